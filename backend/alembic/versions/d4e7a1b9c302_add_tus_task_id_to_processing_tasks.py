@@ -0,0 +1,79 @@
+"""add tus_task_id to processing_tasks
+
+Revision ID: d4e7a1b9c302
+Revises: c88c397f3096
+Create Date: 2026-10-16 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd4e7a1b9c302'
+down_revision: Union[str, Sequence[str], None] = 'c88c397f3096'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 5000
+
+
+def backfill_tus_task_id(bind, batch_size: int = BATCH_SIZE, table_name: str = 'processing_tasks') -> None:
+    """从output_data/task_metadata中的tus_task_id回填新列，按主键分批执行避免长时间锁表"""
+    if bind.dialect.name == 'mysql':
+        max_id = bind.execute(sa.text(f"SELECT MAX(id) FROM {table_name}")).scalar() or 0
+        for start in range(0, max_id + 1, batch_size):
+            bind.execute(sa.text(f"""
+                UPDATE {table_name}
+                SET tus_task_id = COALESCE(
+                    NULLIF(JSON_UNQUOTE(JSON_EXTRACT(output_data, '$.tus_task_id')), 'null'),
+                    NULLIF(JSON_UNQUOTE(JSON_EXTRACT(task_metadata, '$.tus_task_id')), 'null')
+                )
+                WHERE id >= :start AND id < :end AND tus_task_id IS NULL
+                  AND (JSON_EXTRACT(output_data, '$.tus_task_id') IS NOT NULL
+                       OR JSON_EXTRACT(task_metadata, '$.tus_task_id') IS NOT NULL)
+            """), {'start': start, 'end': start + batch_size})
+        return
+
+    # 其他数据库：分批读取JSON在Python中解析
+    table = sa.table(
+        table_name,
+        sa.column('id', sa.Integer),
+        sa.column('tus_task_id', sa.String),
+        sa.column('output_data', sa.JSON),
+        sa.column('task_metadata', sa.JSON)
+    )
+    update = table.update().where(table.c.id == sa.bindparam('row_id')).values(tus_task_id=sa.bindparam('value'))
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select(table.c.id, table.c.output_data, table.c.task_metadata)
+            .where(table.c.id > last_id, table.c.tus_task_id.is_(None))
+            .order_by(table.c.id)
+            .limit(batch_size)
+        ).fetchall()
+        if not rows:
+            break
+        values = []
+        for row in rows:
+            value = (row.output_data or {}).get('tus_task_id') or (row.task_metadata or {}).get('tus_task_id')
+            if value:
+                values.append({'row_id': row.id, 'value': str(value)})
+        if values:
+            bind.execute(update, values)
+        last_id = rows[-1].id
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('processing_tasks', sa.Column('tus_task_id', sa.String(length=255), nullable=True))
+    op.create_index(op.f('ix_processing_tasks_tus_task_id'), 'processing_tasks', ['tus_task_id'], unique=False)
+    backfill_tus_task_id(op.get_bind())
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_processing_tasks_tus_task_id'), table_name='processing_tasks')
+    op.drop_column('processing_tasks', 'tus_task_id')
@@ -52,4 +52,21 @@ async def get_asr_status():
         return {"status": "online" if response.status_code == 200 else "offline"}
     except Exception as e:
         logger.error(f"ASR服务状态检查失败: {str(e)}")
-        return {"status": "offline"}
\ No newline at end of file
+        return {"status": "offline"}
+
+
+@router.get("/cache/stats",
+    summary="获取ASR结果缓存统计",
+    description="返回按音频内容哈希缓存的ASR结果的命中率、条目数和容量占用。",
+    operation_id="asr_cache_stats")
+def get_asr_cache_stats():
+    """
+    获取ASR结果缓存统计
+
+    统计从Redis同步读取，使用普通函数由FastAPI在线程池中执行，不阻塞事件循环。
+
+    Returns:
+        dict: 命中/未命中/写入/淘汰次数、命中率、条目数和缓存总字节数
+    """
+    from app.services.asr_cache import asr_result_cache
+    return asr_result_cache.get_stats()
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, Body
+from fastapi import APIRouter, Depends, HTTPException, Body, Request
 from fastapi.responses import RedirectResponse, Response
 from typing import List, Dict, Any, Optional
 import os
@@ -18,6 +18,7 @@ from app.schemas.video_slice import VideoSlice as VideoSliceSchema
 from app.models.video import Video
 from app.models.project import Project
 from app.core.config import settings
+from app.services.media_streaming import stream_minio_object
 from app.models.resource import Resource, ResourceTag
 from app.core.constants import ProcessingTaskType, ProcessingTaskStatus, ProcessingStage
 from app.models.processing_task import ProcessingTask
@@ -632,55 +633,32 @@ async def export_slice_to_capcut(
         500: {"description": "服务器内部错误"}
     }
 )
-async def proxy_minio_resource(resource_path: str):
+async def proxy_minio_resource(resource_path: str, request: Request):
     """
     为CapCut服务器提供可访问的MinIO资源代理
     
-    允许CapCut服务访问存储在MinIO中的资源文件。该端点会从MinIO获取指定路径的资源并直接返回给请求方。
+    允许CapCut服务访问存储在MinIO中的资源文件。该端点从MinIO流式读取指定路径的资源并返回给请求方，
+    支持Range（206）和If-None-Match / If-Modified-Since（304），不会把整个文件读入内存。
     
     Args:
         resource_path (str): MinIO中的资源路径
+        request (Request): 当前请求，用于读取Range和条件请求头
         
     Returns:
-        Response: 包含资源内容的HTTP响应，带有适当的内容类型和缓存头
+        Response: 包含资源内容的HTTP响应，带有适当的内容类型、ETag和缓存头
         
     Raises:
         HTTPException: 当资源未找到或访问失败时抛出异常
     """
     try:
-        logger.info(f"代理MinIO资源请求: {resource_path}")
-        
-        # 从MinIO获取资源内容并直接返回
-        from app.services.minio_client import minio_service
-        from fastapi import Response
-        import mimetypes
-        
-        # 获取文件内容
-        response = minio_service.internal_client.get_object(
-            settings.minio_bucket_name, 
-            resource_path
-        )
-        
-        # 读取内容
-        content = response.read()
-        response.close()
-        response.release_conn()
-        
-        # 确定内容类型
-        content_type, _ = mimetypes.guess_type(resource_path)
-        if content_type is None:
-            content_type = "application/octet-stream"
-        
-        logger.info(f"成功代理资源 {resource_path}, 大小: {len(content)} 字节")
-        
-        return Response(
-            content=content,
-            media_type=content_type,
-            headers={
-                "Content-Length": str(len(content)),
-                "Cache-Control": "public, max-age=3600"  # 1小时缓存
-            }
+        logger.info(f"代理MinIO资源请求: {resource_path}, Range: {request.headers.get('range')}")
+        return await stream_minio_object(
+            request,
+            resource_path,
+            cache_control="public, max-age=3600"  # 1小时缓存
         )
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"代理MinIO资源失败: {str(e)}")
         raise HTTPException(status_code=500, detail=f"代理资源失败: {str(e)}")
@@ -21,7 +21,8 @@ from app.core.config import settings
 from app.core.constants import ProcessingTaskType, ProcessingTaskStatus, ProcessingStage
 from app.models.processing_task import ProcessingTask
 from app.tasks.video_tasks import export_slice_to_jianying as celery_export_slice_to_jianying
-from app.services.minio_client import minio_service
+from app.services.media_streaming import stream_minio_object
+from app.services.config_version import config_version
 from pydantic import BaseModel, Field
 
 # 创建logger
@@ -134,6 +135,11 @@ class JianyingServiceAPI:
             self.base_url = settings.jianying_api_url
             self.api_key = settings.jianying_api_key
 
+    def refresh_config(self):
+        """系统配置版本变化时调用，settings已是最新配置，不再读取数据库"""
+        self.base_url = settings.jianying_api_url
+        self.api_key = settings.jianying_api_key
+
     def get_resource_by_tag(self, tag_name: str, resource_type: str = "audio") -> Optional[str]:
         """获取资源URL"""
         # 硬编码的资源映射（保持与原CapCut API一致）
@@ -179,6 +185,7 @@ class JianyingServiceAPI:
 
 # 创建Jianying服务实例
 jianying_service = JianyingServiceAPI()
+config_version.register(jianying_service.refresh_config)
 
 @router.post("/export-slice-jianying/{slice_id}", response_model=JianyingExportResponse, operation_id="export_jianying_slice")
 async def export_slice_to_jianying(
@@ -273,20 +280,10 @@ async def export_slice_to_jianying(
         raise HTTPException(status_code=500, detail="Jianying导出任务启动失败")
 
 @router.get("/proxy-resource/{resource_path:path}")
-async def proxy_jianying_resource(resource_path: str, db: AsyncSession = Depends(get_db)):
-    """为Jianying服务器提供MinIO资源访问代理"""
+async def proxy_jianying_resource(resource_path: str, request: Request):
+    """为Jianying服务器提供MinIO资源访问代理，流式返回并支持Range和条件请求"""
     try:
-        logger.info(f"Jianying资源代理请求 - 资源路径: {resource_path}")
-
-        # 从MinIO获取资源文件
-        try:
-            response = minio_service.internal_client.get_object(settings.minio_bucket_name, resource_path)
-            file_data = response.read()
-            response.close()
-            response.release_conn()
-        except Exception as e:
-            logger.error(f"从MinIO获取资源失败: {str(e)}")
-            raise HTTPException(status_code=404, detail="资源文件不存在")
+        logger.info(f"Jianying资源代理请求 - 资源路径: {resource_path}, Range: {request.headers.get('range')}")
 
         # 确定文件的MIME类型
         import mimetypes
@@ -304,16 +301,15 @@ async def proxy_jianying_resource(resource_path: str, db: AsyncSession = Depends
             else:
                 mime_type = 'application/octet-stream'
 
-        # 返回文件内容，设置适当的缓存头
-        from fastapi.responses import Response
-        return Response(
-            content=file_data,
+        # 对象不存在时返回404
+        return await stream_minio_object(
+            request,
+            resource_path,
             media_type=mime_type,
-            headers={
-                "Cache-Control": "public, max-age=3600",  # 缓存1小时
-                "Access-Control-Allow-Origin": "*",  # 允许跨域访问
-                "Content-Disposition": f"inline; filename=\"{resource_path.split('/')[-1]}\""
-            }
+            filename=resource_path.split('/')[-1],
+            disposition="inline",
+            cache_control="public, max-age=3600",  # 缓存1小时
+            extra_headers={"Access-Control-Allow-Origin": "*"}  # 允许跨域访问
         )
 
     except HTTPException:
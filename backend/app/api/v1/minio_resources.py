@@ -1,15 +1,27 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query
+from pydantic import BaseModel, Field
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import Optional
+from typing import Optional, List, Dict
 import logging
 from app.core.database import get_db
 from app.core.security import get_current_user
 from app.models.user import User
 from app.services.minio_client import minio_service
+from app.services.presigned_url_cache import presigned_url_cache
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
+
+class BatchURLRequest(BaseModel):
+    object_paths: List[str] = Field(..., max_length=200, description="MinIO中的对象路径列表，最多200个")
+    expiry: int = Field(3600, ge=60, le=7 * 24 * 3600, description="URL过期时间（秒）")
+
+
+class BatchURLResponse(BaseModel):
+    urls: Dict[str, Optional[str]]
+    expires_in: int
+
 @router.get("/minio-url",
     summary="获取MinIO资源的预签名URL",
     description="获取MinIO存储中资源的预签名URL，用于临时访问私有资源。该接口支持设置URL的过期时间。",
@@ -100,4 +112,66 @@ async def get_minio_resource_url(
         "resource_url": url, 
         "expires_in": expiry, 
         "object_path": object_path
-    }
\ No newline at end of file
+    }
+
+
+@router.post("/minio-urls",
+    response_model=BatchURLResponse,
+    summary="批量获取MinIO资源的预签名URL",
+    description="一次获取多个对象的预签名URL，供列表页使用。已签发且剩余有效期足够的URL直接复用，不检查对象是否存在。",
+    operation_id="batch_minio_urls")
+async def get_minio_resource_urls(
+    request: BatchURLRequest,
+    current_user: User = Depends(get_current_user)
+):
+    """
+    批量获取MinIO资源的预签名URL
+
+    与 GET /minio-url 相比不逐个检查对象是否存在，列表页渲染一页缩略图/音频只需一次请求。
+
+    Args:
+        request (BatchURLRequest): 对象路径列表和过期时间
+        current_user (User): 当前认证用户（依赖注入）
+
+    Returns:
+        BatchURLResponse:
+            - urls (Dict[str, Optional[str]]): 对象路径到预签名URL的映射，签名失败的为null
+            - expires_in (int): 请求的URL过期时间（秒）
+
+    Raises:
+        HTTPException:
+            - 400: 当任一对象路径无效时（包含路径遍历攻击特征）
+    """
+    invalid = [path for path in request.object_paths if ".." in path or path.startswith("/")]
+    if invalid:
+        logger.warning(f"无效的对象路径: {invalid}")
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid object path"
+        )
+
+    urls = await minio_service.get_file_urls(request.object_paths, request.expiry)
+    return BatchURLResponse(urls=urls, expires_in=request.expiry)
+
+
+@router.get("/stats",
+    summary="获取MinIO传输统计",
+    description="返回当前进程中MinIO异步客户端各并发通道的排队情况，以及文件上传的次数、字节数和吞吐量。",
+    operation_id="minio_transfer_stats")
+async def get_minio_transfer_stats(current_user: User = Depends(get_current_user)):
+    """
+    获取MinIO传输统计
+
+    统计只包含处理该请求的API进程，Celery worker中的上传见worker日志中的分片上传速度。
+
+    Returns:
+        dict:
+            - lanes (dict): 元数据/大文件通道的请求数、排队次数、平均等待时间和连接统计
+            - uploads (dict): 上传次数、分片上传次数、失败次数、分片重试次数、字节数和bytes_per_second
+            - presigned_url_cache (dict): 预签名URL缓存的进程内/Redis命中次数和命中率
+    """
+    return {
+        "lanes": minio_service.get_async_stats(),
+        "uploads": minio_service.get_upload_stats(),
+        "presigned_url_cache": presigned_url_cache.get_stats()
+    }
@@ -1,10 +1,11 @@
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
 from sqlalchemy.orm import Session
 from typing import List, Dict, Optional
-from app.core.database import get_db, get_sync_db_context
+from app.core.database import get_db
 from app.core.security import get_current_active_user
 from app.models.system_config import SystemConfig
 from app.services.system_config_service import SystemConfigService
+from app.services.config_version import config_version
 from app.core.config import settings
 from pydantic import BaseModel
 from sqlalchemy import select
@@ -79,8 +80,9 @@ async def update_system_config(
             config.category
         )
         
-        # 更新当前settings
+        # 更新当前settings，并递增配置版本通知其他进程
         await SystemConfigService.update_settings_from_db(db)
+        await config_version.bump()
         
         return ConfigItem(
             key=db_config.key,
@@ -128,15 +130,9 @@ async def update_system_configs(
         await SystemConfigService.update_settings_from_db(db)
         logger.info("系统配置已更新到settings")
 
-        # 如果更新了MinIO相关配置，重载MinIO客户端
-        minio_updated = any(config.key.startswith('minio_') for config in configs)
-        if minio_updated:
-            try:
-                from app.services.minio_client import minio_service
-                minio_service.reload_config()
-                logger.info("MinIO客户端配置已重载")
-            except Exception as e:
-                logger.error(f"重载MinIO客户端配置失败: {e}")
+        # 递增配置版本：本进程的MinIO等客户端在配置变化时立即重建，其他进程在下一次使用前重新加载
+        version = await config_version.bump()
+        logger.info(f"系统配置版本已更新为 {version}")
 
         logger.info(f"配置更新完成，共更新 {len(updated_configs)} 个配置项")
         return updated_configs
@@ -154,20 +150,18 @@ async def reload_system_configs(
     db: Session = Depends(get_db),
     current_user = Depends(get_current_active_user)
 ):
-    """触发所有Celery worker重新加载系统配置"""
+    """触发所有进程（包括Celery worker）重新加载系统配置"""
     try:
         # 更新当前settings
         await SystemConfigService.update_settings_from_db(db)
         
-        # 触发所有Celery worker重新加载配置
-        from app.core.celery import reload_system_configs
-        # 在所有worker上执行任务
-        result = reload_system_configs.apply_async()
+        # 递增配置版本，所有进程在下一次使用配置前从数据库重新加载
+        version = await config_version.bump()
         
         return {
             "status": "success", 
-            "message": "系统配置重新加载任务已发送到所有Celery worker",
-            "task_id": result.id
+            "message": "系统配置版本已更新，所有进程将在下一次使用前重新加载",
+            "version": version
         }
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -419,8 +413,7 @@ async def check_service_status(
                 from app.services.llm_service import llm_service
                 
                 # 动态更新LLM服务的配置
-                with get_sync_db_context() as db:
-                    SystemConfigService.update_settings_from_db_sync(db)
+                await config_version.ensure_current()
                 
                 # 重新初始化LLM服务以使用最新的配置
                 models = await llm_service.get_available_models(filter_provider="google")
@@ -11,6 +11,7 @@ from app.models.project import Project
 from app.models.processing_task import ProcessingStatus
 from app.schemas.video import VideoResponse, PaginatedVideoResponse
 from app.core.config import settings
+from app.services.minio_client import minio_service
 
 router = APIRouter()
 
@@ -18,6 +19,17 @@ import logging
 logger = logging.getLogger(__name__)
 
 
+async def _get_thumbnail_urls(videos: List[Video]) -> dict:
+    """批量签名视频缩略图URL（经预签名URL缓存），返回 {thumbnail_path: url}
+
+    数据库中保存的thumbnail_url是上传时签发的URL，可能已经过期，存在thumbnail_path时以新签名为准
+    """
+    paths = [video.thumbnail_path for video in videos if video.thumbnail_path]
+    if not paths:
+        return {}
+    return await minio_service.get_file_urls(paths, settings.presign_list_thumbnail_expiry)
+
+
 @router.get("/active", response_model=List[VideoResponse], summary="获取活动视频列表", description="获取当前用户所有非完成状态的视频", operation_id="list_active_videos")
 async def get_active_videos(
     current_user: User = Depends(get_current_user),
@@ -61,6 +73,8 @@ async def get_active_videos(
     result = await db.execute(stmt)
     videos_with_project = result.all()
     
+    thumbnail_urls = await _get_thumbnail_urls([video for video, _ in videos_with_project])
+
     # 构建包含项目名称的视频列表
     videos = []
     for video, project_name in videos_with_project:
@@ -90,7 +104,7 @@ async def get_active_videos(
             'file_path': video.file_path,
             'duration': video.duration,
             'file_size': video.file_size,
-            'thumbnail_url': video.thumbnail_url,
+            'thumbnail_url': thumbnail_urls.get(video.thumbnail_path) or video.thumbnail_url,
             'status': actual_status,
             'download_progress': actual_download_progress,
             'created_at': video.created_at,
@@ -284,6 +298,8 @@ async def get_videos(
     result = await db.execute(stmt)
     videos_with_project = result.all()
     
+    thumbnail_urls = await _get_thumbnail_urls([video for video, _ in videos_with_project])
+
     # 构建包含项目名称的视频列表
     videos = []
     for video, project_name in videos_with_project:
@@ -297,7 +313,7 @@ async def get_videos(
             'file_path': video.file_path,
             'duration': video.duration,
             'file_size': video.file_size,
-            'thumbnail_url': video.thumbnail_url,
+            'thumbnail_url': thumbnail_urls.get(video.thumbnail_path) or video.thumbnail_url,
             'status': video.status,
             'download_progress': video.download_progress,
             'created_at': video.created_at,
@@ -341,6 +357,7 @@ async def get_video(
         )
     
     video, project_name = video_with_project
+    thumbnail_urls = await _get_thumbnail_urls([video])
     
     video_dict = {
         'id': video.id,
@@ -352,7 +369,7 @@ async def get_video(
         'file_path': video.file_path,
         'duration': video.duration,
         'file_size': video.file_size,
-        'thumbnail_url': video.thumbnail_url,
+        'thumbnail_url': thumbnail_urls.get(video.thumbnail_path) or video.thumbnail_url,
         'status': video.status,
         'download_progress': video.download_progress,
         'created_at': video.created_at,
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 import re
@@ -10,6 +10,8 @@ from app.models.user import User
 from app.models.video import Video
 from app.models.project import Project
 from app.services.minio_client import minio_service
+from app.services.config_version import config_version
+from app.services.media_streaming import stream_minio_object
 
 router = APIRouter()
 
@@ -467,26 +469,17 @@ async def get_thumbnail_download_url(
 @router.get("/{video_id}/video-download")
 async def download_video_direct(
     video_id: int,
+    request: Request,
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
     """直接下载视频文件，通过后端代理避免MinIO直链问题"""
-    # 在执行下载前重新加载MinIO配置，确保使用最新的访问密钥
+    # 确保使用最新的访问密钥，配置版本未变化时不访问数据库也不重建MinIO客户端
     try:
-        from app.services.system_config_service import SystemConfigService
-        from app.core.database import get_sync_db
-        
-        # 重新加载系统配置
-        db_sync = get_sync_db()
-        SystemConfigService.update_settings_from_db_sync(db_sync)
-        db_sync.close()
-        
-        # 重新加载MinIO客户端配置
-        minio_service.reload_config()
-        
-        logger.info("已重新加载MinIO配置")
+        if await config_version.ensure_current():
+            logger.info("已重新加载系统配置")
     except Exception as config_error:
-        logger.error(f"重新加载MinIO配置失败: {config_error}")
+        logger.error(f"重新加载系统配置失败: {config_error}")
     
     logger.info(f"=== 视频下载请求开始 ===")
     logger.info(f"用户ID: {current_user.id}, 视频ID: {video_id}")
@@ -517,43 +510,6 @@ async def download_video_direct(
                 detail="Video file not available"
             )
         
-        # 从MinIO获取文件流
-        file_stream = await minio_service.get_file_stream(video.file_path)
-        if not file_stream:
-            logger.error(f"无法从MinIO获取文件流: {video.file_path}")
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Video file not found in storage"
-            )
-        
-        # 获取文件信息
-        file_stat = await minio_service.get_file_stat(video.file_path)
-        if not file_stat:
-            logger.error(f"无法获取文件统计信息: {video.file_path}")
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail="Failed to get file information"
-            )
-        
-        logger.info(f"开始下载视频文件: {video.file_path}, 大小: {file_stat.size} bytes")
-        
-        # 返回文件流响应
-        from fastapi.responses import StreamingResponse
-        import io
-        
-        # 创建文件流生成器
-        async def file_stream_generator():
-            try:
-                # 分块读取文件
-                chunk_size = 8192  # 8KB chunks
-                while True:
-                    chunk = file_stream.read(chunk_size)
-                    if not chunk:
-                        break
-                    yield chunk
-            finally:
-                file_stream.close()
-        
         # 确定内容类型
         content_type = "video/mp4"  # 默认
         if video.filename:
@@ -569,18 +525,14 @@ async def download_video_direct(
         # 设置下载文件名
         download_filename = video.filename or f"{video.title}.mp4"
         
-        logger.info(f"返回视频文件流: {download_filename}, 内容类型: {content_type}")
+        logger.info(f"返回视频文件流: {download_filename}, 内容类型: {content_type}, Range: {request.headers.get('range')}")
         
-        return StreamingResponse(
-            file_stream_generator(),
+        # 支持Range（浏览器拖动进度条）和ETag条件请求，只从MinIO读取请求的范围
+        return await stream_minio_object(
+            request,
+            video.file_path,
             media_type=content_type,
-            headers={
-                "Content-Disposition": f"attachment; filename*=UTF-8''{download_filename}",
-                "Content-Length": str(file_stat.size),
-                "Cache-Control": "no-cache, no-store, must-revalidate",
-                "Pragma": "no-cache",
-                "Expires": "0"
-            }
+            filename=download_filename
         )
         
     except HTTPException:
@@ -229,7 +229,9 @@ async def process_slices(
             video_id=video.id,
             project_id=video.project_id,
             user_id=current_user.id,
-            slice_items=request.slice_items
+            slice_items=request.slice_items,
+            smart_cut=request.smart_cut,
+            force_asr=request.force_asr
         )
         
         # 创建处理任务记录
@@ -245,7 +247,9 @@ async def process_slices(
             input_data={
                 "analysis_id": request.analysis_id,
                 "slice_items": request.slice_items,
-                "total_slices": len(request.slice_items)
+                "total_slices": len(request.slice_items),
+                "smart_cut": request.smart_cut,
+                "force_asr": request.force_asr
             }
         )
         
@@ -1,5 +1,7 @@
 from celery import Celery
+from celery.signals import worker_process_shutdown
 import os
+import sys
 from dotenv import load_dotenv
 from app.core.config import settings
 
@@ -121,7 +123,7 @@ celery_app.conf.beat_schedule = {
             'queue': 'default',
         }
     },
-    # 每小时重新加载系统配置
+    # 每小时核对一次系统配置版本（配置变更通知丢失时的兜底）
     'reload-system-configs': {
         'task': 'reload_system_configs',
         'schedule': crontab(minute=0),  # 每小时执行
@@ -139,25 +141,44 @@ print(f"Broker Transport Options: {celery_app.conf.broker_transport_options}")
 # 定义重新加载系统配置的任务
 @celery_app.task
 def reload_system_configs():
-    """重新加载系统配置的任务"""
+    """按配置版本重新加载系统配置的任务，版本未变化时不访问数据库"""
     try:
-        from app.services.system_config_service import SystemConfigService
-        from app.core.database import get_sync_db
-        from app.services.minio_client import minio_service
-        
-        # 获取数据库会话并加载配置
-        db = get_sync_db()
-        SystemConfigService.update_settings_from_db_sync(db)
-        db.close()
-        
-        # 重新加载MinIO客户端配置
-        minio_service.reload_config()
-        
-        print("系统配置已重新加载")
-        return {"status": "success", "message": "系统配置已重新加载"}
+        from app.services.config_version import config_version
+        # 加载MinIO客户端以注册配置变更回调
+        from app.services.minio_client import minio_service  # noqa: F401
+
+        reloaded = config_version.ensure_current_sync()
+        message = "系统配置已重新加载" if reloaded else "系统配置已是最新版本"
+        print(message)
+        return {"status": "success", "message": message, "version": config_version.local_version}
     except Exception as e:
         print(f"重新加载系统配置失败: {e}")
         return {"status": "error", "message": str(e)}
 
+@worker_process_shutdown.connect
+def close_tus_http_sessions(**kwargs):
+    """worker进程退出时关闭TUS客户端的共享HTTP会话"""
+    # 只在本进程已经加载过TUS客户端时关闭，避免退出时才初始化客户端
+    module = sys.modules.get('app.services.tus_asr_client')
+    if module is None:
+        return
+    try:
+        print(f"TUS HTTP连接复用统计: {module.tus_asr_client.get_connection_stats()}")
+        module.tus_asr_client.close_http_sessions_sync()
+    except Exception as e:
+        print(f"关闭TUS HTTP会话失败: {e}")
+
+@worker_process_shutdown.connect
+def close_minio_http_sessions(**kwargs):
+    """worker进程退出时关闭异步MinIO客户端的共享HTTP会话"""
+    module = sys.modules.get('app.services.async_s3_client')
+    if module is None:
+        return
+    try:
+        module.minio_session_pool.close_sync()
+        module.minio_stream_session_pool.close_sync()
+    except Exception as e:
+        print(f"关闭MinIO HTTP会话失败: {e}")
+
 if __name__ == "__main__":
     celery_app.start()
@@ -57,9 +57,30 @@ class Settings(BaseSettings):
     minio_secret_key: str = os.getenv("MINIO_SECRET_KEY", "minioadmin")
     minio_bucket_name: str = "youtube-videos"
     minio_secure: bool = False
+    minio_region: Optional[str] = None  # 存储区域，未配置时按桶查询一次后缓存
+    minio_http_pool_limit: int = 64  # 异步MinIO客户端共享HTTP会话的连接数上限
+    minio_small_op_concurrency: int = 32  # 元数据请求（stat/delete/小对象上传）的并发上限
+    minio_large_op_concurrency: int = 4  # 大文件上传/下载的并发上限，与元数据请求互不排队
+    minio_stream_concurrency: int = 64  # 按客户端速度读取的对象流（视频/资源代理）的并发上限，使用独立连接池，不占用大文件通道
+    minio_large_op_threshold: int = 8 * 1024 * 1024  # 内存数据达到该大小(字节)时按大文件传输
+    minio_small_op_timeout: float = 30.0  # 元数据请求的总超时(秒)
+    minio_large_op_read_timeout: float = 300.0  # 大文件传输单次读写的空闲超时(秒)，不限制总时长
+    minio_multipart_threshold: int = 64 * 1024 * 1024  # 文件达到该大小(字节)时使用并行分片上传
+    minio_multipart_part_size: int = 16 * 1024 * 1024  # 分片大小(字节)，不小于5MB，分片数超过10000时自动放大
+    minio_multipart_concurrency: int = 4  # 单个文件同时上传的分片数
+    minio_multipart_part_retries: int = 3  # 单个分片失败后的重试次数
+    minio_multipart_verify_checksum: bool = True  # 分片携带Content-MD5由服务端校验，合并后核对整体ETag
+    presign_cache_enabled: bool = True  # 缓存预签名URL，同一对象在有效期内返回相同的URL
+    presign_cache_min_remaining_ratio: float = 0.5  # 复用URL时剩余有效期不少于请求有效期的比例
+    presign_cache_local_ttl: float = 60.0  # 进程内缓存条目不回查Redis的最长时间(秒)，限制删除后其他进程的滞后
+    presign_cache_max_local_entries: int = 10000  # 进程内最多缓存的URL数
+    presign_list_thumbnail_expiry: int = 24 * 3600  # 视频列表中缩略图URL的有效期(秒)
+    media_stream_chunk_size: int = 1024 * 1024  # 后端代理视频/资源时每次发送的块大小(字节)
     
     # Redis
     redis_url: str = "redis://redis:6379"
+    config_version_check_interval: float = 30.0  # 没有收到变更通知时，两次核对Redis中配置版本的最小间隔(秒)
+    config_version_pubsub_enabled: bool = True  # 订阅配置变更通知，其他进程修改配置后下一次使用即生效
     
     # Security
     secret_key: str = "your-secret-key-here-change-this-in-production"
@@ -94,6 +115,23 @@ class Settings(BaseSettings):
     tus_timeout_seconds: int = 1500  # TUS超时时间(秒) - 设置为小于Celery硬时间限制
     tus_use_global_callback: bool = True  # 是否使用全局回调服务器(固定端口模式)
     tus_use_standalone_callback: bool = True  # 是否使用独立回调服务器容器
+    tus_transport_codec: str = "wav"  # 上传到ASR服务的传输编码: wav=原始PCM, flac=无损压缩, opus=有损压缩
+    tus_transport_opus_bitrate: int = 32000  # Opus传输编码的码率(bps)
+    tus_upload_parallel_enabled: bool = True  # 服务端支持Concatenation扩展时并发上传partial后合并
+    tus_upload_max_concurrency: int = 4  # 并发上传的partial数上限，实际并发数按吞吐量逐步增加
+    tus_upload_chunk_size: int = 4 * 1024 * 1024  # 初始分块大小(字节)
+    tus_upload_min_chunk_size: int = 1024 * 1024  # 分块大小下限(字节)
+    tus_upload_max_chunk_size: int = 16 * 1024 * 1024  # 分块大小上限(字节)
+    tus_upload_target_chunk_seconds: float = 2.0  # 按观测吞吐量调整分块大小，使单个请求耗时接近该值
+    tus_resume_enabled: bool = True  # 在Redis中记录TUS上传进度，worker中断后重新执行的任务从已确认的offset续传
+    tus_resume_ttl_seconds: int = 24 * 3600  # 上传断点记录的有效期(秒)
+    tus_http_pool_limit: int = 32  # TUS客户端共享HTTP会话的连接总数上限
+    tus_http_pool_limit_per_host: int = 16  # 单个主机的连接数上限，需大于并发上传数
+    tus_http_keepalive_timeout: float = 60.0  # 空闲连接保持时长(秒)，覆盖状态轮询间隔即可复用连接
+    tus_http_dns_cache_ttl: int = 300  # DNS解析结果缓存时长(秒)
+    tus_result_notify_enabled: bool = True  # 通过Redis发布/订阅接收回调服务器的任务完成通知
+    tus_result_safety_poll_seconds: int = 30  # 收到通知前的兜底轮询间隔(秒)，订阅不可用时按5秒轮询
+    tus_result_channel_prefix: str = os.getenv("REDIS_RESULT_CHANNEL_PREFIX", "tus_result_channel:")  # 任务完成通知的频道前缀，与回调服务器的REDIS_RESULT_CHANNEL_PREFIX一致
     
     # LLM Configuration
     openrouter_api_key: Optional[str] = None
@@ -368,6 +406,36 @@ expand_less
     # Temporary directory
     temp_dir: Optional[str] = "/tmp"
     
+    # Video Slicing Configuration
+    slice_batch_enabled: bool = True  # 使用单进程多输出批量切割
+    slice_batch_max_outputs: int = 16  # 单个ffmpeg进程的最大输出数
+    slice_concurrency: int = 4  # 并行切割/上传的批次数
+    slice_source_mode: str = "url"  # url=ffmpeg通过预签名URL按Range读取, download=先分块下载到本地
+    slice_source_url_expiry: int = 6 * 3600  # 源视频预签名URL有效期(秒)
+    slice_keyframe_drift_warning_seconds: float = 2.0  # 流拷贝起点偏移超过该值时发出警告
+    slice_audio_from_parent: bool = True  # 切片/子切片音频直接从父视频WAV中截取，父音频不存在时回退到ffmpeg提取
+    slice_srt_from_parent_transcript: bool = True  # 切片/子切片字幕直接从父视频字幕中截取，父视频字幕不存在时才调用ASR
+
+    # Media Cache Configuration
+    media_cache_enabled: bool = True  # 启用worker本地的源媒体磁盘缓存
+    media_cache_dir: str = "/tmp/flowclip_media_cache"  # 缓存目录，同一节点上的worker共享
+    media_cache_max_bytes: int = 20 * 1024 * 1024 * 1024  # 缓存容量上限(字节)，超出后按LRU淘汰
+
+    # Audio Extraction Configuration
+    audio_extract_streaming: bool = True  # ffmpeg输出的PCM经管道直接分片上传到MinIO，不写临时文件
+    audio_extract_part_size: int = 16 * 1024 * 1024  # 流式上传的分片大小(字节)，不能小于5MB
+
+    # ASR Result Cache Configuration
+    asr_cache_enabled: bool = True  # 按音频内容哈希缓存ASR结果，相同音频不再重复识别
+    asr_cache_ttl_seconds: int = 30 * 24 * 3600  # 缓存条目有效期(秒)
+    asr_cache_max_bytes: int = 2 * 1024 * 1024 * 1024  # 缓存的SRT总大小上限(字节)，超出后按LRU淘汰
+
+    # Parallel ASR Configuration
+    asr_parallel_enabled: bool = True  # 长音频按静音边界切分后并行提交ASR
+    asr_parallel_min_duration: float = 20 * 60  # 音频时长达到该值(秒)时启用并行模式
+    asr_parallel_segment_seconds: int = 600  # 目标分段时长(秒)
+    asr_parallel_max_concurrency: int = 4  # 同时识别的分段数上限，建议与ASR服务worker数一致
+    
     # CapCut Configuration
     capcut_api_url: str = "http://192.168.8.107:9002"
     capcut_api_key: Optional[str] = None
@@ -323,6 +323,10 @@ async def shutdown_event():
     # 停止进度更新服务
     from app.services.progress_service import progress_service
     await progress_service.stop()
+    # 关闭异步MinIO客户端的共享HTTP会话
+    from app.services.async_s3_client import minio_session_pool, minio_stream_session_pool
+    await minio_session_pool.close()
+    await minio_stream_session_pool.close()
 
 if __name__ == "__main__":
     uvicorn.run(
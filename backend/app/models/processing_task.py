@@ -13,6 +13,7 @@ class ProcessingTask(Base):
     task_type = Column(String(50), nullable=False)  # ProcessingTaskType
     task_name = Column(String(200), nullable=False)  # 任务名称
     celery_task_id = Column(String(255), unique=True, index=True)  # CeleryTaskID
+    tus_task_id = Column(String(255), index=True)  # TUS ASR任务ID，回调服务器按此查找任务
     
     # 状态信息
     status = Column(String(50), default=ProcessingTaskStatus.PENDING)  # ProcessingTaskStatus
@@ -159,6 +159,8 @@ class SliceProcessRequest(BaseModel):
     analysis_id: int
     slice_items: List[Dict[str, Any]]  # 需要处理的切片项
     process_srt: bool = False  # 是否在切片完成后处理SRT
+    smart_cut: bool = False  # 是否使用智能切割（帧精确起点，只重新编码首个GOP）
+    force_asr: bool = False  # 是否强制重新调用ASR生成切片字幕（默认从父视频字幕中截取）
 
 class SliceProcessResponse(BaseModel):
     """切片处理响应"""
@@ -0,0 +1,340 @@
+"""
+ASR结果缓存
+
+以解码后的PCM内容哈希 + ASR模型类型 + 语言作为缓存键，
+SRT结果保存在MinIO（asr_cache/{key}.srt），索引保存在Redis：
+- asr_cache:entry:{key}   条目元数据（Hash，带TTL）
+- asr_cache:lru           最近访问时间（ZSet），按容量淘汰时使用
+- asr_cache:bytes         缓存的SRT总字节数
+- asr_cache:stats         命中/未命中/写入/淘汰计数
+- asr_cache:pending:{tus_task_id}  已提交但尚未回调的TUS任务对应的缓存键
+
+同一段音频（重复导入的视频、重新生成的切片、回调丢失后的重试）
+第二次请求ASR时直接返回缓存的SRT，不再上传到TUS服务。
+"""
+
+import time
+import json
+import mmap
+import hashlib
+import logging
+import subprocess
+from typing import Dict, Any, Optional
+
+from app.services.lazy_redis import LazyRedis, SettingsDefault
+from app.services.minio_client import minio_service
+
+logger = logging.getLogger(__name__)
+
+
+class ASRResultCache:
+    """基于音频内容哈希的ASR结果缓存"""
+
+    KEY_PREFIX = 'asr_cache'
+    OBJECT_PREFIX = 'asr_cache'
+    PENDING_TTL_SECONDS = 24 * 3600
+    # 每次淘汰从LRU集合读取的条目数
+    EVICT_BATCH_SIZE = 100
+    HASH_CHUNK_SIZE = 4 * 1024 * 1024
+    # 缓存键使用的规范PCM格式：16kHz 单声道 16bit
+    CANONICAL_SAMPLE_RATE = 16000
+    CANONICAL_CHANNELS = 1
+
+    enabled = SettingsDefault('asr_cache_enabled')
+    ttl_seconds = SettingsDefault('asr_cache_ttl_seconds')
+    max_bytes = SettingsDefault('asr_cache_max_bytes')
+
+    def __init__(self, redis_url: str = None, enabled: bool = None, ttl_seconds: int = None, max_bytes: int = None):
+        """
+        初始化ASR结果缓存
+
+        Args:
+            redis_url: Redis连接URL，默认从配置读取
+            enabled: 是否启用缓存，默认从配置读取
+            ttl_seconds: 条目有效期(秒)，默认从配置读取
+            max_bytes: 缓存容量上限(字节)，默认从配置读取
+        """
+        self._enabled = enabled
+        self._ttl_seconds = ttl_seconds
+        self._max_bytes = max_bytes
+        self._redis = LazyRedis("ASR结果缓存", redis_url)
+
+    def _entry_key(self, key: str) -> str:
+        return f"{self.KEY_PREFIX}:entry:{key}"
+
+    def _pending_key(self, tus_task_id: str) -> str:
+        return f"{self.KEY_PREFIX}:pending:{tus_task_id}"
+
+    def _object_name(self, key: str) -> str:
+        return f"{self.OBJECT_PREFIX}/{key}.srt"
+
+    def compute_audio_key_sync(self, audio_path: str, model_type: str, language: str) -> str:
+        """
+        计算音频的缓存键
+
+        16kHz单声道16bit PCM的WAV直接对data块做哈希；其他格式先用ffmpeg解码为
+        相同的规范PCM再哈希，因此同一段音频无论容器格式如何都得到相同的键。
+
+        Args:
+            audio_path: 本地音频文件路径
+            model_type: ASR模型类型
+            language: 识别语言
+
+        Returns:
+            sha256十六进制字符串
+        """
+        digest = hashlib.sha256()
+        if not self._hash_canonical_wav(audio_path, digest):
+            digest = hashlib.sha256()
+            self._hash_decoded_pcm(audio_path, digest)
+        digest.update(f"|model={model_type or ''}|lang={language or ''}".encode('utf-8'))
+        return digest.hexdigest()
+
+    def _hash_canonical_wav(self, audio_path: str, digest) -> bool:
+        """对规范格式WAV的data块做哈希，格式不符时返回False"""
+        from app.services.audio_processor import AudioProcessor
+
+        with open(audio_path, 'rb') as f:
+            try:
+                data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                # 空文件无法mmap
+                return False
+            try:
+                layout = AudioProcessor._read_wav_layout(data)
+                if (not layout or layout['audio_format'] != 1
+                        or layout['sample_rate'] != self.CANONICAL_SAMPLE_RATE
+                        or layout['channels'] != self.CANONICAL_CHANNELS
+                        or layout['bits_per_sample'] != 16):
+                    return False
+                end = layout['data_offset'] + layout['data_size']
+                for offset in range(layout['data_offset'], end, self.HASH_CHUNK_SIZE):
+                    digest.update(data[offset:min(offset + self.HASH_CHUNK_SIZE, end)])
+                return True
+            finally:
+                data.close()
+
+    def _hash_decoded_pcm(self, audio_path: str, digest):
+        """使用ffmpeg将音频解码为规范PCM并对输出做哈希"""
+        cmd = [
+            'ffmpeg', '-v', 'error', '-i', audio_path,
+            '-vn', '-f', 's16le', '-acodec', 'pcm_s16le',
+            '-ar', str(self.CANONICAL_SAMPLE_RATE), '-ac', str(self.CANONICAL_CHANNELS),
+            'pipe:1'
+        ]
+        process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        try:
+            while True:
+                chunk = process.stdout.read(self.HASH_CHUNK_SIZE)
+                if not chunk:
+                    break
+                digest.update(chunk)
+            _, stderr = process.communicate(timeout=600)
+        except Exception:
+            process.kill()
+            process.wait()
+            raise
+        if process.returncode != 0:
+            raise Exception(f"音频解码失败: {stderr.decode('utf-8', errors='ignore')}")
+
+    def lookup_sync(self, key: str) -> Optional[str]:
+        """
+        查找缓存的SRT内容
+
+        Args:
+            key: compute_audio_key_sync返回的缓存键
+
+        Returns:
+            SRT文本，未命中时返回None
+        """
+        client = self._redis.get() if self.enabled else None
+        if client is None:
+            return None
+
+        try:
+            entry = client.hgetall(self._entry_key(key))
+            content = minio_service.get_file_content_sync(entry['object_name']) if entry else None
+            if content is None:
+                if entry:
+                    # 索引存在但对象已丢失，移除索引
+                    self._remove_entry(client, key, int(entry.get('size', 0)))
+                client.hincrby(f"{self.KEY_PREFIX}:stats", 'misses', 1)
+                return None
+
+            client.zadd(f"{self.KEY_PREFIX}:lru", {key: time.time()})
+            client.hincrby(f"{self.KEY_PREFIX}:stats", 'hits', 1)
+            logger.info(f"ASR结果缓存命中: {key[:16]}")
+            return content.decode('utf-8')
+        except Exception as e:
+            logger.warning(f"查询ASR结果缓存失败: {e}")
+            return None
+
+    def store_sync(self, key: str, srt_content: str, model_type: str = None, language: str = None) -> bool:
+        """
+        写入缓存，超出容量时按最近访问时间淘汰
+
+        Args:
+            key: 缓存键
+            srt_content: SRT文本
+            model_type: ASR模型类型（仅记录）
+            language: 识别语言（仅记录）
+
+        Returns:
+            是否写入成功
+        """
+        client = self._redis.get() if self.enabled else None
+        if client is None or not srt_content or not srt_content.strip():
+            return False
+
+        try:
+            content = srt_content.encode('utf-8')
+            object_name = self._object_name(key)
+            if not minio_service.upload_file_content_sync(content, object_name, 'text/plain; charset=utf-8'):
+                return False
+
+            entry_key = self._entry_key(key)
+            previous_size = client.hget(entry_key, 'size')
+            client.hset(entry_key, mapping={
+                'object_name': object_name,
+                'size': len(content),
+                'model': model_type or '',
+                'language': language or '',
+                'created_at': time.time()
+            })
+            client.expire(entry_key, self.ttl_seconds)
+            client.zadd(f"{self.KEY_PREFIX}:lru", {key: time.time()})
+            client.incrby(f"{self.KEY_PREFIX}:bytes", len(content) - int(previous_size or 0))
+            client.hincrby(f"{self.KEY_PREFIX}:stats", 'stores', 1)
+            logger.info(f"ASR结果已写入缓存: {key[:16]}, 大小: {len(content)} bytes")
+
+            self.evict_sync(exclude=key)
+            return True
+        except Exception as e:
+            logger.warning(f"写入ASR结果缓存失败: {e}")
+            return False
+
+    def register_pending_sync(self, tus_task_id: str, key: str, model_type: str = None, language: str = None) -> bool:
+        """记录已提交的TUS任务对应的缓存键，回调服务器收到结果后写入缓存"""
+        client = self._redis.get() if self.enabled else None
+        if client is None or not tus_task_id:
+            return False
+        try:
+            client.set(
+                self._pending_key(tus_task_id),
+                json.dumps({'key': key, 'model': model_type, 'language': language}),
+                ex=self.PENDING_TTL_SECONDS
+            )
+            return True
+        except Exception as e:
+            logger.warning(f"记录待缓存的TUS任务失败: {e}")
+            return False
+
+    def store_for_task_sync(self, tus_task_id: str, srt_content: str) -> bool:
+        """回调完成时，按TUS任务ID找到缓存键并写入缓存"""
+        client = self._redis.get() if self.enabled else None
+        if client is None or not tus_task_id:
+            return False
+        try:
+            pending = client.get(self._pending_key(tus_task_id))
+            if not pending:
+                return False
+            client.delete(self._pending_key(tus_task_id))
+            info = json.loads(pending)
+            return self.store_sync(info['key'], srt_content, info.get('model'), info.get('language'))
+        except Exception as e:
+            logger.warning(f"写入TUS任务的ASR缓存失败: {e}")
+            return False
+
+    def evict_sync(self, exclude: str = None) -> int:
+        """
+        清理过期条目，并在超出容量时淘汰最久未访问的条目
+
+        只读取LRU有序集合低分一端的有限条目，不遍历整个集合：
+        - 最近访问时间不会早于写入时间，访问时间早于TTL的条目一定已过期
+        - 超出容量时从最久未访问的一端按批取出，降到容量以内即停止
+
+        Args:
+            exclude: 不淘汰的缓存键（刚写入的条目）
+
+        Returns:
+            淘汰的条目数
+        """
+        client = self._redis.get()
+        if client is None:
+            return 0
+
+        evicted = 0
+        lru_key = f"{self.KEY_PREFIX}:lru"
+        expired = client.zrangebyscore(lru_key, '-inf', time.time() - self.ttl_seconds,
+                                       start=0, num=self.EVICT_BATCH_SIZE)
+        for key in expired:
+            if key != exclude:
+                self._remove_entry(client, key, self._entry_size(client, key))
+                evicted += 1
+
+        total_bytes = int(client.get(f"{self.KEY_PREFIX}:bytes") or 0)
+        while total_bytes > self.max_bytes:
+            candidates = [key for key in client.zrange(lru_key, 0, self.EVICT_BATCH_SIZE - 1) if key != exclude]
+            if not candidates:
+                break
+            for key in candidates:
+                if total_bytes <= self.max_bytes:
+                    break
+                size = self._entry_size(client, key)
+                self._remove_entry(client, key, size)
+                total_bytes -= size
+                evicted += 1
+
+        if evicted:
+            client.hincrby(f"{self.KEY_PREFIX}:stats", 'evictions', evicted)
+            logger.info(f"ASR结果缓存淘汰 {evicted} 个条目")
+        return evicted
+
+    def _entry_size(self, client, key: str) -> int:
+        """条目的SRT大小，Hash已被Redis TTL删除时读取MinIO对象大小"""
+        size = client.hget(self._entry_key(key), 'size')
+        return int(size) if size is not None else self._object_size(key)
+
+    def _object_size(self, key: str) -> int:
+        stat = minio_service.stat_file_sync(self._object_name(key))
+        return stat['size'] if stat else 0
+
+    def _remove_entry(self, client, key: str, size: int):
+        """删除缓存条目的索引和MinIO对象"""
+        client.delete(self._entry_key(key))
+        client.zrem(f"{self.KEY_PREFIX}:lru", key)
+        client.incrby(f"{self.KEY_PREFIX}:bytes", -size)
+        minio_service.delete_file_sync(self._object_name(key))
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取缓存命中率、条目数和容量占用（所有worker共享）"""
+        stats = {
+            'enabled': self.enabled,
+            'hits': 0,
+            'misses': 0,
+            'stores': 0,
+            'evictions': 0,
+            'hit_rate': 0.0,
+            'entries': 0,
+            'total_bytes': 0,
+            'max_bytes': self.max_bytes,
+            'ttl_seconds': self.ttl_seconds
+        }
+        client = self._redis.get()
+        if client is None:
+            return stats
+
+        try:
+            for name, value in client.hgetall(f"{self.KEY_PREFIX}:stats").items():
+                stats[name] = int(value)
+            lookups = stats['hits'] + stats['misses']
+            stats['hit_rate'] = round(stats['hits'] / lookups, 4) if lookups else 0.0
+            stats['entries'] = client.zcard(f"{self.KEY_PREFIX}:lru")
+            stats['total_bytes'] = int(client.get(f"{self.KEY_PREFIX}:bytes") or 0)
+        except Exception as e:
+            logger.warning(f"获取ASR结果缓存统计失败: {e}")
+        return stats
+
+
+# 全局ASR结果缓存实例
+asr_result_cache = ASRResultCache()
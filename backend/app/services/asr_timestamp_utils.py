@@ -169,4 +169,35 @@ def validate_segments(segments: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
             # 调整时间戳确保连续性
             validated_segments[i]['start'] = validated_segments[i-1]['end']
     
-    return validated_segments
\ No newline at end of file
+    return validated_segments
+
+
+def window_segments(segments: List[Dict[str, Any]], start_time: float, end_time: float) -> List[Dict[str, Any]]:
+    """
+    从父视频字幕中截取与[start_time, end_time]重叠的片段，并把时间戳重新以0为起点
+
+    Args:
+        segments: 父视频字幕片段，每个元素包含start、end（秒）和text
+        start_time: 窗口开始时间（秒，父视频时间轴）
+        end_time: 窗口结束时间（秒，父视频时间轴）
+
+    Returns:
+        以窗口起点为0的字幕片段列表，跨越窗口边界的片段会被截断到窗口内
+    """
+    clipped = []
+    for segment in sorted(segments, key=lambda s: s['start']):
+        if segment['end'] <= start_time or segment['start'] >= end_time:
+            continue
+        clipped.append({
+            'start': max(segment['start'], start_time),
+            'end': min(segment['end'], end_time),
+            'text': segment['text']
+        })
+
+    windowed = adjust_timestamps_with_duration(
+        [{'segments': clipped, 'wav_duration': end_time - start_time}],
+        time_offset=-start_time
+    )
+    for segment in windowed:
+        segment.pop('original_file', None)
+    return validate_segments(windowed)
@@ -0,0 +1,127 @@
+"""
+ASR传输编码
+上传到TUS之前将16kHz PCM WAV转码为FLAC（无损）或Opus（有损），减少经过网络的字节数；
+ASR服务按文件扩展名解码，回调和SRT处理流程不受影响
+"""
+
+import asyncio
+import logging
+import tempfile
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# 16kHz单声道16bit PCM的码率(bps)，用于估算压缩后的大小
+PCM_16K_MONO_BITRATE = 16000 * 16
+
+# 输出不含编码器版本和随机的Ogg流序号，同一输入重复转码得到相同文件，断点续传可按内容哈希匹配
+BITEXACT_ARGS = ['-fflags', '+bitexact', '-flags:a', '+bitexact']
+
+TRANSPORT_CODECS: Dict[str, Dict[str, Any]] = {
+    'wav': {'extension': 'wav'},
+    # 语音的典型无损压缩率约为原始PCM的55%
+    'flac': {'extension': 'flac', 'ratio': 0.55, 'args': ['-c:a', 'flac', '-compression_level', '5']},
+    # compression_level 5比默认的10编码快约20%，语音下的体积差异可以忽略
+    'opus': {'extension': 'ogg', 'args': ['-c:a', 'libopus', '-application', 'voip', '-vbr', 'on', '-compression_level', '5']},
+}
+
+
+class ASRTransportEncoder:
+    """在TUS上传前按配置转码音频"""
+
+    def __init__(self, codec: str = None, opus_bitrate: int = None):
+        """
+        初始化传输编码器
+
+        Args:
+            codec: 传输编码 wav/flac/opus，默认从配置读取
+            opus_bitrate: Opus码率(bps)，默认从配置读取
+        """
+        self._codec = codec
+        self._opus_bitrate = opus_bitrate
+
+    @property
+    def codec(self) -> str:
+        codec = (self._codec or getattr(settings, 'tus_transport_codec', 'wav') or 'wav').lower()
+        if codec not in TRANSPORT_CODECS:
+            logger.warning(f"未知的传输编码: {codec}，使用wav")
+            return 'wav'
+        return codec
+
+    @property
+    def opus_bitrate(self) -> int:
+        return int(self._opus_bitrate or getattr(settings, 'tus_transport_opus_bitrate', 32000))
+
+    def estimate_transport_size(self, file_size: int, codec: str = None) -> int:
+        """估算16kHz单声道WAV转码后的上传字节数"""
+        codec = codec or self.codec
+        if codec == 'opus':
+            return int(file_size * self.opus_bitrate / PCM_16K_MONO_BITRATE)
+        return int(file_size * TRANSPORT_CODECS[codec].get('ratio', 1.0))
+
+    def build_command(self, input_path: str, output_path: str, codec: str = None) -> list:
+        """构建转码命令，输出保持16kHz单声道"""
+        codec = codec or self.codec
+        cmd = ['ffmpeg', '-v', 'error', '-nostdin', '-i', input_path, '-vn', '-ac', '1', '-ar', '16000']
+        cmd += TRANSPORT_CODECS[codec]['args'] + BITEXACT_ARGS
+        if codec == 'opus':
+            cmd += ['-b:a', str(self.opus_bitrate)]
+        return cmd + ['-y', output_path]
+
+    async def encode(self, audio_file_path: str, output_dir: str, codec: str = None) -> Optional[str]:
+        """
+        使用ffmpeg流式转码到输出目录，不把音频读入内存
+
+        Returns:
+            转码后的文件路径，编码为wav或转码失败时返回None
+        """
+        codec = codec or self.codec
+        if codec == 'wav':
+            return None
+
+        output_path = Path(output_dir) / f"{Path(audio_file_path).stem}.{TRANSPORT_CODECS[codec]['extension']}"
+        process = await asyncio.create_subprocess_exec(
+            *self.build_command(audio_file_path, str(output_path), codec),
+            stdout=asyncio.subprocess.DEVNULL,
+            stderr=asyncio.subprocess.PIPE
+        )
+        _, stderr = await process.communicate()
+        if process.returncode != 0 or not output_path.exists():
+            logger.warning(f"音频转码为{codec}失败，使用原始WAV上传: {stderr.decode('utf-8', errors='replace')}")
+            return None
+        return str(output_path)
+
+    @asynccontextmanager
+    async def transport_file(self, audio_file_path: str) -> AsyncIterator[Tuple[str, str]]:
+        """
+        提供用于上传的文件路径和实际使用的编码，退出时删除转码产生的临时文件
+
+        Yields:
+            (上传文件路径, 编码名称)
+        """
+        codec = self.codec
+        if codec == 'wav':
+            yield audio_file_path, 'wav'
+            return
+
+        with tempfile.TemporaryDirectory(dir=settings.temp_dir) as temp_dir:
+            encoded_path = await self.encode(audio_file_path, temp_dir, codec)
+            if not encoded_path:
+                yield audio_file_path, 'wav'
+                return
+
+            original_size = Path(audio_file_path).stat().st_size
+            encoded_size = Path(encoded_path).stat().st_size
+            logger.info(
+                f"音频已转码为{codec}: {original_size} -> {encoded_size} bytes "
+                f"({encoded_size / max(original_size, 1) * 100:.1f}%)"
+            )
+            yield encoded_path, codec
+
+
+# 全局实例
+asr_transport_encoder = ASRTransportEncoder()
@@ -0,0 +1,439 @@
+"""
+异步S3客户端
+复用minio的URL构建和SigV4签名，请求通过按事件循环复用的aiohttp会话直接在事件循环中发出，不经过线程池。
+大文件传输和元数据请求使用两条独立的并发通道，列表页生成预签名URL、查询对象信息时
+不会排在多GB的上传后面。
+get_object返回的流由调用方按自己的速度读取（如代理给浏览器播放），使用第三条stream通道和独立的连接池，
+慢速客户端只会占用stream通道，不会阻塞大文件传输和元数据请求。
+"""
+
+import os
+import time
+import asyncio
+import hashlib
+import logging
+import weakref
+import xml.etree.ElementTree as ET
+from datetime import timedelta
+from contextlib import asynccontextmanager
+from typing import Dict, Any, AsyncIterator, List
+from urllib.parse import urlunsplit
+
+import aiohttp
+from yarl import URL
+from minio.datatypes import Object, Part
+from minio.error import S3Error
+from minio.helpers import BaseURL
+from minio.signer import sign_v4_s3, presign_v4
+from minio.credentials import StaticProvider
+from minio.time import utcnow, to_amz_date, from_http_header
+from minio.xml import Element, SubElement, findtext, getbytes
+from minio.helpers import md5sum_hash
+
+from app.core.config import settings
+from app.services.http_session_pool import HTTPSessionPool
+
+logger = logging.getLogger(__name__)
+
+# 单次PUT的对象大小上限，超过后只能分片上传
+MAX_SINGLE_PUT_SIZE = 5 * 1024 * 1024 * 1024
+
+UNSIGNED_PAYLOAD = "UNSIGNED-PAYLOAD"
+
+# HEAD请求没有响应体，按状态码给出错误码
+STATUS_ERROR_CODES = {
+    403: "AccessDenied",
+    404: "NoSuchKey",
+    405: "MethodNotAllowed",
+}
+
+
+class AsyncObjectStream:
+    """GET对象的响应流，读完或不再需要时调用close释放连接和stream通道名额"""
+
+    def __init__(self, response: aiohttp.ClientResponse, release_lane):
+        self._response = response
+        self._release_lane = release_lane
+        self._closed = False
+
+    @property
+    def headers(self):
+        return self._response.headers
+
+    @property
+    def status(self) -> int:
+        return self._response.status
+
+    async def read(self, size: int = -1) -> bytes:
+        """读取最多size字节，返回空字节串表示已读完"""
+        return await self._response.content.read(size)
+
+    async def iter_chunks(self, chunk_size: int) -> AsyncIterator[bytes]:
+        """按块迭代响应体"""
+        async for chunk in self._response.content.iter_chunked(chunk_size):
+            yield chunk
+
+    def close(self):
+        """读完的连接放回连接池，未读完的连接直接关闭"""
+        if self._closed:
+            return
+        self._closed = True
+        if self._response.content.at_eof():
+            self._response.release()
+        else:
+            self._response.close()
+        self._release_lane()
+
+    def release_conn(self):
+        """与minio/urllib3响应对象的接口保持一致"""
+        self.close()
+
+
+class AsyncS3Client:
+    """在事件循环中直接访问S3兼容存储的客户端"""
+
+    def __init__(
+        self,
+        endpoint: str,
+        access_key: str,
+        secret_key: str,
+        secure: bool = False,
+        region: str = None,
+        presign_endpoint: str = None,
+        session_pool: HTTPSessionPool = None,
+        small_concurrency: int = None,
+        large_concurrency: int = None,
+        stream_session_pool: HTTPSessionPool = None,
+        stream_concurrency: int = None
+    ):
+        """
+        初始化异步S3客户端
+
+        Args:
+            endpoint: 内部端点（host:port），用于实际的请求
+            access_key: 访问密钥
+            secret_key: 私有密钥
+            secure: 是否使用HTTPS
+            region: 存储区域，未指定时按桶查询一次后缓存
+            presign_endpoint: 生成预签名URL使用的公共端点，默认与内部端点相同
+            session_pool: aiohttp会话池，默认使用MinIO专用的共享会话池
+            small_concurrency: 元数据请求通道的并发上限，默认从配置读取
+            large_concurrency: 大文件传输通道的并发上限，默认从配置读取
+            stream_session_pool: get_object响应流使用的会话池，默认使用MinIO流式读取专用的共享会话池
+            stream_concurrency: get_object响应流的并发上限，默认从配置读取
+        """
+        scheme = "https://" if secure else "http://"
+        self._base_url = BaseURL(scheme + endpoint, region)
+        self._presign_url = BaseURL(scheme + presign_endpoint, region) if presign_endpoint else self._base_url
+        self._provider = StaticProvider(access_key, secret_key)
+        self._session_pool = session_pool or minio_session_pool
+        self.small_concurrency = small_concurrency or settings.minio_small_op_concurrency
+        self.large_concurrency = large_concurrency or settings.minio_large_op_concurrency
+        self._stream_session_pool = stream_session_pool or minio_stream_session_pool
+        self.stream_concurrency = stream_concurrency or settings.minio_stream_concurrency
+        self._region_map: Dict[str, str] = {}
+        # asyncio.Semaphore绑定首次使用它的事件循环，Celery任务各自运行事件循环，按事件循环分别创建
+        self._lanes: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, asyncio.Semaphore]]" = weakref.WeakKeyDictionary()
+        self._stats = {
+            lane: {'requests': 0, 'queued': 0, 'wait_seconds': 0.0, 'active': 0}
+            for lane in ('small', 'large', 'stream')
+        }
+
+    def _lane_concurrency(self, lane: str) -> int:
+        return {'small': self.small_concurrency, 'large': self.large_concurrency,
+                'stream': self.stream_concurrency}[lane]
+
+    def _get_lane(self, lane: str) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        lanes = self._lanes.get(loop)
+        if lanes is None:
+            lanes = {
+                lane: asyncio.Semaphore(self._lane_concurrency(lane))
+                for lane in ('small', 'large', 'stream')
+            }
+            self._lanes[loop] = lanes
+        return lanes[lane]
+
+    async def _acquire(self, lane: str):
+        """占用通道名额，返回释放函数"""
+        semaphore = self._get_lane(lane)
+        stats = self._stats[lane]
+        stats['requests'] += 1
+        if semaphore.locked():
+            stats['queued'] += 1
+        started = time.perf_counter()
+        await semaphore.acquire()
+        stats['wait_seconds'] += time.perf_counter() - started
+        stats['active'] += 1
+        released = False
+
+        def release():
+            nonlocal released
+            if not released:
+                released = True
+                stats['active'] -= 1
+                semaphore.release()
+        return release
+
+    @staticmethod
+    def _small_timeout() -> aiohttp.ClientTimeout:
+        return aiohttp.ClientTimeout(total=settings.minio_small_op_timeout)
+
+    @staticmethod
+    def _large_timeout() -> aiohttp.ClientTimeout:
+        # 大文件传输不限制总时长，只限制连接和单次读取的空闲时间
+        return aiohttp.ClientTimeout(total=None, sock_connect=30, sock_read=settings.minio_large_op_read_timeout)
+
+    async def _get_region(self, bucket_name: str) -> str:
+        """获取桶所在区域，查询结果按桶缓存"""
+        if self._base_url.region:
+            return self._base_url.region
+        region = self._region_map.get(bucket_name)
+        if region:
+            return region
+
+        response = await self._send("GET", "us-east-1", bucket_name, query_params={"location": ""},
+                                    timeout=self._small_timeout())
+        try:
+            element = ET.fromstring(await response.read())
+        finally:
+            response.release()
+        region = element.text or "us-east-1"
+        self._region_map[bucket_name] = region
+        return region
+
+    async def _send(
+        self,
+        method: str,
+        region: str,
+        bucket_name: str,
+        object_name: str = None,
+        query_params: Dict[str, str] = None,
+        headers: Dict[str, str] = None,
+        data=None,
+        content_sha256: str = None,
+        timeout: aiohttp.ClientTimeout = None,
+        session_pool: HTTPSessionPool = None
+    ) -> aiohttp.ClientResponse:
+        """签名并发送请求，非2xx响应转换为S3Error；调用方负责释放返回的响应"""
+        url = self._base_url.build(method, region, bucket_name=bucket_name,
+                                   object_name=object_name, query_params=query_params)
+        date = utcnow()
+        headers = dict(headers or {})
+        headers["Host"] = url.netloc
+        headers["x-amz-content-sha256"] = content_sha256 or hashlib.sha256(data or b"").hexdigest()
+        headers["x-amz-date"] = to_amz_date(date)
+        headers = sign_v4_s3(method, url, region, headers, self._provider.retrieve(),
+                             headers["x-amz-content-sha256"], date)
+
+        session = await (session_pool or self._session_pool).get_session()
+        # URL已按S3规则编码，禁止yarl再次编码；不请求压缩，保证Content-Length和Range按对象字节计算
+        response = await session.request(method, URL(urlunsplit(url), encoded=True), headers=headers, data=data,
+                                         timeout=timeout, skip_auto_headers=("Content-Type", "Accept-Encoding"))
+        if response.status in (200, 204, 206):
+            return response
+
+        try:
+            body = await response.read() if method != "HEAD" else b""
+        finally:
+            response.release()
+        raise self._error_from_response(response.status, body, bucket_name, object_name)
+
+    @staticmethod
+    def _error_from_response(status: int, body: bytes, bucket_name: str, object_name: str) -> S3Error:
+        code, message, request_id = STATUS_ERROR_CODES.get(status, "ResponseError"), f"HTTP {status}", None
+        if body:
+            try:
+                element = ET.fromstring(body)
+                code = element.findtext("Code") or code
+                message = element.findtext("Message") or message
+                request_id = element.findtext("RequestId")
+            except ET.ParseError:
+                pass
+        resource = f"/{bucket_name}/{object_name}" if object_name else f"/{bucket_name}"
+        return S3Error(code, message, resource, request_id, None, None,
+                       bucket_name=bucket_name, object_name=object_name)
+
+    async def _request(self, lane: str, method: str, bucket_name: str, object_name: str = None, **kwargs):
+        """在指定通道中执行请求并读完响应体，返回(响应, 响应体)"""
+        release = await self._acquire(lane)
+        try:
+            return await self._request_unlaned(method, bucket_name, object_name, **kwargs)
+        finally:
+            release()
+
+    async def stat_object(self, bucket_name: str, object_name: str) -> Object:
+        """获取对象信息，返回值与Minio.stat_object相同"""
+        response, _ = await self._request('small', "HEAD", bucket_name, object_name, timeout=self._small_timeout())
+        last_modified = response.headers.get("last-modified")
+        return Object(
+            bucket_name,
+            object_name,
+            last_modified=from_http_header(last_modified) if last_modified else None,
+            etag=response.headers.get("etag", "").replace('"', ""),
+            size=int(response.headers.get("content-length", "0")),
+            content_type=response.headers.get("content-type"),
+            metadata=response.headers,
+            version_id=response.headers.get("x-amz-version-id"),
+        )
+
+    async def put_object(self, bucket_name: str, object_name: str, data: bytes,
+                         content_type: str = "application/octet-stream") -> str:
+        """上传内存中的数据，较大的数据走大文件通道，返回ETag"""
+        lane = 'large' if len(data) >= settings.minio_large_op_threshold else 'small'
+        timeout = self._large_timeout() if lane == 'large' else self._small_timeout()
+        response, _ = await self._request(
+            lane, "PUT", bucket_name, object_name,
+            headers={"Content-Type": content_type, "Content-Length": str(len(data))},
+            data=data, timeout=timeout
+        )
+        return response.headers.get("etag", "").replace('"', "")
+
+    async def put_object_file(self, bucket_name: str, object_name: str, file_path: str,
+                              content_type: str = "application/octet-stream") -> str:
+        """从本地文件流式上传对象（单次PUT），返回ETag"""
+        file_size = os.path.getsize(file_path)
+        if file_size > MAX_SINGLE_PUT_SIZE:
+            raise ValueError(f"文件超过单次上传上限({MAX_SINGLE_PUT_SIZE} bytes): {file_path}")
+        with open(file_path, 'rb') as f:
+            response, _ = await self._request(
+                'large', "PUT", bucket_name, object_name,
+                headers={"Content-Type": content_type, "Content-Length": str(file_size)},
+                data=f, content_sha256=UNSIGNED_PAYLOAD, timeout=self._large_timeout()
+            )
+        return response.headers.get("etag", "").replace('"', "")
+
+    @asynccontextmanager
+    async def transfer_slot(self):
+        """占用大文件通道的一个名额，分片上传整体只占一个名额，分片并发由调用方控制"""
+        release = await self._acquire('large')
+        try:
+            yield
+        finally:
+            release()
+
+    async def _request_unlaned(self, method: str, bucket_name: str, object_name: str = None, **kwargs):
+        """不占用通道名额执行请求并读完响应体，调用方需持有transfer_slot"""
+        region = await self._get_region(bucket_name)
+        response = await self._send(method, region, bucket_name, object_name, **kwargs)
+        try:
+            body = await response.read()
+        finally:
+            response.release()
+        return response, body
+
+    async def create_multipart_upload(self, bucket_name: str, object_name: str,
+                                      content_type: str = "application/octet-stream") -> str:
+        """创建分片上传，返回upload_id"""
+        _, body = await self._request_unlaned(
+            "POST", bucket_name, object_name, query_params={"uploads": ""},
+            headers={"Content-Type": content_type}, timeout=self._small_timeout()
+        )
+        return findtext(ET.fromstring(body), "UploadId", True)
+
+    async def upload_part(self, bucket_name: str, object_name: str, upload_id: str,
+                          part_number: int, data: bytes, content_md5: str = None) -> str:
+        """
+        上传一个分片，返回分片ETag
+
+        指定content_md5（base64）时由服务端校验分片内容，不一致时返回BadDigest错误
+        """
+        headers = {"Content-Length": str(len(data))}
+        if content_md5:
+            headers["Content-MD5"] = content_md5
+        response, _ = await self._request_unlaned(
+            "PUT", bucket_name, object_name,
+            query_params={"partNumber": str(part_number), "uploadId": upload_id},
+            headers=headers, data=data, content_sha256=UNSIGNED_PAYLOAD, timeout=self._large_timeout()
+        )
+        return response.headers.get("etag", "").replace('"', "")
+
+    async def complete_multipart_upload(self, bucket_name: str, object_name: str,
+                                        upload_id: str, parts: List[Part]) -> str:
+        """合并已上传的分片，返回对象ETag"""
+        element = Element("CompleteMultipartUpload")
+        for part in parts:
+            tag = SubElement(element, "Part")
+            SubElement(tag, "PartNumber", str(part.part_number))
+            SubElement(tag, "ETag", '"' + part.etag + '"')
+        payload = getbytes(element)
+        # 合并大对象可能耗时较长，使用大文件传输的超时
+        _, body = await self._request_unlaned(
+            "POST", bucket_name, object_name, query_params={"uploadId": upload_id},
+            headers={"Content-Type": "application/xml", "Content-MD5": md5sum_hash(payload)},
+            data=payload, timeout=self._large_timeout()
+        )
+        result = ET.fromstring(body)
+        # 合并失败时S3也可能返回200，错误信息在响应体中
+        if result.tag == "Error":
+            raise self._error_from_response(200, body, bucket_name, object_name)
+        return (findtext(result, "ETag") or "").replace('"', "")
+
+    async def abort_multipart_upload(self, bucket_name: str, object_name: str, upload_id: str):
+        """取消分片上传，释放已上传的分片"""
+        await self._request_unlaned(
+            "DELETE", bucket_name, object_name, query_params={"uploadId": upload_id},
+            timeout=self._small_timeout()
+        )
+
+    async def remove_object(self, bucket_name: str, object_name: str):
+        """删除对象"""
+        await self._request('small', "DELETE", bucket_name, object_name, timeout=self._small_timeout())
+
+    async def get_object(self, bucket_name: str, object_name: str,
+                         offset: int = 0, length: int = None) -> AsyncObjectStream:
+        """
+        获取对象内容的响应流
+
+        返回的流在close之前一直占用stream通道的一个名额和独立连接池中的一个连接，
+        读取速度由调用方决定（如浏览器播放速度），因此不占用大文件通道和共享连接池
+        """
+        headers = {}
+        if offset or length:
+            end = f"{offset + length - 1}" if length else ""
+            headers["Range"] = f"bytes={offset}-{end}"
+        release = await self._acquire('stream')
+        try:
+            region = await self._get_region(bucket_name)
+            response = await self._send("GET", region, bucket_name, object_name, headers=headers,
+                                        timeout=self._large_timeout(), session_pool=self._stream_session_pool)
+        except BaseException:
+            release()
+            raise
+        return AsyncObjectStream(response, release)
+
+    async def presigned_get_object(self, bucket_name: str, object_name: str,
+                                   expires: timedelta = timedelta(days=7)) -> str:
+        """生成预签名下载URL，只做本地签名计算，区域已缓存时不发出请求"""
+        region = await self._get_region(bucket_name)
+        url = self._presign_url.build("GET", region, bucket_name=bucket_name, object_name=object_name)
+        url = presign_v4("GET", url, region, self._provider.retrieve(), utcnow(), int(expires.total_seconds()))
+        return urlunsplit(url)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """各通道的请求数、排队次数和平均等待时间"""
+        stats = {}
+        for lane, lane_stats in self._stats.items():
+            requests = lane_stats['requests']
+            stats[lane] = {
+                **lane_stats,
+                'wait_seconds': round(lane_stats['wait_seconds'], 3),
+                'avg_wait_ms': round(lane_stats['wait_seconds'] / requests * 1000, 2) if requests else 0.0,
+                'concurrency': self._lane_concurrency(lane)
+            }
+        stats['connections'] = self._session_pool.get_stats()
+        stats['stream_connections'] = self._stream_session_pool.get_stats()
+        return stats
+
+
+# MinIO专用的共享会话池，与TUS客户端的会话池分开，连接数互不占用
+minio_session_pool = HTTPSessionPool(
+    limit=settings.minio_http_pool_limit,
+    limit_per_host=settings.minio_http_pool_limit
+)
+
+# 响应流按客户端速度读取，使用单独的会话池，慢速客户端不会占满上面共享会话池的连接
+minio_stream_session_pool = HTTPSessionPool(
+    limit=settings.minio_stream_concurrency,
+    limit_per_host=settings.minio_stream_concurrency
+)
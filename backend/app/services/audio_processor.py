@@ -1,6 +1,10 @@
 import subprocess
+import mmap
+import struct
 import os
+import shutil
 import tempfile
+import threading
 import asyncio
 import logging
 import time
@@ -8,6 +12,7 @@ from pathlib import Path
 from typing import Dict, Any, Optional
 from app.core.config import settings
 from app.services.minio_client import minio_service
+from app.services.asr_cache import asr_result_cache
 
 logger = logging.getLogger(__name__)
 
@@ -31,80 +36,166 @@ class AudioProcessor:
         logger.info(f"开始从视频提取音频: {video_path}")
         
         try:
-            # 创建临时目录
-            with tempfile.TemporaryDirectory() as temp_dir:
-                temp_path = Path(temp_dir)
-                
-                # 构建输出音频文件路径
-                if custom_filename:
-                    audio_filename = f"{custom_filename}.{audio_format}"
-                else:
-                    audio_filename = f"{video_id}.{audio_format}"
-                output_path = temp_path / audio_filename
-                
-                # 使用ffmpeg提取音频
-                cmd = [
-                    'ffmpeg',
-                    '-i', video_path,
-                    '-vn',  # 禁用视频
-                    '-acodec', 'pcm_s16le',  # 16-bit PCM
-                    '-ar', '16000',  # 采样率 16kHz
-                    '-ac', '1',  # 单声道
-                    '-y',  # 覆盖输出文件
-                    str(output_path)
-                ]
-                
-                logger.info(f"执行ffmpeg命令: {' '.join(cmd)}")
-                
-                # 执行命令
-                result = subprocess.run(cmd, capture_output=True, text=True)
-                
-                if result.returncode != 0:
-                    logger.error(f"ffmpeg音频提取失败: {result.stderr}")
-                    raise Exception(f"音频提取失败: {result.stderr}")
-                
-                # 检查输出文件
-                if not output_path.exists():
-                    raise Exception("音频文件未生成")
-                
-                # 获取音频信息
-                audio_info = await self._get_audio_info(str(output_path))
-                
-                # 上传到MinIO
-                if custom_filename:
-                    audio_object_name = f"users/{user_id}/projects/{project_id}/audio/{custom_filename}.{audio_format}"
-                else:
-                    audio_object_name = minio_service.generate_audio_object_name(
-                        user_id, project_id, video_id, audio_format
-                    )
-                
-                audio_url = await minio_service.upload_file(
-                    str(output_path),
-                    audio_object_name,
-                    f"audio/{audio_format}"
+            # 构建输出音频文件名和对象名
+            if custom_filename:
+                audio_filename = f"{custom_filename}.{audio_format}"
+                audio_object_name = f"users/{user_id}/projects/{project_id}/audio/{custom_filename}.{audio_format}"
+            else:
+                audio_filename = f"{video_id}.{audio_format}"
+                audio_object_name = minio_service.generate_audio_object_name(
+                    user_id, project_id, video_id, audio_format
                 )
-                
-                if not audio_url:
-                    raise Exception("音频文件上传到MinIO失败")
-                
-                logger.info(f"Audio Extraction Completed，上传到: {audio_url}")
-                
-                return {
-                    'success': True,
-                    'video_id': video_id,
-                    'audio_filename': audio_filename,
-                    'minio_path': audio_url,
-                    'object_name': audio_object_name,
-                    'duration': audio_info.get('duration', 0),
-                    'file_size': output_path.stat().st_size,
-                    'audio_format': audio_format,
-                    'sample_rate': audio_info.get('sample_rate', 16000),
-                    'channels': audio_info.get('channels', 1)
-                }
+
+            if audio_format == "wav" and settings.audio_extract_streaming:
+                # ffmpeg输出的PCM经管道直接分片上传，不写临时文件
+                audio_info = await asyncio.get_event_loop().run_in_executor(
+                    None, self.extract_audio_streaming_sync, video_path, audio_object_name
+                )
+            else:
+                audio_info = await self._extract_audio_to_file(video_path, audio_filename, audio_object_name, audio_format)
+
+            logger.info(f"Audio Extraction Completed，上传到: {audio_object_name}")
+            
+            return {
+                'success': True,
+                'video_id': video_id,
+                'audio_filename': audio_filename,
+                'minio_path': audio_object_name,
+                'object_name': audio_object_name,
+                'duration': audio_info.get('duration', 0),
+                'file_size': audio_info['file_size'],
+                'audio_format': audio_format,
+                'sample_rate': audio_info.get('sample_rate', 16000),
+                'channels': audio_info.get('channels', 1)
+            }
                 
         except Exception as e:
             logger.error(f"音频提取失败: {str(e)}", exc_info=True)
             raise Exception(f"音频提取失败: {str(e)}")
+
+    async def _extract_audio_to_file(
+        self,
+        video_path: str,
+        audio_filename: str,
+        audio_object_name: str,
+        audio_format: str
+    ) -> Dict[str, Any]:
+        """先用ffmpeg写入临时文件再上传到MinIO，返回音频信息"""
+        with tempfile.TemporaryDirectory(dir=self.temp_dir) as temp_dir:
+            output_path = Path(temp_dir) / audio_filename
+            
+            # 使用ffmpeg提取音频
+            cmd = [
+                'ffmpeg',
+                '-i', video_path,
+                '-vn',  # 禁用视频
+                '-acodec', 'pcm_s16le',  # 16-bit PCM
+                '-ar', '16000',  # 采样率 16kHz
+                '-ac', '1',  # 单声道
+                '-y',  # 覆盖输出文件
+                str(output_path)
+            ]
+            
+            logger.info(f"执行ffmpeg命令: {' '.join(cmd)}")
+            
+            # 执行命令
+            result = subprocess.run(cmd, capture_output=True, text=True)
+            
+            if result.returncode != 0:
+                logger.error(f"ffmpeg音频提取失败: {result.stderr}")
+                raise Exception(f"音频提取失败: {result.stderr}")
+            
+            # 检查输出文件
+            if not output_path.exists():
+                raise Exception("音频文件未生成")
+            
+            # 获取音频信息，WAV直接读取文件头
+            duration = self.get_wav_duration_sync(str(output_path)) if audio_format == "wav" else None
+            if duration is not None:
+                audio_info = {'duration': duration, 'sample_rate': 16000, 'channels': 1}
+            else:
+                audio_info = await self._get_audio_info(str(output_path))
+            audio_info['file_size'] = output_path.stat().st_size
+            
+            audio_url = await minio_service.upload_file(
+                str(output_path),
+                audio_object_name,
+                f"audio/{audio_format}"
+            )
+            
+            if not audio_url:
+                raise Exception("音频文件上传到MinIO失败")
+            return audio_info
+
+    @staticmethod
+    def build_wav_header(data_bytes: int, sample_rate: int = 16000, channels: int = 1, sample_width: int = 2) -> bytes:
+        """生成44字节的PCM WAV文件头"""
+        byte_rate = sample_rate * channels * sample_width
+        return (
+            b'RIFF' + struct.pack('<I', 36 + data_bytes) + b'WAVE'
+            + b'fmt ' + struct.pack('<IHHIIHH', 16, 1, channels, sample_rate, byte_rate, channels * sample_width, sample_width * 8)
+            + b'data' + struct.pack('<I', data_bytes)
+        )
+
+    def extract_audio_streaming_sync(self, video_path: str, audio_object_name: str) -> Dict[str, Any]:
+        """ffmpeg将16kHz单声道PCM写入管道，边读取边分片上传到MinIO
+
+        时长和文件大小由PCM字节数计算，不再调用ffprobe；WAV头在所有数据上传后才生成。
+        """
+        sample_rate, channels, sample_width = 16000, 1, 2
+        cmd = [
+            'ffmpeg',
+            '-v', 'error',
+            '-nostdin',
+            '-i', video_path,
+            '-vn',  # 禁用视频
+            '-f', 's16le',  # 裸PCM输出到管道
+            '-acodec', 'pcm_s16le',
+            '-ar', str(sample_rate),
+            '-ac', str(channels),
+            'pipe:1'
+        ]
+        logger.info(f"执行ffmpeg命令(流式上传): {' '.join(cmd)}")
+
+        try:
+            process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        except FileNotFoundError as e:
+            logger.error(f"ffmpeg音频提取失败: {e}")
+            raise Exception(f"音频提取失败: 找不到ffmpeg ({e})")
+        # 单独的线程读取stderr，避免管道写满阻塞ffmpeg
+        stderr_chunks = []
+        stderr_thread = threading.Thread(target=lambda: stderr_chunks.append(process.stderr.read()), daemon=True)
+        stderr_thread.start()
+
+        try:
+            data_bytes = minio_service.upload_stream_sync(
+                process.stdout,
+                audio_object_name,
+                "audio/wav",
+                part_size=settings.audio_extract_part_size,
+                header_factory=lambda size: self.build_wav_header(size, sample_rate, channels, sample_width)
+            )
+        except BaseException:
+            process.kill()
+            process.wait()
+            raise
+        finally:
+            process.stdout.close()
+
+        returncode = process.wait()
+        stderr_thread.join()
+        stderr = b''.join(stderr_chunks).decode('utf-8', errors='replace')
+        if returncode != 0 or data_bytes == 0:
+            minio_service.delete_file_sync(audio_object_name)
+            logger.error(f"ffmpeg音频提取失败: {stderr}")
+            raise Exception(f"音频提取失败: {stderr or '音频文件未生成'}")
+
+        return {
+            'duration': data_bytes / (sample_rate * channels * sample_width),
+            'file_size': 44 + data_bytes,
+            'sample_rate': sample_rate,
+            'channels': channels
+        }
     
 
     async def _get_audio_info(self, audio_path: str) -> Dict[str, Any]:
@@ -202,7 +293,406 @@ class AudioProcessor:
         except Exception as e:
             logger.error(f"音频采样率转换失败: {str(e)}")
             raise Exception(f"音频采样率转换失败: {str(e)}")
-    
+
+    def derive_audio_from_parent_sync(
+        self,
+        video_id: str,
+        project_id: int,
+        user_id: int,
+        start_time: float,
+        end_time: float,
+        custom_filename: str
+    ) -> Optional[Dict[str, Any]]:
+        """
+        从父视频已提取的WAV中按采样偏移截取切片音频并上传到MinIO
+
+        不下载切片视频、不调用ffmpeg。父视频音频不存在或格式不是16kHz单声道16位PCM时返回None，
+        由调用方回退到从切片视频提取音频。
+        """
+        parent_object_name = minio_service.generate_audio_object_name(user_id, project_id, video_id, "wav")
+        if not minio_service.stat_file_sync(parent_object_name):
+            logger.info(f"父视频音频不存在，无法截取切片音频: {parent_object_name}")
+            return None
+
+        from app.services.media_cache import media_cache
+
+        audio_filename = f"{custom_filename}.wav"
+        audio_object_name = f"users/{user_id}/projects/{project_id}/audio/{audio_filename}"
+        with tempfile.TemporaryDirectory(dir=self.temp_dir) as temp_dir:
+            output_path = Path(temp_dir) / audio_filename
+            with media_cache.local_path(parent_object_name) as parent_path:
+                segment = self.cut_wav_segment_sync(parent_path, start_time, end_time, str(output_path))
+            if not segment:
+                return None
+
+            if not minio_service.upload_file_sync(str(output_path), audio_object_name, "audio/wav"):
+                raise Exception("切片音频上传到MinIO失败")
+            # 后续的字幕任务通常在同一节点上读取这个音频
+            media_cache.put_file_sync(audio_object_name, str(output_path))
+
+            logger.info(f"已从父视频音频截取切片音频: {audio_object_name}, 时长: {segment['duration']:.3f}s")
+            return {
+                'success': True,
+                'video_id': video_id,
+                'audio_filename': audio_filename,
+                'minio_path': audio_object_name,
+                'object_name': audio_object_name,
+                'duration': segment['duration'],
+                'file_size': output_path.stat().st_size,
+                'audio_format': 'wav',
+                'sample_rate': segment['sample_rate'],
+                'channels': segment['channels'],
+                'derived_from_parent': True
+            }
+
+    def cut_wav_segment_sync(
+        self,
+        wav_path: str,
+        start_time: float,
+        end_time: float,
+        output_path: str,
+        chunk_size: int = 4 * 1024 * 1024
+    ) -> Optional[Dict[str, Any]]:
+        """
+        通过内存映射从PCM WAV中截取[start_time, end_time)，重写WAV头后写入output_path
+
+        Returns:
+            截取结果信息；文件不是16kHz单声道16位PCM WAV时返回None
+        """
+        with open(wav_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            layout = self._read_wav_layout(mm)
+            if not layout:
+                logger.warning(f"无法解析WAV头: {wav_path}")
+                return None
+            if (layout['audio_format'] != 1 or layout['sample_rate'] != 16000
+                    or layout['channels'] != 1 or layout['bits_per_sample'] != 16):
+                logger.info(f"父视频音频格式不匹配，跳过截取: {layout}")
+                return None
+
+            block_align = layout['block_align']
+            total_frames = layout['data_size'] // block_align
+            start_frame = min(max(int(round(start_time * layout['sample_rate'])), 0), total_frames)
+            end_frame = min(max(int(round(end_time * layout['sample_rate'])), start_frame), total_frames)
+            data_size = (end_frame - start_frame) * block_align
+            offset = layout['data_offset'] + start_frame * block_align
+
+            with open(output_path, 'wb') as out:
+                out.write(self.build_wav_header(
+                    data_size, layout['sample_rate'], layout['channels'], layout['bits_per_sample'] // 8
+                ))
+                for position in range(offset, offset + data_size, chunk_size):
+                    out.write(mm[position:min(position + chunk_size, offset + data_size)])
+
+        return {
+            'duration': (end_frame - start_frame) / layout['sample_rate'],
+            'sample_rate': layout['sample_rate'],
+            'channels': layout['channels'],
+            'start_frame': start_frame,
+            'end_frame': end_frame
+        }
+
+    @staticmethod
+    def _read_wav_layout(data) -> Optional[Dict[str, Any]]:
+        """解析RIFF/WAVE头，返回fmt参数和data块的位置"""
+        if len(data) < 12 or data[0:4] != b'RIFF' or data[8:12] != b'WAVE':
+            return None
+
+        layout = {}
+        position = 12
+        while position + 8 <= len(data):
+            chunk_id = data[position:position + 4]
+            chunk_size = struct.unpack('<I', data[position + 4:position + 8])[0]
+            body = position + 8
+            if chunk_id == b'fmt ' and chunk_size >= 16:
+                audio_format, channels, sample_rate, _, block_align, bits = struct.unpack(
+                    '<HHIIHH', data[body:body + 16]
+                )
+                # WAVE_FORMAT_EXTENSIBLE 的实际格式在子格式GUID的前两个字节
+                if audio_format == 0xFFFE and chunk_size >= 26:
+                    audio_format = struct.unpack('<H', data[body + 24:body + 26])[0]
+                layout.update({
+                    'audio_format': audio_format,
+                    'channels': channels,
+                    'sample_rate': sample_rate,
+                    'block_align': block_align,
+                    'bits_per_sample': bits
+                })
+            elif chunk_id == b'data':
+                # 流式写入的WAV中data大小可能为0或0xFFFFFFFF，以实际文件长度为准
+                if chunk_size in (0, 0xFFFFFFFF) or body + chunk_size > len(data):
+                    chunk_size = len(data) - body
+                layout.update({'data_offset': body, 'data_size': chunk_size})
+                break
+            position = body + chunk_size + (chunk_size & 1)
+
+        if 'block_align' not in layout or 'data_offset' not in layout or not layout['block_align']:
+            return None
+        return layout
+
+    def derive_srt_from_parent_sync(
+        self,
+        video_id: str,
+        project_id: int,
+        user_id: int,
+        start_time: float,
+        end_time: float,
+        srt_filename: str,
+        parent_segments: Optional[list] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        从父视频字幕中截取[start_time, end_time]并以0为起点保存为切片字幕，不调用ASR
+
+        Args:
+            parent_segments: 父视频转录片段（Transcript.segments），为空时读取父视频的SRT文件
+
+        Returns:
+            与ASR生成结果相同结构的字典；父视频字幕不存在或窗口内没有字幕时返回None
+        """
+        from app.services.asr_timestamp_utils import parse_srt_text, window_segments, create_srt_content
+
+        segments = []
+        for segment in parent_segments or []:
+            start = segment.get('start', segment.get('start_time'))
+            end = segment.get('end', segment.get('end_time'))
+            if start is None or end is None or not segment.get('text'):
+                continue
+            segments.append({'start': float(start), 'end': float(end), 'text': segment['text']})
+
+        if not segments:
+            parent_srt_object = minio_service.generate_srt_object_name(user_id, project_id, video_id)
+            content = minio_service.get_file_content_sync(parent_srt_object)
+            if not content:
+                logger.info(f"父视频字幕不存在，无法截取切片字幕: {parent_srt_object}")
+                return None
+            srt_text = content.decode('utf-8-sig', errors='replace').replace('\r\n', '\n')
+            segments = parse_srt_text(srt_text)
+
+        windowed = window_segments(segments, start_time, end_time)
+        if not windowed:
+            logger.info(f"父视频字幕在 {start_time:.3f}s - {end_time:.3f}s 内没有内容，回退到ASR")
+            return None
+
+        srt_content = create_srt_content(windowed)
+        srt_object_name = f"users/{user_id}/projects/{project_id}/subtitles/{srt_filename}"
+        if not minio_service.upload_file_content_sync(
+            srt_content.encode('utf-8'), srt_object_name, 'text/plain; charset=utf-8'
+        ):
+            raise Exception("切片字幕上传到MinIO失败")
+
+        logger.info(f"已从父视频字幕截取切片字幕: {srt_object_name}, 字幕条数: {len(windowed)}")
+        return {
+            'success': True,
+            'strategy': 'transcript_window',
+            'srt_filename': srt_filename,
+            'minio_path': srt_object_name,
+            'object_name': srt_object_name,
+            'srt_content': srt_content,
+            'total_segments': len(windowed)
+        }
+
+    def save_cached_srt_sync(
+        self,
+        srt_content: str,
+        project_id: int,
+        user_id: int,
+        srt_filename: str,
+        cache_key: str = None
+    ) -> Dict[str, Any]:
+        """
+        将ASR结果缓存中的字幕保存为视频/切片字幕文件
+
+        Returns:
+            与ASR生成结果相同结构的字典
+        """
+        from app.services.asr_timestamp_utils import parse_srt_text
+
+        srt_object_name = f"users/{user_id}/projects/{project_id}/subtitles/{srt_filename}"
+        if not minio_service.upload_file_content_sync(
+            srt_content.encode('utf-8'), srt_object_name, 'text/plain; charset=utf-8'
+        ):
+            raise Exception("缓存字幕上传到MinIO失败")
+
+        total_segments = len(parse_srt_text(srt_content))
+        logger.info(f"已使用ASR结果缓存生成字幕: {srt_object_name}, 字幕条数: {total_segments}")
+        return {
+            'success': True,
+            'strategy': 'asr_cache',
+            'srt_filename': srt_filename,
+            'minio_path': srt_object_name,
+            'srt_url': srt_object_name,
+            'object_name': srt_object_name,
+            'srt_content': srt_content,
+            'total_segments': total_segments,
+            'cache_key': cache_key
+        }
+
+    def get_wav_duration_sync(self, wav_path: str) -> Optional[float]:
+        """从WAV头计算时长（兼容流式写入的data块大小），不是PCM WAV时返回None"""
+        try:
+            with open(wav_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                layout = self._read_wav_layout(mm)
+        except (OSError, ValueError):
+            return None
+        if not layout or not layout.get('sample_rate'):
+            return None
+        return layout['data_size'] / layout['block_align'] / layout['sample_rate']
+
+    def split_wav_for_parallel_asr_sync(
+        self,
+        wav_path: str,
+        output_dir: str,
+        segment_seconds: float = None
+    ) -> list:
+        """
+        按静音边界把长音频切分为若干分段，用于并行提交ASR
+
+        切分点复用audio_splitter_enhanced.get_split_points，优先落在句子间的停顿上；
+        分段通过内存映射按采样截取，各分段首尾相接，时长之和等于原音频时长。
+
+        Returns:
+            分段列表[{index, file_path, start, duration}]；音频不是16kHz单声道16位PCM WAV时返回空列表
+        """
+        from audio_splitter_enhanced import load_envelope, get_silence_chunks, get_split_points
+
+        total_duration = self.get_wav_duration_sync(wav_path)
+        if total_duration is None:
+            return []
+
+        segment_ms = int((segment_seconds or settings.asr_parallel_segment_seconds) * 1000)
+        audio = load_envelope(wav_path)
+        audio_length = len(audio)
+        if audio_length <= segment_ms:
+            split_points = [0, audio_length]
+        else:
+            silence_chunks = get_silence_chunks(audio)
+            split_points = get_split_points(
+                audio, audio_length, silence_chunks,
+                max_segment_len=segment_ms,
+                strict_max_len=int(segment_ms * 1.5),
+                min_segment_len=segment_ms // 2,
+                search_window=min(segment_ms // 4, 60000)
+            )
+        del audio
+
+        segments = []
+        boundaries = list(zip(split_points, split_points[1:]))
+        for index, (start_ms, end_ms) in enumerate(boundaries):
+            # 最后一段截取到文件末尾，避免毫秒取整丢失尾部采样
+            end_time = total_duration + 1 if index == len(boundaries) - 1 else end_ms / 1000
+            output_path = os.path.join(output_dir, f"segment_{index:04d}.wav")
+            info = self.cut_wav_segment_sync(wav_path, start_ms / 1000, end_time, output_path)
+            if info is None:
+                return []
+            segments.append({
+                'index': index,
+                'file_path': output_path,
+                'start': info['start_frame'] / info['sample_rate'],
+                'duration': info['duration']
+            })
+
+        logger.info(f"长音频已切分为 {len(segments)} 段: {[round(segment['duration'], 1) for segment in segments]}")
+        return segments
+
+    async def generate_srt_parallel(
+        self,
+        audio_path: str,
+        project_id: int,
+        user_id: int,
+        srt_filename: str,
+        lang: str = "auto",
+        asr_model_type: str = "whisper",
+        max_concurrency: int = None,
+        force_asr: bool = False
+    ) -> Optional[Dict[str, Any]]:
+        """
+        并行分段识别长音频并合并为一个SRT
+
+        按静音边界切分后，以max_concurrency为上限同时提交各分段到ASR服务并等待结果，
+        再用adjust_timestamps_with_duration按分段实际时长累加偏移合并字幕。
+        任一分段失败时整体失败，避免合并出时间轴错位的字幕。
+        force_asr 为 True 时不读取分段缓存，重新识别的结果覆盖旧的缓存条目。
+
+        Returns:
+            与ASR生成结果相同结构的字典；音频无法切分为多段时返回None
+        """
+        from app.services.asr_timestamp_utils import (
+            parse_srt_text, adjust_timestamps_with_duration, validate_segments, create_srt_content
+        )
+        from app.services.tus_asr_client import tus_asr_client
+
+        loop = asyncio.get_event_loop()
+        start = time.time()
+        segment_dir = tempfile.mkdtemp(dir=self.temp_dir)
+        try:
+            segments = await loop.run_in_executor(
+                None, self.split_wav_for_parallel_asr_sync, audio_path, segment_dir
+            )
+            if len(segments) < 2:
+                return None
+
+            limit = max(1, max_concurrency or settings.asr_parallel_max_concurrency)
+            semaphore = asyncio.Semaphore(limit)
+            metadata = {'language': lang, 'model': asr_model_type}
+            logger.info(f"开始并行ASR: {len(segments)} 段, 并发上限: {limit}")
+
+            async def _transcribe(segment: Dict[str, Any]) -> Dict[str, Any]:
+                async with semaphore:
+                    # 分段结果也写入缓存，重试时只需重新识别失败的分段
+                    cache_key = None
+                    srt_text = None
+                    if asr_result_cache.enabled:
+                        cache_key = await loop.run_in_executor(
+                            None, asr_result_cache.compute_audio_key_sync, segment['file_path'], asr_model_type, lang
+                        )
+                        if not force_asr:
+                            srt_text = await loop.run_in_executor(None, asr_result_cache.lookup_sync, cache_key)
+                    if not srt_text:
+                        srt_text = await tus_asr_client.transcribe_segment(segment['file_path'], metadata, segment['index'])
+                        if cache_key:
+                            await loop.run_in_executor(
+                                None, asr_result_cache.store_sync, cache_key, srt_text, asr_model_type, lang
+                            )
+                    logger.info(f"分段 {segment['index']} 识别完成 (起点 {segment['start']:.1f}s)")
+                    return {
+                        'file_path': segment['file_path'],
+                        'segments': parse_srt_text((srt_text or '').replace('\r\n', '\n')),
+                        'wav_duration': segment['duration']
+                    }
+
+            results = await asyncio.gather(*[_transcribe(segment) for segment in segments], return_exceptions=True)
+        finally:
+            shutil.rmtree(segment_dir, ignore_errors=True)
+
+        errors = [result for result in results if isinstance(result, BaseException)]
+        if errors:
+            raise Exception(f"并行ASR失败: {len(errors)}/{len(segments)} 个分段识别失败: {errors[0]}")
+
+        merged = validate_segments(adjust_timestamps_with_duration(results))
+        srt_content = create_srt_content(merged)
+        srt_object_name = f"users/{user_id}/projects/{project_id}/subtitles/{srt_filename}"
+        if not minio_service.upload_file_content_sync(
+            srt_content.encode('utf-8'), srt_object_name, 'text/plain; charset=utf-8'
+        ):
+            raise Exception("并行ASR字幕上传到MinIO失败")
+
+        elapsed = time.time() - start
+        logger.info(f"并行ASR完成: {srt_object_name}, {len(segments)} 段, 字幕条数: {len(merged)}, 耗时: {elapsed:.1f}秒")
+        return {
+            'success': True,
+            'strategy': 'parallel_asr',
+            'srt_filename': srt_filename,
+            'minio_path': srt_object_name,
+            'srt_url': srt_object_name,
+            'object_name': srt_object_name,
+            'srt_content': srt_content,
+            'total_segments': len(merged),
+            'processing_stats': {
+                'segment_count': len(segments),
+                'max_concurrency': limit,
+                'processing_time': elapsed
+            }
+        }
+
     # DEPRECATED: 此方法已弃用，系统不再支持音频分割功能
     # 保留在这里仅为了向后兼容，建议使用generate_srt_from_audio直接处理完整音频文件
     async def split_audio_file(
@@ -528,7 +1018,8 @@ class AudioProcessor:
         asr_service_url: str = None,
         asr_model_type: str = "whisper",  # 添加模型类型参数，默认为whisper
         enable_tus_routing: bool = None,  # 保留参数兼容性
-        force_standard_asr: bool = False  # 保留参数兼容性
+        force_standard_asr: bool = False,  # 保留参数兼容性
+        force_asr: bool = False  # 强制重新调用ASR：不读取结果缓存，新结果覆盖旧的缓存条目
     ) -> Dict[str, Any]:
         """从音频文件生成SRT字幕文件 - 统一使用TUS处理"""
 
@@ -559,6 +1050,43 @@ class AudioProcessor:
             except Exception as e:
                 logger.debug(f"无法获取当前CeleryTaskID: {e}")
 
+            # 相同音频已识别过时直接复用缓存的字幕，不再上传到TUS；强制重新识别时只计算缓存键用于写入新结果
+            cache_key = None
+            if asr_result_cache.enabled:
+                loop = asyncio.get_event_loop()
+                cached_srt = None
+                try:
+                    cache_key = await loop.run_in_executor(
+                        None, asr_result_cache.compute_audio_key_sync, audio_path, asr_model_type, lang
+                    )
+                    if not force_asr:
+                        cached_srt = await loop.run_in_executor(None, asr_result_cache.lookup_sync, cache_key)
+                except Exception as e:
+                    logger.warning(f"查询ASR结果缓存失败，继续调用ASR: {e}")
+                if cached_srt:
+                    srt_filename = custom_filename or f"{video_id}.srt"
+                    return await loop.run_in_executor(
+                        None, self.save_cached_srt_sync, cached_srt, project_id, user_id, srt_filename, cache_key
+                    )
+
+            # 长音频按静音切分后并行识别，耗时随ASR worker数而非音频时长增长
+            if settings.asr_parallel_enabled:
+                duration = self.get_wav_duration_sync(audio_path)
+                if duration and duration >= settings.asr_parallel_min_duration:
+                    result = await self.generate_srt_parallel(
+                        audio_path, project_id, user_id,
+                        srt_filename=custom_filename or f"{video_id}.srt",
+                        lang=lang,
+                        asr_model_type=asr_model_type,
+                        force_asr=force_asr
+                    )
+                    if result:
+                        if cache_key:
+                            await loop.run_in_executor(
+                                None, asr_result_cache.store_sync, cache_key, result['srt_content'], asr_model_type, lang
+                            )
+                        return result
+
             # 启动TUS任务（不等待结果）
             logger.info("启动TUS上传任务...")
             tus_task_result = await tus_asr_client._start_tus_task_only(audio_path, metadata)
@@ -569,6 +1097,12 @@ class AudioProcessor:
 
             logger.info(f"TUS任务已启动，task_id: {tus_task_id}")
 
+            # 回调服务器收到结果后按TaskID写入缓存
+            if cache_key:
+                await loop.run_in_executor(
+                    None, asr_result_cache.register_pending_sync, tus_task_id, cache_key, asr_model_type, lang
+                )
+
             # 提取slice_id和sub_slice_id信息用于链式任务
             slice_id = None
             sub_slice_id = None
@@ -14,26 +14,18 @@ logger = logging.getLogger(__name__)
 class CapCutService:
     def __init__(self, api_base_url: str = None, api_key: str = None):
         if api_base_url is None or api_key is None:
-            # 从数据库获取最新的配置
+            # 配置版本变化时才从数据库重新加载，之后直接使用settings
+            from app.core.config import settings
+            from app.services.config_version import config_version
+
             try:
-                from app.core.database import get_sync_db
-                from app.services.system_config_service import SystemConfigService
-                from app.core.config import settings
-
-                with get_sync_db() as db:
-                    db_configs = SystemConfigService.get_all_configs_sync(db)
-                    if api_base_url is None:
-                        api_base_url = db_configs.get("capcut_api_url", settings.capcut_api_url)
-                    if api_key is None:
-                        api_key = db_configs.get("capcut_api_key", settings.capcut_api_key)
+                config_version.ensure_current_sync()
             except Exception as e:
-                # 如果无法从数据库获取配置，使用默认值
-                from app.core.config import settings
-                if api_base_url is None:
-                    api_base_url = settings.capcut_api_url
-                if api_key is None:
-                    api_key = settings.capcut_api_key
-                logger.warning(f"无法从数据库获取CapCut配置，使用默认配置: {e}")
+                logger.warning(f"无法刷新CapCut配置，使用当前配置: {e}")
+            if api_base_url is None:
+                api_base_url = settings.capcut_api_url
+            if api_key is None:
+                api_key = settings.capcut_api_key
 
         self.base_url = api_base_url
         self.api_key = api_key
@@ -0,0 +1,241 @@
+"""
+系统配置版本
+
+数据库中的系统配置只在版本变化时重新加载，不再每个请求/任务都读取整张配置表并重建客户端：
+- Redis中保存单调递增的配置版本（system_config:version），修改配置的接口写库后递增版本并发布通知
+- 各进程记录自己已加载的版本，ensure_current在版本变化时才从数据库加载settings并通知监听者
+- 订阅线程收到通知后只记录最新版本，重新加载在下一次ensure_current时进行；
+  没有收到通知时每隔 config_version_check_interval 秒核对一次Redis中的版本
+- 监听者（MinIO、TUS客户端等）在配置变化后自行判断是否需要重建客户端
+"""
+
+import os
+import time
+import asyncio
+import logging
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+import redis
+
+from app.core.config import settings
+from app.services.lazy_redis import LazyRedis, SettingsDefault
+
+logger = logging.getLogger(__name__)
+
+
+class ConfigVersion:
+    """基于Redis版本号的系统配置刷新"""
+
+    VERSION_KEY = 'system_config:version'
+    CHANNEL = 'system_config:changed'
+    # Redis不可用时的本地版本，Redis恢复后任何版本都会触发一次重新加载
+    UNVERSIONED = -1
+
+    check_interval = SettingsDefault('config_version_check_interval')
+    pubsub_enabled = SettingsDefault('config_version_pubsub_enabled')
+
+    def __init__(self, redis_url: str = None, check_interval: float = None, pubsub_enabled: bool = None):
+        """
+        初始化配置版本
+
+        Args:
+            redis_url: Redis连接URL，默认从配置读取
+            check_interval: 没有变更通知时核对版本的最小间隔(秒)，默认从配置读取
+            pubsub_enabled: 是否订阅配置变更通知，默认从配置读取
+        """
+        self._check_interval = check_interval
+        self._pubsub_enabled = pubsub_enabled
+        # 本进程settings对应的版本，None表示还没有加载过
+        self._local_version: Optional[int] = None
+        # 订阅通知或核对时看到的最新版本
+        self._seen_version: Optional[int] = None
+        self._checked_at = 0.0
+        self._listeners: List[Callable[[], Any]] = []
+        self._reload_lock = threading.Lock()
+        self._redis = LazyRedis("配置版本", redis_url, socket_timeout=2)
+        # 订阅线程不会被fork继承，记录启动它的进程
+        self._subscriber_pid = None
+        self._stats = {'checks': 0, 'reloads': 0, 'bumps': 0, 'notifications': 0}
+
+    @property
+    def local_version(self) -> Optional[int]:
+        return self._local_version
+
+    def register(self, callback: Callable[[], Any]):
+        """注册配置变化后的回调，回调中应只在相关配置确实变化时重建客户端"""
+        if callback not in self._listeners:
+            self._listeners.append(callback)
+
+    def _needs_check(self) -> bool:
+        """快速路径：已加载、没有更新的通知且未到核对间隔时不做任何I/O"""
+        if self._local_version is None:
+            return True
+        if self._seen_version is not None and self._seen_version != self._local_version:
+            return True
+        return time.monotonic() - self._checked_at >= self.check_interval
+
+    def _load_settings(self):
+        """从数据库加载全部配置到settings"""
+        from app.core.database import get_sync_db_context
+        from app.services.system_config_service import SystemConfigService
+
+        with get_sync_db_context() as db:
+            SystemConfigService.update_settings_from_db_sync(db)
+
+    def _notify(self):
+        for callback in list(self._listeners):
+            try:
+                callback()
+            except Exception as e:
+                logger.error(f"配置变更回调失败 {getattr(callback, '__qualname__', callback)}: {e}")
+
+    def _apply(self, version: Optional[int]) -> bool:
+        """
+        按Redis中的版本决定是否重新加载
+
+        Args:
+            version: Redis中的版本，None表示Redis不可用
+
+        Returns:
+            是否重新加载了配置
+        """
+        with self._reload_lock:
+            self._checked_at = time.monotonic()
+            if version is None:
+                # Redis不可用时只在首次使用时从数据库加载，之后保持当前配置
+                if self._local_version is not None:
+                    return False
+                version = self.UNVERSIONED
+            self._seen_version = version
+            if version == self._local_version:
+                return False
+            self._load_settings()
+            self._local_version = version
+            self._stats['reloads'] += 1
+        logger.info(f"系统配置已加载到版本 {version}")
+        self._notify()
+        return True
+
+    def _ensure_subscriber(self):
+        """在当前进程中启动订阅线程（Celery prefork子进程各自启动）"""
+        if not self.pubsub_enabled or self._subscriber_pid == os.getpid():
+            return
+        self._subscriber_pid = os.getpid()
+        threading.Thread(target=self._subscribe_forever, name='config-version-subscriber', daemon=True).start()
+
+    def _subscribe_forever(self):
+        while True:
+            try:
+                # 订阅连接长时间阻塞等待消息，不设置读取超时
+                client = redis.from_url(self._redis.redis_url or settings.redis_url, decode_responses=True,
+                                        socket_connect_timeout=2)
+                pubsub = client.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(self.CHANNEL)
+                for message in pubsub.listen():
+                    self._on_message(message.get('data'))
+            except Exception as e:
+                logger.warning(f"配置变更订阅中断，{LazyRedis.RETRY_INTERVAL}秒后重试: {e}")
+            time.sleep(LazyRedis.RETRY_INTERVAL)
+
+    def _on_message(self, data: Any):
+        try:
+            version = int(data)
+        except (TypeError, ValueError):
+            return
+        self._stats['notifications'] += 1
+        if self._seen_version is None or version > self._seen_version:
+            self._seen_version = version
+
+    def _fetch_version_sync(self) -> Optional[int]:
+        client = self._redis.get()
+        if client is None:
+            return None
+        try:
+            return int(client.get(self.VERSION_KEY) or 0)
+        except Exception as e:
+            logger.warning(f"读取配置版本失败: {e}")
+            return None
+
+    async def _fetch_version(self) -> Optional[int]:
+        client = await self._redis.get_async()
+        if client is None:
+            return None
+        try:
+            return int(await client.get(self.VERSION_KEY) or 0)
+        except Exception as e:
+            logger.warning(f"读取配置版本失败: {e}")
+            return None
+
+    def ensure_current_sync(self) -> bool:
+        """
+        确保本进程的settings是最新版本的配置，版本未变化时不访问数据库
+
+        Returns:
+            是否重新加载了配置
+        """
+        self._ensure_subscriber()
+        if not self._needs_check():
+            return False
+        self._stats['checks'] += 1
+        return self._apply(self._fetch_version_sync())
+
+    async def ensure_current(self) -> bool:
+        """ensure_current_sync的异步版本，版本变化时在线程池中读取数据库，不阻塞事件循环"""
+        self._ensure_subscriber()
+        if not self._needs_check():
+            return False
+        self._stats['checks'] += 1
+        version = await self._fetch_version()
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self._apply, version)
+
+    def _bumped(self, version: Optional[int]) -> Optional[int]:
+        """写入方在bump前已把最新配置加载到settings，这里只更新本地版本并通知监听者"""
+        with self._reload_lock:
+            if version is not None:
+                self._local_version = self._seen_version = version
+                self._checked_at = time.monotonic()
+            self._stats['bumps'] += 1
+        self._notify()
+        return version
+
+    def bump_sync(self) -> Optional[int]:
+        """
+        配置写入数据库后递增版本并通知其他进程
+
+        Returns:
+            新版本号，Redis不可用时为None（其他进程要等Redis恢复后才会重新加载）
+        """
+        client = self._redis.get()
+        version = None
+        if client is not None:
+            try:
+                version = int(client.incr(self.VERSION_KEY))
+                client.publish(self.CHANNEL, version)
+            except Exception as e:
+                logger.warning(f"递增配置版本失败: {e}")
+        return self._bumped(version)
+
+    async def bump(self) -> Optional[int]:
+        """bump_sync的异步版本"""
+        client = await self._redis.get_async()
+        version = None
+        if client is not None:
+            try:
+                version = int(await client.incr(self.VERSION_KEY))
+                await client.publish(self.CHANNEL, version)
+            except Exception as e:
+                logger.warning(f"递增配置版本失败: {e}")
+        return self._bumped(version)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """本进程的版本和加载统计"""
+        stats = dict(self._stats)
+        stats['local_version'] = self._local_version
+        stats['seen_version'] = self._seen_version
+        return stats
+
+
+# 全局实例
+config_version = ConfigVersion()
@@ -92,23 +92,31 @@ class FileSizeDetector:
             current_threshold_mb = self._get_current_threshold()
             current_threshold_bytes = current_threshold_mb * 1024 * 1024
 
+            # 按实际上传的字节数判断策略，启用FLAC/Opus传输编码时上传量小于WAV文件本身
+            from app.services.asr_transport import asr_transport_encoder
+            transport_codec = asr_transport_encoder.codec
+            transport_size = asr_transport_encoder.estimate_transport_size(file_size, transport_codec)
+
             # 判断策略
-            use_tus = file_size >= current_threshold_bytes
+            use_tus = transport_size >= current_threshold_bytes
             strategy = ASRStrategy.TUS if use_tus else ASRStrategy.STANDARD
 
             result = {
                 'file_path': file_path,
                 'file_size': file_size,
                 'file_size_mb': file_size / (1024 * 1024),
+                'transport_codec': transport_codec,
+                'transport_size': transport_size,
                 'threshold_bytes': current_threshold_bytes,
                 'threshold_mb': current_threshold_mb,
                 'use_tus': use_tus,
                 'strategy': strategy.value,
-                'size_category': self._get_size_category(file_size, current_threshold_mb),
+                'size_category': self._get_size_category(transport_size, current_threshold_mb),
                 'recommended_action': self._get_recommended_action(strategy)
             }
 
             logger.info(f"文件大小检测结果: {result['file_size_mb']:.2f}MB, "
+                       f"传输编码: {transport_codec} (约{transport_size / (1024 * 1024):.2f}MB), "
                        f"策略: {strategy.value}, "
                        f"阈值: {current_threshold_mb}MB")
 
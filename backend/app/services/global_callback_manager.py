@@ -203,13 +203,15 @@ class GlobalCallbackManager:
                     if key in ['registered_tasks', 'completed_tasks', 'failed_tasks']:
                         stats[key.decode('utf-8')] = int(value.decode('utf-8'))
 
-                # 获取当前待处理任务数
-                pending_keys = self._redis_client.keys(f"{self._redis_key_prefix}*")
-                stats['pending_tasks'] = len(pending_keys)
+                # 获取当前待处理任务数（SCAN增量遍历，避免KEYS阻塞Redis）
+                stats['pending_tasks'] = sum(
+                    1 for _ in self._redis_client.scan_iter(match=f"{self._redis_key_prefix}*", count=1000)
+                )
 
                 # 获取缓存结果数
-                result_keys = self._redis_client.keys(f"{self._result_key_prefix}*")
-                stats['cached_results'] = len(result_keys)
+                stats['cached_results'] = sum(
+                    1 for _ in self._redis_client.scan_iter(match=f"{self._result_key_prefix}*", count=1000)
+                )
 
                 # 填充默认值
                 stats.setdefault('registered_tasks', 0)
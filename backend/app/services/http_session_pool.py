@@ -0,0 +1,156 @@
+"""
+进程内复用的aiohttp会话池
+aiohttp会话和连接器绑定创建时的事件循环，而Celery任务通过run_async在各自的事件循环中执行，
+因此按事件循环分别保存会话：同一事件循环内的请求复用keep-alive连接和DNS缓存，
+事件循环关闭后对应的会话被丢弃，进程退出时统一关闭
+"""
+
+import os
+import asyncio
+import logging
+import threading
+import weakref
+from types import SimpleNamespace
+from typing import Dict, Any
+
+import aiohttp
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class HTTPSessionPool:
+    """按事件循环复用aiohttp会话，并统计连接复用情况"""
+
+    def __init__(
+        self,
+        limit: int = None,
+        limit_per_host: int = None,
+        keepalive_timeout: float = None,
+        dns_cache_ttl: int = None
+    ):
+        """
+        初始化会话池
+
+        Args:
+            limit: 单个会话的连接总数上限，默认从配置读取
+            limit_per_host: 单个主机的连接数上限，默认从配置读取
+            keepalive_timeout: 空闲连接保持时长(秒)，默认从配置读取
+            dns_cache_ttl: DNS缓存时长(秒)，默认从配置读取
+        """
+        self.limit = limit or settings.tus_http_pool_limit
+        self.limit_per_host = limit_per_host or settings.tus_http_pool_limit_per_host
+        self.keepalive_timeout = keepalive_timeout or settings.tus_http_keepalive_timeout
+        self.dns_cache_ttl = dns_cache_ttl or settings.tus_http_dns_cache_ttl
+
+        self._sessions: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, aiohttp.ClientSession]" = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+        self._stats = {
+            'sessions_created': 0,
+            'requests': 0,
+            'connections_created': 0,
+            'connections_reused': 0,
+            'dns_cache_hits': 0,
+            'dns_cache_misses': 0
+        }
+
+    def _build_trace_config(self) -> aiohttp.TraceConfig:
+        trace_config = aiohttp.TraceConfig()
+
+        def counter(name: str):
+            async def handler(session, ctx: SimpleNamespace, params):
+                self._stats[name] += 1
+            return handler
+
+        trace_config.on_request_end.append(counter('requests'))
+        trace_config.on_connection_create_end.append(counter('connections_created'))
+        trace_config.on_connection_reuseconn.append(counter('connections_reused'))
+        trace_config.on_dns_cache_hit.append(counter('dns_cache_hits'))
+        trace_config.on_dns_cache_miss.append(counter('dns_cache_misses'))
+        return trace_config
+
+    def _reset_after_fork(self):
+        """prefork子进程不能使用父进程创建的连接，丢弃继承的会话"""
+        if self._pid != os.getpid():
+            self._sessions = weakref.WeakKeyDictionary()
+            self._pid = os.getpid()
+
+    def _discard_closed_loops(self):
+        """释放已关闭事件循环上的会话，连接随事件循环一起失效，只需标记关闭"""
+        for loop, session in list(self._sessions.items()):
+            if loop.is_closed():
+                if session.connector is not None:
+                    session.connector._close()
+                del self._sessions[loop]
+
+    async def get_session(self) -> aiohttp.ClientSession:
+        """获取当前事件循环的共享会话，不存在或已关闭时创建"""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            self._reset_after_fork()
+            session = self._sessions.get(loop)
+            if session is not None and not session.closed:
+                return session
+
+            self._discard_closed_loops()
+            connector = aiohttp.TCPConnector(
+                limit=self.limit,
+                limit_per_host=self.limit_per_host,
+                keepalive_timeout=self.keepalive_timeout,
+                ttl_dns_cache=self.dns_cache_ttl,
+                enable_cleanup_closed=True
+            )
+            session = aiohttp.ClientSession(connector=connector, trace_configs=[self._build_trace_config()])
+            self._sessions[loop] = session
+            self._stats['sessions_created'] += 1
+            logger.info(
+                f"创建共享HTTP会话 (PID: {self._pid}, 连接上限: {self.limit}/{self.limit_per_host}, "
+                f"keep-alive: {self.keepalive_timeout}s, DNS缓存: {self.dns_cache_ttl}s)"
+            )
+            return session
+
+    async def close(self):
+        """关闭当前事件循环的会话"""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            session = self._sessions.pop(loop, None)
+        if session is not None and not session.closed:
+            await session.close()
+
+    def close_sync(self):
+        """
+        关闭所有会话，用于worker进程退出
+
+        空闲的事件循环上直接运行close；正在其他线程运行的事件循环提交close并等待；
+        已关闭的事件循环只标记连接器关闭
+        """
+        with self._lock:
+            sessions = list(self._sessions.items())
+            self._sessions = weakref.WeakKeyDictionary()
+
+        for loop, session in sessions:
+            if session.closed:
+                continue
+            try:
+                if loop.is_closed():
+                    if session.connector is not None:
+                        session.connector._close()
+                elif loop.is_running():
+                    asyncio.run_coroutine_threadsafe(session.close(), loop).result(timeout=5)
+                else:
+                    loop.run_until_complete(session.close())
+            except Exception as e:
+                logger.warning(f"关闭共享HTTP会话失败: {e}")
+
+        if sessions:
+            logger.info(f"共享HTTP会话已关闭: {self.get_stats()}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """连接复用统计：复用率 = 复用连接数 / (新建连接数 + 复用连接数)"""
+        stats = dict(self._stats)
+        acquired = stats['connections_created'] + stats['connections_reused']
+        stats['reuse_ratio'] = stats['connections_reused'] / acquired if acquired else 0.0
+        stats['active_sessions'] = sum(1 for session in self._sessions.values() if not session.closed)
+        return stats
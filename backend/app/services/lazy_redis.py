@@ -0,0 +1,107 @@
+"""
+可降级的Redis连接
+
+ASR结果缓存、TUS断点记录、预签名URL缓存和配置版本共用：
+- 首次使用时才连接，连接失败后 RETRY_INTERVAL 秒内直接返回None，调用方按Redis不可用降级，
+  不会每次调用都等待连接超时
+- redis.asyncio的连接绑定创建它的事件循环，异步连接按事件循环分别创建
+
+SettingsDefault用于这些服务"构造参数优先，未指定时读取settings"的配置属性。
+"""
+
+import time
+import asyncio
+import logging
+import weakref
+from typing import Any, Optional
+
+import redis
+import redis.asyncio as aioredis
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class SettingsDefault:
+    """构造时传入的值（保存在 _{属性名}）为None时读取settings中的配置"""
+
+    def __init__(self, setting_name: str):
+        self.setting_name = setting_name
+
+    def __set_name__(self, owner, name):
+        self.attr_name = f"_{name}"
+
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+        value = getattr(instance, self.attr_name, None)
+        return value if value is not None else getattr(settings, self.setting_name)
+
+
+class LazyRedis:
+    """延迟创建、连接失败后暂停重试的Redis连接"""
+
+    RETRY_INTERVAL = 60
+
+    def __init__(self, purpose: str, redis_url: str = None, socket_timeout: float = 5):
+        """
+        Args:
+            purpose: 日志中的用途说明
+            redis_url: Redis连接URL，默认从配置读取
+            socket_timeout: 连接和读写超时(秒)
+        """
+        self.purpose = purpose
+        self.redis_url = redis_url
+        self.socket_timeout = socket_timeout
+        # 测试可以直接替换为内存实现
+        self.client = None
+        self._failed_at = 0.0
+        self._async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Any]" = weakref.WeakKeyDictionary()
+
+    def _options(self):
+        return dict(
+            decode_responses=True,
+            socket_connect_timeout=self.socket_timeout,
+            socket_timeout=self.socket_timeout,
+            retry_on_timeout=True,
+            health_check_interval=30
+        )
+
+    def _failed(self, error: Exception):
+        logger.warning(f"{self.purpose}Redis不可用: {error}")
+        self._failed_at = time.time()
+
+    def _retry_pending(self) -> bool:
+        return time.time() - self._failed_at < self.RETRY_INTERVAL
+
+    def get(self) -> Optional[redis.Redis]:
+        """同步连接，不可用时返回None"""
+        if self.client is None:
+            if self._retry_pending():
+                return None
+            try:
+                client = redis.from_url(self.redis_url or settings.redis_url, **self._options())
+                client.ping()
+                self.client = client
+            except Exception as e:
+                self._failed(e)
+                return None
+        return self.client
+
+    async def get_async(self):
+        """当前事件循环的异步连接，不可用时返回None"""
+        loop = asyncio.get_running_loop()
+        client = self._async_clients.get(loop)
+        if client is not None:
+            return client
+        if self._retry_pending():
+            return None
+        try:
+            client = aioredis.from_url(self.redis_url or settings.redis_url, **self._options())
+            await client.ping()
+            self._async_clients[loop] = client
+            return client
+        except Exception as e:
+            self._failed(e)
+            return None
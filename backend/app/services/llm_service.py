@@ -8,8 +8,7 @@ import subprocess
 import logging
 from typing import Dict, Any, Optional, List
 from app.core.config import settings
-from app.services.system_config_service import SystemConfigService
-from app.core.database import get_sync_db_context
+from app.services.config_version import config_version
 
 # 设置日志
 logger = logging.getLogger(__name__)
@@ -22,9 +21,8 @@ class LLMService:
         logger.info("初始化LLM服务")
         
     def _get_current_config(self):
-        """获取当前最新的配置"""
-        with get_sync_db_context() as db:
-            SystemConfigService.update_settings_from_db_sync(db)
+        """获取当前最新的配置，配置版本未变化时不读取数据库"""
+        config_version.ensure_current_sync()
 
         base_url = getattr(settings, 'llm_base_url', 'https://openrouter.ai/api/v1')
         model = getattr(settings, 'llm_model_type', 'google/gemini-2.5-flash')
@@ -0,0 +1,357 @@
+"""
+Worker本地的源媒体磁盘缓存
+
+同一节点上的所有Celery worker共享一个按容量限制的LRU缓存目录，
+缓存键由 bucket/对象名/ETag 组成，对象被覆盖后自动失效。
+每个缓存条目有一个独立的锁文件（fcntl.flock）：
+- 填充时持有排他锁，并发任务只会下载一次
+- 使用时持有共享锁，淘汰时跳过正在使用的条目
+"""
+
+import os
+import time
+import errno
+import fcntl
+import shutil
+import hashlib
+import logging
+import tempfile
+import threading
+from contextlib import contextmanager
+from typing import Dict, Any, Iterator, List, Optional
+
+from app.core.config import settings
+from app.services.minio_client import minio_service
+
+logger = logging.getLogger(__name__)
+
+
+class MediaCache:
+    """源媒体本地磁盘缓存"""
+
+    LOCK_SUFFIX = '.lock'
+    PARTIAL_SUFFIX = '.partial'
+    EVICT_LOCK_NAME = '.evict.lock'
+    MAX_LOCK_ATTEMPTS = 5
+
+    def __init__(self, cache_dir: str = None, max_bytes: int = None, enabled: bool = None):
+        """
+        初始化媒体缓存
+
+        Args:
+            cache_dir: 缓存目录，默认从配置读取
+            max_bytes: 缓存容量上限，默认从配置读取
+            enabled: 是否启用缓存，默认从配置读取
+        """
+        self._cache_dir = cache_dir
+        self._max_bytes = max_bytes
+        self._enabled = enabled
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            'hits': 0,
+            'misses': 0,
+            'evictions': 0,
+            'bypasses': 0,
+            'bytes_downloaded': 0,
+            'bytes_served': 0,
+            'bytes_evicted': 0,
+        }
+
+    @property
+    def cache_dir(self) -> str:
+        return self._cache_dir or settings.media_cache_dir
+
+    @property
+    def max_bytes(self) -> int:
+        return self._max_bytes if self._max_bytes is not None else settings.media_cache_max_bytes
+
+    @property
+    def enabled(self) -> bool:
+        return self._enabled if self._enabled is not None else settings.media_cache_enabled
+
+    @contextmanager
+    def local_path(self, object_name: str) -> Iterator[str]:
+        """
+        获取对象的本地只读路径
+
+        命中缓存时直接返回缓存文件；未命中时从MinIO下载一次并放入缓存。
+        在with块内持有条目的共享锁，保证文件不会被淘汰。
+        缓存被禁用或对象超过缓存容量时，退化为下载到临时文件并在退出时删除。
+
+        Args:
+            object_name: MinIO对象名称
+
+        Yields:
+            本地文件路径（调用方不得修改或删除）
+        """
+        stat = minio_service.stat_file_sync(object_name) if self.enabled else None
+        if not stat or stat['size'] > self.max_bytes:
+            with self._temporary_download(object_name) as path:
+                yield path
+            return
+
+        key = self._make_key(object_name, stat['etag'])
+        data_path = self._data_path(key, object_name)
+        lock_fd = self._acquire_entry(key, data_path, object_name)
+        try:
+            self._count('bytes_served', stat['size'])
+            yield data_path
+        finally:
+            self._release(lock_fd)
+
+    def put_file_sync(self, object_name: str, file_path: str) -> bool:
+        """
+        将刚上传到MinIO的本地文件放入缓存，后续任务可以直接命中
+
+        优先使用硬链接，跨文件系统时回退为复制。
+
+        Returns:
+            是否成功放入缓存
+        """
+        if not self.enabled or not os.path.exists(file_path):
+            return False
+        try:
+            stat = minio_service.stat_file_sync(object_name)
+            if not stat or stat['size'] > self.max_bytes:
+                return False
+
+            key = self._make_key(object_name, stat['etag'])
+            data_path = self._data_path(key, object_name)
+            lock_fd = self._lock_entry(key, fcntl.LOCK_EX)
+            if lock_fd is None:
+                return False
+            try:
+                if not os.path.exists(data_path):
+                    partial_path = self._entry_path(key, self.PARTIAL_SUFFIX)
+                    self._remove_quietly(partial_path)
+                    try:
+                        os.link(file_path, partial_path)
+                    except OSError:
+                        shutil.copyfile(file_path, partial_path)
+                    os.replace(partial_path, data_path)
+                    logger.info(f"媒体缓存写入 - 对象: {object_name}, 大小: {stat['size']}")
+            finally:
+                self._release(lock_fd)
+
+            self.evict_sync(exclude={key})
+            return True
+        except Exception as e:
+            logger.warning(f"媒体缓存写入失败 - 对象: {object_name}, 错误: {e}")
+            return False
+
+    def evict_sync(self, exclude: Optional[set] = None) -> int:
+        """
+        按最近使用时间淘汰缓存条目，直到总大小不超过上限
+
+        正在使用（锁被占用）的条目会被跳过；同一时刻只有一个进程执行淘汰。
+
+        Returns:
+            本次淘汰的条目数
+        """
+        exclude = exclude or set()
+        os.makedirs(self.cache_dir, exist_ok=True)
+        evict_fd = os.open(os.path.join(self.cache_dir, self.EVICT_LOCK_NAME), os.O_CREAT | os.O_RDWR, 0o644)
+        try:
+            try:
+                fcntl.flock(evict_fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                # 其他进程正在淘汰
+                return 0
+
+            entries = self._list_entries()
+            total_bytes = sum(entry['size'] for entry in entries)
+            evicted = 0
+            for entry in sorted(entries, key=lambda e: e['mtime']):
+                # 残留的partial文件（填充进程崩溃）无论容量都清理
+                if total_bytes <= self.max_bytes and not entry['partial']:
+                    continue
+                if entry['key'] in exclude:
+                    continue
+                lock_fd = self._lock_entry(entry['key'], fcntl.LOCK_EX | fcntl.LOCK_NB)
+                if lock_fd is None:
+                    continue
+                try:
+                    self._remove_quietly(entry['path'])
+                    if not entry['partial']:
+                        self._remove_quietly(self._entry_path(entry['key'], self.LOCK_SUFFIX))
+                        evicted += 1
+                        self._count('evictions')
+                        self._count('bytes_evicted', entry['size'])
+                        logger.info(f"媒体缓存淘汰 - 文件: {entry['path']}, 大小: {entry['size']}")
+                    total_bytes -= entry['size']
+                finally:
+                    self._release(lock_fd)
+            return evicted
+        finally:
+            os.close(evict_fd)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取缓存命中/未命中/淘汰统计（当前进程）和磁盘占用"""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = round(stats['hits'] / lookups, 4) if lookups else 0.0
+        entries = [entry for entry in self._list_entries() if not entry['partial']]
+        stats['entries'] = len(entries)
+        stats['total_bytes'] = sum(entry['size'] for entry in entries)
+        stats['max_bytes'] = self.max_bytes
+        stats['cache_dir'] = self.cache_dir
+        stats['enabled'] = self.enabled
+        return stats
+
+    def _acquire_entry(self, key: str, data_path: str, object_name: str) -> int:
+        """获取条目的共享锁，条目不存在时在排他锁下填充"""
+        for _ in range(self.MAX_LOCK_ATTEMPTS):
+            lock_fd = self._lock_entry(key, fcntl.LOCK_SH)
+            if lock_fd is None:
+                continue
+            if os.path.exists(data_path):
+                self._touch(data_path)
+                self._count('hits')
+                logger.info(f"媒体缓存命中 - 对象: {object_name}")
+                return lock_fd
+
+            filled = False
+            try:
+                fcntl.flock(lock_fd, fcntl.LOCK_EX)
+                if self._lock_is_current(key, lock_fd) and not os.path.exists(data_path):
+                    self._fill(key, data_path, object_name)
+                    filled = True
+                # 填充完成后降级为共享锁，允许其他任务并发读取
+                fcntl.flock(lock_fd, fcntl.LOCK_SH)
+            except BaseException:
+                self._release(lock_fd)
+                raise
+
+            # 锁转换不是原子的，期间条目可能被淘汰，需要重新校验
+            if self._lock_is_current(key, lock_fd) and os.path.exists(data_path):
+                if filled:
+                    self.evict_sync(exclude={key})
+                else:
+                    self._touch(data_path)
+                    self._count('hits')
+                    logger.info(f"媒体缓存命中（等待其他任务填充） - 对象: {object_name}")
+                return lock_fd
+            self._release(lock_fd)
+
+        raise Exception(f"获取媒体缓存条目失败: {object_name}")
+
+    def _fill(self, key: str, data_path: str, object_name: str):
+        """从MinIO下载对象到partial文件，完成后原子重命名"""
+        partial_path = self._entry_path(key, self.PARTIAL_SUFFIX)
+        try:
+            bytes_written = minio_service.download_file_sync(object_name, partial_path)
+            os.replace(partial_path, data_path)
+        except BaseException:
+            self._remove_quietly(partial_path)
+            raise
+        self._count('misses')
+        self._count('bytes_downloaded', bytes_written)
+        logger.info(f"媒体缓存未命中，已下载 - 对象: {object_name}, 大小: {bytes_written}")
+
+    @contextmanager
+    def _temporary_download(self, object_name: str) -> Iterator[str]:
+        """不经过缓存，下载到临时文件"""
+        _, ext = os.path.splitext(object_name)
+        fd, path = tempfile.mkstemp(suffix=ext, dir=settings.temp_dir)
+        os.close(fd)
+        try:
+            bytes_written = minio_service.download_file_sync(object_name, path)
+            self._count('bypasses')
+            self._count('bytes_downloaded', bytes_written)
+            yield path
+        finally:
+            self._remove_quietly(path)
+
+    def _lock_entry(self, key: str, operation: int) -> Optional[int]:
+        """
+        打开并锁定条目的锁文件
+
+        淘汰进程会删除锁文件，所以加锁后需要确认锁文件仍是目录中的那个，
+        否则返回None由调用方重试。非阻塞加锁失败时也返回None。
+        """
+        os.makedirs(self.cache_dir, exist_ok=True)
+        lock_fd = os.open(self._entry_path(key, self.LOCK_SUFFIX), os.O_CREAT | os.O_RDWR, 0o644)
+        try:
+            fcntl.flock(lock_fd, operation)
+        except OSError as e:
+            os.close(lock_fd)
+            if e.errno in (errno.EAGAIN, errno.EACCES, errno.EWOULDBLOCK):
+                return None
+            raise
+        if not self._lock_is_current(key, lock_fd):
+            self._release(lock_fd)
+            return None
+        return lock_fd
+
+    def _lock_is_current(self, key: str, lock_fd: int) -> bool:
+        try:
+            return os.fstat(lock_fd).st_ino == os.stat(self._entry_path(key, self.LOCK_SUFFIX)).st_ino
+        except FileNotFoundError:
+            return False
+
+    def _list_entries(self) -> List[Dict[str, Any]]:
+        """列出缓存目录中的数据文件和残留的partial文件"""
+        entries = []
+        try:
+            names = os.listdir(self.cache_dir)
+        except FileNotFoundError:
+            return entries
+        for name in names:
+            if name.startswith('.') or name.endswith(self.LOCK_SUFFIX):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append({
+                'key': name[:64],
+                'path': path,
+                'size': stat.st_size,
+                'mtime': stat.st_mtime,
+                'partial': name.endswith(self.PARTIAL_SUFFIX),
+            })
+        return entries
+
+    def _make_key(self, object_name: str, etag: str) -> str:
+        raw = f"{minio_service.bucket_name}/{object_name}@{etag}"
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def _entry_path(self, key: str, suffix: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}{suffix}")
+
+    def _data_path(self, key: str, object_name: str) -> str:
+        # 保留原始扩展名，ffmpeg和ASR服务会根据文件名识别格式
+        _, ext = os.path.splitext(object_name)
+        return self._entry_path(key, ext or '.bin')
+
+    def _touch(self, path: str):
+        """更新修改时间作为LRU的最近使用时间（不依赖atime）"""
+        try:
+            now = time.time()
+            os.utime(path, (now, now))
+        except OSError:
+            pass
+
+    def _count(self, name: str, value: int = 1):
+        with self._stats_lock:
+            self._stats[name] += value
+
+    @staticmethod
+    def _release(lock_fd: int):
+        try:
+            fcntl.flock(lock_fd, fcntl.LOCK_UN)
+        finally:
+            os.close(lock_fd)
+
+    @staticmethod
+    def _remove_quietly(path: str):
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+
+
+# 全局媒体缓存实例
+media_cache = MediaCache()
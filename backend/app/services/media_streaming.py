@@ -0,0 +1,191 @@
+"""
+MinIO对象的HTTP流式响应
+
+视频下载、CapCut/剪映资源代理共用：
+- 按MinIO对象信息返回ETag和Last-Modified，If-None-Match / If-Modified-Since 命中时返回304
+- 支持单段Range请求（206），只从MinIO读取请求的字节范围，浏览器拖动进度条不再从头下载
+- 响应体按 media_stream_chunk_size 聚合后发送，MinIO读取是事件循环中的非阻塞await
+- MinIO连接在开始发送响应体时才建立，客户端在此之前断开不会占用连接
+- 响应体按客户端速度读取，MinIO流使用异步客户端的stream通道和独立连接池，
+  暂停播放或慢速的客户端不会占用大文件通道，也不会阻塞上传
+"""
+
+import re
+import mimetypes
+import logging
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Dict, Optional, Tuple
+from urllib.parse import quote
+
+from fastapi import HTTPException, Request, Response, status
+from fastapi.responses import StreamingResponse
+
+from app.core.config import settings
+from app.services.minio_client import minio_service
+
+logger = logging.getLogger(__name__)
+
+RANGE_PATTERN = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    """If-None-Match / If-Range 中的ETag比较（弱比较）"""
+    if header.strip() == "*":
+        return True
+    candidates = [tag.strip() for tag in header.split(",")]
+    return any(tag.removeprefix("W/") == etag for tag in candidates)
+
+
+def _parse_http_date(value: str) -> Optional[datetime]:
+    try:
+        parsed = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def _not_modified(request: Request, etag: str, last_modified: Optional[datetime]) -> bool:
+    """If-None-Match优先；没有If-None-Match时才比较If-Modified-Since"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return _etag_matches(if_none_match, etag)
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified:
+        since = _parse_http_date(if_modified_since)
+        return since is not None and last_modified.replace(microsecond=0) <= since
+    return False
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """
+    解析Range请求头
+
+    只支持单段范围，多段范围或格式不正确时按整个对象返回
+
+    Returns:
+        (起始偏移, 结束偏移(含))，无需按范围返回时为None
+
+    Raises:
+        HTTPException: 范围超出对象大小时返回416
+    """
+    if not header:
+        return None
+    match = RANGE_PATTERN.match(header.strip())
+    if not match or match.group(1) == match.group(2) == "":
+        return None
+    start, end = match.groups()
+    if start == "":
+        # 后缀范围：最后N个字节
+        length = int(end)
+        if length == 0:
+            raise _range_not_satisfiable(size)
+        return max(0, size - length), size - 1
+    start = int(start)
+    end = min(int(end), size - 1) if end else size - 1
+    if start >= size or start > end:
+        raise _range_not_satisfiable(size)
+    return start, end
+
+
+def _range_not_satisfiable(size: int) -> HTTPException:
+    return HTTPException(
+        status_code=416,
+        detail="Requested range not satisfiable",
+        headers={"Content-Range": f"bytes */{size}"}
+    )
+
+
+async def _iter_object(object_name: str, offset: int, length: int, chunk_size: int):
+    """从MinIO读取指定范围并按chunk_size聚合输出"""
+    stream = await minio_service.get_file_stream(object_name, offset, length)
+    if stream is None:
+        # 对象在stat之后被删除，响应头已发送，只能提前结束
+        logger.error(f"流式响应读取对象失败: {object_name}")
+        return
+    try:
+        buffer = bytearray()
+        while True:
+            data = await stream.read(chunk_size - len(buffer))
+            if not data:
+                break
+            buffer += data
+            if len(buffer) >= chunk_size:
+                yield bytes(buffer)
+                buffer.clear()
+        if buffer:
+            yield bytes(buffer)
+    finally:
+        stream.close()
+
+
+async def stream_minio_object(
+    request: Request,
+    object_name: str,
+    media_type: str = None,
+    filename: str = None,
+    disposition: str = "attachment",
+    cache_control: str = "private, no-cache",
+    extra_headers: Dict[str, str] = None
+) -> Response:
+    """
+    返回MinIO对象的流式响应，支持Range和条件请求
+
+    Args:
+        request: 当前请求，读取Range / If-Range / If-None-Match / If-Modified-Since
+        object_name: MinIO对象名
+        media_type: 内容类型，默认按对象名推断
+        filename: Content-Disposition中的文件名，为None时不设置该头
+        disposition: attachment 或 inline
+        cache_control: Cache-Control头，默认要求浏览器每次用ETag重新验证
+        extra_headers: 额外的响应头（如跨域头）
+
+    Returns:
+        200 / 206 的StreamingResponse，或304的空响应
+
+    Raises:
+        HTTPException: 对象不存在时404，范围无效时416
+    """
+    stat = await minio_service.get_file_stat(object_name)
+    if stat is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="File not found in storage")
+
+    etag = f'"{stat.etag}"'
+    headers = {
+        "ETag": etag,
+        "Accept-Ranges": "bytes",
+        "Cache-Control": cache_control,
+        **(extra_headers or {})
+    }
+    if stat.last_modified:
+        headers["Last-Modified"] = format_datetime(stat.last_modified.astimezone(timezone.utc), usegmt=True)
+
+    if _not_modified(request, etag, stat.last_modified):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    byte_range = parse_range(request.headers.get("range"), stat.size)
+    if byte_range is not None:
+        # If-Range与当前对象不一致时忽略Range，返回整个对象
+        if_range = request.headers.get("if-range")
+        if if_range and not (_etag_matches(if_range, etag) if if_range.startswith(('"', 'W/')) else
+                             headers.get("Last-Modified") == if_range):
+            byte_range = None
+
+    if filename:
+        headers["Content-Disposition"] = f"{disposition}; filename*=UTF-8''{quote(filename)}"
+    if media_type is None:
+        media_type = mimetypes.guess_type(object_name)[0] or "application/octet-stream"
+
+    if byte_range is None:
+        # 整个对象不带Range请求MinIO
+        offset, length, status_code = 0, None, status.HTTP_200_OK
+        headers["Content-Length"] = str(stat.size)
+    else:
+        start, end = byte_range
+        offset, length, status_code = start, end - start + 1, status.HTTP_206_PARTIAL_CONTENT
+        headers["Content-Range"] = f"bytes {start}-{end}/{stat.size}"
+        headers["Content-Length"] = str(length)
+
+    logger.debug(f"流式响应: {object_name}, 状态: {status_code}, 范围: {headers.get('Content-Range', 'full')}")
+    body = _iter_object(object_name, offset, length, settings.media_stream_chunk_size) if stat.size else iter(())
+    return StreamingResponse(body, status_code=status_code, media_type=media_type, headers=headers)
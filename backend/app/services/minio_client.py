@@ -1,15 +1,29 @@
 import os
 import io
+import time
+import base64
+import hashlib
 import logging
-from typing import Optional, Dict, Any
+import threading
+from typing import Optional, Dict, Any, BinaryIO, Callable, List, Tuple
 from pathlib import Path
 from datetime import timedelta
 from minio import Minio
+from minio.datatypes import Part
 from minio.error import S3Error
+from minio.helpers import MIN_PART_SIZE, MAX_MULTIPART_COUNT
 from urllib.parse import urlparse
 import asyncio
-from concurrent.futures import ThreadPoolExecutor
+import aiohttp
+import urllib3
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, FIRST_EXCEPTION, wait
 from app.core.config import settings
+from app.services.async_s3_client import AsyncS3Client
+from app.services.config_version import config_version
+from app.services.presigned_url_cache import presigned_url_cache
+
+# 重试无意义的分片错误：上传已被取消、权限或桶不存在
+NON_RETRYABLE_PART_ERRORS = {"NoSuchUpload", "NoSuchBucket", "AccessDenied", "InvalidAccessKeyId", "SignatureDoesNotMatch"}
 
 logger = logging.getLogger(__name__)
 
@@ -17,12 +31,28 @@ class MinioService:
     """MinIO文件存储服务"""
     
     def __init__(self):
+        # 只用于桶初始化、连接测试等低频管理操作，文件读写和预签名走异步客户端
         self.executor = ThreadPoolExecutor(max_workers=4)
+        # 上传吞吐量统计，同步上传可能来自多个线程
+        self._upload_stats = {
+            'uploads': 0, 'multipart_uploads': 0, 'failed_uploads': 0,
+            'bytes': 0, 'seconds': 0.0, 'part_retries': 0, 'last_bytes_per_second': 0.0
+        }
+        self._upload_stats_lock = threading.Lock()
         self._reload_config()
     
+    @staticmethod
+    def _config_identity():
+        """决定客户端是否需要重建的MinIO配置"""
+        from app.core.config import settings
+        return (settings.minio_endpoint, settings.minio_public_endpoint, settings.minio_access_key,
+                settings.minio_secret_key, settings.minio_secure, settings.minio_region, settings.minio_bucket_name)
+
     def _reload_config(self):
         """重新加载配置并创建客户端"""
         from app.core.config import settings
+
+        self._loaded_identity = self._config_identity()
         
         # print(f"DEBUG: _reload_config 开始")
         # print(f"DEBUG: 当前settings对象ID: {id(settings)}")
@@ -50,7 +80,8 @@ class MinioService:
             internal_endpoint,
             access_key=settings.minio_access_key,
             secret_key=settings.minio_secret_key,
-            secure=settings.minio_secure
+            secure=settings.minio_secure,
+            region=settings.minio_region
         )
         
         # 公共客户端用于生成预签名URL
@@ -77,18 +108,41 @@ class MinioService:
             public_endpoint,
             access_key=settings.minio_access_key,
             secret_key=settings.minio_secret_key,
-            secure=settings.minio_secure
+            secure=settings.minio_secure,
+            region=settings.minio_region
+        )
+
+        # 异步客户端：FastAPI中的调用直接在事件循环中发出请求，不占用线程池
+        self.async_client = AsyncS3Client(
+            internal_endpoint,
+            settings.minio_access_key,
+            settings.minio_secret_key,
+            secure=settings.minio_secure,
+            region=settings.minio_region,
+            presign_endpoint=public_endpoint
         )
         
         logger.debug(f"MinIO配置重新加载完成，public_client endpoint: {self.public_client._base_url.host}")
         
         self.bucket_name = settings.minio_bucket_name
         # print(f"DEBUG: 使用的存储桶名称: {self.bucket_name}")
+
+        # 端点、密钥或桶名变化后旧的预签名URL不再复用
+        presigned_url_cache.configure(
+            public_endpoint, settings.minio_secure, settings.minio_region,
+            settings.minio_access_key, settings.minio_secret_key, self.bucket_name
+        )
     
     def reload_config(self):
         """公共方法：重新加载配置"""
         logger.debug("MinIO配置重新加载")
         self._reload_config()
+
+    def refresh_config(self):
+        """系统配置版本变化时调用，只有MinIO相关配置变化才重建客户端"""
+        if self._config_identity() != self._loaded_identity:
+            logger.info("MinIO配置已变化，重建客户端")
+            self._reload_config()
         
     async def ensure_bucket_exists(self) -> bool:
         """确保桶存在并设置正确的权限"""
@@ -137,23 +191,20 @@ class MinioService:
         object_name: str, 
         content_type: str = "application/octet-stream"
     ) -> Optional[str]:
-        """上传文件到MinIO"""
-        def _upload():
-            try:
-                self.internal_client.fput_object(
-                    self.bucket_name,
-                    object_name,
-                    file_path,
-                    content_type=content_type
-                )
-                return object_name
-            except S3Error as e:
-                print(f"✗ 文件上传失败: {e}")
-                return None
-        
-        return await asyncio.get_event_loop().run_in_executor(
-            self.executor, _upload
-        )
+        """上传文件到MinIO，超过分片阈值的文件并行分片上传"""
+        file_size = os.path.getsize(file_path)
+        if file_size >= settings.minio_multipart_threshold:
+            return await self.upload_file_multipart(file_path, object_name, content_type)
+        started = time.perf_counter()
+        try:
+            await self.async_client.put_object_file(self.bucket_name, object_name, file_path, content_type)
+        except S3Error as e:
+            self._record_upload(0, 0.0, multipart=False, success=False)
+            print(f"✗ 文件上传失败: {e}")
+            return None
+        self._record_upload(file_size, time.perf_counter() - started, multipart=False)
+        await presigned_url_cache.invalidate(object_name)
+        return object_name
 
     def upload_file_sync(
         self, 
@@ -161,7 +212,11 @@ class MinioService:
         object_name: str, 
         content_type: str = "application/octet-stream"
     ) -> Optional[str]:
-        """同步上传文件到MinIO"""
+        """同步上传文件到MinIO，超过分片阈值的文件并行分片上传"""
+        file_size = os.path.getsize(file_path)
+        if file_size >= settings.minio_multipart_threshold:
+            return self.upload_file_multipart_sync(file_path, object_name, content_type)
+        started = time.perf_counter()
         try:
             self.internal_client.fput_object(
                 self.bucket_name,
@@ -169,11 +224,249 @@ class MinioService:
                 file_path,
                 content_type=content_type
             )
-            return object_name
         except S3Error as e:
+            self._record_upload(0, 0.0, multipart=False, success=False)
             print(f"✗ 文件上传失败: {e}")
             return None
-    
+        self._record_upload(file_size, time.perf_counter() - started, multipart=False)
+        presigned_url_cache.invalidate_sync(object_name)
+        return object_name
+
+    @staticmethod
+    def _plan_parts(file_size: int, part_size: int = None) -> List[Tuple[int, int, int]]:
+        """
+        按分片大小切分文件，返回[(分片号, 偏移, 长度)]
+
+        分片不小于5MB；分片数超过S3上限(10000)时放大分片
+        """
+        part_size = max(part_size or settings.minio_multipart_part_size, MIN_PART_SIZE)
+        part_size = max(part_size, -(-file_size // MAX_MULTIPART_COUNT))
+        parts = []
+        offset = 0
+        while offset < file_size or not parts:
+            size = min(part_size, file_size - offset)
+            parts.append((len(parts) + 1, offset, size))
+            offset += size
+        return parts
+
+    @staticmethod
+    def _read_part(file_path: str, offset: int, size: int) -> Tuple[bytes, bytes]:
+        """读取一个分片，返回(数据, MD5摘要)"""
+        with open(file_path, 'rb') as f:
+            f.seek(offset)
+            data = f.read(size)
+        return data, hashlib.md5(data).digest()
+
+    @staticmethod
+    def _expected_multipart_etag(digests: List[bytes]) -> str:
+        """S3分片对象的ETag：各分片MD5拼接后的MD5加上分片数"""
+        return f"{hashlib.md5(b''.join(digests)).hexdigest()}-{len(digests)}"
+
+    def _verify_multipart_etag(self, object_name: str, etag: str, digests: List[bytes]):
+        """核对合并后的ETag，服务端启用加密等导致ETag不是MD5格式时跳过"""
+        expected = self._expected_multipart_etag(digests)
+        md5_part, _, count = etag.partition('-')
+        if len(md5_part) != 32 or not count.isdigit():
+            logger.debug(f"ETag不是MD5格式，跳过整体校验 - 对象名称: {object_name}, ETag: {etag}")
+            return
+        if etag != expected:
+            raise ValueError(f"分片上传校验失败 - 对象名称: {object_name}, ETag: {etag}, 期望: {expected}")
+
+    @staticmethod
+    def _is_retryable_part_error(error: Exception) -> bool:
+        if isinstance(error, S3Error):
+            return error.code not in NON_RETRYABLE_PART_ERRORS
+        return isinstance(error, (aiohttp.ClientError, asyncio.TimeoutError, urllib3.exceptions.HTTPError, OSError))
+
+    def _part_retry_delay(self, object_name: str, part_number: int, attempt: int, error: Exception) -> float:
+        """记录一次分片重试，返回退避时间(秒)"""
+        with self._upload_stats_lock:
+            self._upload_stats['part_retries'] += 1
+        logger.warning(f"分片上传失败，准备重试 - 对象名称: {object_name}, 分片: {part_number}, "
+                       f"第{attempt + 1}次, 错误: {error}")
+        return min(2 ** attempt, 10)
+
+    def _record_upload(self, size: int, seconds: float, multipart: bool, success: bool = True):
+        with self._upload_stats_lock:
+            stats = self._upload_stats
+            if not success:
+                stats['failed_uploads'] += 1
+                return
+            stats['uploads'] += 1
+            stats['multipart_uploads'] += int(multipart)
+            stats['bytes'] += size
+            stats['seconds'] += seconds
+            if seconds > 0:
+                stats['last_bytes_per_second'] = size / seconds
+
+    async def upload_file_multipart(
+        self,
+        file_path: str,
+        object_name: str,
+        content_type: str = "application/octet-stream",
+        part_size: int = None,
+        concurrency: int = None
+    ) -> Optional[str]:
+        """
+        并行分片上传文件
+
+        整个上传只占用异步客户端大文件通道的一个名额，分片按concurrency并发上传，
+        每个分片失败后单独重试；启用校验时分片携带Content-MD5，合并后核对整体ETag。
+
+        Args:
+            file_path: 本地文件路径
+            object_name: 对象名称
+            content_type: 内容类型
+            part_size: 分片大小(字节)，默认从配置读取
+            concurrency: 并发上传的分片数，默认从配置读取
+
+        Returns:
+            成功时返回对象名称，失败时返回None（已上传的分片会被取消）
+        """
+        file_size = os.path.getsize(file_path)
+        parts_plan = self._plan_parts(file_size, part_size)
+        concurrency = max(1, min(concurrency or settings.minio_multipart_concurrency, len(parts_plan)))
+        verify = settings.minio_multipart_verify_checksum
+        retries = settings.minio_multipart_part_retries
+        client = self.async_client
+        loop = asyncio.get_running_loop()
+        results: Dict[int, Tuple[Part, bytes]] = {}
+
+        async def upload_part(part_number: int, offset: int, size: int):
+            data, digest = await loop.run_in_executor(None, self._read_part, file_path, offset, size)
+            content_md5 = base64.b64encode(digest).decode() if verify else None
+            for attempt in range(retries + 1):
+                try:
+                    etag = await client.upload_part(self.bucket_name, object_name, upload_id,
+                                                    part_number, data, content_md5)
+                    results[part_number] = (Part(part_number, etag), digest)
+                    return
+                except Exception as e:
+                    if attempt == retries or not self._is_retryable_part_error(e):
+                        raise
+                    await asyncio.sleep(self._part_retry_delay(object_name, part_number, attempt, e))
+
+        pending_parts = iter(parts_plan)
+
+        async def worker():
+            # 各worker共享同一个迭代器依次领取分片，内存中最多有concurrency个分片
+            for part_number, offset, size in pending_parts:
+                await upload_part(part_number, offset, size)
+
+        started = time.perf_counter()
+        upload_id, completed = None, False
+        async with client.transfer_slot():
+            try:
+                upload_id = await client.create_multipart_upload(self.bucket_name, object_name, content_type)
+                workers = [asyncio.ensure_future(worker()) for _ in range(concurrency)]
+                try:
+                    await asyncio.gather(*workers)
+                except BaseException:
+                    for task in workers:
+                        task.cancel()
+                    await asyncio.gather(*workers, return_exceptions=True)
+                    raise
+                ordered = [results[number] for number, _, _ in parts_plan]
+                etag = await client.complete_multipart_upload(
+                    self.bucket_name, object_name, upload_id, [part for part, _ in ordered]
+                )
+                upload_id, completed = None, True
+                if verify:
+                    self._verify_multipart_etag(object_name, etag, [digest for _, digest in ordered])
+            except Exception as e:
+                self._record_upload(0, 0.0, multipart=True, success=False)
+                logger.error(f"分片上传失败 - 对象名称: {object_name}, 错误: {e}")
+                if upload_id:
+                    try:
+                        await client.abort_multipart_upload(self.bucket_name, object_name, upload_id)
+                    except Exception as abort_error:
+                        logger.warning(f"取消分片上传失败 - 对象名称: {object_name}, 错误: {abort_error}")
+                elif completed:
+                    # 整体校验失败时对象已合并，删除内容不可信的对象
+                    await self.delete_file(object_name)
+                return None
+
+        self._log_multipart_done(object_name, file_size, len(parts_plan), concurrency, time.perf_counter() - started)
+        await presigned_url_cache.invalidate(object_name)
+        return object_name
+
+    def upload_file_multipart_sync(
+        self,
+        file_path: str,
+        object_name: str,
+        content_type: str = "application/octet-stream",
+        part_size: int = None,
+        concurrency: int = None
+    ) -> Optional[str]:
+        """同步并行分片上传文件，参数和行为与upload_file_multipart相同，分片在线程池中上传"""
+        file_size = os.path.getsize(file_path)
+        parts_plan = self._plan_parts(file_size, part_size)
+        concurrency = max(1, min(concurrency or settings.minio_multipart_concurrency, len(parts_plan)))
+        verify = settings.minio_multipart_verify_checksum
+
+        def upload_part(part_number: int, offset: int, size: int) -> Tuple[Part, bytes]:
+            data, digest = self._read_part(file_path, offset, size)
+            etag = self._upload_part_sync(object_name, upload_id, part_number, data, digest if verify else None)
+            return Part(part_number, etag), digest
+
+        started = time.perf_counter()
+        upload_id, completed = None, False
+        try:
+            upload_id = self.internal_client._create_multipart_upload(
+                self.bucket_name, object_name, {"Content-Type": content_type}
+            )
+            with ThreadPoolExecutor(max_workers=concurrency) as pool:
+                futures = [pool.submit(upload_part, *spec) for spec in parts_plan]
+                done, not_done = wait(futures, return_when=FIRST_EXCEPTION)
+                for future in not_done:
+                    future.cancel()
+                for future in done:
+                    if future.exception():
+                        raise future.exception()
+                ordered = [future.result() for future in futures]
+            result = self.internal_client._complete_multipart_upload(
+                self.bucket_name, object_name, upload_id, [part for part, _ in ordered]
+            )
+            upload_id, completed = None, True
+            if verify:
+                self._verify_multipart_etag(object_name, result.etag, [digest for _, digest in ordered])
+        except Exception as e:
+            self._record_upload(0, 0.0, multipart=True, success=False)
+            logger.error(f"分片上传失败 - 对象名称: {object_name}, 错误: {e}")
+            if upload_id:
+                try:
+                    self.internal_client._abort_multipart_upload(self.bucket_name, object_name, upload_id)
+                except Exception as abort_error:
+                    logger.warning(f"取消分片上传失败 - 对象名称: {object_name}, 错误: {abort_error}")
+            elif completed:
+                self.delete_file_sync(object_name)
+            return None
+
+        self._log_multipart_done(object_name, file_size, len(parts_plan), concurrency, time.perf_counter() - started)
+        presigned_url_cache.invalidate_sync(object_name)
+        return object_name
+
+    def _upload_part_sync(self, object_name: str, upload_id: str, part_number: int,
+                          data: bytes, digest: Optional[bytes]) -> str:
+        """同步上传一个分片，失败后单独重试，返回分片ETag"""
+        headers = {"Content-MD5": base64.b64encode(digest).decode()} if digest else None
+        retries = settings.minio_multipart_part_retries
+        for attempt in range(retries + 1):
+            try:
+                return self.internal_client._upload_part(
+                    self.bucket_name, object_name, data, headers, upload_id, part_number
+                )
+            except Exception as e:
+                if attempt == retries or not self._is_retryable_part_error(e):
+                    raise
+                time.sleep(self._part_retry_delay(object_name, part_number, attempt, e))
+
+    def _log_multipart_done(self, object_name: str, file_size: int, part_count: int, concurrency: int, seconds: float):
+        self._record_upload(file_size, seconds, multipart=True)
+        rate = file_size / seconds / 1024 / 1024 if seconds > 0 else 0.0
+        logger.info(f"分片上传完成 - 对象名称: {object_name}, 大小: {file_size} bytes, 分片数: {part_count}, "
+                    f"并发: {concurrency}, 耗时: {seconds:.2f}s, 速度: {rate:.1f}MB/s")
+
     async def upload_file_content(
         self, 
         content: bytes, 
@@ -181,94 +474,262 @@ class MinioService:
         content_type: str = "application/octet-stream"
     ) -> Optional[str]:
         """上传文件内容到MinIO"""
-        def _upload():
-            try:
-                file_data = io.BytesIO(content)
-                file_size = len(content)
-                
-                self.internal_client.put_object(
-                    self.bucket_name,
-                    object_name,
-                    file_data,
-                    file_size,
-                    content_type=content_type
-                )
-                return object_name
-            except S3Error as e:
-                print(f"✗ 内容上传失败: {e}")
-                return None
-        
-        return await asyncio.get_event_loop().run_in_executor(
-            self.executor, _upload
-        )
+        try:
+            await self.async_client.put_object(self.bucket_name, object_name, content, content_type)
+            await presigned_url_cache.invalidate(object_name)
+            return object_name
+        except S3Error as e:
+            print(f"✗ 内容上传失败: {e}")
+            return None
     
-    def get_file_url_sync(self, object_name: str, expiry: int = 3600) -> Optional[str]:
-        """同步获取文件的预签名URL"""
+    def upload_file_content_sync(
+        self, 
+        content: bytes, 
+        object_name: str, 
+        content_type: str = "application/octet-stream"
+    ) -> Optional[str]:
+        """同步上传文件内容到MinIO"""
         try:
-            # 使用公共客户端生成预签名URL
-            url = self.public_client.presigned_get_object(
-                self.bucket_name, 
-                object_name, 
-                expires=timedelta(seconds=expiry)
+            self.internal_client.put_object(
+                self.bucket_name,
+                object_name,
+                io.BytesIO(content),
+                len(content),
+                content_type=content_type
             )
-            return url
+            presigned_url_cache.invalidate_sync(object_name)
+            return object_name
         except S3Error as e:
-            print(f"✗ 获取URL失败: {e}")
+            print(f"✗ 内容上传失败: {e}")
             return None
 
-    async def get_file_url(self, object_name: str, expiry: int = 3600) -> Optional[str]:
-        """获取文件的预签名URL"""
-        logger.debug(f"获取文件预签名URL - object_name: {object_name}, expiry: {expiry}")
-        
-        def _get_url():
+    def upload_stream_sync(
+        self,
+        stream: BinaryIO,
+        object_name: str,
+        content_type: str = "application/octet-stream",
+        part_size: int = 16 * 1024 * 1024,
+        header_factory: Optional[Callable[[int], bytes]] = None
+    ) -> int:
+        """同步将长度未知的数据流以分片上传的方式写入MinIO，不落盘
+
+        header_factory用于生成依赖总长度的文件头（如WAV头），参数为流的总字节数。
+        第一个分片会缓存在内存中，等流结束后最后上传，因此文件头中的长度是准确的。
+        其余分片在读取后续数据的同时并行上传，失败的分片单独重试。
+
+        Returns:
+            从流中读取的字节数（不含文件头）
+        """
+        if part_size < 5 * 1024 * 1024:
+            raise ValueError("分片大小不能小于5MB")
+        headers = {"Content-Type": content_type}
+
+        first_chunk = stream.read(part_size)
+        chunk = stream.read(part_size)
+        if not chunk:
+            # 数据不足一个分片，直接单次上传
+            header = header_factory(len(first_chunk)) if header_factory else b''
+            content = header + first_chunk
+            self.internal_client.put_object(
+                self.bucket_name, object_name, io.BytesIO(content), len(content), content_type=content_type
+            )
+            presigned_url_cache.invalidate_sync(object_name)
+            return len(first_chunk)
+
+        verify = settings.minio_multipart_verify_checksum
+        concurrency = max(1, settings.minio_multipart_concurrency)
+        started = time.perf_counter()
+        upload_id = self.internal_client._create_multipart_upload(self.bucket_name, object_name, headers)
+        pool = ThreadPoolExecutor(max_workers=concurrency)
+        try:
+            futures = {}
+            digests = {}
+
+            def submit(number: int, data: bytes):
+                digests[number] = hashlib.md5(data).digest()
+                futures[number] = pool.submit(self._upload_part_sync, object_name, upload_id, number,
+                                              data, digests[number] if verify else None)
+
+            total_bytes = len(first_chunk)
+            part_number = 2
+            while chunk:
+                # 读取下一个分片的同时上传已读到的分片，在途分片数不超过并发数
+                pending = [future for future in futures.values() if not future.done()]
+                if len(pending) >= concurrency:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        future.result()
+                submit(part_number, chunk)
+                total_bytes += len(chunk)
+                part_number += 1
+                chunk = stream.read(part_size)
+
+            header = header_factory(total_bytes) if header_factory else b''
+            submit(1, header + first_chunk)
+            parts = [Part(number, futures[number].result()) for number in sorted(futures)]
+            result = self.internal_client._complete_multipart_upload(self.bucket_name, object_name, upload_id, parts)
+            if verify:
+                self._verify_multipart_etag(object_name, result.etag or "", [digests[number] for number in sorted(digests)])
+            self._log_multipart_done(object_name, total_bytes + len(header), len(parts),
+                                     concurrency, time.perf_counter() - started)
+            presigned_url_cache.invalidate_sync(object_name)
+            return total_bytes
+        except BaseException:
+            self._record_upload(0, 0.0, multipart=True, success=False)
+            try:
+                self.internal_client._abort_multipart_upload(self.bucket_name, object_name, upload_id)
+            except Exception as abort_error:
+                logger.warning(f"取消分片上传失败 - 对象名称: {object_name}, 错误: {abort_error}")
+            raise
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+    def get_file_content_sync(self, object_name: str) -> Optional[bytes]:
+        """同步读取小文件的完整内容，对象不存在时返回None"""
+        try:
+            response = self.internal_client.get_object(self.bucket_name, object_name)
+            try:
+                return response.read()
+            finally:
+                response.close()
+                response.release_conn()
+        except S3Error as e:
+            logger.debug(f"读取文件内容失败 - 对象名称: {object_name}, 错误: {e}")
+            return None
+    
+    def get_file_url_sync(self, object_name: str, expiry: int = 3600) -> Optional[str]:
+        """同步获取文件的预签名URL，剩余有效期足够的已签名URL直接复用"""
+        return self.get_file_urls_sync([object_name], expiry).get(object_name)
+
+    def get_file_urls_sync(self, object_names: List[str], expiry: int = 3600) -> Dict[str, Optional[str]]:
+        """
+        同步批量获取预签名URL，缓存只查询一次，未命中的对象在本地签名后一起写回
+
+        Returns:
+            Dict[对象名, URL]，签名失败的对象为None
+        """
+        urls: Dict[str, Optional[str]] = dict(presigned_url_cache.get_many_sync(object_names, expiry))
+        signed_at = time.time()
+        signed = {}
+        for object_name in object_names:
+            if object_name in urls or object_name in signed:
+                continue
             try:
                 # 使用公共客户端生成预签名URL
-                url = self.public_client.presigned_get_object(
-                    self.bucket_name, 
-                    object_name, 
+                signed[object_name] = self.public_client.presigned_get_object(
+                    self.bucket_name,
+                    object_name,
                     expires=timedelta(seconds=expiry)
                 )
-                
-                logger.debug(f"成功生成预签名URL: {object_name}")
-                return url
+            except S3Error as e:
+                print(f"✗ 获取URL失败: {e}")
+                urls[object_name] = None
+        presigned_url_cache.put_many_sync(signed, expiry, signed_at)
+        urls.update(signed)
+        return urls
 
+    async def get_file_url(self, object_name: str, expiry: int = 3600) -> Optional[str]:
+        """获取文件的预签名URL，剩余有效期足够的已签名URL直接复用"""
+        logger.debug(f"获取文件预签名URL - object_name: {object_name}, expiry: {expiry}")
+        return (await self.get_file_urls([object_name], expiry)).get(object_name)
+
+    async def get_file_urls(self, object_names: List[str], expiry: int = 3600) -> Dict[str, Optional[str]]:
+        """
+        批量获取预签名URL，列表页使用，缓存只查询一次，未命中的对象在本地签名后一起写回
+
+        复用的URL剩余有效期不少于 expiry × presign_cache_min_remaining_ratio。
+
+        Returns:
+            Dict[对象名, URL]，签名失败的对象为None
+        """
+        urls: Dict[str, Optional[str]] = dict(await presigned_url_cache.get_many(object_names, expiry))
+        signed_at = time.time()
+        signed = {}
+        for object_name in object_names:
+            if object_name in urls or object_name in signed:
+                continue
+            try:
+                # 使用公共端点签名，只做本地计算
+                signed[object_name] = await self.async_client.presigned_get_object(
+                    self.bucket_name,
+                    object_name,
+                    expires=timedelta(seconds=expiry)
+                )
             except S3Error as e:
                 logger.error(f"获取预签名URL失败: {e}")
-                return None
+                urls[object_name] = None
+        await presigned_url_cache.put_many(signed, expiry, signed_at)
+        urls.update(signed)
+        return urls
+    
+    def get_internal_file_url_sync(self, object_name: str, expiry: int = 3600) -> Optional[str]:
+        """同步获取内部端点的预签名URL，供worker内的ffmpeg等工具直接读取"""
+        try:
+            return self.internal_client.presigned_get_object(
+                self.bucket_name,
+                object_name,
+                expires=timedelta(seconds=expiry)
+            )
+        except S3Error as e:
+            logger.error(f"获取内部预签名URL失败: {e}")
+            return None
+
+    def stat_file_sync(self, object_name: str) -> Optional[Dict[str, Any]]:
+        """同步获取对象的ETag和大小，对象不存在时返回None"""
+        try:
+            stat = self.internal_client.stat_object(self.bucket_name, object_name)
+            return {'etag': stat.etag, 'size': stat.size}
+        except S3Error as e:
+            logger.debug(f"获取对象信息失败 - 对象名称: {object_name}, 错误: {e}")
+            return None
+
+    def download_file_sync(self, object_name: str, file_path: str, chunk_size: int = 8 * 1024 * 1024) -> int:
+        """同步分块下载文件到本地，不会将整个对象读入内存
         
-        return await asyncio.get_event_loop().run_in_executor(
-            self.executor, _get_url
-        )
+        Returns:
+            写入的字节数
+        """
+        response = self.internal_client.get_object(self.bucket_name, object_name)
+        bytes_written = 0
+        try:
+            with open(file_path, 'wb') as f:
+                for chunk in response.stream(chunk_size):
+                    f.write(chunk)
+                    bytes_written += len(chunk)
+        finally:
+            response.close()
+            response.release_conn()
+        return bytes_written
+    
+    def delete_file_sync(self, object_name: str) -> bool:
+        """同步删除文件"""
+        try:
+            self.internal_client.remove_object(self.bucket_name, object_name)
+            presigned_url_cache.invalidate_sync(object_name)
+            return True
+        except S3Error as e:
+            print(f"✗ 文件删除失败: {e}")
+            return False
     
     async def delete_file(self, object_name: str) -> bool:
         """删除文件"""
-        def _delete():
-            try:
-                self.internal_client.remove_object(self.bucket_name, object_name)
-                return True
-            except S3Error as e:
-                print(f"✗ 文件删除失败: {e}")
-                return False
-        
-        return await asyncio.get_event_loop().run_in_executor(
-            self.executor, _delete
-        )
+        try:
+            await self.async_client.remove_object(self.bucket_name, object_name)
+            await presigned_url_cache.invalidate(object_name)
+            return True
+        except S3Error as e:
+            print(f"✗ 文件删除失败: {e}")
+            return False
     
     async def file_exists(self, object_name: str) -> bool:
         """检查文件是否存在"""
-        def _exists():
-            try:
-                stat = self.internal_client.stat_object(self.bucket_name, object_name)
-                logger.debug(f"文件存在 - 对象名称: {object_name}, 大小: {stat.size}")
-                return True
-            except S3Error as e:
-                logger.debug(f"文件不存在或访问失败 - 对象名称: {object_name}, 错误: {e}")
-                return False
-
-        result = await asyncio.get_event_loop().run_in_executor(
-            self.executor, _exists
-        )
-        return result
+        try:
+            stat = await self.async_client.stat_object(self.bucket_name, object_name)
+            logger.debug(f"文件存在 - 对象名称: {object_name}, 大小: {stat.size}")
+            return True
+        except S3Error as e:
+            logger.debug(f"文件不存在或访问失败 - 对象名称: {object_name}, 错误: {e}")
+            return False
     
     def generate_object_name(self, user_id: int, project_id: int, filename: str) -> str:
         """生成MinIO对象名称"""
@@ -294,6 +755,13 @@ class MinioService:
         """生成ASR JSON结果对象名称"""
         return f"users/{user_id}/projects/{project_id}/asr_results/{video_id}_asr_result.json"
     
+    def generate_keyframe_index_object_name(self, video_object_name: str) -> str:
+        """生成视频关键帧索引对象名称，与视频对象一一对应"""
+        directory, _, filename = video_object_name.rpartition('/')
+        if directory.endswith('/videos'):
+            directory = directory[:-len('videos')] + 'keyframes'
+        return f"{directory}/{filename}.keyframes.json" if directory else f"{filename}.keyframes.json"
+    
     def generate_slice_object_name(self, user_id: int, project_id: int, video_id: int, filename: str) -> str:
         """生成视频切片对象名称"""
         import uuid
@@ -338,34 +806,38 @@ class MinioService:
             self.executor, _test
         )
     
-    async def get_file_stream(self, object_name: str):
-        """获取文件流对象"""
-        def _get_stream():
-            try:
-                response = self.internal_client.get_object(self.bucket_name, object_name)
-                return response
-            except S3Error as e:
-                print(f"✗ 获取文件流失败: {e}")
-                return None
-        
-        return await asyncio.get_event_loop().run_in_executor(
-            self.executor, _get_stream
-        )
+    async def get_file_stream(self, object_name: str, offset: int = 0, length: int = None):
+        """获取文件流对象（AsyncObjectStream），用 await stream.read(n) 读取，用完后调用close
+
+        指定offset/length时只请求对象的对应字节范围
+        """
+        try:
+            return await self.async_client.get_object(self.bucket_name, object_name, offset, length)
+        except S3Error as e:
+            print(f"✗ 获取文件流失败: {e}")
+            return None
     
     async def get_file_stat(self, object_name: str):
         """获取文件统计信息"""
-        def _get_stat():
-            try:
-                stat = self.internal_client.stat_object(self.bucket_name, object_name)
-                return stat
-            except S3Error as e:
-                print(f"✗ 获取文件统计信息失败: {e}")
-                return None
-        
-        return await asyncio.get_event_loop().run_in_executor(
-            self.executor, _get_stat
-        )
+        try:
+            return await self.async_client.stat_object(self.bucket_name, object_name)
+        except S3Error as e:
+            print(f"✗ 获取文件统计信息失败: {e}")
+            return None
+
+    def get_async_stats(self) -> Dict[str, Any]:
+        """异步客户端各并发通道的排队情况和连接复用统计"""
+        return self.async_client.get_stats()
+
+    def get_upload_stats(self) -> Dict[str, Any]:
+        """本进程的上传次数、字节数和平均吞吐量(bytes/s)"""
+        with self._upload_stats_lock:
+            stats = dict(self._upload_stats)
+        stats['seconds'] = round(stats['seconds'], 3)
+        stats['bytes_per_second'] = stats['bytes'] / stats['seconds'] if stats['seconds'] > 0 else 0.0
+        return stats
 
 # 全局实例
 from app.core.config import settings
-minio_service = MinioService()
\ No newline at end of file
+minio_service = MinioService()
+config_version.register(minio_service.refresh_config)
\ No newline at end of file
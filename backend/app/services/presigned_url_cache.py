@@ -0,0 +1,250 @@
+"""
+预签名URL缓存
+
+按（对象名, 有效期）缓存已签名的下载URL，剩余有效期不少于请求有效期的一定比例时直接复用，
+同一对象在多次请求、多个进程之间返回相同的URL，浏览器可以命中自身缓存。
+两级缓存：
+- 进程内LRU：命中时不做任何I/O，条目在 presign_cache_local_ttl 秒后回到Redis重新确认
+- Redis：presign:{namespace}:{object_name}（Hash，字段为有效期秒数，值为URL和过期时间）
+
+namespace由MinIO公共端点、访问密钥和桶名计算，reload_config后自然使用新的键空间，
+旧配置签出的URL不会再被返回；删除或覆盖对象时删除对应的Hash。
+"""
+
+import time
+import json
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Iterable, Tuple
+
+from app.services.lazy_redis import LazyRedis, SettingsDefault
+
+logger = logging.getLogger(__name__)
+
+
+class PresignedURLCache:
+    """进程内 + Redis 两级预签名URL缓存"""
+
+    KEY_PREFIX = 'presign'
+
+    enabled = SettingsDefault('presign_cache_enabled')
+    min_remaining_ratio = SettingsDefault('presign_cache_min_remaining_ratio')
+    local_ttl = SettingsDefault('presign_cache_local_ttl')
+    max_local_entries = SettingsDefault('presign_cache_max_local_entries')
+
+    def __init__(self, redis_url: str = None, enabled: bool = None, min_remaining_ratio: float = None,
+                 local_ttl: float = None, max_local_entries: int = None):
+        """
+        初始化预签名URL缓存
+
+        Args:
+            redis_url: Redis连接URL，默认从配置读取
+            enabled: 是否启用缓存，默认从配置读取
+            min_remaining_ratio: 复用URL时剩余有效期占请求有效期的最小比例，默认从配置读取
+            local_ttl: 进程内条目不回查Redis的最长时间(秒)，默认从配置读取
+            max_local_entries: 进程内最多缓存的URL数，默认从配置读取
+        """
+        self._enabled = enabled
+        self._min_remaining_ratio = min_remaining_ratio
+        self._local_ttl = local_ttl
+        self._max_local_entries = max_local_entries
+        self._namespace = 'default'
+        # (对象名, 有效期) -> (url, 过期时间, 写入进程缓存的时间)
+        self._local: "OrderedDict[Tuple[str, int], Tuple[str, float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._redis = LazyRedis("预签名URL缓存", redis_url, socket_timeout=2)
+        self._stats = {'local_hits': 0, 'redis_hits': 0, 'misses': 0, 'invalidations': 0}
+
+    def configure(self, *identity: Any):
+        """按签名相关的配置（公共端点、密钥、桶名等）切换键空间，配置有变化时清空进程内缓存"""
+        namespace = hashlib.sha1('|'.join(str(part) for part in identity).encode()).hexdigest()[:12]
+        if namespace != self._namespace:
+            self._namespace = namespace
+            self.clear_local()
+
+    def clear_local(self):
+        with self._lock:
+            self._local.clear()
+
+    def _redis_key(self, object_name: str) -> str:
+        return f"{self.KEY_PREFIX}:{self._namespace}:{object_name}"
+
+    def _usable(self, expires_at: float, expiry: int, now: float) -> bool:
+        return expires_at - now >= expiry * self.min_remaining_ratio
+
+    def _get_local(self, object_names: Iterable[str], expiry: int, now: float) -> Dict[str, str]:
+        hits = {}
+        with self._lock:
+            for object_name in object_names:
+                key = (object_name, expiry)
+                entry = self._local.get(key)
+                if entry is None:
+                    continue
+                url, expires_at, cached_at = entry
+                if now - cached_at > self.local_ttl or not self._usable(expires_at, expiry, now):
+                    del self._local[key]
+                    continue
+                self._local.move_to_end(key)
+                hits[object_name] = url
+            self._stats['local_hits'] += len(hits)
+        return hits
+
+    def _put_local(self, entries: Dict[str, Tuple[str, float]], expiry: int, now: float):
+        with self._lock:
+            for object_name, (url, expires_at) in entries.items():
+                self._local[(object_name, expiry)] = (url, expires_at, now)
+                self._local.move_to_end((object_name, expiry))
+            while len(self._local) > self.max_local_entries:
+                self._local.popitem(last=False)
+
+    def _parse_redis_values(self, object_names, values, expiry: int, now: float) -> Dict[str, Tuple[str, float]]:
+        entries = {}
+        for object_name, value in zip(object_names, values):
+            if not value:
+                continue
+            try:
+                entry = json.loads(value)
+            except ValueError:
+                continue
+            if self._usable(entry['expires_at'], expiry, now):
+                entries[object_name] = (entry['url'], entry['expires_at'])
+        return entries
+
+    def _drop_local(self, object_name: str):
+        with self._lock:
+            for key in [key for key in self._local if key[0] == object_name]:
+                del self._local[key]
+            self._stats['invalidations'] += 1
+
+    def get_many_sync(self, object_names: Iterable[str], expiry: int) -> Dict[str, str]:
+        """
+        批量查询可复用的URL
+
+        Returns:
+            Dict[对象名, URL]，只包含命中的对象
+        """
+        if not self.enabled:
+            return {}
+        now = time.time()
+        object_names = list(dict.fromkeys(object_names))
+        hits = self._get_local(object_names, expiry, now)
+        missing = [name for name in object_names if name not in hits]
+        client = self._redis.get() if missing else None
+        if client is not None:
+            try:
+                pipe = client.pipeline(transaction=False)
+                for object_name in missing:
+                    pipe.hget(self._redis_key(object_name), str(expiry))
+                entries = self._parse_redis_values(missing, pipe.execute(), expiry, now)
+            except Exception as e:
+                logger.warning(f"读取预签名URL缓存失败: {e}")
+                entries = {}
+            self._put_local(entries, expiry, now)
+            hits.update({name: url for name, (url, _) in entries.items()})
+            with self._lock:
+                self._stats['redis_hits'] += len(entries)
+        with self._lock:
+            self._stats['misses'] += len(object_names) - len(hits)
+        return hits
+
+    async def get_many(self, object_names: Iterable[str], expiry: int) -> Dict[str, str]:
+        """批量查询可复用的URL（异步），行为与get_many_sync相同"""
+        if not self.enabled:
+            return {}
+        now = time.time()
+        object_names = list(dict.fromkeys(object_names))
+        hits = self._get_local(object_names, expiry, now)
+        missing = [name for name in object_names if name not in hits]
+        client = await self._redis.get_async() if missing else None
+        if client is not None:
+            try:
+                pipe = client.pipeline(transaction=False)
+                for object_name in missing:
+                    pipe.hget(self._redis_key(object_name), str(expiry))
+                entries = self._parse_redis_values(missing, await pipe.execute(), expiry, now)
+            except Exception as e:
+                logger.warning(f"读取预签名URL缓存失败: {e}")
+                entries = {}
+            self._put_local(entries, expiry, now)
+            hits.update({name: url for name, (url, _) in entries.items()})
+            with self._lock:
+                self._stats['redis_hits'] += len(entries)
+        with self._lock:
+            self._stats['misses'] += len(object_names) - len(hits)
+        return hits
+
+    def _queue_writes(self, pipe, urls: Dict[str, str], expiry: int, signed_at: float):
+        expires_at = signed_at + expiry
+        for object_name, url in urls.items():
+            key = self._redis_key(object_name)
+            pipe.hset(key, str(expiry), json.dumps({'url': url, 'expires_at': expires_at}))
+            # TTL按最后写入的条目设置，其他有效期的条目提前过期只会导致重新签名
+            pipe.expire(key, expiry)
+
+    def put_many_sync(self, urls: Dict[str, str], expiry: int, signed_at: float):
+        """保存新签名的URL，signed_at为签名时间"""
+        if not self.enabled or not urls:
+            return
+        self._put_local({name: (url, signed_at + expiry) for name, url in urls.items()}, expiry, time.time())
+        client = self._redis.get()
+        if client is None:
+            return
+        try:
+            pipe = client.pipeline(transaction=False)
+            self._queue_writes(pipe, urls, expiry, signed_at)
+            pipe.execute()
+        except Exception as e:
+            logger.warning(f"写入预签名URL缓存失败: {e}")
+
+    async def put_many(self, urls: Dict[str, str], expiry: int, signed_at: float):
+        """保存新签名的URL（异步）"""
+        if not self.enabled or not urls:
+            return
+        self._put_local({name: (url, signed_at + expiry) for name, url in urls.items()}, expiry, time.time())
+        client = await self._redis.get_async()
+        if client is None:
+            return
+        try:
+            pipe = client.pipeline(transaction=False)
+            self._queue_writes(pipe, urls, expiry, signed_at)
+            await pipe.execute()
+        except Exception as e:
+            logger.warning(f"写入预签名URL缓存失败: {e}")
+
+    def invalidate_sync(self, object_name: str):
+        """对象被删除或覆盖时清除它的所有URL"""
+        self._drop_local(object_name)
+        client = self._redis.get() if self.enabled else None
+        if client is None:
+            return
+        try:
+            client.delete(self._redis_key(object_name))
+        except Exception as e:
+            logger.warning(f"清除预签名URL缓存失败: {e}")
+
+    async def invalidate(self, object_name: str):
+        """对象被删除或覆盖时清除它的所有URL（异步）"""
+        self._drop_local(object_name)
+        client = await self._redis.get_async() if self.enabled else None
+        if client is None:
+            return
+        try:
+            await client.delete(self._redis_key(object_name))
+        except Exception as e:
+            logger.warning(f"清除预签名URL缓存失败: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """本进程的命中统计"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['local_entries'] = len(self._local)
+        lookups = stats['local_hits'] + stats['redis_hits'] + stats['misses']
+        stats['hit_rate'] = round((stats['local_hits'] + stats['redis_hits']) / lookups, 4) if lookups else 0.0
+        stats['enabled'] = self.enabled
+        return stats
+
+
+# 全局实例
+presigned_url_cache = PresignedURLCache()
@@ -7,11 +7,101 @@ import asyncio
 import pickle
 import time
 import logging
+import weakref
 import redis
-from typing import Optional, Dict, Any
+import redis.asyncio as aioredis
+from contextlib import asynccontextmanager
+from typing import Optional, Dict, Any, Set
 
 logger = logging.getLogger(__name__)
 
+# 通知订阅不可用时的轮询间隔(秒)
+FALLBACK_POLL_SECONDS = 5
+
+
+class ResultNotificationListener:
+    """
+    事件循环内共享的任务完成通知订阅
+
+    同一事件循环中的所有等待者共用一个模式订阅连接，收到通知后唤醒对应任务的等待者；
+    最后一个等待者离开时关闭订阅，不在事件循环中留下后台任务
+    """
+
+    def __init__(self, redis_url: str, channel_prefix: str):
+        """
+        Args:
+            redis_url: Redis连接URL
+            channel_prefix: 回调服务器发布通知的频道前缀（REDIS_RESULT_CHANNEL_PREFIX）
+        """
+        self.redis_url = redis_url
+        self.channel_prefix = channel_prefix
+        self._waiters: Dict[str, Set[asyncio.Future]] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._ready: Optional[asyncio.Event] = None
+        self.notifications = 0
+
+    async def _run(self):
+        client = aioredis.from_url(self.redis_url, socket_connect_timeout=5)
+        pubsub = client.pubsub()
+        try:
+            await pubsub.psubscribe(f"{self.channel_prefix}*")
+            self._ready.set()
+            async for message in pubsub.listen():
+                if message.get('type') != 'pmessage':
+                    continue
+                channel = message['channel']
+                if isinstance(channel, bytes):
+                    channel = channel.decode('utf-8')
+                task_id = channel[len(self.channel_prefix):]
+                self.notifications += 1
+                for future in self._waiters.get(task_id, ()):
+                    if not future.done():
+                        future.set_result(True)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"任务完成通知订阅中断，等待者改用轮询: {e}")
+        finally:
+            try:
+                await pubsub.aclose()
+                await client.aclose()
+            except Exception:
+                pass
+
+    async def add_waiter(self, task_id: str) -> Optional[asyncio.Future]:
+        """登记等待者，返回收到通知时完成的Future；订阅不可用时返回None"""
+        # 先登记，订阅建立期间其他等待者离开时不会关闭订阅
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.setdefault(task_id, set()).add(future)
+        if self._task is None or self._task.done():
+            self._ready = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+        task, ready = self._task, self._ready
+        try:
+            await asyncio.wait_for(asyncio.shield(ready.wait()), 5)
+        except asyncio.TimeoutError:
+            pass
+        if not ready.is_set() or task.done():
+            await self.remove_waiter(task_id, future)
+            return None
+        return future
+
+    async def remove_waiter(self, task_id: str, future: Optional[asyncio.Future]):
+        """移除等待者，没有等待者时关闭订阅"""
+        if future is not None:
+            waiters = self._waiters.get(task_id)
+            if waiters is not None:
+                waiters.discard(future)
+                if not waiters:
+                    del self._waiters[task_id]
+        if not self._waiters and self._task is not None:
+            task, self._task = self._task, None
+            task.cancel()
+            try:
+                await task
+            except (asyncio.CancelledError, Exception):
+                pass
+
 class StandaloneCallbackClient:
     """独立回调服务器客户端"""
 
@@ -21,6 +111,8 @@ class StandaloneCallbackClient:
         self.result_key_prefix = "tus_result:"
         self.stats_key = "tus_callback_stats"
         self._redis_client = None
+        # 按事件循环保存通知订阅，Celery任务可能运行在不同的事件循环中
+        self._listeners: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, ResultNotificationListener]" = weakref.WeakKeyDictionary()
 
         self._init_redis()
 
@@ -71,13 +163,13 @@ class StandaloneCallbackClient:
                 task_data['celery_task_id'] = celery_task_id
                 logger.info(f"🔗 保存TUS任务ID与Celery任务ID关联: {task_id} -> {celery_task_id}")
 
-                # 额外保存一个映射关系，便于快速查找
+                # 额外保存双向映射关系，回调服务器按TUS任务ID直接GET，无需遍历键
                 mapping_key = f"tus_celery_mapping:{celery_task_id}"
-                self._redis_client.setex(
-                    mapping_key,
-                    5400,  # 1.5小时过期，与任务注册时间保持一致
-                    task_id
-                )
+                reverse_mapping_key = f"tus_task_mapping:{task_id}"
+                pipe = self._redis_client.pipeline()
+                pipe.setex(mapping_key, 5400, task_id)  # 1.5小时过期，与任务注册时间保持一致
+                pipe.setex(reverse_mapping_key, 5400, celery_task_id)
+                pipe.execute()
 
             # 计算动态过期时间：基础时间1小时 + TUS超时时间的缓冲
             base_expire_time = 3600  # 1小时基础时间
@@ -98,24 +190,82 @@ class StandaloneCallbackClient:
             logger.error(f"❌ 任务注册失败: {e}")
             return False
 
+    def _get_listener(self) -> Optional[ResultNotificationListener]:
+        from app.core.config import settings
+        if not settings.tus_result_notify_enabled:
+            return None
+        loop = asyncio.get_running_loop()
+        listener = self._listeners.get(loop)
+        if listener is None:
+            listener = ResultNotificationListener(self.redis_url, settings.tus_result_channel_prefix)
+            self._listeners[loop] = listener
+        return listener
+
+    @asynccontextmanager
+    async def result_notifications(self, task_id: str):
+        """
+        订阅任务完成通知，得到用于替代轮询之间固定sleep的等待函数
+
+        调用方应在检查任务状态之前进入，避免在检查和订阅之间完成的任务错过通知：
+
+            async with client.result_notifications(task_id) as wait:
+                while ...:
+                    检查状态
+                    await wait(timeout)
+
+        wait(timeout)在收到通知时立即返回True，超时返回False；
+        订阅不可用时最多等待 FALLBACK_POLL_SECONDS 秒，保持原有的5秒轮询
+        """
+        listener = self._get_listener()
+        future = await listener.add_waiter(task_id) if listener else None
+
+        async def wait(timeout: float) -> bool:
+            nonlocal future
+            if future is None:
+                await asyncio.sleep(min(timeout, FALLBACK_POLL_SECONDS))
+                return False
+            try:
+                await asyncio.wait_for(asyncio.shield(future), timeout)
+            except asyncio.TimeoutError:
+                return False
+            # 通知已到达，重新登记以便结果未写入时继续等待下一次通知
+            await listener.remove_waiter(task_id, future)
+            future = await listener.add_waiter(task_id)
+            return True
+
+        try:
+            yield wait
+        finally:
+            if listener:
+                await listener.remove_waiter(task_id, future)
+
     async def wait_for_result(self, task_id: str, timeout: int = 1800) -> Optional[Dict[str, Any]]:
-        """等待任务结果"""
+        """
+        等待任务结果
+
+        回调服务器保存结果后发布通知，等待者被立即唤醒；
+        兜底轮询只在通知丢失时生效，订阅不可用时退回每5秒检查一次
+        """
+        from app.core.config import settings
+
         try:
             start_time = time.time()
             result_key = self._get_result_key(task_id)
 
-            logger.info(f"⏳ 开始等待任务 {task_id} 的结果，超时: {timeout}秒")
+            # 先订阅再检查结果，避免在两者之间完成的任务错过通知
+            async with self.result_notifications(task_id) as wait:
+                logger.info(f"⏳ 开始等待任务 {task_id} 的结果，超时: {timeout}秒")
 
-            while time.time() - start_time < timeout:
-                # 检查结果是否已存在
-                result_data = self._redis_client.get(result_key)
-                if result_data:
-                    data = pickle.loads(result_data)
-                    logger.info(f"✅ 任务 {task_id} 结果已获取")
-                    return data.get('result')
+                while time.time() - start_time < timeout:
+                    # 检查结果是否已存在
+                    result_data = self._redis_client.get(result_key)
+                    if result_data:
+                        data = pickle.loads(result_data)
+                        logger.info(f"✅ 任务 {task_id} 结果已获取 (等待 {time.time() - start_time:.1f}秒)")
+                        return data.get('result')
 
-                # 每隔5秒检查一次
-                await asyncio.sleep(5)
+                    await wait(min(settings.tus_result_safety_poll_seconds,
+                                   max(timeout - (time.time() - start_time), 0)))
 
             # 超时
             logger.warning(f"⏰ 任务 {task_id} 等待超时 ({timeout}秒)")
@@ -155,17 +305,19 @@ class StandaloneCallbackClient:
                 stats[key.decode('utf-8')] = int(value.decode('utf-8'))
 
             # 获取待处理任务数
-            pending_keys = self._redis_client.keys(f"{self.redis_key_prefix}*")
-            stats['pending_tasks'] = len(pending_keys)
+            stats['pending_tasks'] = self._count_keys(f"{self.redis_key_prefix}*")
 
             # 获取缓存结果数
-            result_keys = self._redis_client.keys(f"{self.result_key_prefix}*")
-            stats['cached_results'] = len(result_keys)
+            stats['cached_results'] = self._count_keys(f"{self.result_key_prefix}*")
 
             return stats
         except Exception as e:
             logger.error(f"获取统计信息失败: {e}")
             return {'error': str(e)}
 
+    def _count_keys(self, pattern: str) -> int:
+        """用SCAN增量统计匹配的键数，避免KEYS阻塞Redis"""
+        return sum(1 for _ in self._redis_client.scan_iter(match=pattern, count=1000))
+
 # 全局实例
 standalone_callback_client = StandaloneCallbackClient()
\ No newline at end of file
@@ -50,6 +50,8 @@ class SystemConfigService:
         "tus_enable_routing": "tus_enable_routing",
         "tus_max_retries": "tus_max_retries",
         "tus_timeout_seconds": "tus_timeout_seconds",
+        "tus_transport_codec": "tus_transport_codec",
+        "tus_transport_opus_bitrate": "tus_transport_opus_bitrate",
         
         # LLM配置
         "llm_base_url": "llm_base_url",
@@ -67,6 +69,7 @@ class SystemConfigService:
         "tus_file_size_threshold_mb": int,
         "tus_max_retries": int,
         "tus_timeout_seconds": int,
+        "tus_transport_opus_bitrate": int,
         "llm_temperature": float,
         "llm_max_tokens": int,
 
@@ -311,6 +314,8 @@ class SystemConfigService:
             {"key": "tus_enable_routing", "label": "启用TUS路由", "category": "其他服务配置", "default": str(settings.tus_enable_routing).lower(), "description": "是否启用TUS自动路由功能"},
             {"key": "tus_max_retries", "label": "TUS最大重试次数", "category": "其他服务配置", "default": str(settings.tus_max_retries), "description": "TUS操作的最大重试次数"},
             {"key": "tus_timeout_seconds", "label": "TUS超时时间(秒)", "category": "其他服务配置", "default": str(settings.tus_timeout_seconds), "description": "TUS操作的超时时间(秒) - 应设置为小于Celery任务硬时间限制(1800秒)"},
+            {"key": "tus_transport_codec", "label": "TUS传输编码", "category": "其他服务配置", "default": settings.tus_transport_codec, "description": "上传到ASR服务前的音频编码：wav(原始PCM)、flac(无损压缩)或opus(有损压缩)"},
+            {"key": "tus_transport_opus_bitrate", "label": "Opus码率(bps)", "category": "其他服务配置", "default": str(settings.tus_transport_opus_bitrate), "description": "传输编码为opus时使用的码率，语音识别建议不低于24000"},
 
             # LLM配置
             {"key": "openrouter_api_key", "label": "OpenRouter API密钥", "category": "LLM配置", "default": settings.openrouter_api_key or "", "sensitive": True},
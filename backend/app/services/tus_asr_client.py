@@ -17,8 +17,14 @@ from typing import Dict, Any, Optional
 from aiohttp import web
 
 from app.core.config import settings
+from app.services.config_version import config_version
 from app.services.global_callback_manager import global_callback_manager
-from app.services.standalone_callback_client import standalone_callback_client
+from app.services.standalone_callback_client import standalone_callback_client, FALLBACK_POLL_SECONDS
+from app.services.asr_cache import asr_result_cache
+from app.services.asr_transport import asr_transport_encoder
+from app.services.tus_uploader import TusUploader
+from app.services.tus_upload_state import tus_upload_state
+from app.services.http_session_pool import HTTPSessionPool
 
 logger = logging.getLogger(__name__)
 
@@ -30,6 +36,9 @@ class TusASRClient:
     _use_standalone_callback = True
     _use_global_callback = False
 
+    # 断点记录中的ASR任务处于这些状态时不再续传，重新创建任务
+    NON_RESUMABLE_TASK_STATUSES = ('completed', 'processing', 'failed', 'error', 'cancelled', 'unknown')
+
     @classmethod
     def _process_signal_handler(cls, signum, frame):
         """处理进程级别的关闭信号"""
@@ -61,20 +70,24 @@ class TusASRClient:
 
         # 使用固定的9090端口
         self.callback_port = 9090
-        self.callback_host = callback_host or settings.tus_callback_host
-
-        # API配置
-        self.api_url = (api_url or settings.tus_api_url).rstrip('/')
-        self.tus_url = (tus_url or settings.tus_upload_url).rstrip('/')
-        self.max_retries = max_retries or settings.tus_max_retries
 
-        # 确保超时设置不超过安全限制
-        configured_timeout = timeout_seconds or settings.tus_timeout_seconds
-        self.timeout_seconds = min(configured_timeout, 1700)  # 限制在1700秒以内
+        # 构造时显式传入的配置不随系统配置变化
+        self._overrides = {
+            'api_url': api_url,
+            'tus_url': tus_url,
+            'callback_host': callback_host,
+            'max_retries': max_retries,
+            'timeout_seconds': timeout_seconds,
+        }
+        self._apply_settings()
 
         # 内部状态管理 - 固定使用独立回调服务器
         self.completed_tasks = {}  # 保留兼容性，但实际不使用
         self.callback_manager = standalone_callback_client
+        self.transport_encoder = asr_transport_encoder
+        self._uploader = None
+        # 进程内共享的HTTP会话，按事件循环复用keep-alive连接
+        self.http_pool = HTTPSessionPool()
         self.process_id = os.getpid()  # 记录进程ID用于日志
 
         # 信号处理
@@ -87,6 +100,27 @@ class TusASRClient:
         logger.info(f"  回调端口: {self.callback_port} (固定独立模式)")
         logger.info(f"  回调主机: {self.callback_host}")
 
+    def _apply_settings(self):
+        """按settings和构造参数设置服务地址、回调主机、重试次数和超时"""
+        overrides = self._overrides
+        self.callback_host = overrides['callback_host'] or settings.tus_callback_host
+
+        # API配置
+        self.api_url = (overrides['api_url'] or settings.tus_api_url).rstrip('/')
+        self.tus_url = (overrides['tus_url'] or settings.tus_upload_url).rstrip('/')
+        self.max_retries = overrides['max_retries'] or settings.tus_max_retries
+
+        # 确保超时设置不超过安全限制
+        configured_timeout = overrides['timeout_seconds'] or settings.tus_timeout_seconds
+        self.timeout_seconds = min(configured_timeout, 1700)  # 限制在1700秒以内
+
+    def refresh_config(self):
+        """系统配置版本变化时调用，更新TUS配置（上传器在TUS地址变化后的下一次上传时重建）"""
+        previous = (self.api_url, self.tus_url)
+        self._apply_settings()
+        if (self.api_url, self.tus_url) != previous:
+            logger.info(f"TUS配置已变化: API URL {self.api_url}, TUS URL {self.tus_url}")
+
     def _load_config_from_database(self):
         """从数据库动态加载TUS配置"""
         try:
@@ -131,7 +165,8 @@ class TusASRClient:
         self,
         audio_file_path: str,
         metadata: Dict[str, Any] = None,
-        celery_task_id: str = None
+        celery_task_id: str = None,
+        force_asr: bool = False
     ) -> Dict[str, Any]:
         """
         处理音频文件的主要入口点
@@ -139,6 +174,8 @@ class TusASRClient:
         Args:
             audio_file_path: 音频文件路径
             metadata: ASR处理元数据
+            celery_task_id: Celery任务ID，默认取当前任务
+            force_asr: 强制重新识别，不读取ASR结果缓存，新结果覆盖旧的缓存条目
 
         Returns:
             Dict: 处理结果，包含SRT内容和状态信息
@@ -165,8 +202,46 @@ class TusASRClient:
                 except Exception as e:
                     logger.debug(f"无法获取CeleryTaskID: {e}")
 
+            # 相同音频已识别过时直接返回缓存的字幕，不再上传；强制重新识别时只计算缓存键用于写入新结果
+            metadata = metadata or {}
+            cache_key = None
+            if asr_result_cache.enabled:
+                loop = asyncio.get_event_loop()
+                cached_srt = None
+                try:
+                    cache_key = await loop.run_in_executor(
+                        None, asr_result_cache.compute_audio_key_sync,
+                        audio_file_path, metadata.get('model'), metadata.get('language')
+                    )
+                    if not force_asr:
+                        cached_srt = await loop.run_in_executor(None, asr_result_cache.lookup_sync, cache_key)
+                except Exception as e:
+                    logger.warning(f"查询ASR结果缓存失败，继续TUS处理: {e}")
+                if cached_srt:
+                    return {
+                        'success': True,
+                        'strategy': 'asr_cache',
+                        'status': 'completed',
+                        'srt_content': cached_srt,
+                        'cache_key': cache_key,
+                        'file_path': audio_file_path,
+                        'metadata': metadata,
+                        'file_size': audio_path.stat().st_size
+                    }
+
             # 执行TUS处理流程，传递CeleryTaskID（固定使用独立回调服务器）
-            result = await self._execute_tus_pipeline(audio_file_path, metadata or {}, celery_task_id)
+            result = await self._execute_tus_pipeline(audio_file_path, metadata, celery_task_id)
+            if cache_key:
+                if result.get('srt_content'):
+                    await loop.run_in_executor(
+                        None, asr_result_cache.store_sync,
+                        cache_key, result['srt_content'], metadata.get('model'), metadata.get('language')
+                    )
+                elif result.get('task_id'):
+                    await loop.run_in_executor(
+                        None, asr_result_cache.register_pending_sync,
+                        result['task_id'], cache_key, metadata.get('model'), metadata.get('language')
+                    )
             return result
 
         except KeyboardInterrupt:
@@ -212,31 +287,35 @@ class TusASRClient:
                 logger.warning("⚠️ 独立回调管理器Redis不可用，回退到标准ASR处理")
                 return await self._fallback_to_standard_asr(audio_file_path, metadata, start_time)
 
-            # 步骤1: 创建ASR任务
-            # 步骤1: 创建ASR任务
-            logger.info("📝 步骤1: 创建ASR任务...")
-            task_info = await self._create_tus_task(audio_file_path, metadata)
-            task_id = task_info['task_id']
-            upload_url = task_info['upload_url']
-
-            logger.info(f"✅ 任务创建: {task_id}")
-            logger.info(f"📤 上传URL: {upload_url}")
-
-            # 步骤1.5: 立即注册TUS任务映射关系（在上传前注册）
-            if redis_available and celery_task_id:
-                logger.info(f"🔗 立即注册TUS任务映射: {task_id} -> {celery_task_id}")
-                registration_success = self.callback_manager.register_task(task_id, celery_task_id)
-                if registration_success:
-                    logger.info(f"✅ TUS任务映射注册成功: {task_id} -> {celery_task_id}")
+            async with self.transport_encoder.transport_file(audio_file_path) as (transport_path, transport_codec):
+                metadata = {**metadata, 'transport_codec': transport_codec}
+                transport_size = Path(transport_path).stat().st_size
+
+                # 步骤1: 创建ASR任务
+                logger.info("📝 步骤1: 创建ASR任务...")
+                task_info = await self._create_or_resume_tus_task(transport_path, metadata)
+                task_id = task_info['task_id']
+                upload_url = task_info['upload_url']
+
+                logger.info(f"✅ 任务创建: {task_id}")
+                logger.info(f"📤 上传URL: {upload_url}")
+
+                # 步骤1.5: 立即注册TUS任务映射关系（在上传前注册）
+                if redis_available and celery_task_id:
+                    logger.info(f"🔗 立即注册TUS任务映射: {task_id} -> {celery_task_id}")
+                    registration_success = self.callback_manager.register_task(task_id, celery_task_id)
+                    if registration_success:
+                        logger.info(f"✅ TUS任务映射注册成功: {task_id} -> {celery_task_id}")
+                    else:
+                        logger.warning(f"⚠️ TUS任务映射注册失败: {task_id} -> {celery_task_id}")
                 else:
-                    logger.warning(f"⚠️ TUS任务映射注册失败: {task_id} -> {celery_task_id}")
-            else:
-                logger.warning(f"⚠️ 无法注册TUS任务映射: redis_available={redis_available}, celery_task_id={celery_task_id}")
+                    logger.warning(f"⚠️ 无法注册TUS任务映射: redis_available={redis_available}, celery_task_id={celery_task_id}")
+                await self._record_tus_task_id(task_id, celery_task_id)
 
-            # 步骤2: TUS文件上传
-            logger.info("📤 步骤2: TUS文件上传...")
-            await self._upload_file_via_tus(audio_file_path, upload_url)
-            logger.info("✅ 文件上传完成")
+                # 步骤2: TUS文件上传
+                logger.info(f"📤 步骤2: TUS文件上传 (编码: {transport_codec})...")
+                await self._upload_file_via_tus(transport_path, upload_url, task_id, task_info.get('resume_key'))
+                logger.info("✅ 文件上传完成")
 
             # 步骤3: TUS任务提交完成（异步处理由callback服务器负责）
             logger.info("🎧 步骤3: TUS任务提交完成")
@@ -255,6 +334,8 @@ class TusASRClient:
                 'metadata': metadata,
                 'processing_time': time.time() - start_time,
                 'file_size': audio_path.stat().st_size,
+                'transport_codec': transport_codec,
+                'transport_size': transport_size,
                 'async_processing': True  # 标记这是异步处理
             }
         except Exception as e:
@@ -262,6 +343,29 @@ class TusASRClient:
             elapsed_time = time.time() - start_time if 'start_time' in locals() else 0
             raise RuntimeError(f"TUS处理流水线执行失败: {str(e)} (已处理 {elapsed_time:.1f} 秒)") from e
 
+    async def transcribe_segment(self, audio_file_path: str, metadata: Dict[str, Any], segment_index: int = None) -> str:
+        """
+        提交单个音频分段并等待识别结果，用于并行分段ASR
+
+        segment_index区分同一次识别中的各分段，内容相同的分段也各自创建任务和断点记录。
+
+        分段任务不与Celery任务关联，callback服务器只保存结果，不更新数据库；
+        由调用方合并各分段的字幕。
+
+        Returns:
+            分段的SRT文本
+        """
+        async with self.transport_encoder.transport_file(audio_file_path) as (transport_path, transport_codec):
+            metadata = {**metadata, 'transport_codec': transport_codec}
+            task_info = await self._create_or_resume_tus_task(transport_path, metadata, segment_index)
+            task_id = task_info['task_id']
+            if not self.callback_manager.register_task(task_id):
+                raise RuntimeError(f"分段任务 {task_id} 注册失败")
+
+            await self._upload_file_via_tus(transport_path, task_info['upload_url'], task_id, task_info.get('resume_key'))
+        logger.info(f"✅ 分段已上传，等待识别结果: {task_id}")
+        return await self._wait_for_tus_results(task_id)
+
     async def _start_tus_task_only(
         self,
         audio_file_path: str,
@@ -289,56 +393,65 @@ class TusASRClient:
             except Exception as e:
                 logger.debug(f"无法获取当前CeleryTaskID: {e}")
 
-            # 步骤1: 创建ASR任务
-            logger.info("📝 步骤1: 创建ASR任务...")
-            task_info = await self._create_tus_task(audio_file_path, metadata)
-            task_id = task_info['task_id']
-            upload_url = task_info['upload_url']
+            async with self.transport_encoder.transport_file(audio_file_path) as (transport_path, transport_codec):
+                metadata = {**metadata, 'transport_codec': transport_codec}
+                transport_size = Path(transport_path).stat().st_size
 
-            logger.info(f"✅ 任务创建: {task_id}")
-            logger.info(f"📤 上传URL: {upload_url}")
+                # 步骤1: 创建ASR任务
+                logger.info("📝 步骤1: 创建ASR任务...")
+                task_info = await self._create_or_resume_tus_task(transport_path, metadata)
+                task_id = task_info['task_id']
+                upload_url = task_info['upload_url']
 
-            # 注册TUS任务与Celery task ID的关联
-            if current_celery_task_id and redis_available:
-                success = self.callback_manager.register_task(task_id, current_celery_task_id)
-                if success:
-                    logger.info(f"✅ TUS任务 {task_id} 已与Celery任务 {current_celery_task_id} 关联")
-                else:
-                    logger.warning(f"⚠️ TUS任务 {task_id} 注册失败")
-            else:
-                logger.warning(f"⚠️ 无法注册TUS任务关联: celery_task_id={current_celery_task_id}, redis_available={redis_available}")
+                logger.info(f"✅ 任务创建: {task_id}")
+                logger.info(f"📤 上传URL: {upload_url}")
 
-            # 步骤2: TUS文件上传（执行上传但不等待ASR结果）
-            logger.info("📤 步骤2: TUS文件上传（执行上传，不等待ASR处理）...")
+                # 注册TUS任务与Celery task ID的关联
+                if current_celery_task_id and redis_available:
+                    success = self.callback_manager.register_task(task_id, current_celery_task_id)
+                    if success:
+                        logger.info(f"✅ TUS任务 {task_id} 已与Celery任务 {current_celery_task_id} 关联")
+                    else:
+                        logger.warning(f"⚠️ TUS任务 {task_id} 注册失败")
+                else:
+                    logger.warning(f"⚠️ 无法注册TUS任务关联: celery_task_id={current_celery_task_id}, redis_available={redis_available}")
+                await self._record_tus_task_id(task_id, current_celery_task_id)
 
-            # 执行文件上传，但不等待ASR处理结果
-            # 这样确保文件真正上传到ASR服务
-            try:
-                await self._upload_file_via_tus(audio_file_path, upload_url)
-                logger.info(f"✅ TUS文件上传完成: {task_id}")
+                # 步骤2: TUS文件上传（执行上传但不等待ASR结果）
+                logger.info(f"📤 步骤2: TUS文件上传（执行上传，不等待ASR处理，编码: {transport_codec}）...")
 
-                return {
-                    'success': True,
-                    'task_id': task_id,
-                    'upload_url': upload_url,
-                    'file_path': audio_file_path,
-                    'file_size': audio_path.stat().st_size,
-                    'metadata': metadata,
-                    'status': 'uploaded'  # 文件已上传，等待ASR处理
-                }
-            except Exception as upload_error:
-                logger.error(f"TUS文件上传失败: {upload_error}")
-                # 即使上传失败，TUS任务也已创建，ASR服务可能有其他机制
-                return {
-                    'success': True,
-                    'task_id': task_id,
-                    'upload_url': upload_url,
-                    'file_path': audio_file_path,
-                    'file_size': audio_path.stat().st_size,
-                    'metadata': metadata,
-                    'upload_status': 'failed',
-                    'upload_error': str(upload_error)
-                }
+                # 执行文件上传，但不等待ASR处理结果
+                # 这样确保文件真正上传到ASR服务
+                try:
+                    await self._upload_file_via_tus(transport_path, upload_url, task_id, task_info.get('resume_key'))
+                    logger.info(f"✅ TUS文件上传完成: {task_id}")
+
+                    return {
+                        'success': True,
+                        'task_id': task_id,
+                        'upload_url': upload_url,
+                        'file_path': audio_file_path,
+                        'file_size': audio_path.stat().st_size,
+                        'transport_codec': transport_codec,
+                        'transport_size': transport_size,
+                        'metadata': metadata,
+                        'status': 'uploaded'  # 文件已上传，等待ASR处理
+                    }
+                except Exception as upload_error:
+                    logger.error(f"TUS文件上传失败: {upload_error}")
+                    # 即使上传失败，TUS任务也已创建，ASR服务可能有其他机制
+                    return {
+                        'success': True,
+                        'task_id': task_id,
+                        'upload_url': upload_url,
+                        'file_path': audio_file_path,
+                        'file_size': audio_path.stat().st_size,
+                        'transport_codec': transport_codec,
+                        'transport_size': transport_size,
+                        'metadata': metadata,
+                        'upload_status': 'failed',
+                        'upload_error': str(upload_error)
+                    }
 
         except Exception as e:
             logger.error(f"TUS任务启动失败: {e}", exc_info=True)
@@ -354,54 +467,10 @@ class TusASRClient:
 
         这个方法专门用于在后台执行上传，不会阻塞调用者
         """
-        audio_path = Path(audio_file_path)
-
         try:
             logger.info(f"🔄 开始后台上传: {audio_file_path}")
-            logger.info(f"📤 TUS服务器URL: {upload_url}")
-
-            # 检查文件是否存在
-            if not audio_path.exists():
-                logger.error(f"❌ 音频文件不存在: {audio_file_path}")
-                return
-
-            file_size = audio_path.stat().st_size
-            logger.info(f"📁 文件大小: {file_size} bytes ({file_size / 1024 / 1024:.2f} MB)")
-
-            # 创建TUS上传会话
-            logger.info("🔐 创建TUS上传会话...")
-            tus_upload_id = await self._create_tus_upload_session(task_id, file_size, audio_path.name)
-            logger.info(f"✅ TUS上传会话已创建: {tus_upload_id}")
-
-            # 执行分块上传
-            logger.info("📤 开始分块上传...")
-            chunk_size = 4 * 1024 * 1024  # 4MB chunks for better efficiency
-
-            with open(audio_path, 'rb') as file:
-                offset = 0
-                chunk_number = 0
-
-                while offset < file_size:
-                    chunk = file.read(chunk_size)
-                    if not chunk:
-                        break
-
-                    chunk_number += 1
-                    chunk_size_actual = len(chunk)
-
-                    logger.info(f"📤 上传分块 {chunk_number} (大小: {chunk_size_actual} bytes, 偏移: {offset})")
-
-                    # 上传分块
-                    await self._upload_chunk(upload_url, tus_upload_id, chunk, offset, chunk_size_actual, file_size)
-
-                    offset += chunk_size_actual
-                    logger.info(f"✅ 分块 {chunk_number} 上传完成")
-
-            # 完成上传
-            logger.info("🎯 完成上传，发送最终请求...")
-            await self._finalize_upload(upload_url, tus_upload_id)
+            await self._upload_file_via_tus(audio_file_path, upload_url, task_id)
             logger.info(f"✅ 后台上传完成: {task_id}")
-
         except Exception as e:
             logger.error(f"❌ 后台上传失败: {task_id} - {str(e)}")
             # 不抛出异常，避免影响主任务
@@ -421,7 +490,8 @@ class TusASRClient:
             "filesize": audio_path.stat().st_size,
             "metadata": {
                 "language": metadata.get("language", "auto"),
-                "model": metadata.get("model", "large-v3-turbo")
+                "model": metadata.get("model", "large-v3-turbo"),
+                "transport_codec": metadata.get("transport_codec", "wav")
             }
         }
 
@@ -440,39 +510,38 @@ class TusASRClient:
                 logger.info(f"API请求URL: {self.api_url}/api/v1/asr-tasks")
                 logger.info(f"API请求载荷: {json.dumps(payload, indent=2)}")
 
-                async with aiohttp.ClientSession() as session:
-                    logger.info("创建aiohttp客户端会话")
-                    # 添加认证头 - 支持从数据库配置读取
-                    headers = {}
-                    # 优先从数据库配置读取，如果没有则使用环境变量
-                    if hasattr(settings, 'asr_api_key') and settings.asr_api_key:
-                        headers['X-API-Key'] = settings.asr_api_key
-
-                    # 添加ngrok绕过头
-                    headers['ngrok-skip-browser-warning'] = 'true'
-
-                    async with session.post(
-                        f"{self.api_url}/api/v1/asr-tasks",
-                        json=payload,
-                        headers=headers,
-                        timeout=aiohttp.ClientTimeout(total=30)
-                    ) as response:
-                        logger.info(f"API响应状态码: {response.status}")
-                        if response.status == 200:
-                            logger.info("开始解析API响应JSON")
-                            result = await response.json()
-                            logger.info(f"API响应内容: {json.dumps(result, indent=2)}")
-                            if 'task_id' not in result or 'upload_url' not in result:
-                                raise ValueError(f"无效的API响应: {result}")
-
-                            # 保存任务ID供后续使用
-                            self.current_task_id = result['task_id']
-                            logger.info(f"TUS任务创建成功: {result['task_id']}")
-                            return result
-                        else:
-                            error_text = await response.text()
-                            logger.warning(f"API请求失败，状态码: {response.status}, 响应: {error_text}")
-                            raise RuntimeError(f"API请求失败，状态码: {response.status}, 响应: {error_text}")
+                session = await self.http_pool.get_session()
+                # 添加认证头 - 支持从数据库配置读取
+                headers = {}
+                # 优先从数据库配置读取，如果没有则使用环境变量
+                if hasattr(settings, 'asr_api_key') and settings.asr_api_key:
+                    headers['X-API-Key'] = settings.asr_api_key
+
+                # 添加ngrok绕过头
+                headers['ngrok-skip-browser-warning'] = 'true'
+
+                async with session.post(
+                    f"{self.api_url}/api/v1/asr-tasks",
+                    json=payload,
+                    headers=headers,
+                    timeout=aiohttp.ClientTimeout(total=30)
+                ) as response:
+                    logger.info(f"API响应状态码: {response.status}")
+                    if response.status == 200:
+                        logger.info("开始解析API响应JSON")
+                        result = await response.json()
+                        logger.info(f"API响应内容: {json.dumps(result, indent=2)}")
+                        if 'task_id' not in result or 'upload_url' not in result:
+                            raise ValueError(f"无效的API响应: {result}")
+
+                        # 保存任务ID供后续使用
+                        self.current_task_id = result['task_id']
+                        logger.info(f"TUS任务创建成功: {result['task_id']}")
+                        return result
+                    else:
+                        error_text = await response.text()
+                        logger.warning(f"API请求失败，状态码: {response.status}, 响应: {error_text}")
+                        raise RuntimeError(f"API请求失败，状态码: {response.status}, 响应: {error_text}")
 
             except Exception as e:
                 last_error = e
@@ -490,197 +559,127 @@ class TusASRClient:
         logger.error(error_msg)
         raise RuntimeError(error_msg) from last_error
 
-    async def _upload_file_via_tus(
-        self,
-        audio_file_path: str,
-        upload_url: str
-    ) -> None:
-        """通过TUS协议上传文件"""
-        audio_path = Path(audio_file_path)
-        file_size = audio_path.stat().st_size
-
-        logger.info(f"开始TUS上传: {audio_path.name} ({file_size} bytes)")
-
+    @staticmethod
+    def _record_tus_task_id_sync(task_id: str, celery_task_id: str) -> bool:
+        """把TUS任务ID写入对应ProcessingTask的tus_task_id列，回调服务器按索引直接查找"""
         try:
-            # 从upload_url提取upload_id
-            upload_id = upload_url.split('/')[-1]
-
-            # 创建TUS上传会话
-            tus_upload_id = await self._create_tus_upload_session(upload_id, file_size, audio_path.name)
-
-            # 分块上传文件数据
-            await self._upload_tus_chunks(tus_upload_id, audio_path)
+            from app.core.database import get_sync_db
+            from app.models.processing_task import ProcessingTask
 
-            logger.info(f"TUS上传完成: {audio_path.name}")
+            with get_sync_db() as db:
+                updated = db.query(ProcessingTask).filter(
+                    ProcessingTask.celery_task_id == celery_task_id
+                ).update({ProcessingTask.tus_task_id: task_id}, synchronize_session=False)
+                db.commit()
+            return updated > 0
         except Exception as e:
-            logger.error(f"TUS文件上传失败: {e}", exc_info=True)
-            raise RuntimeError(f"TUS文件上传失败: {str(e)}") from e
+            logger.warning(f"⚠️ 记录tus_task_id失败: {task_id} -> {celery_task_id}: {e}")
+            return False
+
+    async def _record_tus_task_id(self, task_id: str, celery_task_id: Optional[str]):
+        """在线程池中记录tus_task_id，不阻塞事件循环"""
+        if not celery_task_id:
+            return
+        loop = asyncio.get_running_loop()
+        if await loop.run_in_executor(None, self._record_tus_task_id_sync, task_id, celery_task_id):
+            logger.info(f"✅ 已记录ProcessingTask.tus_task_id: {celery_task_id} -> {task_id}")
+
+    @staticmethod
+    def _current_celery_task_id() -> Optional[str]:
+        """获取当前Celery任务ID，不在Celery任务中时返回None"""
+        try:
+            import celery
+            current_task = celery.current_task
+            return current_task.request.id if current_task else None
+        except Exception:
+            return None
 
-    async def _create_tus_upload_session(
+    async def _create_or_resume_tus_task(
         self,
-        upload_id: str,
-        file_size: int,
-        filename: str
-    ) -> str:
-        """创建TUS上传会话"""
-        task_id = getattr(self, 'current_task_id', None)
-
-        # 构建TUS元数据
-        metadata_parts = [f'filename {filename}']
-        if task_id:
-            metadata_parts.append(f'task_id {task_id}')
-
-        headers = {
-            'Tus-Resumable': '1.0.0',
-            'Upload-Length': str(file_size),
-            'Upload-Metadata': ', '.join(metadata_parts)
-        }
-
-        # 添加认证头 - 支持从数据库配置读取
-        if hasattr(settings, 'asr_api_key') and settings.asr_api_key:
-            headers['X-API-Key'] = settings.asr_api_key
-
-        # 添加ngrok绕过头
-        headers['ngrok-skip-browser-warning'] = 'true'
+        transport_path: str,
+        metadata: Dict[str, Any],
+        segment_index: int = None
+    ) -> Dict[str, Any]:
+        """
+        创建TUS ASR任务；同一Celery任务重新执行时，存在同一次提交的断点记录且ASR任务仍在等待上传则复用该任务
 
-        # 添加重试机制
-        last_error = None
-        for attempt in range(3):  # 最多重试3次
-            try:
-                async with aiohttp.ClientSession() as session:
-                    url = f"{self.tus_url}/files"
-                    logger.info(f"创建TUS上传会话: {url}")
-                    logger.info(f"请求头: {headers}")
-
-                    async with session.post(url, headers=headers) as response:
-                        logger.info(f"TUS响应状态码: {response.status}")
-                        logger.info(f"TUS响应头: {dict(response.headers)}")
-
-                        if response.status != 201:  # TUS创建上传会话应该返回201
-                            error_text = await response.text()
-                            logger.error(f"TUS上传会话创建失败，状态码: {response.status}, 响应: {error_text}")
-                            raise RuntimeError(f"TUS上传会话创建失败，状态码: {response.status}, 响应: {error_text}")
-
-                        # 从Location头获取上传URL
-                        location = response.headers.get('Location', '')
-                        if not location:
-                            raise ValueError("TUS响应中缺少Location头")
-
-                        # 提取实际的upload_id
-                        actual_upload_id = location.split('/')[-1]
-                        logger.info(f"TUS上传会话创建成功: {actual_upload_id}")
-
-                        return actual_upload_id
-            except Exception as e:
-                last_error = e
-                logger.warning(f"TUS上传会话创建失败 (尝试 {attempt + 1}/3): {e}")
-                if attempt < 2:  # 还有重试次数
-                    # 使用指数退避算法，基础等待时间为1秒，最大等待时间为30秒
-                    wait_time = min(1 * (2 ** attempt), 30)
-                    logger.info(f"等待 {wait_time} 秒后重试TUS上传会话创建 (指数退避)...")
-                    await asyncio.sleep(wait_time)
-                else:
-                    logger.error(f"TUS上传会话创建失败，已重试3次，最后错误: {e}")
+        断点记录按Celery任务ID和分段序号区分，不在Celery任务中时不记录（没有重新投递可以续传）。
+        返回的task_info带resume_key，上传时传给TusUploader以记录和恢复上传进度
+        """
+        store = tus_upload_state
+        owner = self._current_celery_task_id()
+        if not store.enabled or not owner:
+            return await self._create_tus_task(transport_path, metadata)
+
+        loop = asyncio.get_running_loop()
+        resume_key = await loop.run_in_executor(
+            None, store.compute_key_sync, transport_path, owner, segment_index,
+            metadata.get('model'), metadata.get('language')
+        )
+        file_size = Path(transport_path).stat().st_size
+
+        record = await store.load(resume_key)
+        if record and record.get('task_id') and record.get('file_size') == file_size:
+            status = await self._get_task_status(record['task_id'])
+            # 已在处理或已完成的任务不再上传；状态查询失败(unknown)时也重新创建
+            if status.get('status') not in self.NON_RESUMABLE_TASK_STATUSES:
+                logger.info(f"♻️ 复用未完成上传的ASR任务: {record['task_id']} (上次进度: {record.get('mode', '未开始')})")
+                self.current_task_id = record['task_id']
+                return {
+                    'task_id': record['task_id'],
+                    'upload_url': record['task_upload_url'],
+                    'resume_key': resume_key,
+                    'resumed': True
+                }
+            logger.info(f"断点记录中的ASR任务状态为 {status.get('status')}，不再续传，重新创建任务")
+
+        task_info = await self._create_tus_task(transport_path, metadata)
+        await store.save(resume_key, {
+            'task_id': task_info['task_id'],
+            'task_upload_url': task_info['upload_url'],
+            'file_size': file_size
+        })
+        return {**task_info, 'resume_key': resume_key}
+
+    def _get_uploader(self) -> TusUploader:
+        """获取当前TUS地址对应的上传器，地址从数据库重新加载后自动重建"""
+        if self._uploader is None or self._uploader.tus_url != self.tus_url:
+            self._uploader = TusUploader(self.tus_url, session_provider=self.http_pool.get_session)
+        return self._uploader
+
+    def get_connection_stats(self) -> Dict[str, Any]:
+        """共享HTTP会话的连接复用统计"""
+        return self.http_pool.get_stats()
+
+    def close_http_sessions_sync(self):
+        """关闭共享HTTP会话，在worker进程退出时调用"""
+        self.http_pool.close_sync()
 
-        # 所有重试都失败
-        error_msg = f"TUS上传会话创建失败，已重试3次。最后错误: {str(last_error)}"
-        logger.error(error_msg)
-        raise RuntimeError(error_msg) from last_error
+    async def _upload_file_via_tus(
+        self,
+        audio_file_path: str,
+        upload_url: str,
+        task_id: str = None,
+        resume_key: str = None
+    ) -> None:
+        """通过TUS协议上传文件
 
-    async def _upload_tus_chunks(self, upload_id: str, file_path: Path) -> None:
-        """分块上传文件数据"""
-        chunk_size = 4 * 1024 * 1024  # 4MB chunks for better efficiency
-        offset = 0
-        file_size = file_path.stat().st_size
+        服务端支持Concatenation扩展时并发上传，否则顺序上传，详见TusUploader。
+        task_id写入Upload-Metadata，未传入时使用最近创建的任务ID。
+        传入resume_key时记录上传进度，中断后重新执行可从服务端已确认的offset继续。
+        """
+        audio_path = Path(audio_file_path)
+        file_size = audio_path.stat().st_size
+        task_id = task_id or getattr(self, 'current_task_id', None)
 
-        logger.info(f"开始分块上传: 文件大小 {file_size} bytes, 块大小 {chunk_size} bytes")
+        logger.info(f"开始TUS上传: {audio_path.name} ({file_size} bytes), 任务上传地址: {upload_url}")
 
         try:
-            with open(file_path, 'rb') as f:
-                async with aiohttp.ClientSession() as session:
-                    while offset < file_size:
-                        # 定位到offset位置
-                        f.seek(offset)
-
-                        # 读取数据块
-                        chunk = f.read(chunk_size)
-                        if not chunk:
-                            logger.warning(f"读取数据块为空，offset={offset}")
-                            break
-
-                        # 上传数据块
-                        headers = {
-                            'Tus-Resumable': '1.0.0',
-                            'Upload-Offset': str(offset),
-                            'Content-Type': 'application/offset+octet-stream'
-                        }
-
-                        # 添加认证头 - 支持从数据库配置读取
-                        if hasattr(settings, 'asr_api_key') and settings.asr_api_key:
-                            headers['X-API-Key'] = settings.asr_api_key
-
-                        # 添加ngrok绕过头
-                        headers['ngrok-skip-browser-warning'] = 'true'
-
-                        url = f"{self.tus_url}/files/{upload_id}"
-                        logger.info(f"上传数据块: offset={offset}, size={len(chunk)}, 进度 {offset/file_size*100:.1f}%")
-
-                        # 为每个数据块添加重试机制
-                        chunk_upload_success = False
-                        last_chunk_error = None
-
-                        for chunk_attempt in range(3):  # 最多重试3次
-                            try:
-                                logger.info(f"上传数据块尝试 {chunk_attempt + 1}/3: offset={offset}, size={len(chunk)}")
-
-                                async with session.patch(url, data=chunk, headers=headers) as response:
-                                    logger.info(f"TUS块上传响应状态码: {response.status}")
-
-                                    if response.status not in [200, 204]:  # TUS块上传应该返回200或204
-                                        error_text = await response.text()
-                                        logger.error(f"TUS块上传失败，状态码: {response.status}, 响应: {error_text}")
-                                        # HTTP错误不重试，直接失败
-                                        raise RuntimeError(f"TUS块上传失败，状态码: {response.status}, 响应: {error_text}")
-
-                                    # 验证offset
-                                    new_offset = int(response.headers.get('Upload-Offset', offset + len(chunk)))
-                                    if new_offset != offset + len(chunk):
-                                        raise ValueError(f"Offset不匹配: 期望 {offset + len(chunk)}, 实际 {new_offset}")
-
-                                    offset = new_offset
-                                    chunk_upload_success = True
-                                    logger.info(f"✅ 数据块上传成功，当前进度 {offset/file_size*100:.1f}%")
-                                    break  # 成功则跳出重试循环
-
-                            except aiohttp.ClientError as e:
-                                last_chunk_error = e
-                                logger.warning(f"数据块网络错误 (尝试 {chunk_attempt + 1}/3): {e}")
-                                if chunk_attempt < 2:  # 还有重试次数
-                                    # 使用指数退避算法，基础等待时间为1秒，最大等待时间为30秒
-                                    wait_time = min(1 * (2 ** chunk_attempt), 30)
-                                    logger.info(f"等待 {wait_time} 秒后重试数据块上传 (指数退避)...")
-                                    await asyncio.sleep(wait_time)
-                                else:
-                                    logger.error(f"数据块上传失败，已重试3次，最后错误: {e}")
-
-                            except Exception as e:
-                                last_chunk_error = e
-                                logger.error(f"数据块上传未知错误 (尝试 {chunk_attempt + 1}/3): {e}")
-                                # 非网络异常不重试，直接失败
-                                raise RuntimeError(f"数据块上传失败: {str(e)}") from e
-
-                        # 检查数据块是否上传成功
-                        if not chunk_upload_success:
-                            error_msg = "数据块上传失败，已达到最大重试次数"
-                            if last_chunk_error:
-                                error_msg = f"数据块上传失败，已达到最大重试次数。最后错误: {str(last_chunk_error)}"
-                            logger.error(error_msg)
-                            raise RuntimeError(error_msg) from last_chunk_error
-
-            logger.info(f"TUS分块上传完成: 最终offset={offset}")
+            tus_upload_id = await self._get_uploader().upload(audio_path, audio_path.name, task_id, resume_key)
+            logger.info(f"TUS上传完成: {audio_path.name} -> {tus_upload_id}")
         except Exception as e:
-            logger.error(f"分块上传失败: {e}", exc_info=True)
-            raise RuntimeError(f"分块上传失败: {str(e)}") from e
+            logger.error(f"TUS文件上传失败: {e}", exc_info=True)
+            raise RuntimeError(f"TUS文件上传失败: {str(e)}") from e
 
     async def _wait_for_tus_results(self, task_id: str, celery_task_id: str = None) -> str:
         """等待TUS ASR处理结果"""
@@ -872,31 +871,34 @@ class TusASRClient:
             elapsed_time = time.time() - start_time
             logger.warning(f"回退到轮询任务 {task_id} (已等待 {elapsed_time:.1f} 秒)")
 
-            while time.time() - start_time < safe_timeout:
-                # 检查全局模式是否被中断
-                if self._use_global_callback and not self.callback_manager._server_running:
-                    raise KeyboardInterrupt("全局回调服务器已关闭")
-                # 检查传统模式是否被中断
-                if not self._use_global_callback and not self.__class__._callback_running:
-                    raise KeyboardInterrupt("本地回调服务器已关闭")
+            # 先订阅完成通知再查询状态，避免在两者之间完成的任务错过通知
+            async with self.callback_manager.result_notifications(task_id) as wait_for_notification:
+                while time.time() - start_time < safe_timeout:
+                    # 检查全局模式是否被中断
+                    if self._use_global_callback and not self.callback_manager._server_running:
+                        raise KeyboardInterrupt("全局回调服务器已关闭")
+                    # 检查传统模式是否被中断
+                    if not self._use_global_callback and not self.__class__._callback_running:
+                        raise KeyboardInterrupt("本地回调服务器已关闭")
 
-                try:
-                    status = await self._get_task_status(task_id)
+                    try:
+                        status = await self._get_task_status(task_id)
 
-                    if status['status'] == 'completed':
-                        srt_url = f"{self.api_url}/api/v1/tasks/{task_id}/download"
-                        srt_content = await self._download_srt_content(srt_url)
-                        return srt_content
-                    elif status['status'] == 'failed':
-                        error_msg = status.get('error_message', '任务失败')
-                        raise RuntimeError(f"任务失败: {error_msg}")
+                        if status['status'] == 'completed':
+                            srt_url = f"{self.api_url}/api/v1/tasks/{task_id}/download"
+                            srt_content = await self._download_srt_content(srt_url)
+                            return srt_content
+                        elif status['status'] == 'failed':
+                            error_msg = status.get('error_message', '任务失败')
+                            raise RuntimeError(f"任务失败: {error_msg}")
 
-                    logger.info(f"任务状态: {status['status']}, 等待中...")
-                    await asyncio.sleep(5)
+                        logger.info(f"任务状态: {status['status']}, 等待中...")
+                        # 回调服务器发布完成通知时立即重新查询，否则每5秒查询一次
+                        await wait_for_notification(FALLBACK_POLL_SECONDS)
 
-                except Exception as e:
-                    logger.error(f"轮询任务状态出错: {e}")
-                    await asyncio.sleep(5)
+                    except Exception as e:
+                        logger.error(f"轮询任务状态出错: {e}")
+                        await asyncio.sleep(5)
 
             raise TimeoutError(f"等待任务 {task_id} 完成超时")
 
@@ -1007,23 +1009,26 @@ class TusASRClient:
         # 设置一个安全的超时缓冲区，确保在Celery超时之前完成
         safe_timeout = min(self.timeout_seconds, 1700)  # 留出100秒的缓冲时间
 
-        while time.time() - start_time < safe_timeout:
-            try:
-                status = await self._get_task_status(task_id)
+        # 先订阅完成通知再查询状态，避免在两者之间完成的任务错过通知
+        async with self.callback_manager.result_notifications(task_id) as wait_for_notification:
+            while time.time() - start_time < safe_timeout:
+                try:
+                    status = await self._get_task_status(task_id)
 
-                if status['status'] == 'completed':
-                    srt_url = f"{self.api_url}/api/v1/tasks/{task_id}/download"
-                    return await self._download_srt_content(srt_url)
-                elif status['status'] == 'failed':
-                    error_msg = status.get('error_message', '任务失败')
-                    raise RuntimeError(f"TUS任务失败: {error_msg}")
+                    if status['status'] == 'completed':
+                        srt_url = f"{self.api_url}/api/v1/tasks/{task_id}/download"
+                        return await self._download_srt_content(srt_url)
+                    elif status['status'] == 'failed':
+                        error_msg = status.get('error_message', '任务失败')
+                        raise RuntimeError(f"TUS任务失败: {error_msg}")
 
-                logger.info(f"任务状态: {status['status']}, 等待中...")
-                await asyncio.sleep(5)
+                    logger.info(f"任务状态: {status['status']}, 等待中...")
+                    # 回调服务器发布完成通知时立即重新查询，否则每5秒查询一次
+                    await wait_for_notification(FALLBACK_POLL_SECONDS)
 
-            except Exception as e:
-                logger.error(f"轮询任务状态失败: {e}")
-                await asyncio.sleep(5)
+                except Exception as e:
+                    logger.error(f"轮询任务状态失败: {e}")
+                    await asyncio.sleep(5)
 
         elapsed_time = time.time() - start_time
         logger.warning(f"TUS轮询超时: 已等待 {elapsed_time:.1f} 秒，超时设置 {safe_timeout} 秒")
@@ -1041,20 +1046,20 @@ class TusASRClient:
                 # 添加ngrok绕过头
                 headers['ngrok-skip-browser-warning'] = 'true'
 
-                async with aiohttp.ClientSession() as session:
-                    url = f"{self.api_url}/api/v1/asr-tasks/{task_id}/status"
-                    logger.info(f"轮询任务状态: {url}")
+                session = await self.http_pool.get_session()
+                url = f"{self.api_url}/api/v1/asr-tasks/{task_id}/status"
+                logger.info(f"轮询任务状态: {url}")
 
-                    async with session.get(url, headers=headers, timeout=aiohttp.ClientTimeout(total=10)) as response:
-                        logger.info(f"任务状态API响应状态码: {response.status}")
-                        if response.status == 200:
-                            result = await response.json()
-                            logger.info(f"任务状态响应: {json.dumps(result, indent=2)}")
-                            return result
-                        else:
-                            error_text = await response.text()
-                            logger.warning(f"状态API返回状态码: {response.status}, 响应: {error_text}")
-                            return {"status": "unknown"}
+                async with session.get(url, headers=headers, timeout=aiohttp.ClientTimeout(total=10)) as response:
+                    logger.info(f"任务状态API响应状态码: {response.status}")
+                    if response.status == 200:
+                        result = await response.json()
+                        logger.info(f"任务状态响应: {json.dumps(result, indent=2)}")
+                        return result
+                    else:
+                        error_text = await response.text()
+                        logger.warning(f"状态API返回状态码: {response.status}, 响应: {error_text}")
+                        return {"status": "unknown"}
 
         except Exception as e:
             logger.error(f"获取任务状态失败: {e}", exc_info=True)
@@ -1074,40 +1079,40 @@ class TusASRClient:
             # 添加ngrok绕过头
             headers['ngrok-skip-browser-warning'] = 'true'
 
-            async with aiohttp.ClientSession() as session:
-                async with session.get(srt_url, headers=headers, timeout=aiohttp.ClientTimeout(total=60)) as response:
-                    logger.info(f"SRT下载响应状态码: {response.status}")
+            session = await self.http_pool.get_session()
+            async with session.get(srt_url, headers=headers, timeout=aiohttp.ClientTimeout(total=60)) as response:
+                logger.info(f"SRT下载响应状态码: {response.status}")
 
-                    if response.status != 200:
-                        error_text = await response.text()
-                        logger.error(f"SRT下载失败，状态码: {response.status}, 响应: {error_text}")
-                        raise RuntimeError(f"SRT下载失败，状态码: {response.status}, 响应: {error_text}")
+                if response.status != 200:
+                    error_text = await response.text()
+                    logger.error(f"SRT下载失败，状态码: {response.status}, 响应: {error_text}")
+                    raise RuntimeError(f"SRT下载失败，状态码: {response.status}, 响应: {error_text}")
 
-                    # 尝试解析JSON响应
-                    content_type = response.headers.get('Content-Type', '').lower()
-                    logger.info(f"响应内容类型: {content_type}")
+                # 尝试解析JSON响应
+                content_type = response.headers.get('Content-Type', '').lower()
+                logger.info(f"响应内容类型: {content_type}")
 
-                    try:
-                        if 'application/json' in content_type:
-                            result = await response.json()
-                            # logger.info(f"JSON响应: {json.dumps(result, indent=2)}")
-                            if result.get("code") == 0 and result.get("data"):
-                                srt_content = result["data"]
-                                logger.info(f"下载SRT内容成功 (JSON格式, {len(srt_content)} 字符)")
-                                return srt_content
-                            else:
-                                raise ValueError(f"无效的JSON响应: {result}")
-                        else:
-                            # 如果不是JSON，尝试纯文本
-                            srt_content = await response.text()
-                            logger.info(f"下载SRT内容成功 (纯文本格式, {len(srt_content)} 字符)")
+                try:
+                    if 'application/json' in content_type:
+                        result = await response.json()
+                        # logger.info(f"JSON响应: {json.dumps(result, indent=2)}")
+                        if result.get("code") == 0 and result.get("data"):
+                            srt_content = result["data"]
+                            logger.info(f"下载SRT内容成功 (JSON格式, {len(srt_content)} 字符)")
                             return srt_content
-                    except aiohttp.ContentTypeError as e:
-                        # 如果Content-Type解析失败，尝试纯文本
-                        logger.warning(f"Content-Type解析失败: {e}，尝试纯文本")
+                        else:
+                            raise ValueError(f"无效的JSON响应: {result}")
+                    else:
+                        # 如果不是JSON，尝试纯文本
                         srt_content = await response.text()
                         logger.info(f"下载SRT内容成功 (纯文本格式, {len(srt_content)} 字符)")
                         return srt_content
+                except aiohttp.ContentTypeError as e:
+                    # 如果Content-Type解析失败，尝试纯文本
+                    logger.warning(f"Content-Type解析失败: {e}，尝试纯文本")
+                    srt_content = await response.text()
+                    logger.info(f"下载SRT内容成功 (纯文本格式, {len(srt_content)} 字符)")
+                    return srt_content
 
         except Exception as e:
             logger.error(f"下载SRT内容失败: {e}", exc_info=True)
@@ -1150,4 +1155,5 @@ class TusASRClient:
     
 
 # 全局实例
-tus_asr_client = TusASRClient()
\ No newline at end of file
+tus_asr_client = TusASRClient()
+config_version.register(tus_asr_client.refresh_config)
\ No newline at end of file
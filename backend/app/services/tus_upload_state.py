@@ -0,0 +1,109 @@
+"""
+TUS上传断点记录
+
+每确认一个分块就把上传进度写入Redis（tus_upload_state:{key}，带TTL），
+key由Celery任务ID + 分段序号 + 上传文件内容哈希 + ASR模型 + 语言组成，每次提交各自一条记录：
+同一次并行识别中内容相同的分段、不同Celery任务提交的相同音频不会共用或覆盖记录。
+Celery worker在上传途中退出、任务被重新投递后（任务ID不变），TusASRClient按同一个key找到记录，
+复用已创建的ASR任务，并通过TUS HEAD请求从服务端确认的offset继续上传。
+读写记录使用异步Redis连接，Redis缓慢或不可用时不阻塞同一事件循环中的其他分块上传。
+
+记录内容：
+- task_id / task_upload_url   已创建的ASR任务
+- mode                        sequential 或 concatenation
+- upload_url / offset         顺序上传的TUS地址和已确认的offset
+- partials                    并发上传已完成的partial {起始offset: [URL, 长度]}
+"""
+
+import time
+import json
+import hashlib
+import logging
+from typing import Dict, Any, Optional
+
+from app.services.lazy_redis import LazyRedis, SettingsDefault
+
+logger = logging.getLogger(__name__)
+
+
+class TusUploadStateStore:
+    """保存在Redis中的TUS上传断点记录"""
+
+    KEY_PREFIX = 'tus_upload_state'
+    HASH_CHUNK_SIZE = 4 * 1024 * 1024
+
+    enabled = SettingsDefault('tus_resume_enabled')
+    ttl_seconds = SettingsDefault('tus_resume_ttl_seconds')
+
+    def __init__(self, redis_url: str = None, enabled: bool = None, ttl_seconds: int = None):
+        """
+        初始化断点记录存储
+
+        Args:
+            redis_url: Redis连接URL，默认从配置读取
+            enabled: 是否启用断点续传，默认从配置读取
+            ttl_seconds: 记录有效期(秒)，每次更新后重新计时，默认从配置读取
+        """
+        self._enabled = enabled
+        self._ttl_seconds = ttl_seconds
+        self._redis = LazyRedis("TUS断点记录", redis_url)
+
+    def _state_key(self, key: str) -> str:
+        return f"{self.KEY_PREFIX}:{key}"
+
+    def compute_key_sync(self, file_path: str, owner: str, segment_index: int = None,
+                         model_type: str = None, language: str = None) -> str:
+        """
+        计算一次提交的记录键
+
+        Args:
+            file_path: 上传的文件
+            owner: 提交任务的Celery任务ID，重新投递后不变
+            segment_index: 并行识别中的分段序号，整段提交时为None
+            model_type: ASR模型
+            language: 识别语言
+        """
+        digest = hashlib.sha256()
+        with open(file_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(self.HASH_CHUNK_SIZE), b''):
+                digest.update(chunk)
+        segment = '' if segment_index is None else segment_index
+        return f"{owner}:{segment}:{digest.hexdigest()}:{model_type or ''}:{language or ''}"
+
+    async def load(self, key: str) -> Optional[Dict[str, Any]]:
+        """读取断点记录，不存在或Redis不可用时返回None"""
+        client = await self._redis.get_async()
+        if client is None:
+            return None
+        try:
+            value = await client.get(self._state_key(key))
+            return json.loads(value) if value else None
+        except Exception as e:
+            logger.warning(f"读取TUS断点记录失败: {e}")
+            return None
+
+    async def save(self, key: str, record: Dict[str, Any]) -> bool:
+        """写入断点记录并刷新有效期"""
+        client = await self._redis.get_async()
+        if client is None:
+            return False
+        record['updated_at'] = time.time()
+        try:
+            await client.set(self._state_key(key), json.dumps(record), ex=self.ttl_seconds)
+            return True
+        except Exception as e:
+            logger.warning(f"写入TUS断点记录失败: {e}")
+            return False
+
+    async def delete(self, key: str) -> None:
+        client = await self._redis.get_async()
+        if client is None:
+            return
+        try:
+            await client.delete(self._state_key(key))
+        except Exception as e:
+            logger.warning(f"删除TUS断点记录失败: {e}")
+
+
+# 全局实例
+tus_upload_state = TusUploadStateStore()
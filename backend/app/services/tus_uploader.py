@@ -0,0 +1,503 @@
+"""
+TUS分块上传
+服务端支持Concatenation扩展时把文件拆成多个partial上传并发发送，最后用final上传合并；
+否则按顺序PATCH，并在当前请求传输时预读下一个分块。分块大小和并发数根据观测到的吞吐量调整。
+传入resume_key时每确认一个分块就把进度写入断点记录，进程退出后可以从服务端确认的offset继续上传
+"""
+
+import time
+import asyncio
+import logging
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+from urllib.parse import urljoin
+
+import aiohttp
+
+from app.core.config import settings
+from app.services.tus_upload_state import TusUploadStateStore, tus_upload_state
+
+logger = logging.getLogger(__name__)
+
+# 分块大小按该粒度对齐
+CHUNK_ALIGNMENT = 64 * 1024
+
+
+class AdaptiveUploadTuner:
+    """根据观测到的吞吐量调整分块大小和并发数"""
+
+    def __init__(
+        self,
+        chunk_size: int,
+        min_chunk_size: int,
+        max_chunk_size: int,
+        max_concurrency: int = 1,
+        target_seconds: float = 2.0,
+        concurrency: int = 1
+    ):
+        """
+        Args:
+            chunk_size: 初始分块大小
+            min_chunk_size: 分块大小下限
+            max_chunk_size: 分块大小上限
+            max_concurrency: 并发数上限
+            target_seconds: 单个请求的目标耗时，分块大小按 单请求吞吐量 x 目标耗时 计算
+            concurrency: 初始并发数
+        """
+        self.min_chunk_size = min_chunk_size
+        self.max_chunk_size = max(max_chunk_size, min_chunk_size)
+        self.chunk_size = self._clamp(chunk_size)
+        self.max_concurrency = max(1, max_concurrency)
+        self.concurrency = max(1, min(concurrency, self.max_concurrency))
+        self.target_seconds = target_seconds
+
+        self.request_rate = None  # 单个请求吞吐量的指数加权平均(bytes/s)
+        self._best_rate = 0.0  # 已观测到的最高总吞吐量
+        self._growing = True
+        self._window_start = time.monotonic()
+        self._window_bytes = 0
+        self._window_requests = 0
+
+    def _clamp(self, size: float) -> int:
+        size = int(size) // CHUNK_ALIGNMENT * CHUNK_ALIGNMENT
+        return max(self.min_chunk_size, min(self.max_chunk_size, size))
+
+    def record(self, nbytes: int, seconds: float):
+        """记录一次完成的请求，更新分块大小；每完成一轮并发请求评估一次总吞吐量"""
+        rate = nbytes / max(seconds, 1e-6)
+        self.request_rate = rate if self.request_rate is None else 0.7 * self.request_rate + 0.3 * rate
+        self.chunk_size = self._clamp(self.request_rate * self.target_seconds)
+
+        self._window_bytes += nbytes
+        self._window_requests += 1
+        if self._window_requests < self.concurrency:
+            return
+
+        now = time.monotonic()
+        total_rate = self._window_bytes / max(now - self._window_start, 1e-6)
+        if self._growing and self.concurrency < self.max_concurrency:
+            if total_rate > self._best_rate * 1.1:
+                # 增加并发带来了明显提升，继续增加
+                self._best_rate = total_rate
+                self.concurrency += 1
+            else:
+                # 提升不足10%，退回上一个并发数并停止增长
+                self._growing = False
+                self.concurrency = max(1, self.concurrency - 1)
+        self._window_start = now
+        self._window_bytes = 0
+        self._window_requests = 0
+
+    def get_stats(self) -> Dict[str, float]:
+        return {
+            'chunk_size': self.chunk_size,
+            'concurrency': self.concurrency,
+            'request_rate': self.request_rate or 0.0
+        }
+
+
+class TusUploader:
+    """TUS文件上传，支持Concatenation扩展的并发上传和顺序上传两种模式"""
+
+    def __init__(
+        self,
+        tus_url: str,
+        state_store: Optional[TusUploadStateStore] = tus_upload_state,
+        session_provider: Optional[Callable[[], Awaitable[aiohttp.ClientSession]]] = None
+    ):
+        """
+        Args:
+            tus_url: TUS服务地址
+            state_store: 断点记录存储，None时不记录上传进度
+            session_provider: 返回共享会话的协程函数；未提供时每次上传创建独立会话
+        """
+        self.tus_url = tus_url.rstrip('/')
+        self.state_store = state_store
+        self.session_provider = session_provider
+        self._extensions_cache: Dict[str, Set[str]] = {}
+        self.last_stats: Dict[str, Any] = {}
+
+    def _headers(self, extra: Dict[str, str] = None) -> Dict[str, str]:
+        headers = {'Tus-Resumable': '1.0.0'}
+        # 添加认证头 - 支持从数据库配置读取
+        if hasattr(settings, 'asr_api_key') and settings.asr_api_key:
+            headers['X-API-Key'] = settings.asr_api_key
+        # 添加ngrok绕过头
+        headers['ngrok-skip-browser-warning'] = 'true'
+        if extra:
+            headers.update(extra)
+        return headers
+
+    def _new_tuner(self, file_size: int, max_concurrency: int) -> AdaptiveUploadTuner:
+        return AdaptiveUploadTuner(
+            chunk_size=settings.tus_upload_chunk_size,
+            min_chunk_size=settings.tus_upload_min_chunk_size,
+            max_chunk_size=settings.tus_upload_max_chunk_size,
+            max_concurrency=max_concurrency,
+            target_seconds=settings.tus_upload_target_chunk_seconds,
+            concurrency=min(2, max_concurrency)
+        )
+
+    async def get_extensions(self, session: aiohttp.ClientSession) -> Set[str]:
+        """通过OPTIONS请求获取服务端支持的TUS扩展，结果按服务地址缓存"""
+        if self.tus_url in self._extensions_cache:
+            return self._extensions_cache[self.tus_url]
+
+        extensions = set()
+        try:
+            async with session.options(
+                f"{self.tus_url}/files",
+                headers=self._headers(),
+                timeout=aiohttp.ClientTimeout(total=10)
+            ) as response:
+                header = response.headers.get('Tus-Extension', '')
+                extensions = {item.strip().lower() for item in header.split(',') if item.strip()}
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logger.warning(f"获取TUS服务端扩展失败，使用顺序上传: {e}")
+            return extensions
+
+        logger.info(f"TUS服务端扩展: {sorted(extensions)}")
+        self._extensions_cache[self.tus_url] = extensions
+        return extensions
+
+    async def upload(self, file_path: Path, filename: str, task_id: str = None, resume_key: str = None) -> str:
+        """
+        上传文件，返回最终上传的ID
+
+        Args:
+            file_path: 要上传的文件
+            filename: 写入Upload-Metadata的文件名
+            task_id: ASR任务ID，写入Upload-Metadata供服务端关联任务
+            resume_key: 断点记录键，存在未完成的记录时从服务端确认的offset继续上传
+        """
+        file_size = file_path.stat().st_size
+        metadata_parts = [f'filename {filename}']
+        if task_id:
+            metadata_parts.append(f'task_id {task_id}')
+        metadata = ', '.join(metadata_parts)
+
+        record = (await self.state_store.load(resume_key) if resume_key and self.state_store else None) or {}
+        if self.session_provider:
+            session = await self.session_provider()
+            return await self._upload_with_session(session, file_path, file_size, metadata, record, resume_key)
+
+        connector = aiohttp.TCPConnector(limit=max(1, settings.tus_upload_max_concurrency) + 1)
+        async with aiohttp.ClientSession(connector=connector) as session:
+            return await self._upload_with_session(session, file_path, file_size, metadata, record, resume_key)
+
+    async def _upload_with_session(
+        self,
+        session: aiohttp.ClientSession,
+        file_path: Path,
+        file_size: int,
+        metadata: str,
+        record: Dict[str, Any],
+        resume_key: Optional[str]
+    ) -> str:
+        max_concurrency = max(1, settings.tus_upload_max_concurrency)
+        start_time = time.monotonic()
+        # 续传上次未完成的顺序上传
+        if record.get('mode') == 'sequential' and record.get('upload_url'):
+            offset = await self._get_server_offset(session, record['upload_url'], file_size)
+            if offset is not None:
+                logger.info(f"续传TUS上传: {record['upload_url']}, 服务端已确认 {offset}/{file_size} bytes")
+                tuner = self._new_tuner(file_size, 1)
+                await self._upload_sequential(
+                    session, record['upload_url'], file_path, file_size, tuner,
+                    offset=offset, resume_key=resume_key, record=record
+                )
+                await self._finish(resume_key, 'sequential', file_size - offset, start_time, tuner)
+                return record['upload_url'].rstrip('/').split('/')[-1]
+
+        completed = {}
+        if record.get('mode') == 'concatenation':
+            completed = await self._verify_partials(session, record.get('partials', {}))
+            if completed:
+                logger.info(f"续传TUS并发上传: 已完成 {len(completed)} 个partial")
+
+        use_concat = (
+            settings.tus_upload_parallel_enabled
+            and (max_concurrency > 1 or completed)
+            and file_size > settings.tus_upload_min_chunk_size
+            and 'concatenation' in await self.get_extensions(session)
+        )
+        if use_concat:
+            tuner = self._new_tuner(file_size, max_concurrency)
+            record.update(mode='concatenation', partials={str(start): list(part) for start, part in completed.items()})
+            uploaded_before = sum(length for _, length in completed.values())
+            try:
+                upload_id = await self._upload_concatenated(
+                    session, file_path, file_size, metadata, tuner,
+                    completed=completed, resume_key=resume_key, record=record
+                )
+                await self._finish(resume_key, 'concatenation', file_size - uploaded_before, start_time, tuner)
+                return upload_id
+            except Exception as e:
+                logger.warning(f"并发分块上传失败，改用顺序上传: {e}")
+
+        tuner = self._new_tuner(file_size, 1)
+        upload_url = await self._create_upload(session, {
+            'Upload-Length': str(file_size),
+            'Upload-Metadata': metadata
+        })
+        record.update(mode='sequential', upload_url=upload_url, offset=0, partials={})
+        await self._persist(resume_key, record)
+        await self._upload_sequential(
+            session, upload_url, file_path, file_size, tuner, resume_key=resume_key, record=record
+        )
+        await self._finish(resume_key, 'sequential', file_size, start_time, tuner)
+        return upload_url.rstrip('/').split('/')[-1]
+
+    async def _persist(self, resume_key: Optional[str], record: Dict[str, Any]):
+        """写入断点记录"""
+        if resume_key and self.state_store:
+            await self.state_store.save(resume_key, record)
+
+    async def _finish(self, resume_key: Optional[str], mode: str, uploaded_bytes: int, start_time: float, tuner: AdaptiveUploadTuner):
+        """上传完成后删除断点记录并记录统计"""
+        if resume_key and self.state_store:
+            await self.state_store.delete(resume_key)
+        self._record_stats(mode, uploaded_bytes, start_time, tuner)
+
+    async def _get_server_offset(self, session: aiohttp.ClientSession, upload_url: str, file_size: int = None) -> Optional[int]:
+        """HEAD请求获取服务端已确认的offset，上传不存在或长度不符时返回None"""
+        try:
+            async with session.head(upload_url, headers=self._headers(), timeout=aiohttp.ClientTimeout(total=10)) as response:
+                if response.status not in [200, 204]:
+                    logger.info(f"TUS上传不可续传，状态码: {response.status}: {upload_url}")
+                    return None
+                length = response.headers.get('Upload-Length')
+                if file_size is not None and length is not None and int(length) != file_size:
+                    logger.info(f"TUS上传长度不符，不续传: {length} != {file_size}")
+                    return None
+                return int(response.headers.get('Upload-Offset', 0))
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+            logger.warning(f"查询TUS上传offset失败: {e}")
+            return None
+
+    async def _verify_partials(
+        self,
+        session: aiohttp.ClientSession,
+        partials: Dict[str, List[Any]]
+    ) -> Dict[int, Tuple[str, int]]:
+        """检查记录中的partial在服务端是否已完整上传，只保留完整的"""
+        items = [(int(start), url, int(length)) for start, (url, length) in partials.items()]
+        offsets = await asyncio.gather(*(self._get_server_offset(session, url, length) for _, url, length in items))
+        return {
+            start: (url, length)
+            for (start, url, length), offset in zip(items, offsets)
+            if offset == length
+        }
+
+    def _record_stats(self, mode: str, uploaded_bytes: int, start_time: float, tuner: AdaptiveUploadTuner):
+        elapsed = time.monotonic() - start_time
+        self.last_stats = {
+            'mode': mode,
+            'bytes': uploaded_bytes,
+            'seconds': elapsed,
+            'throughput': uploaded_bytes / max(elapsed, 1e-6),
+            **tuner.get_stats()
+        }
+        logger.info(
+            f"TUS上传完成({mode}): 本次上传 {uploaded_bytes} bytes, 耗时 {elapsed:.2f}s, "
+            f"吞吐量 {self.last_stats['throughput'] / 1024 / 1024:.2f}MB/s, "
+            f"最终分块 {tuner.chunk_size} bytes, 并发 {tuner.concurrency}"
+        )
+
+    async def _create_upload(self, session: aiohttp.ClientSession, extra_headers: Dict[str, str], retries: int = 3) -> str:
+        """POST /files 创建上传，返回上传的绝对URL"""
+        headers = self._headers(extra_headers)
+        last_error = None
+        for attempt in range(retries):
+            try:
+                async with session.post(f"{self.tus_url}/files", headers=headers) as response:
+                    if response.status != 201:  # TUS创建上传会话应该返回201
+                        error_text = await response.text()
+                        raise RuntimeError(f"TUS上传会话创建失败，状态码: {response.status}, 响应: {error_text}")
+
+                    # 从Location头获取上传URL
+                    location = response.headers.get('Location', '')
+                    if not location:
+                        raise ValueError("TUS响应中缺少Location头")
+                    return urljoin(f"{self.tus_url}/", location)
+            except Exception as e:
+                last_error = e
+                logger.warning(f"TUS上传会话创建失败 (尝试 {attempt + 1}/{retries}): {e}")
+                if attempt < retries - 1:
+                    # 使用指数退避算法，基础等待时间为1秒，最大等待时间为30秒
+                    await asyncio.sleep(min(1 * (2 ** attempt), 30))
+
+        raise RuntimeError(f"TUS上传会话创建失败，已重试{retries}次。最后错误: {str(last_error)}") from last_error
+
+    async def _patch(
+        self,
+        session: aiohttp.ClientSession,
+        upload_url: str,
+        data: bytes,
+        offset: int,
+        retries: int = 3
+    ) -> int:
+        """PATCH上传一个分块，返回服务端确认的新offset；网络错误按指数退避重试"""
+        headers = self._headers({
+            'Upload-Offset': str(offset),
+            'Content-Type': 'application/offset+octet-stream'
+        })
+        last_error = None
+        for attempt in range(retries):
+            if attempt > 0:
+                # 上一次请求可能已部分或全部写入服务端，先确认服务端offset
+                server_offset = await self._get_server_offset(session, upload_url)
+                if server_offset == offset + len(data):
+                    return server_offset
+                if server_offset is not None and server_offset != offset:
+                    raise RuntimeError(f"数据块重试前服务端offset为 {server_offset}，期望 {offset}")
+            try:
+                async with session.patch(upload_url, data=data, headers=headers) as response:
+                    if response.status not in [200, 204]:  # TUS块上传应该返回200或204
+                        error_text = await response.text()
+                        # HTTP错误不重试，直接失败
+                        raise RuntimeError(f"TUS块上传失败，状态码: {response.status}, 响应: {error_text}")
+
+                    # 验证offset
+                    new_offset = int(response.headers.get('Upload-Offset', offset + len(data)))
+                    if new_offset != offset + len(data):
+                        raise ValueError(f"Offset不匹配: 期望 {offset + len(data)}, 实际 {new_offset}")
+                    return new_offset
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                last_error = e
+                logger.warning(f"数据块网络错误 (尝试 {attempt + 1}/{retries}): {e}")
+                if attempt < retries - 1:
+                    await asyncio.sleep(min(1 * (2 ** attempt), 30))
+
+        raise RuntimeError(f"数据块上传失败，已达到最大重试次数。最后错误: {str(last_error)}") from last_error
+
+    async def _upload_sequential(
+        self,
+        session: aiohttp.ClientSession,
+        upload_url: str,
+        file_path: Path,
+        file_size: int,
+        tuner: AdaptiveUploadTuner,
+        offset: int = 0,
+        resume_key: str = None,
+        record: Dict[str, Any] = None
+    ) -> None:
+        """顺序PATCH上传，当前分块传输期间在线程池中预读下一个分块"""
+        loop = asyncio.get_running_loop()
+        next_chunk = None
+        with open(file_path, 'rb') as f:
+            f.seek(offset)
+            try:
+                next_chunk = loop.run_in_executor(None, f.read, tuner.chunk_size)
+                while offset < file_size:
+                    chunk = await next_chunk
+                    next_chunk = None
+                    if not chunk:
+                        logger.warning(f"读取数据块为空，offset={offset}")
+                        break
+                    if offset + len(chunk) < file_size:
+                        next_chunk = loop.run_in_executor(None, f.read, tuner.chunk_size)
+
+                    started = time.monotonic()
+                    offset = await self._patch(session, upload_url, chunk, offset)
+                    tuner.record(len(chunk), time.monotonic() - started)
+                    if record is not None:
+                        record['offset'] = offset
+                        await self._persist(resume_key, record)
+                    logger.debug(f"数据块上传成功，当前进度 {offset / file_size * 100:.1f}%")
+            finally:
+                # 出错时等待预读完成再关闭文件
+                if next_chunk is not None:
+                    await asyncio.gather(next_chunk, return_exceptions=True)
+
+    @staticmethod
+    def _read_range(file_path: Path, start: int, length: int) -> bytes:
+        with open(file_path, 'rb') as f:
+            f.seek(start)
+            return f.read(length)
+
+    async def _upload_partial(
+        self,
+        session: aiohttp.ClientSession,
+        file_path: Path,
+        start: int,
+        length: int,
+        tuner: AdaptiveUploadTuner,
+        retries: int = 3
+    ) -> str:
+        """把文件的一段作为partial上传，返回partial上传的URL；失败时换一个新的partial重试"""
+        data = await asyncio.get_running_loop().run_in_executor(None, self._read_range, file_path, start, length)
+        last_error = None
+        for attempt in range(retries):
+            try:
+                partial_url = await self._create_upload(session, {
+                    'Upload-Length': str(length),
+                    'Upload-Concat': 'partial'
+                }, retries=1)
+                started = time.monotonic()
+                await self._patch(session, partial_url, data, 0, retries=1)
+                tuner.record(length, time.monotonic() - started)
+                return partial_url
+            except Exception as e:
+                last_error = e
+                logger.warning(f"partial上传失败 (offset={start}, 尝试 {attempt + 1}/{retries}): {e}")
+                if attempt < retries - 1:
+                    await asyncio.sleep(min(1 * (2 ** attempt), 30))
+        raise RuntimeError(f"partial上传失败 (offset={start}): {str(last_error)}") from last_error
+
+    async def _upload_concatenated(
+        self,
+        session: aiohttp.ClientSession,
+        file_path: Path,
+        file_size: int,
+        metadata: str,
+        tuner: AdaptiveUploadTuner,
+        completed: Dict[int, Tuple[str, int]] = None,
+        resume_key: str = None,
+        record: Dict[str, Any] = None
+    ) -> str:
+        """按调优器给出的分块大小和并发数并发上传partial，全部完成后创建final上传"""
+        completed = dict(completed or {})
+        # 未被已完成partial覆盖的区间
+        pending: List[List[int]] = []
+        cursor = 0
+        for start in sorted(completed):
+            if start > cursor:
+                pending.append([cursor, start])
+            cursor = max(cursor, start + completed[start][1])
+        if cursor < file_size:
+            pending.append([cursor, file_size])
+
+        active: Dict[asyncio.Task, Tuple[int, int]] = {}
+        try:
+            while pending or active:
+                while pending and len(active) < tuner.concurrency:
+                    start, end = pending[0]
+                    length = min(tuner.chunk_size, end - start)
+                    if start + length >= end:
+                        pending.pop(0)
+                    else:
+                        pending[0][0] += length
+                    task = asyncio.create_task(self._upload_partial(session, file_path, start, length, tuner))
+                    active[task] = (start, length)
+
+                done, _ = await asyncio.wait(active, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    start, length = active.pop(task)
+                    completed[start] = (task.result(), length)
+                    if record is not None:
+                        record.setdefault('partials', {})[str(start)] = [completed[start][0], length]
+                        await self._persist(resume_key, record)
+        finally:
+            for task in active:
+                task.cancel()
+            if active:
+                await asyncio.gather(*active, return_exceptions=True)
+
+        ordered_urls: List[str] = [completed[start][0] for start in sorted(completed)]
+        final_url = await self._create_upload(session, {
+            'Upload-Concat': 'final;' + ' '.join(ordered_urls),
+            'Upload-Metadata': metadata
+        })
+        logger.info(f"TUS并发上传完成: {len(ordered_urls)} 个partial已合并为 {final_url}")
+        return final_url.rstrip('/').split('/')[-1]
@@ -2,12 +2,17 @@
 视频切片服务 - 基于FFMPEG进行视频切割
 """
 import os
+import re
+import math
+import bisect
 import subprocess
 import json
 import asyncio
 import tempfile
+import threading
 import logging
-from typing import Dict, Any, Optional, List, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Optional, List, Tuple, Callable
 from pathlib import Path
 from datetime import datetime
 from app.core.config import settings
@@ -18,6 +23,35 @@ logger = logging.getLogger(__name__)
 class VideoSlicingService:
     """视频切片服务类"""
     
+    # 智能切割时用于重新编码首个GOP的编码器（按原始视频编码选择）
+    SMART_CUT_ENCODERS = {
+        'h264': 'libx264',
+        'hevc': 'libx265',
+    }
+    
+    # 流拷贝部分转换为Annex B，SPS/PPS随关键帧写入码流，拼接后解码器在拼接点切换参数集
+    SMART_CUT_ANNEXB_FILTERS = {
+        'h264': 'h264_mp4toannexb',
+        'hevc': 'hevc_mp4toannexb',
+    }
+    
+    # ffprobe输出的profile名称到编码器 -profile:v 取值的映射，重新编码的GOP需与流拷贝部分的profile一致
+    SMART_CUT_PROFILES = {
+        'h264': {
+            'constrained baseline': 'baseline',
+            'baseline': 'baseline',
+            'main': 'main',
+            'high': 'high',
+            'high 10': 'high10',
+            'high 4:2:2': 'high422',
+            'high 4:4:4 predictive': 'high444',
+        },
+        'hevc': {
+            'main': 'main',
+            'main 10': 'main10',
+        },
+    }
+    
     def __init__(self):
         self.temp_dir = settings.temp_dir or "/tmp"
         self.ffmpeg_path = "ffmpeg"  # 假设ffmpeg在PATH中
@@ -32,14 +66,17 @@ class VideoSlicingService:
         cover_title: str,
         user_id: int,
         project_id: int,
-        video_id: int
+        video_id: int,
+        smart_cut: bool = False
     ) -> Dict[str, Any]:
         """
         异步版本 - 视频切割
+        
+        smart_cut 为 True 时只重新编码起点到下一个关键帧的部分，其余部分流拷贝，实现帧精确的起点
         """
         return await self._slice_video_impl(
             video_path, start_time, end_time, output_filename, 
-            cover_title, user_id, project_id, video_id
+            cover_title, user_id, project_id, video_id, smart_cut
         )
     
     def slice_video_sync(
@@ -51,15 +88,22 @@ class VideoSlicingService:
         cover_title: str,
         user_id: int,
         project_id: int,
-        video_id: int
+        video_id: int,
+        transfer_stats: Optional[Dict[str, int]] = None,
+        keyframe_index: Optional[Dict[str, Any]] = None,
+        smart_cut: bool = False
     ) -> Dict[str, Any]:
         """
         同步版本 - 视频切割，用于Celery任务
+        
+        video_path 可以是本地文件路径，也可以是预签名URL（ffmpeg通过HTTP Range按需读取）
+        smart_cut 为 True 时只重新编码起点到下一个关键帧的部分，其余部分流拷贝，实现帧精确的起点
         """
         try:
             return self._slice_video_impl_sync(
                 video_path, start_time, end_time, output_filename,
-                cover_title, user_id, project_id, video_id
+                cover_title, user_id, project_id, video_id, transfer_stats,
+                keyframe_index, smart_cut
             )
         except Exception as e:
             logger.error(f"同步视频切片失败: {str(e)}")
@@ -74,7 +118,8 @@ class VideoSlicingService:
         cover_title: str,
         user_id: int,
         project_id: int,
-        video_id: int
+        video_id: int,
+        smart_cut: bool = False
     ) -> Dict[str, Any]:
         """
         切割视频片段的异步实现
@@ -85,10 +130,22 @@ class VideoSlicingService:
             end_time: 结束时间（秒）
             output_filename: 输出文件名
             cover_title: 封面标题
+            smart_cut: 是否使用智能切割（只重新编码首个GOP）
             
         Returns:
             切割结果
         """
+        if smart_cut:
+            # 智能切割包含多次ffmpeg调用，整体放到线程池中执行
+            loop = asyncio.get_event_loop()
+            return await loop.run_in_executor(
+                None,
+                lambda: self._slice_video_impl_sync(
+                    video_path, start_time, end_time, output_filename,
+                    cover_title, user_id, project_id, video_id, smart_cut=True
+                )
+            )
+        
         try:
             # 计算持续时间
             duration = end_time - start_time
@@ -192,17 +249,23 @@ class VideoSlicingService:
         cover_title: str,
         user_id: int,
         project_id: int,
-        video_id: int
+        video_id: int,
+        transfer_stats: Optional[Dict[str, int]] = None,
+        keyframe_index: Optional[Dict[str, Any]] = None,
+        smart_cut: bool = False
     ) -> Dict[str, Any]:
         """
         同步版本的视频切割实现
         
         Args:
-            video_path: 原视频文件路径
+            video_path: 原视频文件路径或预签名URL
             start_time: 开始时间（秒）
             end_time: 结束时间（秒）
             output_filename: 输出文件名
             cover_title: 封面标题
+            transfer_stats: 可选的统计字典，远程输入时累加 bytes_read
+            keyframe_index: 可选的关键帧索引，提供时用预测时长代替ffprobe
+            smart_cut: 是否使用智能切割（只重新编码首个GOP）
             
         Returns:
             切割结果
@@ -215,10 +278,27 @@ class VideoSlicingService:
             with tempfile.TemporaryDirectory() as temp_dir:
                 temp_file_path = os.path.join(temp_dir, output_filename)
                 
+                if smart_cut:
+                    smart_cut_info = self._smart_cut_to_file_sync(
+                        video_path, start_time, end_time, temp_file_path, keyframe_index
+                    )
+                    result = self._finalize_slice_output_sync(
+                        temp_file_path,
+                        duration,
+                        output_filename,
+                        user_id,
+                        project_id,
+                        video_id
+                    )
+                    result["smart_cut"] = smart_cut_info
+                    return result
+                
                 # 构建ffmpeg命令
                 cmd = [
                     self.ffmpeg_path,
+                    *self._log_options([video_path]),
                     '-ss', str(start_time),  # 开始时间
+                    *self._input_options(video_path),
                     '-i', video_path,  # 输入文件
                     '-t', str(duration),  # 持续时间
                     '-c', 'copy',  # 使用流拷贝，保持原质量
@@ -238,58 +318,25 @@ class VideoSlicingService:
                 )
                 
                 if result.returncode != 0:
-                    logger.error(f"FFMPEG执行失败: {result.stderr}")
-                    raise Exception(f"视频切割失败: {result.stderr}")
+                    logger.error(f"FFMPEG执行失败: {result.stderr[-2000:]}")
+                    raise Exception(f"视频切割失败: {result.stderr[-2000:]}")
+                
+                self._record_bytes_read(result.stderr, transfer_stats)
                 
                 # 检查输出文件
                 if not os.path.exists(temp_file_path):
                     raise Exception("切割后的文件不存在")
                 
-                # 获取实际的视频时长
-                actual_duration = duration
-                try:
-                    cmd = [
-                        self.ffprobe_path,
-                        '-v', 'quiet',
-                        '-print_format', 'json',
-                        '-show_format',
-                        temp_file_path
-                    ]
-                    
-                    result = subprocess.run(
-                        cmd,
-                        capture_output=True,
-                        text=True,
-                        timeout=30
-                    )
-                    
-                    if result.returncode == 0:
-                        info = json.loads(result.stdout)
-                        actual_duration = float(info.get('format', {}).get('duration', duration))
-                except Exception as e:
-                    logger.warning(f"获取实际视频时长失败，使用计算值: {str(e)}")
-                
-                # 获取文件信息
-                file_size = os.path.getsize(temp_file_path)
-                
-                # 上传到MinIO (使用同步版本)
-                minio_path = minio_service.generate_slice_object_name(user_id, project_id, video_id, output_filename)
-                upload_result = minio_service.upload_file_sync(
+                return self._finalize_slice_output_sync(
                     temp_file_path,
-                    minio_path,
-                    content_type="video/mp4"
+                    duration,
+                    output_filename,
+                    user_id,
+                    project_id,
+                    video_id,
+                    self._predict_duration(keyframe_index, start_time, end_time)
                 )
                 
-                logger.info(f"视频切割成功 (同步): {output_filename}, 大小: {file_size} bytes, 理论时长: {duration}秒, 实际时长: {actual_duration}秒")
-                
-                return {
-                    "success": True,
-                    "filename": output_filename,
-                    "file_path": minio_path,
-                    "file_size": file_size,
-                    "duration": actual_duration
-                }
-                
         except subprocess.TimeoutExpired:
             logger.error("视频切割超时")
             raise Exception("视频切割超时")
@@ -297,6 +344,534 @@ class VideoSlicingService:
             logger.error(f"视频切割失败: {str(e)}")
             raise Exception(f"视频切割失败: {str(e)}")
     
+    def slice_video_batch_sync(
+        self,
+        video_path: str,
+        cuts: List[Dict[str, Any]],
+        user_id: int,
+        project_id: int,
+        video_id: int,
+        max_outputs_per_process: Optional[int] = None,
+        transfer_stats: Optional[Dict[str, int]] = None,
+        keyframe_index: Optional[Dict[str, Any]] = None,
+        concurrency: int = 1,
+        smart_cut: bool = False,
+        progress_callback: Optional[Callable[[int, int], None]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        同步版本 - 批量视频切割，用于Celery任务
+        
+        将多个切割合并到同一个ffmpeg进程中执行（每个切割对应一个带 -ss 的输入和一个输出），
+        切割语义与 slice_video_sync 完全一致，但避免了每个切片单独启动ffmpeg进程。
+        concurrency > 1 时多个批次在有界线程池中并行执行（切割和上传互不阻塞），
+        单个切片失败不会影响其他切片。
+        
+        Args:
+            video_path: 原视频文件路径或预签名URL
+            cuts: 切割列表，每项包含 start_time, end_time, output_filename
+            max_outputs_per_process: 单个ffmpeg进程的最大输出数
+            transfer_stats: 可选的统计字典，远程输入时累加 bytes_read
+            keyframe_index: 可选的关键帧索引，提供时用预测时长代替ffprobe
+            concurrency: 并行执行的批次数
+            smart_cut: 是否使用智能切割（逐个切片执行）
+            progress_callback: 进度回调 (已完成数, 总数)
+            
+        Returns:
+            与cuts一一对应的切割结果列表，失败项为 {"success": False, "error": ...}
+        """
+        if max_outputs_per_process is None:
+            max_outputs_per_process = settings.slice_batch_max_outputs
+        if smart_cut:
+            max_outputs_per_process = 1
+        concurrency = max(1, concurrency)
+        
+        # 批次大小同时受单进程输出上限和并发数约束，保证所有worker都有任务
+        chunk_size = max(1, min(max_outputs_per_process, math.ceil(len(cuts) / concurrency)))
+        chunks = [
+            list(range(chunk_start, min(chunk_start + chunk_size, len(cuts))))
+            for chunk_start in range(0, len(cuts), chunk_size)
+        ]
+        
+        results: List[Optional[Dict[str, Any]]] = [None] * len(cuts)
+        lock = threading.Lock()
+        completed = {'count': 0}
+        
+        with tempfile.TemporaryDirectory() as temp_dir:
+            
+            def _process_chunk(chunk_indexes: List[int]):
+                chunk_stats = {} if transfer_stats is not None else None
+                try:
+                    if smart_cut:
+                        for cut_index in chunk_indexes:
+                            results[cut_index] = self._slice_single_cut_sync(
+                                video_path, cuts[cut_index], user_id, project_id, video_id,
+                                chunk_stats, keyframe_index, smart_cut=True
+                            )
+                    else:
+                        self._slice_chunk_sync(
+                            video_path, cuts, chunk_indexes, temp_dir, results,
+                            user_id, project_id, video_id, chunk_stats, keyframe_index
+                        )
+                except Exception as e:
+                    logger.error(f"批量切割批次失败: {str(e)}")
+                    for cut_index in chunk_indexes:
+                        if results[cut_index] is None:
+                            results[cut_index] = {
+                                "success": False,
+                                "filename": cuts[cut_index]['output_filename'],
+                                "error": str(e)
+                            }
+                
+                with lock:
+                    if chunk_stats:
+                        transfer_stats['bytes_read'] = transfer_stats.get('bytes_read', 0) + chunk_stats.get('bytes_read', 0)
+                    completed['count'] += len(chunk_indexes)
+                    if progress_callback:
+                        try:
+                            progress_callback(completed['count'], len(cuts))
+                        except Exception as e:
+                            logger.warning(f"切割进度回调失败: {str(e)}")
+            
+            if concurrency == 1 or len(chunks) <= 1:
+                for chunk_indexes in chunks:
+                    _process_chunk(chunk_indexes)
+            else:
+                with ThreadPoolExecutor(max_workers=min(concurrency, len(chunks))) as executor:
+                    list(executor.map(_process_chunk, chunks))
+        
+        return results
+
+    def _slice_chunk_sync(
+        self,
+        video_path: str,
+        cuts: List[Dict[str, Any]],
+        chunk_indexes: List[int],
+        temp_dir: str,
+        results: List[Optional[Dict[str, Any]]],
+        user_id: int,
+        project_id: int,
+        video_id: int,
+        transfer_stats: Optional[Dict[str, int]] = None,
+        keyframe_index: Optional[Dict[str, Any]] = None
+    ):
+        """在一个ffmpeg进程中切割一个批次，结果写入 results 对应位置"""
+        cmd = [self.ffmpeg_path, *self._log_options([video_path])]
+        outputs = []
+        for cut_index in chunk_indexes:
+            cmd += [
+                '-ss', str(cuts[cut_index]['start_time']),
+                *self._input_options(video_path),
+                '-i', video_path
+            ]
+        for input_index, cut_index in enumerate(chunk_indexes):
+            cut = cuts[cut_index]
+            temp_file_path = os.path.join(temp_dir, cut['output_filename'])
+            outputs.append(temp_file_path)
+            cmd += [
+                '-map', f'{input_index}',
+                '-t', str(cut['end_time'] - cut['start_time']),
+                '-c', 'copy',
+                '-avoid_negative_ts', 'make_zero',
+                '-y',
+                temp_file_path
+            ]
+        
+        logger.info(f"执行FFMPEG批量切割命令: {len(chunk_indexes)} 个输出")
+        
+        try:
+            result = subprocess.run(
+                cmd,
+                capture_output=True,
+                text=True,
+                timeout=300 + 30 * len(chunk_indexes)
+            )
+            batch_ok = result.returncode == 0
+            self._record_bytes_read(result.stderr, transfer_stats)
+            if not batch_ok:
+                logger.error(f"FFMPEG批量切割失败，回退到逐个切割: {result.stderr[-2000:]}")
+        except subprocess.TimeoutExpired:
+            logger.error("FFMPEG批量切割超时，回退到逐个切割")
+            batch_ok = False
+        
+        for cut_index, temp_file_path in zip(chunk_indexes, outputs):
+            cut = cuts[cut_index]
+            if batch_ok and os.path.exists(temp_file_path):
+                try:
+                    results[cut_index] = self._finalize_slice_output_sync(
+                        temp_file_path,
+                        cut['end_time'] - cut['start_time'],
+                        cut['output_filename'],
+                        user_id,
+                        project_id,
+                        video_id,
+                        self._predict_duration(keyframe_index, cut['start_time'], cut['end_time'])
+                    )
+                except Exception as e:
+                    logger.error(f"批量切割中的切片失败: {cut['output_filename']}, 错误: {str(e)}")
+                    results[cut_index] = {
+                        "success": False,
+                        "filename": cut['output_filename'],
+                        "error": str(e)
+                    }
+                finally:
+                    if os.path.exists(temp_file_path):
+                        os.unlink(temp_file_path)
+            else:
+                results[cut_index] = self._slice_single_cut_sync(
+                    video_path, cut, user_id, project_id, video_id,
+                    transfer_stats, keyframe_index
+                )
+
+    def _slice_single_cut_sync(
+        self,
+        video_path: str,
+        cut: Dict[str, Any],
+        user_id: int,
+        project_id: int,
+        video_id: int,
+        transfer_stats: Optional[Dict[str, int]] = None,
+        keyframe_index: Optional[Dict[str, Any]] = None,
+        smart_cut: bool = False
+    ) -> Dict[str, Any]:
+        """单独切割一个切片，失败时返回失败结果而不是抛出异常"""
+        try:
+            return self._slice_video_impl_sync(
+                video_path,
+                cut['start_time'],
+                cut['end_time'],
+                cut['output_filename'],
+                cut.get('cover_title', ''),
+                user_id,
+                project_id,
+                video_id,
+                transfer_stats,
+                keyframe_index,
+                smart_cut
+            )
+        except Exception as e:
+            logger.error(f"批量切割中的切片失败: {cut['output_filename']}, 错误: {str(e)}")
+            return {
+                "success": False,
+                "filename": cut['output_filename'],
+                "error": str(e)
+            }
+
+    def _find_next_keyframe_sync(
+        self,
+        video_path: str,
+        start_time: float,
+        keyframe_index: Optional[Dict[str, Any]] = None,
+        window: float = 30.0
+    ) -> Optional[float]:
+        """
+        查找 >= start_time 的第一个关键帧
+        
+        有关键帧索引时直接查表，否则只探测 start_time 之后 window 秒内的视频包
+        
+        Returns:
+            关键帧时间，窗口内没有关键帧时返回None
+        """
+        if keyframe_index and keyframe_index.get('keyframes'):
+            keyframes = keyframe_index['keyframes']
+            position = bisect.bisect_left(keyframes, start_time - 1e-3)
+            return keyframes[position] if position < len(keyframes) else None
+        
+        cmd = [
+            self.ffprobe_path,
+            '-v', 'error',
+            '-select_streams', 'v:0',
+            '-read_intervals', f'{start_time}%+{window}',
+            '-show_entries', 'packet=pts_time,flags',
+            '-of', 'csv=p=0',
+            video_path
+        ]
+        result = subprocess.run(cmd, capture_output=True, text=True, timeout=60)
+        if result.returncode != 0:
+            raise Exception(f"探测关键帧失败: {result.stderr[-1000:]}")
+        
+        keyframes = []
+        for line in result.stdout.splitlines():
+            fields = line.split(',')
+            if len(fields) >= 2 and 'K' in fields[1] and fields[0] not in ('', 'N/A'):
+                keyframes.append(float(fields[0]))
+        candidates = [t for t in keyframes if t >= start_time - 1e-3]
+        return min(candidates) if candidates else None
+
+    def _probe_video_stream_sync(self, video_path: str) -> Dict[str, Any]:
+        """获取首个视频流的编码参数，用于让重新编码的片段与原始流保持一致"""
+        cmd = [
+            self.ffprobe_path,
+            '-v', 'error',
+            '-select_streams', 'v:0',
+            '-show_entries', 'stream=codec_name,profile,level,pix_fmt,width,height,time_base',
+            '-of', 'json',
+            video_path
+        ]
+        result = subprocess.run(cmd, capture_output=True, text=True, timeout=30)
+        if result.returncode != 0:
+            raise Exception(f"获取视频流信息失败: {result.stderr[-1000:]}")
+        streams = json.loads(result.stdout).get('streams', [])
+        return streams[0] if streams else {}
+
+    def _matching_encode_options(self, stream: Dict[str, Any], encoder: str) -> List[str]:
+        """
+        重新编码首个GOP的参数：profile、level、像素格式和时间基与原始视频流一致，
+        使拼接后的码流能被解码器按同一套参数解码
+        """
+        options = ['-c:v', encoder, '-preset', 'veryfast', '-crf', '18']
+        codec = stream.get('codec_name')
+        profile = self.SMART_CUT_PROFILES.get(codec, {}).get(str(stream.get('profile', '')).lower())
+        if profile:
+            options += ['-profile:v', profile]
+        level = stream.get('level')
+        if isinstance(level, int) and level > 0:
+            if codec == 'h264':
+                options += ['-level:v', f"{level / 10:.1f}"]
+            elif codec == 'hevc':
+                # HEVC的level_idc为级别的30倍，libx265通过x265-params设置
+                options += ['-x265-params', f"level-idc={level / 30:.1f}"]
+        if stream.get('pix_fmt'):
+            options += ['-pix_fmt', stream['pix_fmt']]
+        return options
+
+    def _track_timescale_options(self, stream: Dict[str, Any]) -> List[str]:
+        """输出MP4的视频轨道时间基与原始视频流一致，流拷贝的时间戳无需换算"""
+        time_base = str(stream.get('time_base', ''))
+        if time_base.startswith('1/') and time_base[2:].isdigit():
+            return ['-video_track_timescale', time_base[2:]]
+        return []
+
+    def _smart_cut_to_file_sync(
+        self,
+        video_path: str,
+        start_time: float,
+        end_time: float,
+        output_path: str,
+        keyframe_index: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """
+        智能切割：重新编码 [start_time, 下一个关键帧) 的视频，流拷贝 [下一个关键帧, end_time) 的视频，
+        再无损拼接；音频整段流拷贝
+        
+        Returns:
+            {"keyframe": 拼接点, "reencoded_duration": 重新编码的时长, "mode": 切割方式}
+        """
+        next_keyframe = self._find_next_keyframe_sync(video_path, start_time, keyframe_index)
+        
+        # 起点正好在关键帧上，直接流拷贝即可帧精确
+        if next_keyframe is not None and next_keyframe - start_time < 1e-3:
+            self._run_ffmpeg_sync([
+                '-ss', str(start_time),
+                *self._input_options(video_path),
+                '-i', video_path,
+                '-t', str(end_time - start_time),
+                '-c', 'copy',
+                '-avoid_negative_ts', 'make_zero',
+                '-y', output_path
+            ])
+            return {"keyframe": next_keyframe, "reencoded_duration": 0.0, "mode": "copy"}
+        
+        stream = self._probe_video_stream_sync(video_path)
+        encoder = self.SMART_CUT_ENCODERS.get(stream.get('codec_name'))
+        encode_options = ['-c:v', encoder or 'libx264', '-preset', 'veryfast', '-crf', '18']
+        if stream.get('pix_fmt'):
+            encode_options += ['-pix_fmt', stream['pix_fmt']]
+        
+        # 区间内没有关键帧或编码器不支持时，整段重新编码
+        if next_keyframe is None or next_keyframe >= end_time or encoder is None:
+            self._run_ffmpeg_sync([
+                '-ss', str(start_time),
+                *self._input_options(video_path),
+                '-i', video_path,
+                '-t', str(end_time - start_time),
+                *encode_options,
+                '-c:a', 'aac',
+                '-y', output_path
+            ])
+            return {"keyframe": None, "reencoded_duration": round(end_time - start_time, 3), "mode": "encode"}
+        
+        work_dir = os.path.dirname(output_path)
+        base_name = os.path.splitext(os.path.basename(output_path))[0]
+        head_path = os.path.join(work_dir, f"{base_name}_head.mp4")
+        tail_path = os.path.join(work_dir, f"{base_name}_tail.mp4")
+        list_path = os.path.join(work_dir, f"{base_name}_concat.txt")
+        
+        try:
+            # 起点到下一个关键帧：只重新编码视频，参数与原始视频流一致
+            self._run_ffmpeg_sync([
+                '-ss', str(start_time),
+                *self._input_options(video_path),
+                '-i', video_path,
+                '-t', str(next_keyframe - start_time),
+                '-map', '0:v:0',
+                *self._matching_encode_options(stream, encoder),
+                *self._track_timescale_options(stream),
+                '-y', head_path
+            ])
+            
+            # 关键帧到终点：视频流拷贝，参数集写入码流
+            self._run_ffmpeg_sync([
+                '-ss', str(next_keyframe + 1e-3),
+                *self._input_options(video_path),
+                '-i', video_path,
+                '-t', str(end_time - next_keyframe),
+                '-map', '0:v:0',
+                '-c', 'copy',
+                '-bsf:v', self.SMART_CUT_ANNEXB_FILTERS[stream['codec_name']],
+                '-avoid_negative_ts', 'make_zero',
+                '-y', tail_path
+            ])
+            
+            # 指定首段时长，关键帧准确落在 next_keyframe - start_time 处
+            with open(list_path, 'w') as f:
+                f.write(f"file '{head_path}'\nduration {next_keyframe - start_time:.6f}\nfile '{tail_path}'\n")
+            
+            # 拼接两段视频，音频整段从原始视频流拷贝，不重新编码也不在拼接点切换参数
+            self._run_ffmpeg_sync([
+                '-f', 'concat',
+                '-safe', '0',
+                '-i', list_path,
+                '-ss', str(start_time),
+                *self._input_options(video_path),
+                '-i', video_path,
+                '-t', str(end_time - start_time),
+                '-map', '0:v:0',
+                '-map', '1:a?',
+                '-c', 'copy',
+                *self._track_timescale_options(stream),
+                '-movflags', '+faststart',
+                '-y', output_path
+            ])
+        finally:
+            for path in (head_path, tail_path, list_path):
+                if os.path.exists(path):
+                    os.unlink(path)
+        
+        return {
+            "keyframe": next_keyframe,
+            "reencoded_duration": round(next_keyframe - start_time, 3),
+            "mode": "smart"
+        }
+
+    def _run_ffmpeg_sync(self, args: List[str], timeout: int = 300) -> subprocess.CompletedProcess:
+        """执行ffmpeg命令，失败时抛出异常"""
+        cmd = [self.ffmpeg_path, *args]
+        logger.info(f"执行FFMPEG命令 (同步): {' '.join(cmd)}")
+        result = subprocess.run(cmd, capture_output=True, text=True, timeout=timeout)
+        if result.returncode != 0:
+            logger.error(f"FFMPEG执行失败: {result.stderr[-2000:]}")
+            raise Exception(f"视频切割失败: {result.stderr[-2000:]}")
+        return result
+
+    def _is_remote_source(self, video_path: str) -> bool:
+        """判断输入是否为HTTP(S) URL"""
+        return video_path.startswith(('http://', 'https://'))
+
+    def _input_options(self, video_path: str) -> List[str]:
+        """远程输入的ffmpeg输入参数，断线时按Range重连"""
+        if self._is_remote_source(video_path):
+            return ['-reconnect', '1', '-reconnect_on_network_error', '1']
+        return []
+
+    def _log_options(self, video_paths: List[str]) -> List[str]:
+        """远程输入时提高日志级别，以便从AVIOContext统计中获取读取字节数"""
+        if any(self._is_remote_source(path) for path in video_paths):
+            return ['-v', 'verbose']
+        return []
+
+    def _record_bytes_read(self, stderr: str, transfer_stats: Optional[Dict[str, int]]):
+        """从ffmpeg输出中解析读取的字节数并累加到统计字典"""
+        if transfer_stats is None or not stderr:
+            return
+        bytes_read = sum(int(n) for n in re.findall(r'Statistics: (\d+) bytes read', stderr))
+        transfer_stats['bytes_read'] = transfer_stats.get('bytes_read', 0) + bytes_read
+
+    def _predict_duration(
+        self,
+        keyframe_index: Optional[Dict[str, Any]],
+        start_time: float,
+        end_time: float
+    ) -> Optional[float]:
+        """根据关键帧索引预测流拷贝切割的实际时长，无索引时返回None"""
+        if not keyframe_index or not keyframe_index.get('keyframes'):
+            return None
+        _, actual_duration = self.predict_copy_cut(keyframe_index, start_time, end_time)
+        return actual_duration
+
+    def _probe_duration_sync(self, file_path: str, default: float) -> float:
+        """使用ffprobe获取文件的实际时长，失败时返回默认值"""
+        try:
+            cmd = [
+                self.ffprobe_path,
+                '-v', 'quiet',
+                '-print_format', 'json',
+                '-show_format',
+                file_path
+            ]
+            
+            result = subprocess.run(
+                cmd,
+                capture_output=True,
+                text=True,
+                timeout=30
+            )
+            
+            if result.returncode == 0:
+                info = json.loads(result.stdout)
+                return float(info.get('format', {}).get('duration', default))
+        except Exception as e:
+            logger.warning(f"获取实际视频时长失败，使用计算值: {str(e)}")
+        return default
+
+    def _finalize_slice_output_sync(
+        self,
+        temp_file_path: str,
+        duration: float,
+        output_filename: str,
+        user_id: int,
+        project_id: int,
+        video_id: int,
+        predicted_duration: Optional[float] = None
+    ) -> Dict[str, Any]:
+        """
+        获取切割输出的实际时长和大小并上传到MinIO
+        
+        Args:
+            temp_file_path: 切割后的本地文件路径
+            duration: 理论时长（秒）
+            output_filename: 输出文件名
+            predicted_duration: 根据关键帧索引预测的实际时长，提供时跳过ffprobe
+            
+        Returns:
+            切割结果
+        """
+        # 获取实际的视频时长：有关键帧索引时直接使用预测值，避免ffprobe
+        if predicted_duration is not None:
+            actual_duration = predicted_duration
+        else:
+            actual_duration = self._probe_duration_sync(temp_file_path, duration)
+        
+        # 获取文件信息
+        file_size = os.path.getsize(temp_file_path)
+        
+        # 上传到MinIO (使用同步版本)
+        minio_path = minio_service.generate_slice_object_name(user_id, project_id, video_id, output_filename)
+        upload_result = minio_service.upload_file_sync(
+            temp_file_path,
+            minio_path,
+            content_type="video/mp4"
+        )
+        
+        logger.info(f"视频切割成功 (同步): {output_filename}, 大小: {file_size} bytes, 理论时长: {duration}秒, 实际时长: {actual_duration}秒")
+        
+        return {
+            "success": True,
+            "filename": output_filename,
+            "file_path": minio_path,
+            "file_size": file_size,
+            "duration": actual_duration
+        }
+    
     async def get_video_info(self, video_path: str) -> Dict[str, Any]:
         """
         获取视频信息
@@ -404,10 +979,160 @@ class VideoSlicingService:
             logger.error(f"生成缩略图失败: {str(e)}")
             raise Exception(f"生成缩略图失败: {str(e)}")
     
+    def build_keyframe_index_sync(self, video_path: str) -> Optional[Dict[str, Any]]:
+        """
+        构建视频的关键帧索引（只读取包头，不解码）
+        
+        Args:
+            video_path: 视频文件路径或预签名URL
+            
+        Returns:
+            {"version": 1, "duration": 总时长, "keyframes": [关键帧时间...]}，失败时返回None
+        """
+        try:
+            cmd = [
+                self.ffprobe_path,
+                '-v', 'error',
+                '-select_streams', 'v:0',
+                '-show_entries', 'packet=pts_time,flags:format=duration',
+                '-of', 'csv',
+                video_path
+            ]
+            
+            result = subprocess.run(
+                cmd,
+                capture_output=True,
+                text=True,
+                timeout=600
+            )
+            
+            if result.returncode != 0:
+                logger.warning(f"构建关键帧索引失败: {result.stderr[-1000:]}")
+                return None
+            
+            keyframes = []
+            duration = 0.0
+            for line in result.stdout.splitlines():
+                fields = line.split(',')
+                if fields[0] == 'packet' and len(fields) >= 3:
+                    if 'K' in fields[2] and fields[1] not in ('', 'N/A'):
+                        keyframes.append(round(float(fields[1]), 3))
+                elif fields[0] == 'format' and len(fields) >= 2 and fields[1] not in ('', 'N/A'):
+                    duration = float(fields[1])
+            
+            keyframes.sort()
+            logger.info(f"关键帧索引构建完成: {len(keyframes)} 个关键帧, 时长: {duration}秒")
+            
+            return {
+                "version": 1,
+                "duration": duration,
+                "keyframes": keyframes
+            }
+            
+        except Exception as e:
+            logger.warning(f"构建关键帧索引失败: {str(e)}")
+            return None
+
+    def save_keyframe_index_sync(self, video_object_name: str, keyframe_index: Dict[str, Any]) -> Optional[str]:
+        """将关键帧索引保存为MinIO中的sidecar文件"""
+        object_name = minio_service.generate_keyframe_index_object_name(video_object_name)
+        content = json.dumps(keyframe_index, separators=(',', ':')).encode('utf-8')
+        return minio_service.upload_file_content_sync(content, object_name, content_type="application/json")
+
+    def load_keyframe_index_sync(self, video_object_name: str) -> Optional[Dict[str, Any]]:
+        """从MinIO读取关键帧索引，不存在时返回None"""
+        object_name = minio_service.generate_keyframe_index_object_name(video_object_name)
+        content = minio_service.get_file_content_sync(object_name)
+        if not content:
+            return None
+        try:
+            keyframe_index = json.loads(content)
+            if not keyframe_index.get('keyframes'):
+                return None
+            return keyframe_index
+        except (ValueError, AttributeError) as e:
+            logger.warning(f"关键帧索引解析失败: {object_name}, 错误: {str(e)}")
+            return None
+
+    def index_video_keyframes_sync(self, video_path: str, video_object_name: str) -> Optional[Dict[str, Any]]:
+        """
+        构建并保存视频的关键帧索引，在视频下载或上传完成后调用一次
+        
+        Args:
+            video_path: 本地视频文件路径
+            video_object_name: 视频在MinIO中的对象名称
+            
+        Returns:
+            关键帧索引，失败时返回None
+        """
+        keyframe_index = self.build_keyframe_index_sync(video_path)
+        if keyframe_index and keyframe_index['keyframes']:
+            self.save_keyframe_index_sync(video_object_name, keyframe_index)
+            return keyframe_index
+        return None
+
+    def predict_copy_cut(
+        self,
+        keyframe_index: Dict[str, Any],
+        start_time: float,
+        end_time: float
+    ) -> Tuple[float, float]:
+        """
+        预测流拷贝切割的实际起点和时长
+        
+        ffmpeg 在输入端 -ss 且 -c copy 时会从起点之前最近的关键帧开始输出，
+        因此实际起点为 <= start_time 的最后一个关键帧，输出一直持续到 end_time。
+        
+        Returns:
+            (实际起点, 实际时长)
+        """
+        keyframes = keyframe_index['keyframes']
+        position = bisect.bisect_right(keyframes, start_time + 1e-3)
+        actual_start = keyframes[position - 1] if position > 0 else keyframes[0]
+        actual_end = end_time
+        video_duration = keyframe_index.get('duration') or 0
+        if video_duration > 0:
+            actual_end = min(actual_end, video_duration)
+        return actual_start, round(max(actual_end - actual_start, 0.0), 3)
+
+    def get_keyframe_drift_warnings(
+        self,
+        slices: List[Dict[str, Any]],
+        keyframe_index: Dict[str, Any],
+        max_drift: Optional[float] = None
+    ) -> List[str]:
+        """
+        检查切片起点与实际流拷贝起点（前一个关键帧）之间的偏移
+        
+        Returns:
+            偏移超过阈值的警告信息列表
+        """
+        if max_drift is None:
+            max_drift = settings.slice_keyframe_drift_warning_seconds
+        warnings = []
+        
+        def _check(label: str, item: Dict[str, Any]):
+            start_time = self._parse_time_str(item.get('start', '00:00:00,000'))
+            end_time = self._parse_time_str(item.get('end', '00:00:00,000'))
+            if start_time is None or end_time is None:
+                return
+            actual_start, _ = self.predict_copy_cut(keyframe_index, start_time, end_time)
+            drift = start_time - actual_start
+            if drift > max_drift:
+                warnings.append(f"{label}: 起点将提前 {drift:.2f} 秒到关键帧 {actual_start:.3f}")
+        
+        for i, slice_item in enumerate(slices):
+            _check(f"切片 {i+1}", slice_item)
+            for j, sub_slice in enumerate(slice_item.get('chapters', [])):
+                _check(f"切片 {i+1} 子切片 {j+1}", sub_slice)
+        
+        return warnings
+    
     async def validate_slice_timing(
         self,
         video_duration: float,
-        slices: List[Dict[str, Any]]
+        slices: List[Dict[str, Any]],
+        keyframe_index: Optional[Dict[str, Any]] = None
     ) -> Tuple[bool, List[str]]:
         """
         验证切片时间是否有效
@@ -415,12 +1140,17 @@ class VideoSlicingService:
         Args:
             video_duration: 视频总时长
             slices: 切片列表
+            keyframe_index: 可选的关键帧索引，用于警告流拷贝起点偏移过大的切片
             
         Returns:
             (是否有效, 错误信息列表)
         """
         errors = []
         
+        if keyframe_index:
+            for warning in self.get_keyframe_drift_warnings(slices, keyframe_index):
+                logger.warning(f"关键帧偏移警告 - {warning}")
+        
         for i, slice_item in enumerate(slices):
             start_time = self._parse_time_str(slice_item.get('start', '00:00:00,000'))
             end_time = self._parse_time_str(slice_item.get('end', '00:00:00,000'))
@@ -729,6 +729,27 @@ class YouTubeDownloaderMinio:
                     logger.error(f"✗ 文件上传后验证失败: {video_object_name}")
                     raise Exception(f"文件上传验证失败: {video_object_name}")
                 
+                # 构建关键帧索引，供后续切片预测切割边界和时长
+                try:
+                    from app.services.video_slicing_service import video_slicing_service
+                    await asyncio.get_event_loop().run_in_executor(
+                        None,
+                        video_slicing_service.index_video_keyframes_sync,
+                        str(downloaded_file),
+                        video_object_name
+                    )
+                except Exception as index_error:
+                    logger.warning(f"构建关键帧索引失败，继续处理: {index_error}")
+                
+                # 放入节点本地媒体缓存，后续的音频提取和切片任务无需再从MinIO下载
+                from app.services.media_cache import media_cache
+                await asyncio.get_event_loop().run_in_executor(
+                    None,
+                    media_cache.put_file_sync,
+                    video_object_name,
+                    str(downloaded_file)
+                )
+                
                 # 上传缩略图
                 thumbnail_url = None
                 if thumbnail_file and thumbnail_file.exists():
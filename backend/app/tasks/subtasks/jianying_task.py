@@ -45,15 +45,10 @@ def _get_proxy_url(resource_path: str) -> str:
     from app.core.config import settings
     import asyncio
 
-    # 强制重新加载配置以确保使用最新的值
+    # 配置版本变化时才重新加载配置，MinIO客户端随之重建
     try:
-        from app.services.system_config_service import SystemConfigService
-        from app.core.database import get_sync_db
-        db = get_sync_db()
-        SystemConfigService.update_settings_from_db_sync(db)
-        db.close()
-        # 重新加载MinIO配置
-        minio_service.reload_config()
+        from app.services.config_version import config_version
+        config_version.ensure_current_sync()
     except Exception as e:
         print(f"DEBUG: 重新加载配置时出错: {e}")
 
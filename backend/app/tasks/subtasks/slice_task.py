@@ -1,6 +1,7 @@
 from celery import shared_task
 import asyncio
 import tempfile
+from contextlib import ExitStack
 import os
 import requests
 import json
@@ -11,6 +12,7 @@ from pathlib import Path
 from typing import Dict, Any
 from app.services.video_slicing_service import video_slicing_service
 from app.services.minio_client import minio_service
+from app.services.media_cache import media_cache
 from app.services.state_manager import get_state_manager
 from app.core.constants import ProcessingTaskType, ProcessingTaskStatus, ProcessingStage
 from app.core.database import get_sync_db
@@ -21,8 +23,12 @@ from app.models import Video, VideoSlice, VideoSubSlice, LLMAnalysis, Processing
 logger = logging.getLogger(__name__)
 
 @shared_task(bind=True, name='app.tasks.video_tasks.process_video_slices')
-def process_video_slices(self, analysis_id: int, video_id: int, project_id: int, user_id: int, slice_items: list) -> Dict[str, Any]:
-    """处理视频切片任务"""
+def process_video_slices(self, analysis_id: int, video_id: int, project_id: int, user_id: int, slice_items: list, smart_cut: bool = False, force_asr: bool = False) -> Dict[str, Any]:
+    """处理视频切片任务
+    
+    smart_cut 为 True 时逐个切片使用智能切割（帧精确起点，只重新编码首个GOP）
+    force_asr 为 True 时切片字幕重新调用ASR，而不是从父视频字幕中截取
+    """
     
     def _update_task_status(celery_task_id: str, status: str, progress: float, message: str = None, error: str = None):
         """更新任务状态 - 同步版本"""
@@ -78,7 +84,8 @@ def process_video_slices(self, analysis_id: int, video_id: int, project_id: int,
                             video_minio_path=video_slice.sliced_file_path,
                             slice_id=video_slice.id,
                             create_processing_task=True,
-                            trigger_srt_after_audio=True  # 启用SRT自动触发
+                            trigger_srt_after_audio=True,  # 启用SRT自动触发
+                            force_asr=force_asr
                         )
                         video_slice.audio_processing_status = "processing"
                         video_slice.audio_task_id = audio_task.id
@@ -103,7 +110,8 @@ def process_video_slices(self, analysis_id: int, video_id: int, project_id: int,
                                     video_minio_path=sub_slice.sliced_file_path,
                                     sub_slice_id=sub_slice.id,
                                     create_processing_task=True,
-                                    trigger_srt_after_audio=True  # 启用SRT自动触发
+                                    trigger_srt_after_audio=True,  # 启用SRT自动触发
+                                    force_asr=force_asr
                                 )
                                 sub_slice.audio_processing_status = "processing"
                                 sub_slice.audio_task_id = sub_audio_task.id
@@ -191,29 +199,135 @@ def process_video_slices(self, analysis_id: int, video_id: int, project_id: int,
                 if not video.file_path:
                     raise Exception("视频文件不存在")
                 
-                # 下载原始视频到临时文件
-                import tempfile
+                # 准备源视频：默认让ffmpeg通过预签名URL按Range读取，避免整体下载
+                transfer_stats = {'bytes_read': 0}
+                local_source = {'path': None}
+                media_stack = ExitStack()
+                
+                def _ensure_local_source() -> str:
+                    """通过节点本地媒体缓存获取源视频（缓存未命中时分块下载一次）"""
+                    if local_source['path'] is None:
+                        downloaded_before = media_cache.get_stats()['bytes_downloaded']
+                        local_source['path'] = media_stack.enter_context(media_cache.local_path(video.file_path))
+                        transfer_stats['bytes_read'] += media_cache.get_stats()['bytes_downloaded'] - downloaded_before
+                    return local_source['path']
                 
-                with tempfile.NamedTemporaryFile(suffix='.mp4', delete=False) as temp_file:
-                    # 从MinIO下载视频
-                    video_data = minio_service.internal_client.get_object(
-                        settings.minio_bucket_name,
-                        video.file_path
+                source_path = None
+                if settings.slice_source_mode == "url":
+                    source_path = minio_service.get_internal_file_url_sync(
+                        video.file_path,
+                        expiry=settings.slice_source_url_expiry
                     )
-                    
-                    content = video_data.read()
-                    temp_file.write(content)
-                    temp_file.flush()
-                    
-                    temp_video_path = temp_file.name
+                if not source_path:
+                    source_path = _ensure_local_source()
+                source_is_remote = source_path != local_source['path']
                 
                 try:
+                    # 读取关键帧索引，用于预测流拷贝切割的实际时长，避免逐个ffprobe
+                    keyframe_index = video_slicing_service.load_keyframe_index_sync(video.file_path)
+                    if keyframe_index is None and not source_is_remote:
+                        keyframe_index = video_slicing_service.index_video_keyframes_sync(source_path, video.file_path)
+                    if keyframe_index:
+                        for warning in video_slicing_service.get_keyframe_drift_warnings(slice_items, keyframe_index):
+                            print(f"关键帧偏移警告 - {warning}")
+                    
                     total_slices = len(slice_items)
                     processed_slices = 0
                     
+                    # 预先解析所有切片和子切片的时间并生成文件名
+                    slice_plans = []
+                    for i, slice_item in enumerate(slice_items):
+                        start_time = video_slicing_service._parse_time_str_sync(slice_item.get('start', '00:00:00,000'))
+                        end_time = video_slicing_service._parse_time_str_sync(slice_item.get('end', '00:00:00,000'))
+                        filename = video_slicing_service.generate_filename(
+                            slice_item.get('cover_title', 'slice'),
+                            i + 1
+                        )
+                        chapter_plans = []
+                        for j, sub_slice in enumerate(slice_item.get('chapters', [])):
+                            chapter_plans.append({
+                                'start_time': video_slicing_service._parse_time_str_sync(sub_slice.get('start', '00:00:00,000')),
+                                'end_time': video_slicing_service._parse_time_str_sync(sub_slice.get('end', '00:00:00,000')),
+                                'output_filename': video_slicing_service.generate_filename(
+                                    sub_slice.get('cover_title', 'sub_slice'),
+                                    j + 1,
+                                    is_sub_slice=True
+                                ),
+                                'cover_title': sub_slice.get('cover_title', 'sub_slice')
+                            })
+                        slice_plans.append({
+                            'start_time': start_time,
+                            'end_time': end_time,
+                            'output_filename': filename,
+                            'cover_title': slice_item.get('cover_title', 'slice'),
+                            'chapters': chapter_plans
+                        })
+                    
+                    # 先并行完成所有切片和子切片的切割与上传，再按原顺序串行写入数据库
+                    cuts = []
+                    for plan in slice_plans:
+                        if plan['start_time'] is None or plan['end_time'] is None:
+                            continue
+                        cuts.append(plan)
+                        cuts.extend(
+                            chapter for chapter in plan['chapters']
+                            if chapter['start_time'] is not None and chapter['end_time'] is not None
+                        )
+                    
+                    _update_task_status(self.request.id, ProcessingTaskStatus.RUNNING, 15, f"Cutting {len(cuts)} clips")
+                    
+                    def _report_cut_progress(completed: int, total: int):
+                        """汇总各并行批次的切割进度到父任务"""
+                        progress = 15 + (completed / max(total, 1)) * 45
+                        _update_task_status(self.request.id, ProcessingTaskStatus.RUNNING, progress, f"Cutting clips {completed}/{total}")
+                    
+                    # 批量切割：每个ffmpeg进程输出多个切片；关闭时每个进程只输出一个切片
+                    slice_options = {
+                        'max_outputs_per_process': settings.slice_batch_max_outputs if settings.slice_batch_enabled else 1,
+                        'keyframe_index': keyframe_index,
+                        'concurrency': settings.slice_concurrency,
+                        'smart_cut': smart_cut
+                    }
+                    results = video_slicing_service.slice_video_batch_sync(
+                        source_path,
+                        cuts,
+                        user_id,
+                        project_id,
+                        video_id,
+                        transfer_stats=transfer_stats,
+                        progress_callback=_report_cut_progress,
+                        **slice_options
+                    )
+                    cut_results = {
+                        cut['output_filename']: result for cut, result in zip(cuts, results)
+                    }
+                    
+                    # 远程读取失败的切片回退到本地文件重新切割
+                    failed_cuts = [cut for cut, result in zip(cuts, results) if not result.get('success')]
+                    if source_is_remote and failed_cuts:
+                        print(f"{len(failed_cuts)} 个切片通过URL切割失败，回退到本地文件")
+                        retry_results = video_slicing_service.slice_video_batch_sync(
+                            _ensure_local_source(),
+                            failed_cuts,
+                            user_id,
+                            project_id,
+                            video_id,
+                            **slice_options
+                        )
+                        cut_results.update({
+                            cut['output_filename']: result for cut, result in zip(failed_cuts, retry_results)
+                        })
+                    
+                    def _cut(plan: Dict[str, Any]) -> Dict[str, Any]:
+                        """获取切割结果，失败时抛出异常"""
+                        result = cut_results.get(plan['output_filename'])
+                        if not result or not result.get('success'):
+                            raise Exception(f"视频切割失败: {(result or {}).get('error')}")
+                        return result
+                    
                     for i, slice_item in enumerate(slice_items):
                         try:
-                            progress = 20 + (i / total_slices) * 70
+                            progress = 60 + (i / total_slices) * 30
                             message = f"Processing Clips {i+1}/{total_slices}: {slice_item.get('cover_title', 'N/A')}"
                             
                             _update_task_status(self.request.id, ProcessingTaskStatus.RUNNING, progress, message)
@@ -222,30 +336,18 @@ def process_video_slices(self, analysis_id: int, video_id: int, project_id: int,
                             # 前端会通过定时查询获取最新状态
                             
                             # 解析时间
-                            start_time = video_slicing_service._parse_time_str_sync(slice_item.get('start', '00:00:00,000'))
-                            end_time = video_slicing_service._parse_time_str_sync(slice_item.get('end', '00:00:00,000'))
+                            slice_plan = slice_plans[i]
+                            start_time = slice_plan['start_time']
+                            end_time = slice_plan['end_time']
                             
                             if start_time is None or end_time is None:
                                 print(f"时间解析失败: {slice_item}")
                                 continue
                             
-                            # 生成文件名
-                            filename = video_slicing_service.generate_filename(
-                                slice_item.get('cover_title', 'slice'),
-                                i + 1
-                            )
+                            filename = slice_plan['output_filename']
                             
                             # 执行视频切割 - 使用同步版本
-                            slice_result = video_slicing_service.slice_video_sync(
-                                temp_video_path,
-                                start_time,
-                                end_time,
-                                filename,
-                                slice_item.get('cover_title', 'slice'),
-                                user_id,
-                                project_id,
-                                video_id
-                            )
+                            slice_result = _cut(slice_plan)
                             
                             # 创建切片记录
                             video_slice = VideoSlice(
@@ -273,31 +375,18 @@ def process_video_slices(self, analysis_id: int, video_id: int, project_id: int,
                             sub_slices_data = []
                             for j, sub_slice in enumerate(slice_item.get('chapters', [])):
                                 try:
-                                    sub_start = video_slicing_service._parse_time_str_sync(sub_slice.get('start', '00:00:00,000'))
-                                    sub_end = video_slicing_service._parse_time_str_sync(sub_slice.get('end', '00:00:00,000'))
+                                    sub_plan = slice_plan['chapters'][j]
+                                    sub_start = sub_plan['start_time']
+                                    sub_end = sub_plan['end_time']
                                     
                                     if sub_start is None or sub_end is None:
                                         print(f"子切片时间解析失败: {sub_slice}")
                                         continue
                                     
-                                    # 生成子切片文件名
-                                    sub_filename = video_slicing_service.generate_filename(
-                                        sub_slice.get('cover_title', 'sub_slice'),
-                                        j + 1,
-                                        is_sub_slice=True
-                                    )
+                                    sub_filename = sub_plan['output_filename']
                                     
                                     # 执行子切片切割 - 使用同步版本
-                                    sub_result = video_slicing_service.slice_video_sync(
-                                        temp_video_path,
-                                        sub_start,
-                                        sub_end,
-                                        sub_filename,
-                                        sub_slice.get('cover_title', 'sub_slice'),
-                                        user_id,
-                                        project_id,
-                                        video_id
-                                    )
+                                    sub_result = _cut(sub_plan)
                                     
                                     # 创建子切片记录
                                     video_sub_slice = VideoSubSlice(
@@ -352,6 +441,10 @@ def process_video_slices(self, analysis_id: int, video_id: int, project_id: int,
                     analysis.status = "applied"
                     db.commit()
                     
+                    source_mode = "url" if source_is_remote else "download"
+                    print(f"切片任务源视频传输: mode={source_mode}, bytes={transfer_stats['bytes_read']}, "
+                          f"local_fallback={local_source['path'] is not None and source_is_remote}")
+                    
                     _update_task_status(self.request.id, ProcessingTaskStatus.SUCCESS, 100, f"Video Clip Processing Completed，成功处理 {processed_slices}/{total_slices} 个切片")
                     
                     # 只更新数据库，不发送WebSocket通知
@@ -363,15 +456,14 @@ def process_video_slices(self, analysis_id: int, video_id: int, project_id: int,
                         'video_id': video_id,
                         'total_slices': total_slices,
                         'processed_slices': processed_slices,
+                        'source_mode': source_mode,
+                        'source_bytes_transferred': transfer_stats['bytes_read'],
                         'message': f"成功处理 {processed_slices}/{total_slices} 个切片"
                     }
                     
                 finally:
-                    # 清理临时文件
-                    try:
-                        os.unlink(temp_video_path)
-                    except:
-                        pass
+                    # 释放媒体缓存条目的共享锁
+                    media_stack.close()
               
         except Exception as e:
             import traceback
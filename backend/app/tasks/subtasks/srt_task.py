@@ -1,6 +1,7 @@
 from celery import shared_task
 import asyncio
 import tempfile
+from contextlib import ExitStack
 import os
 import requests
 import json
@@ -11,6 +12,7 @@ from pathlib import Path
 from typing import Dict, Any
 from app.services.audio_processor import audio_processor
 from app.services.minio_client import minio_service
+from app.services.media_cache import media_cache
 from app.services.state_manager import get_state_manager
 from app.core.constants import ProcessingTaskType, ProcessingTaskStatus, ProcessingStage
 from app.core.database import get_sync_db
@@ -30,28 +32,22 @@ logger = logging.getLogger(__name__)
     retry_backoff=True,
     retry_jitter=True
 )
-def generate_srt(self, video_id: str, project_id: int, user_id: int, split_files: list = None, slice_id: int = None, sub_slice_id: int = None, create_processing_task: bool = True) -> Dict[str, Any]:
-    """Generate SRT subtitles from audio using ASR"""
+def generate_srt(self, video_id: str, project_id: int, user_id: int, split_files: list = None, slice_id: int = None, sub_slice_id: int = None, create_processing_task: bool = True, force_asr: bool = False) -> Dict[str, Any]:
+    """Generate SRT subtitles from audio using ASR
+    
+    切片/子切片默认从父视频字幕中截取（转录窗口模式），父视频字幕不存在或 force_asr 为 True 时才调用ASR
+    """
     
     print(f"DEBUG: SRT任务开始执行 - video_id: {video_id}, project_id: {project_id}, user_id: {user_id}")
     
-    # 在执行任务前重新加载MinIO配置，确保使用最新的访问密钥
+    # 在执行任务前确保使用最新的配置，配置版本未变化时不访问数据库
     try:
-        from app.services.system_config_service import SystemConfigService
-        from app.core.database import get_sync_db
-        from app.services.minio_client import minio_service
-        
-        # 重新加载系统配置
-        db = get_sync_db()
-        SystemConfigService.update_settings_from_db_sync(db)
-        db.close()
-        
-        # 重新加载MinIO客户端配置
-        minio_service.reload_config()
-        
-        print("已重新加载MinIO配置")
+        from app.services.config_version import config_version
+
+        if config_version.ensure_current_sync():
+            print("已重新加载系统配置")
     except Exception as config_error:
-        print(f"重新加载MinIO配置失败: {config_error}")
+        print(f"重新加载系统配置失败: {config_error}")
     
     def _ensure_processing_task_exists(celery_task_id: str, video_id: str, slice_id: int = None, sub_slice_id: int = None) -> bool:
         """确保处理任务记录存在"""
@@ -234,6 +230,95 @@ def generate_srt(self, video_id: str, project_id: int, user_id: int, split_files
         except Exception as e:
             print(f"Error updating task status: {type(e).__name__}: {e}")
     
+    def _derive_srt_from_parent_transcript() -> dict:
+        """从父视频字幕中截取切片/子切片字幕，父视频字幕不可用时返回None"""
+        try:
+            from app.models import VideoSlice, VideoSubSlice, Transcript
+            with get_sync_db() as db:
+                if sub_slice_id:
+                    record = db.query(VideoSubSlice).filter(VideoSubSlice.id == sub_slice_id).first()
+                else:
+                    record = db.query(VideoSlice).filter(VideoSlice.id == slice_id).first()
+                if not record:
+                    return None
+                start_time, end_time = record.start_time, record.end_time
+                
+                transcript = db.query(Transcript).filter(
+                    Transcript.video_id == int(video_id),
+                    Transcript.status == "completed",
+                    Transcript.segments.isnot(None)
+                ).order_by(Transcript.id.desc()).first()
+                parent_segments = transcript.segments if transcript else None
+            
+            if sub_slice_id:
+                srt_filename = f"{video_id}_subslice_{sub_slice_id}.srt"
+            else:
+                srt_filename = f"{video_id}_slice_{slice_id}.srt"
+            return audio_processor.derive_srt_from_parent_sync(
+                video_id=video_id,
+                project_id=project_id,
+                user_id=user_id,
+                start_time=start_time,
+                end_time=end_time,
+                srt_filename=srt_filename,
+                parent_segments=parent_segments
+            )
+        except Exception as e:
+            logger.warning(f"从父视频字幕截取失败，回退到ASR: {e}")
+            return None
+    
+    def _save_derived_srt(celery_task_id: str, result: dict):
+        """保存未经TUS回调生成的字幕（转录窗口/ASR结果缓存）到相关记录和处理任务"""
+        from app.models import VideoSlice, VideoSubSlice
+        from app.models.processing_task import ProcessingStatus
+        strategy = result['strategy']
+        with get_sync_db() as db:
+            if sub_slice_id or slice_id:
+                if sub_slice_id:
+                    record = db.query(VideoSubSlice).filter(VideoSubSlice.id == sub_slice_id).first()
+                else:
+                    record = db.query(VideoSlice).filter(VideoSlice.id == slice_id).first()
+                if record:
+                    record.srt_url = result['object_name']
+                    record.srt_processing_status = "completed"
+            else:
+                # 原视频的SRT任务，与callback服务器处理TUS结果时一致地更新视频状态
+                video = db.query(Video).filter(Video.id == int(video_id)).first()
+                if video:
+                    video.processing_progress = 100
+                    video.processing_stage = ProcessingStage.GENERATE_SRT.value
+                    video.processing_message = f"字幕生成完成 (策略: {strategy})"
+                    video.processing_completed_at = datetime.utcnow()
+                processing_status = db.query(ProcessingStatus).filter(
+                    ProcessingStatus.video_id == int(video_id)
+                ).first()
+                if processing_status:
+                    processing_status.generate_srt_status = ProcessingTaskStatus.SUCCESS
+                    processing_status.generate_srt_progress = 100
+            
+            if create_processing_task:
+                task = db.query(ProcessingTask).filter(
+                    ProcessingTask.celery_task_id == celery_task_id
+                ).first()
+                if task:
+                    get_state_manager(db).update_task_status_sync(
+                        task_id=task.id,
+                        status=ProcessingTaskStatus.SUCCESS,
+                        progress=100,
+                        message=f"字幕生成完成 (策略: {strategy})",
+                        output_data={
+                            'srt_filename': result['srt_filename'],
+                            'minio_path': result['minio_path'],
+                            'srt_url': result['minio_path'],
+                            'object_name': result['object_name'],
+                            'total_segments': result['total_segments'],
+                            'srt_content': result['srt_content'],
+                            'strategy': strategy
+                        },
+                        stage=ProcessingStage.GENERATE_SRT
+                    )
+            db.commit()
+    
     try:
         celery_task_id = self.request.id
         if not celery_task_id:
@@ -257,6 +342,22 @@ def generate_srt(self, video_id: str, project_id: int, user_id: int, split_files
         
         print(f"DEBUG: 任务状态已更新为运行中")
         
+        # 转录窗口模式：切片/子切片字幕直接从父视频字幕中截取，不再调用ASR
+        if (slice_id or sub_slice_id) and settings.slice_srt_from_parent_transcript and not force_asr:
+            window_result = _derive_srt_from_parent_transcript()
+            if window_result:
+                _save_derived_srt(celery_task_id, window_result)
+                self.update_state(state='SUCCESS', meta={'progress': 100, 'stage': ProcessingStage.GENERATE_SRT, 'message': '字幕生成完成'})
+                return {
+                    'status': 'completed',
+                    'video_id': video_id,
+                    'strategy': 'transcript_window',
+                    'srt_filename': window_result['srt_filename'],
+                    'minio_path': window_result['minio_path'],
+                    'object_name': window_result['object_name'],
+                    'total_segments': window_result['total_segments']
+                }
+        
         
         # 获取音频文件信息
         audio_info = _get_audio_file_from_db(video_id, sub_slice_id, slice_id)
@@ -268,10 +369,8 @@ def generate_srt(self, video_id: str, project_id: int, user_id: int, split_files
             _update_task_status(celery_task_id, ProcessingTaskStatus.FAILURE, 0, error_msg)
             raise Exception(error_msg)
         
-        with tempfile.TemporaryDirectory() as temp_dir:
+        with tempfile.TemporaryDirectory() as temp_dir, ExitStack() as media_stack:
                 temp_path = Path(temp_dir)
-                audio_filename = f"{video_id}.wav"
-                audio_path = temp_path / audio_filename
                 
                 _update_task_status(celery_task_id, ProcessingTaskStatus.RUNNING, 30, "The audio file is being downloaded.")
                 self.update_state(state='PROGRESS', meta={'progress': 30, 'stage': ProcessingStage.GENERATE_SRT, 'message': 'The audio file is being downloaded.'})
@@ -305,17 +404,8 @@ def generate_srt(self, video_id: str, project_id: int, user_id: int, split_files
                         asyncio.set_event_loop(loop)
                     return loop.run_until_complete(coro)
                 
-                audio_url = run_async(minio_service.get_file_url(object_name, expiry=3600))
-                if not audio_url:
-                    raise Exception(f"无法获取音频文件URL: {object_name}")
-                
-                import requests
-                response = requests.get(audio_url, stream=True)
-                response.raise_for_status()
-                
-                with open(audio_path, 'wb') as f:
-                    for chunk in response.iter_content(chunk_size=8192):
-                        f.write(chunk)
+                # 通过节点本地媒体缓存获取音频文件，同一节点上的任务只下载一次
+                audio_path = Path(media_stack.enter_context(media_cache.local_path(object_name)))
                 
                 # 检查下载的文件大小
                 downloaded_file_size = os.path.getsize(audio_path)
@@ -353,10 +443,25 @@ def generate_srt(self, video_id: str, project_id: int, user_id: int, split_files
                         start_time=start_time,
                         end_time=end_time,
                         asr_service_url=asr_service_url,  # 传递最新的URL
-                        asr_model_type=asr_model_type  # 传递模型类型
+                        asr_model_type=asr_model_type,  # 传递模型类型
+                        force_asr=force_asr  # 强制重新识别时不复用ASR结果缓存
                     )
                 )
 
+                # ASR结果缓存命中或并行分段识别：字幕已生成，不会有TUS回调，直接保存结果
+                if result.get('success') and result.get('strategy') in ('asr_cache', 'parallel_asr'):
+                    _save_derived_srt(celery_task_id, result)
+                    self.update_state(state='SUCCESS', meta={'progress': 100, 'stage': ProcessingStage.GENERATE_SRT, 'message': '字幕生成完成'})
+                    return {
+                        'status': 'completed',
+                        'video_id': video_id,
+                        'strategy': result['strategy'],
+                        'srt_filename': result['srt_filename'],
+                        'minio_path': result['minio_path'],
+                        'object_name': result['object_name'],
+                        'total_segments': result['total_segments']
+                    }
+
                 # TUS异步处理：Celery任务只负责提交，不等待callback
                 if result.get('strategy') == 'tus' and result.get('success'):
                     logger.info(f"✅ TUS任务提交成功: task_id={result.get('task_id')}")
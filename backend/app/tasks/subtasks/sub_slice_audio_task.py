@@ -1,13 +1,12 @@
 from celery import shared_task
 import asyncio
-import tempfile
-import requests
+from contextlib import ExitStack
 import logging
 from datetime import datetime
 from pathlib import Path
 from typing import Dict, Any
 from app.services.audio_processor import audio_processor
-from app.services.minio_client import minio_service
+from app.services.media_cache import media_cache
 from app.services.state_manager import get_state_manager
 from app.core.constants import ProcessingTaskType, ProcessingTaskStatus, ProcessingStage
 from app.core.database import get_sync_db, AsyncSessionLocal
@@ -20,7 +19,7 @@ from app.tasks.subtasks.task_utils import run_async, update_task_status
 logger = logging.getLogger(__name__)
 
 @shared_task(bind=True, ignore_result=False, name='app.tasks.video_tasks.extract_sub_slice_audio')
-def extract_sub_slice_audio(self, video_id: str, project_id: int, user_id: int, video_minio_path: str, sub_slice_id: int, create_processing_task: bool = True, trigger_srt_after_audio: bool = False) -> Dict[str, Any]:
+def extract_sub_slice_audio(self, video_id: str, project_id: int, user_id: int, video_minio_path: str, sub_slice_id: int, create_processing_task: bool = True, trigger_srt_after_audio: bool = False, force_asr: bool = False) -> Dict[str, Any]:
     """Extract audio from video sub-slice using ffmpeg"""
     
     def _ensure_processing_task_exists(celery_task_id: str, video_id: str) -> bool:
@@ -114,6 +113,26 @@ def extract_sub_slice_audio(self, video_id: str, project_id: int, user_id: int,
         except Exception as e:
             print(f"Error updating task status: {type(e).__name__}: {e}")
     
+    def _derive_audio_from_parent():
+        """从父视频的WAV中截取子切片音频，父音频不可用时返回None"""
+        try:
+            with get_sync_db() as db:
+                sub_slice_record = db.query(VideoSubSlice).filter(VideoSubSlice.id == sub_slice_id).first()
+                if not sub_slice_record:
+                    return None
+                start_time, end_time = sub_slice_record.start_time, sub_slice_record.end_time
+            return audio_processor.derive_audio_from_parent_sync(
+                video_id=video_id,
+                project_id=project_id,
+                user_id=user_id,
+                start_time=start_time,
+                end_time=end_time,
+                custom_filename=f"{video_id}_subslice_{sub_slice_id}"
+            )
+        except Exception as e:
+            logger.warning(f"从父视频音频截取子切片音频失败，回退到从子切片视频提取: {e}")
+            return None
+    
     try:
         celery_task_id = self.request.id
         if not celery_task_id:
@@ -122,107 +141,47 @@ def extract_sub_slice_audio(self, video_id: str, project_id: int, user_id: int,
         _update_task_status(celery_task_id, ProcessingTaskStatus.RUNNING, 10, "开始提取子切片音频")
         self.update_state(state='PROGRESS', meta={'progress': 10, 'stage': ProcessingStage.EXTRACT_AUDIO, 'message': '开始提取子切片音频'})
         
-        # 总是提取子切片音频，不使用父视频音频优化
         audio_extraction_completed = False
-        with tempfile.TemporaryDirectory() as temp_dir:
-            temp_path = Path(temp_dir)
-            video_filename = f"{video_id}.mp4"
-            video_path = temp_path / video_filename
-                
-            bucket_prefix = f"{settings.minio_bucket_name}/"
-            if video_minio_path.startswith(bucket_prefix):
-                object_name = video_minio_path[len(bucket_prefix):]
-            else:
-                # Handle both full URLs and object names
-                if "http" in video_minio_path:
-                    # It's a full URL, extract the object name
-                    from urllib.parse import urlparse
-                    parsed = urlparse(video_minio_path)
-                    path_parts = parsed.path.strip('/').split('/', 1)
-                    if len(path_parts) > 1:
-                        object_name = path_parts[1]  # Skip bucket name
+        # 快速路径：直接从父视频的WAV中按采样偏移截取，无需下载子切片视频和重新解码
+        result = _derive_audio_from_parent() if settings.slice_audio_from_parent else None
+        if result is None:
+            with ExitStack() as media_stack:
+                bucket_prefix = f"{settings.minio_bucket_name}/"
+                if video_minio_path.startswith(bucket_prefix):
+                    object_name = video_minio_path[len(bucket_prefix):]
+                else:
+                    # Handle both full URLs and object names
+                    if "http" in video_minio_path:
+                        # It's a full URL, extract the object name
+                        from urllib.parse import urlparse
+                        parsed = urlparse(video_minio_path)
+                        path_parts = parsed.path.strip('/').split('/', 1)
+                        if len(path_parts) > 1:
+                            object_name = path_parts[1]  # Skip bucket name
+                        else:
+                            object_name = video_minio_path
                     else:
                         object_name = video_minio_path
-                else:
-                    object_name = video_minio_path
                 
-                _update_task_status(celery_task_id, ProcessingTaskStatus.RUNNING, 30, "The video file is being downloaded.")
-                self.update_state(state='PROGRESS', meta={'progress': 30, 'stage': ProcessingStage.EXTRACT_AUDIO, 'message': 'The video file is being downloaded.'})
+                    _update_task_status(celery_task_id, ProcessingTaskStatus.RUNNING, 30, "The video file is being downloaded.")
+                    self.update_state(state='PROGRESS', meta={'progress': 30, 'stage': ProcessingStage.EXTRACT_AUDIO, 'message': 'The video file is being downloaded.'})
                 
-                video_url = run_async(minio_service.get_file_url(object_name, expiry=3600))
-                if not video_url:
-                    raise Exception("无法获取视频文件URL")
+                    # 通过节点本地媒体缓存获取源视频，同一节点上的任务只下载一次
+                    video_path = Path(media_stack.enter_context(media_cache.local_path(object_name)))
                 
-                response = requests.get(video_url, stream=True)
-                response.raise_for_status()
-                
-                with open(video_path, 'wb') as f:
-                    for chunk in response.iter_content(chunk_size=8192):
-                        f.write(chunk)
-                
-                _update_task_status(celery_task_id, ProcessingTaskStatus.RUNNING, 65, "extracting audio")
-                self.update_state(state='PROGRESS', meta={'progress': 65, 'stage': ProcessingStage.EXTRACT_AUDIO, 'message': 'extracting audio'})
-
-                result = run_async(
-                    audio_processor.extract_audio_from_video(
-                        video_path=str(video_path),
-                        video_id=video_id,
-                        project_id=project_id,
-                        user_id=user_id,
-                        custom_filename=f"{video_id}_subslice_{sub_slice_id}"
-                    )
-                )
-
-                # 检查并转换音频采样率（在临时目录上下文内执行）
-                if result.get('success'):
-                    try:
-                        # 音频文件需要在临时目录上下文中进行采样率检查
-                        # 从MinIO下载音频文件到当前临时目录
-
-                        # 从MinIO下载刚上传的音频文件到本地临时目录
-                        audio_url = run_async(minio_service.get_file_url(result['object_name'], expiry=3600))
-                        if not audio_url:
-                            raise Exception("无法获取刚上传的音频文件URL")
+                    _update_task_status(celery_task_id, ProcessingTaskStatus.RUNNING, 65, "extracting audio")
+                    self.update_state(state='PROGRESS', meta={'progress': 65, 'stage': ProcessingStage.EXTRACT_AUDIO, 'message': 'extracting audio'})
 
-                        audio_temp_path = temp_path / result['audio_filename']
-
-                        response = requests.get(audio_url, stream=True)
-                        response.raise_for_status()
-
-                        with open(audio_temp_path, 'wb') as f:
-                            for chunk in response.iter_content(chunk_size=8192):
-                                f.write(chunk)
-
-                        _update_task_status(celery_task_id, ProcessingTaskStatus.RUNNING, 85, "正在检查音频采样率")
-                        self.update_state(state='PROGRESS', meta={'progress': 85, 'stage': ProcessingStage.EXTRACT_AUDIO, 'message': '正在检查音频采样率'})
-
-                        # 检查并转换采样率
-                        converted_audio_path = run_async(
-                            audio_processor.convert_audio_sample_rate(str(audio_temp_path), 16000)
+                    result = run_async(
+                        audio_processor.extract_audio_from_video(
+                            video_path=str(video_path),
+                            video_id=video_id,
+                            project_id=project_id,
+                            user_id=user_id,
+                            custom_filename=f"{video_id}_subslice_{sub_slice_id}"
                         )
+                    )
 
-                        # 如果采样率被转换，需要重新上传文件
-                        if converted_audio_path != str(audio_temp_path):
-                            # 重新上传转换后的音频文件
-                            audio_url = run_async(
-                                minio_service.upload_file(
-                                    converted_audio_path,
-                                    result['object_name'],
-                                    f"audio/{result['audio_format']}"
-                                )
-                            )
-
-                            if audio_url:
-                                # 更新结果中的音频路径和文件大小
-                                result['minio_path'] = audio_url
-                                result['file_size'] = Path(converted_audio_path).stat().st_size
-                                logger.info(f"子切片音频采样率已转换并重新上传: {audio_url}")
-                            else:
-                                logger.error("转换后的音频文件上传失败")
-                                raise Exception("转换后的音频文件上传失败")
-                    except Exception as e:
-                        logger.error(f"子切片音频采样率检查/转换失败: {str(e)}")
-                        # 不中断整个流程，继续使用原始音频
         # 处理成功逻辑
         if result.get('success'):
             try:
@@ -317,7 +276,8 @@ def extract_sub_slice_audio(self, video_id: str, project_id: int, user_id: int,
                         user_id=user_id,
                         split_files=[],
                         sub_slice_id=sub_slice_id,
-                        create_processing_task=True
+                        create_processing_task=True,
+                        force_asr=force_asr
                     )
                     print(f"SRT生成任务已提交: task_id={srt_task.id}")
                 except Exception as srt_error:
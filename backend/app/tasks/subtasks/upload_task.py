@@ -9,6 +9,9 @@ from typing import Dict, Any, Optional, Tuple
 from sqlalchemy import desc
 
 from app.services.minio_client import minio_service
+from app.services.config_version import config_version
+from app.services.video_slicing_service import video_slicing_service
+from app.services.media_cache import media_cache
 from app.services.state_manager import get_state_manager
 from app.core.constants import ProcessingTaskType, ProcessingTaskStatus, ProcessingStage
 from app.core.database import get_sync_db
@@ -219,8 +222,8 @@ def upload_video(self, video_id: int, project_id: int, user_id: int, temp_file_p
             
             # 上传文件到MinIO
             try:
-                # 重新加载MinIO配置，确保使用最新的访问密钥
-                minio_service.reload_config()
+                # 确保使用最新的访问密钥，配置版本未变化时不重建客户端
+                config_version.ensure_current_sync()
                 
                 minio_service.upload_file_sync(temp_file_path, object_name)
                 
@@ -231,6 +234,15 @@ def upload_video(self, video_id: int, project_id: int, user_id: int, temp_file_p
                 logger.error(f"上传文件到MinIO失败: {upload_error}")
                 raise Exception(f"上传文件到MinIO失败: {upload_error}")
             
+            # 构建关键帧索引，供后续切片预测切割边界和时长
+            try:
+                video_slicing_service.index_video_keyframes_sync(temp_file_path, object_name)
+            except Exception as index_error:
+                logger.warning(f"构建关键帧索引失败，继续处理: {index_error}")
+            
+            # 放入节点本地媒体缓存，后续的音频提取和切片任务无需再从MinIO下载
+            media_cache.put_file_sync(object_name, temp_file_path)
+            
             # 阶段6: 完成处理 (90-100%)
             _update_status(95, "上传处理完成")
             
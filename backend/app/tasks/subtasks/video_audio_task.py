@@ -1,13 +1,12 @@
 from celery import shared_task
 import asyncio
-import tempfile
-import requests
+from contextlib import ExitStack
 import logging
 from datetime import datetime
 from pathlib import Path
 from typing import Dict, Any
 from app.services.audio_processor import audio_processor
-from app.services.minio_client import minio_service
+from app.services.media_cache import media_cache
 from app.services.state_manager import get_state_manager
 from app.core.constants import ProcessingTaskType, ProcessingTaskStatus, ProcessingStage
 from app.core.database import get_sync_db, AsyncSessionLocal
@@ -122,11 +121,7 @@ def extract_video_audio(self, video_id: str, project_id: int, user_id: int, vide
         _update_task_status(celery_task_id, ProcessingTaskStatus.RUNNING, 10, "Start Extracting Audio", video_id=video_id)
         self.update_state(state='PROGRESS', meta={'progress': 10, 'stage': ProcessingStage.EXTRACT_AUDIO, 'message': 'Start Extracting Audio'})
         
-        with tempfile.TemporaryDirectory() as temp_dir:
-            temp_path = Path(temp_dir)
-            video_filename = f"{video_id}.mp4"
-            video_path = temp_path / video_filename
-            
+        with ExitStack() as media_stack:
             bucket_prefix = f"{settings.minio_bucket_name}/"
             if video_minio_path.startswith(bucket_prefix):
                 object_name = video_minio_path[len(bucket_prefix):]
@@ -147,16 +142,8 @@ def extract_video_audio(self, video_id: str, project_id: int, user_id: int, vide
             _update_task_status(celery_task_id, ProcessingTaskStatus.RUNNING, 30, "The video file is being downloaded.", video_id=video_id)
             self.update_state(state='PROGRESS', meta={'progress': 30, 'stage': ProcessingStage.EXTRACT_AUDIO, 'message': 'The video file is being downloaded.'})
             
-            video_url = run_async(minio_service.get_file_url(object_name, expiry=3600))
-            if not video_url:
-                raise Exception("无法获取视频文件URL")
-            
-            response = requests.get(video_url, stream=True)
-            response.raise_for_status()
-            
-            with open(video_path, 'wb') as f:
-                for chunk in response.iter_content(chunk_size=8192):
-                    f.write(chunk)
+            # 通过节点本地媒体缓存获取源视频，同一节点上的任务只下载一次
+            video_path = Path(media_stack.enter_context(media_cache.local_path(object_name)))
             
             _update_task_status(celery_task_id, ProcessingTaskStatus.RUNNING, 70, "extracting audio", video_id=video_id)
             self.update_state(state='PROGRESS', meta={'progress': 70, 'stage': ProcessingStage.EXTRACT_AUDIO, 'message': 'extracting audio'})
@@ -170,41 +157,6 @@ def extract_video_audio(self, video_id: str, project_id: int, user_id: int, vide
                 )
             )
             
-            # 检查并转换音频采样率（如果需要）
-            if result.get('success'):
-                try:
-                    # 音频文件已经在临时目录中，直接检查本地文件
-                    audio_filename = result['audio_filename']
-                    audio_temp_path = temp_path / audio_filename
-                    
-                    # 检查并转换采样率
-                    converted_audio_path = run_async(
-                        audio_processor.convert_audio_sample_rate(str(audio_temp_path), 16000)
-                    )
-                    
-                    # 如果采样率被转换，需要重新上传文件
-                    if converted_audio_path != str(audio_temp_path):
-                        # 重新上传转换后的音频文件
-                        audio_url = run_async(
-                            minio_service.upload_file(
-                                converted_audio_path,
-                                result['object_name'],
-                                f"audio/{result['audio_format']}"
-                            )
-                        )
-                        
-                        if audio_url:
-                            # 更新结果中的音频路径和文件大小
-                            result['minio_path'] = audio_url
-                            result['file_size'] = Path(converted_audio_path).stat().st_size
-                            logger.info(f"音频采样率已转换并重新上传: {audio_url}")
-                        else:
-                            logger.error("转换后的音频文件上传失败")
-                            raise Exception("转换后的音频文件上传失败")
-                except Exception as e:
-                    logger.error(f"音频采样率检查/转换失败: {str(e)}")
-                    # 不中断整个流程，继续使用原始音频
-            
             if result.get('success'):
                 try:
                     # 更新处理任务的output_data
@@ -1,9 +1,10 @@
 import os
+import wave
+import struct
 import argparse
+from math import gcd
 from pydub import AudioSegment
-from pydub.silence import detect_silence, detect_nonsilent
 import numpy as np
-import matplotlib.pyplot as plt
 from collections import Counter
 
 # 默认参数
@@ -36,11 +37,220 @@ def load_audio(file_path):
     print(f"成功加载音频，长度: {len(audio)/1000:.2f}秒")
     return audio
 
+class AudioEnvelope:
+    """
+    基于NumPy的音频能量包络
+
+    一次性计算每毫秒的平方和并做前缀和，任意[start, end)毫秒区间的RMS都可以O(1)得到，
+    静音检测的阈值扫描、能量最低点搜索都直接从包络中向量化计算，不再逐窗口切片AudioSegment。
+    毫秒到采样帧的换算与pydub一致（int(ms * frame_rate / 1000)），RMS取整方式与audioop.rms一致。
+    """
+
+    ENERGY_CHUNK_MS = 60000  # 计算包络时每次读入的时长，避免一次性展开整个文件
+    WINDOW_BATCH = 600000  # 静音检测时每批计算的窗口数
+
+    def __init__(self, samples, frame_rate, channels, sample_width):
+        """
+        Args:
+            samples: 交错排列的PCM采样数组（可以是np.memmap）
+            frame_rate: 采样率
+            channels: 声道数
+            sample_width: 采样字节数
+        """
+        self.samples = samples
+        self.frame_rate = frame_rate
+        self.channels = channels
+        self.sample_width = sample_width
+        self.frame_count = len(samples) // channels
+        self.duration_ms = round(1000 * (self.frame_count / frame_rate))
+        self.max_possible_amplitude = (2 ** (sample_width * 8)) / 2
+        # 每个毫秒边界对应的采样帧（与pydub的_parse_position一致，末尾可能超出实际帧数）
+        self._frame_index = (np.arange(self.duration_ms + 1) * (frame_rate / 1000.0)).astype(np.int64)
+        self._cumulative_energy = self._compute_cumulative_energy()
+
+    def __len__(self):
+        return self.duration_ms
+
+    @classmethod
+    def from_segment(cls, audio):
+        """从pydub的AudioSegment构造（共享底层数据，不复制）"""
+        dtype = {1: np.int8, 2: '<i2', 4: '<i4'}[audio.sample_width]
+        samples = np.frombuffer(audio.raw_data, dtype=dtype)
+        return cls(samples, audio.frame_rate, audio.channels, audio.sample_width)
+
+    @classmethod
+    def from_file(cls, file_path):
+        """PCM WAV通过内存映射读取，其他格式先用pydub解码"""
+        if os.path.splitext(file_path)[1].lower() == '.wav':
+            layout = _read_pcm_wav_layout(file_path)
+            if layout:
+                dtype = {2: '<i2', 4: '<i4'}[layout['sample_width']]
+                frame_bytes = layout['sample_width'] * layout['channels']
+                data_size = layout['data_size'] - layout['data_size'] % frame_bytes
+                samples = np.memmap(file_path, dtype=dtype, mode='r',
+                                    offset=layout['data_offset'], shape=(data_size // layout['sample_width'],))
+                return cls(samples, layout['frame_rate'], layout['channels'], layout['sample_width'])
+        return cls.from_segment(load_audio(file_path))
+
+    def _compute_cumulative_energy(self):
+        """按毫秒累加采样平方和，返回长度为duration_ms+1的前缀和"""
+        # 16位采样用int64精确累加；32位采样的平方和可能溢出int64，改用float64
+        accumulate_dtype = np.int64 if self.sample_width <= 2 else np.float64
+        cumulative = np.zeros(self.duration_ms + 1, dtype=accumulate_dtype)
+        frame_bounds = np.minimum(self._frame_index, self.frame_count)
+
+        for chunk_start in range(0, self.duration_ms, self.ENERGY_CHUNK_MS):
+            chunk_end = min(chunk_start + self.ENERGY_CHUNK_MS, self.duration_ms)
+            bounds = frame_bounds[chunk_start:chunk_end + 1]
+            chunk = np.asarray(
+                self.samples[bounds[0] * self.channels:bounds[-1] * self.channels], dtype=accumulate_dtype
+            )
+            running = np.concatenate(([0], np.cumsum(chunk * chunk)))
+            offsets = (bounds[1:] - bounds[0]) * self.channels
+            cumulative[chunk_start + 1:chunk_end + 1] = cumulative[chunk_start] + running[offsets]
+        return cumulative
+
+    def window_rms(self, starts, ends):
+        """
+        批量计算[starts, ends)毫秒区间的RMS
+
+        与pydub切片后取.rms的结果一致：超出音频末尾的部分按静音补齐并计入采样数。
+        """
+        starts = np.minimum(np.asarray(starts, dtype=np.int64), self.duration_ms)
+        ends = np.minimum(np.asarray(ends, dtype=np.int64), self.duration_ms)
+        energy = (self._cumulative_energy[ends] - self._cumulative_energy[starts]).astype(np.float64)
+        sample_counts = (self._frame_index[ends] - self._frame_index[starts]) * self.channels
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rms = np.floor(np.sqrt(energy / sample_counts))
+        return np.where(sample_counts > 0, rms, 0.0)
+
+    def window_dbfs(self, starts, ends):
+        """批量计算[starts, ends)毫秒区间的dBFS，完全静音时为-inf"""
+        rms = self.window_rms(starts, ends)
+        with np.errstate(divide='ignore'):
+            return 20 * np.log10(rms / self.max_possible_amplitude)
+
+    def detect_silence(self, min_silence_len=1000, silence_thresh=-16):
+        """与pydub.silence.detect_silence(seek_step=1)结果相同的向量化实现"""
+        seg_len = self.duration_ms
+        if seg_len < min_silence_len:
+            return []
+
+        threshold = (10 ** (float(silence_thresh) / 20)) * self.max_possible_amplitude
+        # 分批计算窗口RMS，控制临时数组的内存占用
+        silent_parts = []
+        last_start = seg_len - min_silence_len
+        for batch_start in range(0, last_start + 1, self.WINDOW_BATCH):
+            starts = np.arange(batch_start, min(batch_start + self.WINDOW_BATCH, last_start + 1), dtype=np.int64)
+            silent_parts.append(starts[self.window_rms(starts, starts + min_silence_len) <= threshold])
+        silent_starts = np.concatenate(silent_parts)
+        if not silent_starts.size:
+            return []
+
+        # 相邻静音窗口起点间隔超过min_silence_len时才断开，与pydub合并重叠区间的规则一致
+        breaks = np.nonzero(np.diff(silent_starts) > min_silence_len)[0]
+        range_starts = np.concatenate((silent_starts[:1], silent_starts[breaks + 1]))
+        range_ends = np.concatenate((silent_starts[breaks], silent_starts[-1:])) + min_silence_len
+        return [[int(start), int(end)] for start, end in zip(range_starts, range_ends)]
+
+    def detect_nonsilent(self, min_silence_len=1000, silence_thresh=-16):
+        """与pydub.silence.detect_nonsilent(seek_step=1)结果相同"""
+        silent_ranges = self.detect_silence(min_silence_len, silence_thresh)
+        seg_len = self.duration_ms
+        if not silent_ranges:
+            return [[0, seg_len]]
+        if silent_ranges[0][0] == 0 and silent_ranges[0][1] == seg_len:
+            return []
+
+        nonsilent_ranges = []
+        prev_end = 0
+        for start, end in silent_ranges:
+            nonsilent_ranges.append([prev_end, start])
+            prev_end = end
+        if silent_ranges[-1][1] != seg_len:
+            nonsilent_ranges.append([prev_end, seg_len])
+        if nonsilent_ranges[0] == [0, 0]:
+            nonsilent_ranges.pop(0)
+        return nonsilent_ranges
+
+    def segment_length(self, start_ms, end_ms):
+        """audio[start_ms:end_ms]的长度（毫秒），与pydub一致"""
+        start_ms = min(start_ms, self.duration_ms)
+        end_ms = min(end_ms, self.duration_ms)
+        frames = max(0, int(self._frame_index[end_ms] - self._frame_index[start_ms]))
+        return round(1000 * (frames / self.frame_rate))
+
+    def get_array_of_samples(self):
+        return self.samples
+
+    def export_segment(self, start_ms, end_ms, output_file):
+        """把[start_ms, end_ms)写为PCM WAV"""
+        frame_bounds = np.minimum(self._frame_index, self.frame_count)
+        start = int(frame_bounds[min(start_ms, self.duration_ms)]) * self.channels
+        end = int(frame_bounds[min(end_ms, self.duration_ms)]) * self.channels
+        with wave.open(output_file, 'wb') as wav:
+            wav.setnchannels(self.channels)
+            wav.setsampwidth(self.sample_width)
+            wav.setframerate(self.frame_rate)
+            wav.writeframes(np.ascontiguousarray(self.samples[start:end]).tobytes())
+
+
+def _read_pcm_wav_layout(file_path):
+    """解析PCM WAV的fmt和data块位置，不是16/32位整数PCM时返回None"""
+    with open(file_path, 'rb') as f:
+        header = f.read(12)
+        if len(header) < 12 or header[0:4] != b'RIFF' or header[8:12] != b'WAVE':
+            return None
+        file_size = os.fstat(f.fileno()).st_size
+        layout = {}
+        while True:
+            chunk_header = f.read(8)
+            if len(chunk_header) < 8:
+                return None
+            chunk_id, chunk_size = struct.unpack('<4sI', chunk_header)
+            body = f.tell()
+            if chunk_id == b'fmt ' and chunk_size >= 16:
+                audio_format, channels, frame_rate, _, _, bits = struct.unpack('<HHIIHH', f.read(16))
+                if audio_format == 0xFFFE and chunk_size >= 26:
+                    f.read(8)
+                    audio_format = struct.unpack('<H', f.read(2))[0]
+                layout.update({'audio_format': audio_format, 'channels': channels,
+                               'frame_rate': frame_rate, 'sample_width': bits // 8})
+            elif chunk_id == b'data':
+                # 流式写入的WAV中data大小可能为0或0xFFFFFFFF，以实际文件长度为准
+                if chunk_size in (0, 0xFFFFFFFF) or body + chunk_size > file_size:
+                    chunk_size = file_size - body
+                layout.update({'data_offset': body, 'data_size': chunk_size})
+                break
+            f.seek(body + chunk_size + (chunk_size & 1))
+
+    if layout.get('audio_format') != 1 or layout.get('sample_width') not in (2, 4) or not layout.get('channels'):
+        return None
+    return layout
+
+
+def load_envelope(file_path):
+    """加载音频并计算能量包络，PCM WAV不会整体读入内存"""
+    print(f"计算音频能量包络: {file_path}")
+    envelope = AudioEnvelope.from_file(file_path)
+    print(f"能量包络计算完成，长度: {len(envelope)/1000:.2f}秒")
+    return envelope
+
+
+def as_envelope(audio):
+    """接受AudioSegment或AudioEnvelope，统一返回AudioEnvelope"""
+    if isinstance(audio, AudioEnvelope):
+        return audio
+    return AudioEnvelope.from_segment(audio)
+
+
 def get_silence_chunks(audio, min_silence_len=DEFAULT_MIN_SILENCE_LEN, silence_thresh=DEFAULT_SILENCE_THRESH, debug=DEFAULT_DEBUG):
     """检测音频中的静音段"""
     print(f"使用参数检测静音: 最小静音长度={min_silence_len}ms, 静音阈值={silence_thresh}dB")
+    # 所有阈值尝试都基于同一个能量包络计算，不再重复扫描音频
+    envelope = as_envelope(audio)
+    detect_silence = envelope.detect_silence
     silence_chunks = detect_silence(
-        audio, 
         min_silence_len=min_silence_len,
         silence_thresh=silence_thresh
     )
@@ -50,7 +260,7 @@ def get_silence_chunks(audio, min_silence_len=DEFAULT_MIN_SILENCE_LEN, silence_t
         print("未检测到静音，尝试更宽松的参数...")
         for thresh in [silence_thresh + 5, silence_thresh + 10, silence_thresh + 15]:
             print(f"  尝试静音阈值: {thresh}dB")
-            silence_chunks = detect_silence(audio, min_silence_len=min_silence_len, silence_thresh=thresh)
+            silence_chunks = detect_silence(min_silence_len=min_silence_len, silence_thresh=thresh)
             if len(silence_chunks) > 0:
                 print(f"  使用阈值 {thresh}dB 检测到 {len(silence_chunks)} 个静音段")
                 break
@@ -59,12 +269,12 @@ def get_silence_chunks(audio, min_silence_len=DEFAULT_MIN_SILENCE_LEN, silence_t
     if len(silence_chunks) == 0:
         min_silence_len = min_silence_len // 2
         print(f"仍未检测到静音，降低最小静音长度至 {min_silence_len}ms")
-        silence_chunks = detect_silence(audio, min_silence_len=min_silence_len, silence_thresh=silence_thresh + 15)
+        silence_chunks = detect_silence(min_silence_len=min_silence_len, silence_thresh=silence_thresh + 15)
     
     # 如果上面的方法都失败了，尝试检测非静音段，然后取反
     if len(silence_chunks) == 0:
         print("所有常规方法都失败了，尝试检测非静音段...")
-        non_silent_chunks = detect_nonsilent(audio, min_silence_len=100, silence_thresh=silence_thresh + 20)
+        non_silent_chunks = envelope.detect_nonsilent(min_silence_len=100, silence_thresh=silence_thresh + 20)
         
         # 从非静音段构造静音段
         if non_silent_chunks:
@@ -78,8 +288,8 @@ def get_silence_chunks(audio, min_silence_len=DEFAULT_MIN_SILENCE_LEN, silence_t
                 silence_chunks.append((non_silent_chunks[i][1], non_silent_chunks[i+1][0]))
             
             # 添加最后一个非静音段到结束
-            if non_silent_chunks[-1][1] < len(audio):
-                silence_chunks.append((non_silent_chunks[-1][1], len(audio)))
+            if non_silent_chunks[-1][1] < len(envelope):
+                silence_chunks.append((non_silent_chunks[-1][1], len(envelope)))
     
     print(f"最终检测到 {len(silence_chunks)} 个静音段")
     
@@ -93,6 +303,7 @@ def get_silence_chunks(audio, min_silence_len=DEFAULT_MIN_SILENCE_LEN, silence_t
         
         # 绘制静音长度分布图
         if debug and len(silence_lengths) > 5:
+            import matplotlib.pyplot as plt
             plt.figure(figsize=(10, 6))
             plt.hist(silence_lengths, bins=50)
             plt.xlabel('Silence Length (ms)')
@@ -174,26 +385,17 @@ def find_energy_minimum(audio, start_time, end_time, window_size=200):
     if end_time <= start_time:
         return start_time
     
-    # 提取音频片段
-    segment = audio[start_time:end_time]
-    if len(segment) < window_size:
+    envelope = as_envelope(audio)
+    segment_length = envelope.segment_length(start_time, end_time)
+    if segment_length < window_size:
         return (start_time + end_time) // 2
     
-    # 计算滑动窗口能量
-    min_energy = float('inf')
-    min_pos = start_time
-    
-    # 使用小窗口计算局部能量
-    for win_start in range(0, len(segment) - window_size, window_size // 2):
-        win_end = win_start + window_size
-        window = segment[win_start:win_end]
-        # 使用RMS能量
-        energy = window.rms
-        if energy < min_energy:
-            min_energy = energy
-            min_pos = start_time + win_start + window_size // 2
-    
-    return min_pos
+    # 以半个窗口为步长的滑动窗口RMS能量，一次向量化计算
+    window_starts = start_time + np.arange(0, segment_length - window_size, window_size // 2, dtype=np.int64)
+    if not window_starts.size:
+        return start_time
+    energies = envelope.window_rms(window_starts, window_starts + window_size)
+    return int(window_starts[np.argmin(energies)]) + window_size // 2
 
 def get_split_points(audio, audio_length, silence_chunks,
                      max_segment_len=DEFAULT_MAX_SEGMENT_LEN,
@@ -202,6 +404,8 @@ def get_split_points(audio, audio_length, silence_chunks,
                      pause_threshold=DEFAULT_PAUSE_THRESHOLD,
                      search_window=DEFAULT_SEARCH_WINDOW):
     """确定切割点，优先在句子边界处切割"""
+    # 能量最低点搜索共用同一个包络
+    audio = as_envelope(audio)
     # 将静音点分类
     sentence_boundaries, within_sentence_pauses = classify_silence_points(silence_chunks, pause_threshold)
     
@@ -317,7 +521,7 @@ def split_audio(input_file=DEFAULT_INPUT_FILE,
     try:
         # 加载音频
         print(f"加载音频文件: {input_file}")
-        audio = load_audio(input_file)
+        audio = load_envelope(input_file)
         
         # 创建输出目录
         if output_dir is None:
@@ -370,12 +574,9 @@ def split_audio(input_file=DEFAULT_INPUT_FILE,
             start_time = split_points[i]
             end_time = split_points[i + 1]
             
-            # 切割片段
-            segment = audio[start_time:end_time]
-            
-            # 保存片段
+            # 切割并保存片段
             output_file = os.path.join(output_dir, f"segment_{i+1:03d}.wav")
-            segment.export(output_file, format="wav")
+            audio.export_segment(start_time, end_time, output_file)
             output_files.append(output_file)
             
             print(f"  片段 {i+1:03d}: {start_time/1000:.2f}s - {end_time/1000:.2f}s ({(end_time-start_time)/1000:.2f}s)")
@@ -389,40 +590,43 @@ def split_audio(input_file=DEFAULT_INPUT_FILE,
         return []  # 返回空列表表示失败
 
 def detect_sentence_energy(audio, window_size=1000, step_size=100):
-    """使用能量检测句子结构"""
+    """使用能量检测句子结构（窗口和步长以采样点为单位）"""
     print("使用能量检测句子结构...")
     
-    # 将音频转换为数组进行处理
-    samples = np.array(audio.get_array_of_samples())
+    samples = as_envelope(audio).get_array_of_samples()
+    positions = np.arange(0, len(samples) - window_size, step_size, dtype=np.int64)
+    if not positions.size:
+        return []
     
-    # 计算滑动窗口能量
-    energies = []
-    positions = []
-    for start in range(0, len(samples) - window_size, step_size):
-        window = samples[start:start+window_size]
-        energy = np.sum(window**2) / window_size
-        energies.append(energy)
-        positions.append(start)
+    # 以窗口和步长的最大公约数为块，分块累加平方和后用前缀和得到每个窗口的能量。
+    # 平方在采样原始类型上计算，与逐窗口window**2的结果保持一致
+    block = gcd(window_size, step_size)
+    block_count = (int(positions[-1]) + window_size) // block
+    block_sums = np.empty(block_count, dtype=np.int64)
+    chunk_blocks = max(1, 1000000 // block)
+    for first in range(0, block_count, chunk_blocks):
+        last = min(first + chunk_blocks, block_count)
+        chunk = np.asarray(samples[first * block:last * block])
+        block_sums[first:last] = (chunk * chunk).astype(np.int64).reshape(-1, block).sum(axis=1)
+    cumulative = np.concatenate(([0], np.cumsum(block_sums)))
+    energies = (cumulative[(positions + window_size) // block] - cumulative[positions // block]) / window_size
     
     # 归一化能量
-    energies = np.array(energies)
-    norm_energies = (energies - np.min(energies)) / (np.max(energies) - np.min(energies))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        norm_energies = (energies - np.min(energies)) / (np.max(energies) - np.min(energies))
     
-    # 检测低能量区域（可能是句子边界）
+    # 检测低能量区域（可能是句子边界）：进入低能量到离开低能量之间的区间
     threshold = 0.2  # 能量阈值
-    low_energy_regions = []
-    in_low_region = False
-    start_pos = 0
+    low = (norm_energies < threshold).astype(np.int8)
+    transitions = np.diff(np.concatenate(([0], low)))
+    enter_indices = np.nonzero(transitions == 1)[0]
+    exit_indices = np.nonzero(transitions == -1)[0]
+    enter_indices = enter_indices[:len(exit_indices)]
     
-    for i, energy in enumerate(norm_energies):
-        if not in_low_region and energy < threshold:
-            in_low_region = True
-            start_pos = positions[i]
-        elif in_low_region and energy >= threshold:
-            in_low_region = False
-            end_pos = positions[i]
-            if end_pos - start_pos > 300:  # 忽略太短的低能量区域
-                low_energy_regions.append((start_pos, end_pos))
+    start_positions = positions[enter_indices]
+    end_positions = positions[exit_indices]
+    keep = end_positions - start_positions > 300  # 忽略太短的低能量区域
+    low_energy_regions = [(int(start), int(end)) for start, end in zip(start_positions[keep], end_positions[keep])]
     
     print(f"检测到 {len(low_energy_regions)} 个低能量区域，可能是句子边界")
     return low_energy_regions
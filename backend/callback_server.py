@@ -2,6 +2,13 @@
 """
 独立TUS回调服务器
 运行在独立容器中，专门处理TUS ASR的回调请求
+
+回调请求只做校验并写入Redis Stream，立即返回200；由消费者组中的消费者
+（本进程内的线程，或以 CALLBACK_ROLE=consumer 运行在其他进程/主机上的实例）
+完成结果保存、数据库更新和SRT下载，失败的消息在空闲超时后被重新认领重试，
+超过最大尝试次数后转入死信Stream。
+
+CALLBACK_ROLE: all=接收回调并处理队列（默认）, server=只接收回调, consumer=只处理队列
 """
 
 import asyncio
@@ -10,7 +17,9 @@ import json
 import time
 import logging
 import signal
+import socket
 import pickle
+import threading
 from typing import Dict, Any, Optional
 from aiohttp import web
 import redis
@@ -62,6 +71,20 @@ class StandaloneCallbackServer:
         self.redis_key_prefix = os.getenv('REDIS_KEY_PREFIX', 'tus_callback:')
         self.result_key_prefix = os.getenv('REDIS_RESULT_PREFIX', 'tus_result:')
         self.stats_key = os.getenv('REDIS_STATS_KEY', 'tus_callback_stats')
+        self.result_channel_prefix = os.getenv('REDIS_RESULT_CHANNEL_PREFIX', 'tus_result_channel:')
+
+        # Redis Streams回调队列
+        self.role = os.getenv('CALLBACK_ROLE', 'all')
+        self.stream_key = os.getenv('CALLBACK_STREAM_KEY', 'tus_callback_stream')
+        self.dead_letter_key = os.getenv('CALLBACK_DEAD_LETTER_KEY', 'tus_callback_dead_letter')
+        self.consumer_group = os.getenv('CALLBACK_CONSUMER_GROUP', 'tus_callback_workers')
+        self.consumer_count = int(os.getenv('CALLBACK_CONSUMERS', '4'))
+        self.max_attempts = int(os.getenv('CALLBACK_MAX_ATTEMPTS', '5'))
+        self.claim_idle_ms = int(os.getenv('CALLBACK_CLAIM_IDLE_MS', '60000'))  # 未确认消息空闲超过该时长后被重新认领
+        self.stream_maxlen = int(os.getenv('CALLBACK_STREAM_MAXLEN', '100000'))
+        self.stream_stats_key = f"{self.stats_key}:stream"
+        self.processing_times_key = f"{self.stats_key}:processing_ms"
+        self._consumer_threads = []
 
         self._server_running = False
         self._redis_client = None
@@ -200,51 +223,231 @@ class StandaloneCallbackServer:
                 logger.error("❌ 回调中缺少task_id")
                 return web.Response(status=400, text='Missing task_id')
 
-            logger.info(f"📝 处理TaskID: {task_id}")
-
-            # 检查任务是否在Redis中注册
-            task_key = self._get_task_key(task_id)
-            task_exists = self._redis_client.exists(task_key)
-
-            if not task_exists:
-                logger.warning(f"⚠️ 任务 {task_id} 未在Redis中找到，可能已超时")
-            else:
-                logger.info(f"✅ 任务 {task_id} 在Redis中找到")
-
-            # 处理任务结果
-            if payload.get('status') == 'completed':
-                logger.info(f"✅ 任务 {task_id} 完成，保存结果")
-                self._complete_task(task_id, payload)
-            elif payload.get('status') == 'failed':
-                # 增强失败callback处理
-                error_msg = payload.get('error_message', '任务失败')
-                failed_at = payload.get('failed_at')
-                filename = payload.get('filename', '')
-
-                logger.error(f"❌ 任务 {task_id} 失败: {error_msg}")
-                if filename:
-                    logger.error(f"📁 失败文件: {filename}")
-                if failed_at:
-                    logger.error(f"⏰ 失败时间: {failed_at}")
-
-                # 保存详细的失败信息
-                self._fail_task(task_id, error_msg, payload)
-            else:
-                # 兼容其他失败状态
-                error_msg = payload.get('error_message', '任务失败')
-                logger.error(f"❌ 任务 {task_id} 失败: {error_msg}")
-                self._fail_task(task_id, error_msg)
+            # 写入回调队列后立即返回，结果保存和数据库更新由消费者完成
+            try:
+                entry_id = self._enqueue_callback(payload)
+            except Exception as enqueue_error:
+                # 返回错误让ASR服务重试回调
+                logger.error(f"❌ 回调写入队列失败: {enqueue_error}")
+                return web.Response(status=503, text='Queue Unavailable')
 
             # 更新统计
             self._increment_stats('received_callbacks')
 
-            logger.info(f"✅ 任务 {task_id} 处理完成")
+            logger.info(f"✅ 任务 {task_id} 回调已入队: {entry_id.decode('utf-8') if isinstance(entry_id, bytes) else entry_id}")
             return web.Response(text='OK')
 
         except Exception as e:
             logger.error(f"❌ 回调处理错误: {e}", exc_info=True)
             return web.Response(status=500, text=str(e))
 
+    def _enqueue_callback(self, payload: Dict[str, Any]):
+        """把回调写入Redis Stream，超过长度上限时近似裁剪最早的消息"""
+        return self._redis_client.xadd(
+            self.stream_key,
+            {'payload': json.dumps(payload), 'received_at': str(time.time())},
+            maxlen=self.stream_maxlen,
+            approximate=True
+        )
+
+    def _process_callback(self, payload: Dict[str, Any]):
+        """处理一条回调：保存结果、通知等待者并更新数据库，失败时抛出异常由消费者重试"""
+        task_id = payload['task_id']
+        logger.info(f"📝 处理TaskID: {task_id}")
+
+        # 检查任务是否在Redis中注册
+        task_key = self._get_task_key(task_id)
+        task_exists = self._redis_client.exists(task_key)
+
+        if not task_exists:
+            logger.warning(f"⚠️ 任务 {task_id} 未在Redis中找到，可能已超时")
+        else:
+            logger.info(f"✅ 任务 {task_id} 在Redis中找到")
+
+        # 处理任务结果
+        if payload.get('status') == 'completed':
+            logger.info(f"✅ 任务 {task_id} 完成，保存结果")
+            self._complete_task(task_id, payload)
+        elif payload.get('status') == 'failed':
+            # 增强失败callback处理
+            error_msg = payload.get('error_message', '任务失败')
+            failed_at = payload.get('failed_at')
+            filename = payload.get('filename', '')
+
+            logger.error(f"❌ 任务 {task_id} 失败: {error_msg}")
+            if filename:
+                logger.error(f"📁 失败文件: {filename}")
+            if failed_at:
+                logger.error(f"⏰ 失败时间: {failed_at}")
+
+            # 保存详细的失败信息
+            self._fail_task(task_id, error_msg, payload)
+        else:
+            # 兼容其他失败状态
+            error_msg = payload.get('error_message', '任务失败')
+            logger.error(f"❌ 任务 {task_id} 失败: {error_msg}")
+            self._fail_task(task_id, error_msg)
+
+        logger.info(f"✅ 任务 {task_id} 处理完成")
+
+    def _ensure_consumer_group(self):
+        """创建消费者组，从Stream开头消费，已存在时忽略"""
+        try:
+            self._redis_client.xgroup_create(self.stream_key, self.consumer_group, id='0', mkstream=True)
+            logger.info(f"✅ 已创建回调消费者组: {self.consumer_group}")
+        except redis.ResponseError as e:
+            if 'BUSYGROUP' not in str(e):
+                raise
+
+    def start_consumers(self):
+        """启动本进程内的消费者线程"""
+        self._ensure_consumer_group()
+        prefix = f"{socket.gethostname()}-{os.getpid()}"
+        for index in range(self.consumer_count):
+            thread = threading.Thread(
+                target=self._consume_loop,
+                args=(f"{prefix}-{index}",),
+                name=f"callback-consumer-{index}",
+                daemon=True
+            )
+            thread.start()
+            self._consumer_threads.append(thread)
+        logger.info(f"🧵 已启动 {self.consumer_count} 个回调消费者 (组: {self.consumer_group})")
+
+    def _consume_loop(self, consumer_name: str):
+        """消费者主循环：优先认领其他消费者超时未确认的消息，再读取新消息"""
+        while self._server_running:
+            try:
+                entries = self._claim_stale_entries(consumer_name)
+                if not entries:
+                    response = self._redis_client.xreadgroup(
+                        self.consumer_group, consumer_name, {self.stream_key: '>'}, count=10, block=2000
+                    )
+                    entries = response[0][1] if response else []
+                for entry_id, fields in entries:
+                    self._handle_stream_entry(entry_id, fields)
+            except Exception as e:
+                logger.error(f"❌ 回调消费者 {consumer_name} 出错: {e}", exc_info=True)
+                time.sleep(1)
+
+    def _claim_stale_entries(self, consumer_name: str) -> list:
+        """认领空闲超过claim_idle_ms的未确认消息（消费者崩溃或处理失败待重试）"""
+        response = self._redis_client.xautoclaim(
+            self.stream_key, self.consumer_group, consumer_name,
+            min_idle_time=self.claim_idle_ms, start_id='0-0', count=10
+        )
+        # 已被裁剪的消息没有字段，直接确认
+        entries = []
+        for entry_id, fields in response[1]:
+            if fields:
+                entries.append((entry_id, fields))
+            else:
+                self._redis_client.xack(self.stream_key, self.consumer_group, entry_id)
+        return entries
+
+    def _handle_stream_entry(self, entry_id, fields: Dict[bytes, bytes]):
+        """处理一条消息，成功后确认；失败时保留在待确认列表中等待重试，超过最大尝试次数转入死信"""
+        started = time.time()
+        try:
+            payload = json.loads(fields[b'payload'])
+        except Exception as e:
+            logger.error(f"❌ 无法解析回调消息 {entry_id}: {e}")
+            self._dead_letter(entry_id, fields, e, 1)
+            return
+
+        try:
+            self._process_callback(payload)
+        except Exception as e:
+            attempts = self._get_delivery_count(entry_id)
+            if attempts >= self.max_attempts:
+                self._dead_letter(entry_id, fields, e, attempts)
+            else:
+                self._increment_stream_stat('retries')
+                logger.warning(
+                    f"⚠️ 回调消息 {entry_id} 第 {attempts} 次处理失败，"
+                    f"{self.claim_idle_ms / 1000:.0f}秒后重试: {e}"
+                )
+            return
+
+        elapsed_ms = (time.time() - started) * 1000
+        pipe = self._redis_client.pipeline()
+        pipe.xack(self.stream_key, self.consumer_group, entry_id)
+        pipe.hincrby(self.stream_stats_key, 'processed', 1)
+        pipe.hincrbyfloat(self.stream_stats_key, 'processing_ms_total', elapsed_ms)
+        pipe.lpush(self.processing_times_key, f"{elapsed_ms:.1f}")
+        pipe.ltrim(self.processing_times_key, 0, 999)
+        pipe.execute()
+
+    def _get_delivery_count(self, entry_id) -> int:
+        """消息已被投递的次数"""
+        pending = self._redis_client.xpending_range(
+            self.stream_key, self.consumer_group, min=entry_id, max=entry_id, count=1
+        )
+        return pending[0]['times_delivered'] if pending else 1
+
+    def _dead_letter(self, entry_id, fields: Dict[bytes, bytes], error: Exception, attempts: int):
+        """把无法处理的消息转入死信Stream并确认原消息"""
+        dead_fields = dict(fields)
+        dead_fields.update({
+            'source_id': entry_id,
+            'error': str(error)[:1000],
+            'attempts': str(attempts),
+            'dead_at': str(time.time())
+        })
+        # 先确认原消息，同一消息被多个消费者同时认领时只有确认成功的一方写入死信
+        if not self._redis_client.xack(self.stream_key, self.consumer_group, entry_id):
+            return
+        pipe = self._redis_client.pipeline()
+        pipe.xadd(self.dead_letter_key, dead_fields, maxlen=self.stream_maxlen, approximate=True)
+        pipe.hincrby(self.stream_stats_key, 'dead_lettered', 1)
+        pipe.execute()
+        logger.error(f"☠️ 回调消息 {entry_id} 处理 {attempts} 次失败，已转入死信: {error}")
+
+    def _increment_stream_stat(self, stat_name: str):
+        try:
+            self._redis_client.hincrby(self.stream_stats_key, stat_name, 1)
+        except Exception as e:
+            logger.error(f"❌ 更新队列统计失败: {e}")
+
+    def _get_stream_stats(self) -> Dict[str, Any]:
+        """回调队列统计：积压、待确认、最早待确认消息的等待时长和处理耗时"""
+        def decode(value):
+            return value.decode('utf-8') if isinstance(value, bytes) else value
+
+        stats = {
+            'stream_length': self._redis_client.xlen(self.stream_key),
+            'dead_letter_length': self._redis_client.xlen(self.dead_letter_key)
+        }
+        try:
+            groups = self._redis_client.xinfo_groups(self.stream_key)
+        except redis.ResponseError:
+            # Stream尚未创建
+            groups = []
+        group = next((g for g in groups if decode(g['name']) == self.consumer_group), None)
+        if group:
+            stats['consumers'] = group['consumers']
+            stats['pending'] = group['pending']
+            # lag: 尚未投递给任何消费者的消息数
+            stats['lag'] = group.get('lag')
+            if group['pending']:
+                summary = self._redis_client.xpending(self.stream_key, self.consumer_group)
+                oldest_ms = int(decode(summary['min']).split('-')[0])
+                stats['oldest_pending_seconds'] = round(time.time() - oldest_ms / 1000, 1)
+
+        counters = {decode(k): float(v) for k, v in self._redis_client.hgetall(self.stream_stats_key).items()}
+        processed = int(counters.get('processed', 0))
+        stats.update({
+            'processed': processed,
+            'retries': int(counters.get('retries', 0)),
+            'dead_lettered': int(counters.get('dead_lettered', 0)),
+            'avg_processing_ms': round(counters.get('processing_ms_total', 0) / processed, 1) if processed else 0.0
+        })
+        recent = sorted(float(v) for v in self._redis_client.lrange(self.processing_times_key, 0, -1))
+        if recent:
+            stats['p50_processing_ms'] = recent[len(recent) // 2]
+            stats['p95_processing_ms'] = recent[min(len(recent) - 1, int(len(recent) * 0.95))]
+        return stats
+
     def _complete_task(self, task_id: str, result: Dict[str, Any]):
         """完成任务并设置结果"""
         try:
@@ -264,6 +467,7 @@ class StandaloneCallbackServer:
                 300,  # 5分钟过期
                 pickle.dumps(result_data)
             )
+            self._notify_result(task_id, 'completed')
 
             logger.info(f"✅ 任务 {task_id} 结果已保存到Redis")
 
@@ -279,6 +483,7 @@ class StandaloneCallbackServer:
 
         except Exception as e:
             logger.error(f"❌ 保存任务结果失败: {e}")
+            raise
 
     def _fail_task(self, task_id: str, error_message: str, full_payload: Dict[str, Any] = None):
         """标记任务失败"""
@@ -322,6 +527,7 @@ class StandaloneCallbackServer:
                 300,  # 5分钟过期
                 pickle.dumps(result_data)
             )
+            self._notify_result(task_id, 'failed')
 
             # 从任务注册表中删除
             task_key = self._get_task_key(task_id)
@@ -337,6 +543,16 @@ class StandaloneCallbackServer:
 
         except Exception as e:
             logger.error(f"❌ 保存失败状态失败: {e}")
+            raise
+
+    def _notify_result(self, task_id: str, status: str):
+        """结果写入Redis后发布通知，唤醒等待该任务的客户端"""
+        try:
+            receivers = self._redis_client.publish(f"{self.result_channel_prefix}{task_id}", status)
+            logger.info(f"📣 任务 {task_id} 结果通知已发布，订阅者: {receivers}")
+        except Exception as e:
+            # 通知失败时客户端仍会通过兜底轮询取到结果
+            logger.warning(f"发布任务 {task_id} 结果通知失败: {e}")
 
     def _increment_stats(self, stat_name: str):
         """增加统计计数"""
@@ -357,7 +573,8 @@ class StandaloneCallbackServer:
             return web.json_response({
                 'status': 'healthy',
                 'timestamp': time.time(),
-                'stats': stats
+                'stats': stats,
+                'stream': self._get_stream_stats()
             })
         except Exception as e:
             return web.json_response({
@@ -375,40 +592,59 @@ class StandaloneCallbackServer:
                 stats[key.decode('utf-8')] = int(value.decode('utf-8'))
 
             # 获取待处理任务数
-            pending_keys = self._redis_client.keys(f"{self.redis_key_prefix}*")
-            stats['pending_tasks'] = len(pending_keys)
+            stats['pending_tasks'] = self._count_keys(f"{self.redis_key_prefix}*")
 
             # 获取缓存结果数
-            result_keys = self._redis_client.keys(f"{self.result_key_prefix}*")
-            stats['cached_results'] = len(result_keys)
+            stats['cached_results'] = self._count_keys(f"{self.result_key_prefix}*")
 
             return stats
         except Exception as e:
             logger.error(f"获取统计信息失败: {e}")
             return {'error': str(e)}
 
-    async def create_app(self):
-        """创建aiohttp应用"""
+    def _count_keys(self, pattern: str, limit: int = None) -> int:
+        """用SCAN增量统计匹配的键数，避免KEYS阻塞Redis；limit用于诊断时提前停止"""
+        count = 0
+        for _ in self._redis_client.scan_iter(match=pattern, count=1000):
+            count += 1
+            if limit and count >= limit:
+                break
+        return count
+
+    def build_app(self) -> web.Application:
+        """构建aiohttp应用"""
         app = web.Application()
         app.router.add_post('/callback', self.callback_handler)
         app.router.add_get('/health', self.health_check)
         app.router.add_get('/stats', lambda request: web.json_response(self._get_stats()))
+        return app
 
-        runner = web.AppRunner(app)
-        await runner.setup()
-        site = web.TCPSite(runner, self.callback_host, self.callback_port)
-        await site.start()
-
-        logger.info(f"🚀 独立回调服务器启动成功!")
-        logger.info(f"📡 回调URL: http://{self.callback_host}:{self.callback_port}/callback")
-        logger.info(f"💚 健康检查URL: http://{self.callback_host}:{self.callback_port}/health")
-        logger.info(f"📊 统计URL: http://{self.callback_host}:{self.callback_port}/stats")
+    async def create_app(self):
+        """创建aiohttp应用并按CALLBACK_ROLE启动回调接收和队列消费者"""
+        if self.role in ('all', 'consumer'):
+            self.start_consumers()
+
+        runner = None
+        if self.role in ('all', 'server'):
+            runner = web.AppRunner(self.build_app())
+            await runner.setup()
+            site = web.TCPSite(runner, self.callback_host, self.callback_port)
+            await site.start()
+
+            logger.info(f"🚀 独立回调服务器启动成功!")
+            logger.info(f"📡 回调URL: http://{self.callback_host}:{self.callback_port}/callback")
+            logger.info(f"💚 健康检查URL: http://{self.callback_host}:{self.callback_port}/health")
+            logger.info(f"📊 统计URL: http://{self.callback_host}:{self.callback_port}/stats")
 
         # 保持运行
         while self._server_running:
             await asyncio.sleep(1)
 
         logger.info("独立回调服务器正在关闭...")
+        if runner:
+            await runner.cleanup()
+        for thread in self._consumer_threads:
+            thread.join(timeout=5)
 
     async def shutdown(self):
         """关闭服务器"""
@@ -425,12 +661,21 @@ class StandaloneCallbackServer:
             session = self.db_session_factory()
             logger.info(f"🔍 开始查找与TUSTaskID {task_id} 关联的ProcessingTask")
 
-            # 首先尝试从Redis中获取CeleryTaskID
-            celery_task_id = self._get_celery_task_id_from_redis(task_id)
-            logger.info(f"📋 从Redis获取到的CeleryTaskID: {celery_task_id}")
+            # 首先通过索引列tus_task_id直接查找
+            processing_task = session.query(ProcessingTask).filter(
+                ProcessingTask.tus_task_id == task_id
+            ).first()
+            if processing_task:
+                logger.info(f"✅ 通过tus_task_id索引找到关联任务: {task_id} -> ProcessingTask.id={processing_task.id}")
 
-            # 详细调试：检查Redis中的所有相关键
-            if not celery_task_id:
+            # 其次从Redis中获取CeleryTaskID
+            celery_task_id = None
+            if not processing_task:
+                celery_task_id = self._get_celery_task_id_from_redis(task_id)
+                logger.info(f"📋 从Redis获取到的CeleryTaskID: {celery_task_id}")
+
+            # 调试：检查Redis中的相关键（SCAN采样计数，不阻塞Redis）
+            if not processing_task and not celery_task_id:
                 logger.warning(f"🔍 未找到CeleryTaskID，调试Redis状态:")
                 try:
                     # 检查任务键
@@ -443,36 +688,29 @@ class StandaloneCallbackServer:
                     result_exists = self._redis_client.exists(result_key)
                     logger.info(f"  - 结果键 {result_key} 存在: {result_exists}")
 
-                    # 检查所有映射键
-                    all_mapping_keys = self._redis_client.keys("tus_celery_mapping:*")
-                    logger.info(f"  - 总映射键数量: {len(all_mapping_keys)}")
+                    # 检查映射键数量（超过上限时只报告下限）
+                    mapping_count = self._count_keys("tus_task_mapping:*", limit=10000)
+                    logger.info(f"  - 映射键数量: {mapping_count}{'+' if mapping_count >= 10000 else ''}")
 
-                    # 检查最近创建的任务键
-                    recent_task_keys = self._redis_client.keys(f"{self.redis_key_prefix}*")
-                    logger.info(f"  - 最近任务键数量: {len(recent_task_keys)}")
-                    if len(recent_task_keys) > 0:
-                        logger.info(f"  - 最近的任务键示例: {[key.decode('utf-8') for key in recent_task_keys[:3]]}")
+                    # 检查任务键示例
+                    sample_task_keys = []
+                    for key in self._redis_client.scan_iter(match=f"{self.redis_key_prefix}*", count=100):
+                        sample_task_keys.append(key.decode('utf-8'))
+                        if len(sample_task_keys) >= 3:
+                            break
+                    if sample_task_keys:
+                        logger.info(f"  - 任务键示例: {sample_task_keys}")
 
                 except Exception as debug_error:
                     logger.error(f"调试Redis状态失败: {debug_error}")
 
-            processing_task = None
-            if celery_task_id:
-                # 优先通过Celery任务ID查找
+            if not processing_task and celery_task_id:
+                # 通过Celery任务ID查找
                 processing_task = session.query(ProcessingTask).filter(
                     ProcessingTask.celery_task_id == celery_task_id
                 ).first()
                 logger.info(f"✅ 通过Celery任务ID找到关联任务: {celery_task_id} -> ProcessingTask.id={processing_task.id if processing_task else 'None'}")
 
-            if not processing_task:
-                # 回退到通过task_metadata查找
-                logger.info(f"🔍 尝试通过task_metadata查找TUSTaskID {task_id}")
-                processing_task = session.query(ProcessingTask).filter(
-                    ProcessingTask.task_metadata.like(f'%{task_id}%')
-                ).first()
-                if processing_task:
-                    logger.info(f"✅ 通过task_metadata找到关联任务: TUSTaskID {task_id} -> ProcessingTask.id={processing_task.id}")
-
             if not processing_task:
                 # 最后尝试：查找最近的相关任务
                 logger.info(f"🔍 尝试查找最近的相关ProcessingTask（过去1小时内）")
@@ -481,7 +719,8 @@ class StandaloneCallbackServer:
 
                 processing_task = session.query(ProcessingTask).filter(
                     ProcessingTask.created_at >= one_hour_ago,
-                    ProcessingTask.task_type.like('%tus%')
+                    ProcessingTask.task_type.like('%tus%'),
+                    ProcessingTask.tus_task_id.is_(None)
                 ).order_by(ProcessingTask.created_at.desc()).first()
 
                 if processing_task:
@@ -504,6 +743,8 @@ class StandaloneCallbackServer:
                 return
 
             logger.info(f"✅ 找到关联任务: ProcessingTask.id={processing_task.id}, celery_task_id={processing_task.celery_task_id}")
+            # 记录TUS任务ID，后续回调直接走索引查找
+            processing_task.tus_task_id = task_id
             logger.info(f"📋 ProcessingTask详细信息:")
             logger.info(f"  - task_type: {processing_task.task_type}")
             logger.info(f"  - task_name: {processing_task.task_name}")
@@ -558,6 +799,11 @@ class StandaloneCallbackServer:
                     try:
                         srt_content = self._download_srt_content_for_db(srt_url)
                         logger.info(f"✅ SRT内容下载成功，大小: {len(srt_content) if srt_content else 0} 字符")
+                        # 写入ASR结果缓存，相同音频再次请求时不再调用ASR
+                        if srt_content:
+                            from app.services.asr_cache import asr_result_cache
+                            if asr_result_cache.store_for_task_sync(task_id, srt_content):
+                                logger.info(f"✅ ASR结果已写入缓存: task_id={task_id}")
                     except Exception as e:
                         logger.error(f"❌ 下载SRT内容失败: {e}")
                         srt_content = None
@@ -624,6 +870,8 @@ class StandaloneCallbackServer:
                 session.close()
             except:
                 pass
+            # 由回调消费者重试
+            raise
 
     def _download_srt_content_for_db(self, srt_url: str) -> Optional[str]:
         """下载SRT内容用于存储到数据库"""
@@ -851,28 +1099,13 @@ class StandaloneCallbackServer:
                 except Exception as e:
                     logger.debug(f"解析任务数据失败: {e}")
 
-            # 如果任务数据中没有，尝试通过映射查找
-            # 这种情况下需要遍历所有可能的映射
+            # 任务数据中没有时，通过反向映射直接查找
             logger.info(f"🔍 尝试通过映射查找TUSTaskID {task_id} 对应的CeleryTaskID")
-
-            # 检查所有可能的映射键（这种效率较低，但作为回退方案）
-            for key_pattern in ["tus_celery_mapping:*"]:
-                matching_keys = self._redis_client.keys(key_pattern)
-                logger.info(f"🔍 找到 {len(matching_keys)} 个映射键")
-                for key in matching_keys:
-                    mapping_value = self._redis_client.get(key)
-                    if mapping_value:
-                        try:
-                            decoded_value = mapping_value.decode('utf-8')
-                            logger.debug(f"映射键 {key.decode('utf-8')} -> {decoded_value}")
-                            if decoded_value == task_id:
-                                celery_task_id = key.decode('utf-8').split(':', 1)[1]  # 提取CeleryTaskID
-                                logger.info(f"✅ 通过映射找到CeleryTaskID: {celery_task_id}")
-                                return celery_task_id
-                        except Exception as decode_error:
-                            logger.debug(f"解码映射值失败: {decode_error}")
-                    else:
-                        logger.debug(f"映射键 {key.decode('utf-8')} 没有值")
+            mapping_value = self._redis_client.get(f"tus_task_mapping:{task_id}")
+            if mapping_value:
+                celery_task_id = mapping_value.decode('utf-8')
+                logger.info(f"✅ 通过映射找到CeleryTaskID: {celery_task_id}")
+                return celery_task_id
 
             logger.info(f"⚠️ 未找到TUSTaskID {task_id} 对应的CeleryTaskID")
             return None
@@ -897,12 +1130,11 @@ class StandaloneCallbackServer:
                 logger.info(f"✅ 映射已存在，跳过恢复")
                 return
 
-            # 创建映射关系
-            self._redis_client.setex(
-                mapping_key,
-                1800,  # 30分钟过期（较短，因为这是事后恢复）
-                task_id
-            )
+            # 创建双向映射关系，30分钟过期（较短，因为这是事后恢复）
+            pipe = self._redis_client.pipeline()
+            pipe.setex(mapping_key, 1800, task_id)
+            pipe.setex(f"tus_task_mapping:{task_id}", 1800, celery_task_id)
+            pipe.execute()
 
             logger.info(f"✅ 映射关系恢复成功: {task_id} -> {celery_task_id}")
 
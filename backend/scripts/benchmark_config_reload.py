@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+下载请求前的配置刷新开销对比脚本：每次读取配置表并重建MinIO客户端 vs 按配置版本刷新
+
+使用方法:
+1. 默认负载（配置表45项，1000次请求）:
+   python scripts/benchmark_config_reload.py
+
+2. 使用真实Redis核对版本（核对间隔设为0，每次请求都读取一次版本号）:
+   python scripts/benchmark_config_reload.py --redis-url redis://localhost:6379/0
+
+说明: 配置表放在SQLite内存数据库中，不包含MySQL的网络往返，真实环境中reload模式的差距更大。
+- reload:    改动前的做法，每次请求 update_settings_from_db_sync + minio_service.reload_config()
+- versioned: config_version.ensure_current_sync()，版本未变化时不读取数据库也不重建客户端
+"""
+
+import sys
+import os
+import time
+import argparse
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+# 添加项目根目录到 Python 路径
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from app.models.system_config import SystemConfig
+from app.services.config_version import ConfigVersion
+from app.services.minio_client import minio_service
+from app.services.system_config_service import SystemConfigService
+
+
+def percentile(values, ratio):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * ratio))] * 1000
+
+
+def measure(name, handle_request, requests):
+    latencies = []
+    handle_request()  # 预热
+    for _ in range(requests):
+        started = time.perf_counter()
+        handle_request()
+        latencies.append(time.perf_counter() - started)
+    return name, percentile(latencies, 0.5), percentile(latencies, 0.95), sum(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='下载请求前的配置刷新开销对比')
+    parser.add_argument('--requests', type=int, default=1000, help='请求次数 (默认: 1000)')
+    parser.add_argument('--redis-url', default=None, help='Redis连接URL，指定时每次请求都核对一次版本')
+    args = parser.parse_args()
+
+    engine = create_engine("sqlite://")
+    SystemConfig.__table__.create(engine)
+    Session = sessionmaker(bind=engine)
+    with Session() as db:
+        for item in SystemConfigService.get_configurable_items():
+            db.add(SystemConfig(key=item["key"], value=str(item["default"]), category=item["category"]))
+        db.commit()
+
+    def reload_request():
+        with Session() as db:
+            SystemConfigService.update_settings_from_db_sync(db)
+        minio_service.reload_config()
+
+    version = ConfigVersion(redis_url=args.redis_url, check_interval=0 if args.redis_url else None,
+                            pubsub_enabled=False)
+    if not args.redis_url:
+        version._redis.get = lambda: None
+    version._load_settings = reload_request
+    version.register(minio_service.refresh_config)
+
+    results = [
+        measure("reload", reload_request, args.requests),
+        measure("versioned", version.ensure_current_sync, args.requests),
+    ]
+
+    print(f"\n=== {args.requests} 次请求 ===")
+    print(f"{'模式':<10} {'p50(ms)':>10} {'p95(ms)':>10} {'总计(s)':>10}")
+    for name, p50, p95, total in results:
+        print(f"{name:<10} {p50:>10.3f} {p95:>10.3f} {total:>10.3f}")
+    print(f"\n版本统计: {version.get_stats()}")
+
+
+if __name__ == "__main__":
+    main()
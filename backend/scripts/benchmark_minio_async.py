@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""
+MinIO混合负载性能对比脚本：线程池 + 同步minio客户端 vs 异步S3客户端
+
+使用方法:
+1. 默认负载（8个32MB上传，上传期间每10ms发起一次预签名+stat，共200次）:
+   python scripts/benchmark_minio_async.py
+
+2. 调整负载和模拟带宽:
+   python scripts/benchmark_minio_async.py --large-uploads 16 --large-mb 64 --small-ops 500 --bandwidth-mbps 400
+
+说明: 脚本在本地启动一个S3兼容的模拟存储（支持GetBucketLocation、单次PUT、分片上传、HEAD、GET），
+按连接限速接收上传数据。两种模式执行相同的负载:
+- legacy: 与改动前的MinioService相同，所有调用经过4线程的ThreadPoolExecutor执行同步minio客户端
+- async:  MinioService当前使用的AsyncS3Client，元数据请求和大文件传输走各自的并发通道
+统计元数据请求（列表页生成URL+获取文件信息）的延迟分布和上传总耗时。
+"""
+
+import sys
+import os
+import time
+import uuid
+import asyncio
+import argparse
+import tempfile
+import threading
+from datetime import timedelta
+from concurrent.futures import ThreadPoolExecutor
+
+from aiohttp import web
+from minio import Minio
+
+# 添加项目根目录到 Python 路径
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from app.services.async_s3_client import AsyncS3Client
+from app.services.http_session_pool import HTTPSessionPool
+
+BUCKET = "bench"
+
+
+class StandInS3:
+    """在后台线程运行的S3兼容模拟存储，上传按连接限速"""
+
+    def __init__(self, bandwidth_mbps: float):
+        self.bytes_per_second = bandwidth_mbps * 1024 * 1024 / 8
+        self.objects = {}
+        self.uploads = {}
+        self.port = None
+        self._loop = asyncio.new_event_loop()
+        self._ready = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    async def _read_throttled(self, request) -> bytes:
+        chunks = []
+        started = time.perf_counter()
+        received = 0
+        async for chunk in request.content.iter_chunked(256 * 1024):
+            chunks.append(chunk)
+            received += len(chunk)
+            delay = received / self.bytes_per_second - (time.perf_counter() - started)
+            if delay > 0:
+                await asyncio.sleep(delay)
+        return b''.join(chunks)
+
+    async def _handle(self, request):
+        query = request.query
+        if 'location' in query:
+            return web.Response(text='<LocationConstraint xmlns="http://s3.amazonaws.com/doc/2006-03-01/"/>',
+                                content_type='application/xml')
+        key = request.path
+        if request.method == 'POST' and 'uploads' in query:
+            upload_id = uuid.uuid4().hex
+            self.uploads[upload_id] = {}
+            return web.Response(content_type='application/xml', text=(
+                '<InitiateMultipartUploadResult><Bucket>{}</Bucket><Key>{}</Key><UploadId>{}</UploadId>'
+                '</InitiateMultipartUploadResult>').format(BUCKET, key, upload_id))
+        if request.method == 'PUT' and 'partNumber' in query:
+            self.uploads[query['uploadId']][int(query['partNumber'])] = await self._read_throttled(request)
+            return web.Response(headers={'ETag': f'"part-{query["partNumber"]}"'})
+        if request.method == 'POST' and 'uploadId' in query:
+            await request.read()
+            parts = self.uploads.pop(query['uploadId'])
+            self.objects[key] = b''.join(parts[n] for n in sorted(parts))
+            return web.Response(content_type='application/xml', text=(
+                '<CompleteMultipartUploadResult><Bucket>{}</Bucket><Key>{}</Key><ETag>"done"</ETag>'
+                '</CompleteMultipartUploadResult>').format(BUCKET, key))
+        if request.method == 'PUT':
+            self.objects[key] = await self._read_throttled(request)
+            return web.Response(headers={'ETag': '"etag"'})
+        if key not in self.objects:
+            return web.Response(status=404)
+        if request.method == 'HEAD':
+            return web.Response(headers={'Content-Length': str(len(self.objects[key])), 'ETag': '"etag"',
+                                         'Last-Modified': 'Mon, 12 Oct 2026 08:00:00 GMT'})
+        return web.Response(body=self.objects[key])
+
+    def _run(self):
+        asyncio.set_event_loop(self._loop)
+        app = web.Application(client_max_size=1024 * 1024 * 1024)
+        app.router.add_route('*', '/{tail:.*}', self._handle)
+        runner = web.AppRunner(app)
+        self._loop.run_until_complete(runner.setup())
+        site = web.TCPSite(runner, '127.0.0.1', 0)
+        self._loop.run_until_complete(site.start())
+        self.port = site._server.sockets[0].getsockname()[1]
+        self._ready.set()
+        self._loop.run_forever()
+
+    def start(self) -> str:
+        self._thread.start()
+        self._ready.wait()
+        return f"127.0.0.1:{self.port}"
+
+
+class LegacyBackend:
+    """改动前的实现：同步minio客户端 + 4线程的ThreadPoolExecutor"""
+
+    def __init__(self, endpoint: str):
+        self.client = Minio(endpoint, access_key="bench", secret_key="benchsecret", secure=False)
+        self.executor = ThreadPoolExecutor(max_workers=4)
+
+    async def upload(self, file_path: str, object_name: str):
+        await asyncio.get_running_loop().run_in_executor(
+            self.executor, lambda: self.client.fput_object(BUCKET, object_name, file_path)
+        )
+
+    async def small_op(self, object_name: str):
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(
+            self.executor, lambda: self.client.presigned_get_object(BUCKET, object_name, expires=timedelta(hours=1))
+        )
+        await loop.run_in_executor(self.executor, lambda: self.client.stat_object(BUCKET, object_name))
+
+    async def close(self):
+        self.executor.shutdown(wait=False)
+
+
+class AsyncBackend:
+    """MinioService当前使用的异步客户端"""
+
+    def __init__(self, endpoint: str, large_concurrency: int):
+        self.pool = HTTPSessionPool(limit=64, limit_per_host=64, keepalive_timeout=60, dns_cache_ttl=300)
+        self.client = AsyncS3Client(endpoint, "bench", "benchsecret", session_pool=self.pool,
+                                    small_concurrency=32, large_concurrency=large_concurrency)
+
+    async def upload(self, file_path: str, object_name: str):
+        await self.client.put_object_file(BUCKET, object_name, file_path)
+
+    async def small_op(self, object_name: str):
+        await self.client.presigned_get_object(BUCKET, object_name, expires=timedelta(hours=1))
+        await self.client.stat_object(BUCKET, object_name)
+
+    async def close(self):
+        await self.pool.close()
+
+
+async def run_workload(backend, file_path: str, large_uploads: int, small_ops: int, interval: float) -> dict:
+    """上传期间按固定间隔发起元数据请求，返回延迟和耗时统计"""
+    # 预热：查询并缓存区域，写入元数据请求使用的小对象
+    with tempfile.NamedTemporaryFile(delete=False) as small:
+        small.write(b'x' * 1024)
+    try:
+        await backend.upload(small.name, "thumb.jpg")
+    finally:
+        os.unlink(small.name)
+
+    latencies = []
+
+    async def timed_small_op():
+        started = time.perf_counter()
+        await backend.small_op("thumb.jpg")
+        latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    uploads = [asyncio.ensure_future(backend.upload(file_path, f"videos/{i}.mp4")) for i in range(large_uploads)]
+    small_tasks = []
+    for _ in range(small_ops):
+        small_tasks.append(asyncio.ensure_future(timed_small_op()))
+        await asyncio.sleep(interval)
+    await asyncio.gather(*small_tasks)
+    small_done = time.perf_counter() - started
+    await asyncio.gather(*uploads)
+    total = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        'p50_ms': latencies[len(latencies) // 2] * 1000,
+        'p95_ms': latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000,
+        'max_ms': latencies[-1] * 1000,
+        'small_done_s': small_done,
+        'uploads_done_s': total
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='MinIO混合负载性能对比: 线程池 vs 异步客户端')
+    parser.add_argument('--large-uploads', type=int, default=8, help='并发大文件上传数 (默认: 8)')
+    parser.add_argument('--large-mb', type=int, default=32, help='大文件大小MB (默认: 32)')
+    parser.add_argument('--small-ops', type=int, default=200, help='元数据请求次数 (默认: 200)')
+    parser.add_argument('--interval-ms', type=float, default=10, help='元数据请求间隔毫秒 (默认: 10)')
+    parser.add_argument('--bandwidth-mbps', type=float, default=800, help='单连接上传带宽Mbit/s (默认: 800)')
+    parser.add_argument('--large-concurrency', type=int, default=4, help='异步客户端大文件通道并发数 (默认: 4)')
+    args = parser.parse_args()
+
+    store = StandInS3(args.bandwidth_mbps)
+    endpoint = store.start()
+
+    with tempfile.NamedTemporaryFile(delete=False, suffix='.mp4') as f:
+        f.write(os.urandom(args.large_mb * 1024 * 1024))
+        file_path = f.name
+
+    print(f"模拟存储: {endpoint}, 单连接带宽: {args.bandwidth_mbps}Mbit/s")
+    print(f"负载: {args.large_uploads} x {args.large_mb}MB 上传, {args.small_ops} 次预签名+stat (间隔 {args.interval_ms}ms)")
+
+    results = {}
+    try:
+        for name, factory in (
+            ('legacy', lambda: LegacyBackend(endpoint)),
+            ('async', lambda: AsyncBackend(endpoint, args.large_concurrency))
+        ):
+            async def run():
+                backend = factory()
+                try:
+                    return await run_workload(backend, file_path, args.large_uploads, args.small_ops,
+                                              args.interval_ms / 1000)
+                finally:
+                    await backend.close()
+            results[name] = asyncio.run(run())
+    finally:
+        os.unlink(file_path)
+
+    print("\n=== 结果 ===")
+    print(f"{'模式':<8} {'p50(ms)':>10} {'p95(ms)':>10} {'max(ms)':>10} {'元数据完成(s)':>14} {'上传完成(s)':>12}")
+    for name, r in results.items():
+        print(f"{name:<8} {r['p50_ms']:>10.1f} {r['p95_ms']:>10.1f} {r['max_ms']:>10.1f} "
+              f"{r['small_done_s']:>14.2f} {r['uploads_done_s']:>12.2f}")
+    if results['async']['p95_ms'] > 0:
+        print(f"\n元数据请求p95延迟降低: {results['legacy']['p95_ms'] / results['async']['p95_ms']:.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+MinIO大文件上传性能对比脚本：单次PUT vs 并行分片上传
+
+使用方法:
+1. 默认负载（256MB文件，单连接带宽400Mbit/s，分片16MB，并发1/4/8）:
+   python scripts/benchmark_minio_multipart.py
+
+2. 调整文件大小、分片和并发:
+   python scripts/benchmark_minio_multipart.py --file-mb 1024 --part-mb 32 --concurrency 4 8 16
+
+说明: 复用benchmark_minio_async.py中的模拟存储，上传按连接限速，用来模拟单连接吞吐量受限的场景。
+single 为改动前upload_file的单次PUT，multipart-N 为MinioService.upload_file_multipart以N个分片并发上传。
+"""
+
+import sys
+import os
+import time
+import asyncio
+import argparse
+import tempfile
+
+# 添加项目根目录到 Python 路径
+script_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(script_dir)
+sys.path.insert(0, project_root)
+sys.path.insert(0, script_dir)
+
+from benchmark_minio_async import StandInS3, BUCKET
+from app.services.async_s3_client import AsyncS3Client
+from app.services.http_session_pool import HTTPSessionPool
+from app.services.minio_client import MinioService
+
+
+async def run_upload(endpoint: str, file_path: str, part_size: int, concurrency: int) -> float:
+    """执行一次上传，返回耗时(秒)；concurrency为0时使用单次PUT"""
+    pool = HTTPSessionPool(limit=64, limit_per_host=64, keepalive_timeout=60, dns_cache_ttl=300)
+    service = MinioService()
+    service.async_client = AsyncS3Client(endpoint, "bench", "benchsecret", session_pool=pool)
+    service.bucket_name = BUCKET
+    try:
+        started = time.perf_counter()
+        if concurrency:
+            result = await service.upload_file_multipart(file_path, "videos/bench.mp4", "video/mp4",
+                                                         part_size=part_size, concurrency=concurrency)
+        else:
+            result = await service.async_client.put_object_file(BUCKET, "videos/bench.mp4", file_path, "video/mp4")
+        if not result:
+            raise RuntimeError("上传失败")
+        return time.perf_counter() - started
+    finally:
+        await pool.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='MinIO大文件上传性能对比: 单次PUT vs 并行分片')
+    parser.add_argument('--file-mb', type=int, default=256, help='文件大小MB (默认: 256)')
+    parser.add_argument('--part-mb', type=int, default=16, help='分片大小MB (默认: 16)')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 4, 8], help='分片并发数 (默认: 1 4 8)')
+    parser.add_argument('--bandwidth-mbps', type=float, default=400, help='单连接上传带宽Mbit/s (默认: 400)')
+    args = parser.parse_args()
+
+    store = StandInS3(args.bandwidth_mbps)
+    endpoint = store.start()
+
+    with tempfile.NamedTemporaryFile(delete=False, suffix='.mp4') as f:
+        f.write(os.urandom(args.file_mb * 1024 * 1024))
+        file_path = f.name
+
+    print(f"模拟存储: {endpoint}, 单连接带宽: {args.bandwidth_mbps}Mbit/s")
+    print(f"文件: {args.file_mb}MB, 分片: {args.part_mb}MB")
+
+    results = []
+    try:
+        for concurrency in [0] + args.concurrency:
+            name = f"multipart-{concurrency}" if concurrency else "single"
+            seconds = asyncio.run(run_upload(endpoint, file_path, args.part_mb * 1024 * 1024, concurrency))
+            results.append((name, seconds))
+    finally:
+        os.unlink(file_path)
+
+    print("\n=== 结果 ===")
+    print(f"{'模式':<14} {'耗时(s)':>10} {'吞吐量(MB/s)':>14}")
+    for name, seconds in results:
+        print(f"{name:<14} {seconds:>10.2f} {args.file_mb / seconds:>14.1f}")
+    print(f"\n最快的分片上传比单次PUT快: {results[0][1] / min(s for _, s in results[1:]):.1f}x")
+
+
+if __name__ == "__main__":
+    main()
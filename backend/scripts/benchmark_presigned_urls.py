@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+列表页预签名URL性能对比脚本：逐个签名 vs 经缓存批量签名
+
+使用方法:
+1. 默认负载（每页100个对象，重复50页）:
+   python scripts/benchmark_presigned_urls.py
+
+2. 同时测量Redis层（进程内缓存清空后从Redis读取）:
+   python scripts/benchmark_presigned_urls.py --redis-url redis://localhost:6379/0
+
+说明: 只测量生成一页URL的耗时，不访问MinIO（区域预先固定，签名只做本地计算）。
+- executor:  改动前的get_file_url，每个对象经4线程的线程池调用同步minio客户端签名
+- sign:      逐个调用异步客户端签名，不使用缓存
+- batch:     MinioService.get_file_urls，进程内缓存命中
+- batch-redis: 每页前清空进程内缓存，从Redis批量读取（需要--redis-url）
+"""
+
+import sys
+import os
+import time
+import asyncio
+import argparse
+from datetime import timedelta
+from concurrent.futures import ThreadPoolExecutor
+
+from minio import Minio
+
+# 添加项目根目录到 Python 路径
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from app.services.async_s3_client import AsyncS3Client
+from app.services.minio_client import MinioService
+from app.services.presigned_url_cache import PresignedURLCache
+import app.services.minio_client as minio_client_module
+
+ENDPOINT = "media.example.com"
+
+
+def percentile(values, ratio):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * ratio))] * 1000
+
+
+async def measure(name, render_page, pages):
+    latencies = []
+    await render_page()  # 预热
+    for _ in range(pages):
+        started = time.perf_counter()
+        await render_page()
+        latencies.append(time.perf_counter() - started)
+    return name, percentile(latencies, 0.5), percentile(latencies, 0.95)
+
+
+async def run(args):
+    names = [f"users/1/projects/1/thumbnails/{i}.jpg" for i in range(args.page_size)]
+    sync_client = Minio(ENDPOINT, access_key="bench", secret_key="benchsecret", secure=False, region="us-east-1")
+    executor = ThreadPoolExecutor(max_workers=4)
+    service = MinioService()
+    service.async_client = AsyncS3Client(ENDPOINT, "bench", "benchsecret", region="us-east-1")
+    service.bucket_name = "bench"
+
+    async def executor_page():
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*[
+            loop.run_in_executor(executor, lambda n=n: sync_client.presigned_get_object(
+                "bench", n, expires=timedelta(seconds=3600)))
+            for n in names
+        ])
+
+    async def sign_page():
+        for n in names:
+            await service.async_client.presigned_get_object("bench", n, expires=timedelta(seconds=3600))
+
+    results = []
+    uncached = PresignedURLCache(enabled=False)
+    minio_client_module.presigned_url_cache = uncached
+    results.append(await measure("executor", executor_page, args.pages))
+    results.append(await measure("sign", sign_page, args.pages))
+
+    cache = PresignedURLCache(redis_url=args.redis_url, enabled=True)
+    if not args.redis_url:
+        cache._redis.get = lambda: None
+
+        async def no_redis():
+            return None
+        cache._redis.get_async = no_redis
+    cache.configure(ENDPOINT, "bench", "bench")
+    minio_client_module.presigned_url_cache = cache
+    results.append(await measure("batch", lambda: service.get_file_urls(names), args.pages))
+
+    if args.redis_url:
+        async def redis_page():
+            cache.clear_local()
+            await service.get_file_urls(names)
+        results.append(await measure("batch-redis", redis_page, args.pages))
+
+    executor.shutdown()
+    return results, cache.get_stats()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='列表页预签名URL性能对比')
+    parser.add_argument('--page-size', type=int, default=100, help='每页对象数 (默认: 100)')
+    parser.add_argument('--pages', type=int, default=50, help='重复页数 (默认: 50)')
+    parser.add_argument('--redis-url', default=None, help='Redis连接URL，指定时测量Redis层')
+    args = parser.parse_args()
+
+    results, stats = asyncio.run(run(args))
+
+    print(f"\n=== 每页 {args.page_size} 个URL ===")
+    print(f"{'模式':<12} {'p50(ms)':>10} {'p95(ms)':>10}")
+    for name, p50, p95 in results:
+        print(f"{name:<12} {p50:>10.2f} {p95:>10.2f}")
+    print(f"\n缓存统计: {stats}")
+
+
+if __name__ == "__main__":
+    main()
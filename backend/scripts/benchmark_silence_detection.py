@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+静音检测与切割点计算性能对比脚本：pydub逐窗口计算 vs NumPy能量包络
+
+使用方法:
+1. 使用生成的测试音频（默认60分钟，16kHz单声道，模拟说话与停顿）:
+   python scripts/benchmark_silence_detection.py
+
+2. 使用指定的WAV文件:
+   python scripts/benchmark_silence_detection.py --audio /path/to/audio.wav
+
+3. 只测试NumPy实现（旧实现在60分钟音频上需要数分钟）:
+   python scripts/benchmark_silence_detection.py --skip-legacy
+
+说明: 旧实现按改动前的逻辑执行（pydub.silence逐阈值扫描、AudioSegment切片计算能量最低点），
+两种实现使用相同的切割参数，输出各自耗时、峰值内存和切割点的最大偏差。
+"""
+
+import sys
+import os
+import time
+import wave
+import argparse
+import resource
+import tempfile
+import tracemalloc
+
+import numpy as np
+
+# 添加项目根目录到 Python 路径
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+import audio_splitter_enhanced as splitter
+from pydub.silence import detect_silence, detect_nonsilent
+
+
+def generate_sample_audio(path: str, duration: int, frame_rate: int = 16000, seed: int = 0):
+    """生成模拟说话的测试音频：2-8秒的有声段与0.2-1.5秒的停顿交替"""
+    rng = np.random.default_rng(seed)
+    total_frames = duration * frame_rate
+    written = 0
+    with wave.open(path, 'wb') as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(frame_rate)
+        speaking = True
+        while written < total_frames:
+            seconds = rng.uniform(2, 8) if speaking else rng.uniform(0.2, 1.5)
+            frames = min(int(seconds * frame_rate), total_frames - written)
+            amplitude = rng.uniform(2000, 8000) if speaking else 20
+            wav.writeframes((rng.standard_normal(frames) * amplitude).astype(np.int16).tobytes())
+            written += frames
+            speaking = not speaking
+
+
+def legacy_get_silence_chunks(audio, min_silence_len, silence_thresh):
+    """改动前的静音检测：每次阈值尝试都用pydub重新扫描整个音频"""
+    silence_chunks = detect_silence(audio, min_silence_len=min_silence_len, silence_thresh=silence_thresh)
+    if len(silence_chunks) == 0:
+        for thresh in [silence_thresh + 5, silence_thresh + 10, silence_thresh + 15]:
+            silence_chunks = detect_silence(audio, min_silence_len=min_silence_len, silence_thresh=thresh)
+            if len(silence_chunks) > 0:
+                break
+    if len(silence_chunks) == 0:
+        min_silence_len = min_silence_len // 2
+        silence_chunks = detect_silence(audio, min_silence_len=min_silence_len, silence_thresh=silence_thresh + 15)
+    if len(silence_chunks) == 0:
+        non_silent_chunks = detect_nonsilent(audio, min_silence_len=100, silence_thresh=silence_thresh + 20)
+        if non_silent_chunks:
+            silence_chunks = []
+            if non_silent_chunks[0][0] > 0:
+                silence_chunks.append((0, non_silent_chunks[0][0]))
+            for i in range(len(non_silent_chunks) - 1):
+                silence_chunks.append((non_silent_chunks[i][1], non_silent_chunks[i + 1][0]))
+            if non_silent_chunks[-1][1] < len(audio):
+                silence_chunks.append((non_silent_chunks[-1][1], len(audio)))
+    return silence_chunks
+
+
+def legacy_find_energy_minimum(audio, start_time, end_time, window_size=200):
+    """改动前的能量最低点搜索：逐窗口切片AudioSegment并计算rms"""
+    if end_time <= start_time:
+        return start_time
+    segment = audio[start_time:end_time]
+    if len(segment) < window_size:
+        return (start_time + end_time) // 2
+    min_energy = float('inf')
+    min_pos = start_time
+    for win_start in range(0, len(segment) - window_size, window_size // 2):
+        energy = segment[win_start:win_start + window_size].rms
+        if energy < min_energy:
+            min_energy = energy
+            min_pos = start_time + win_start + window_size // 2
+    return min_pos
+
+
+def run_legacy(audio_path: str, params: dict):
+    """按改动前的方式加载音频并计算切割点"""
+    audio = splitter.load_audio(audio_path)
+    silence_chunks = legacy_get_silence_chunks(audio, params['min_silence_len'], params['silence_thresh'])
+    # get_split_points内部的能量最低点搜索替换为旧实现，并保持传入AudioSegment
+    original_find, original_as_envelope = splitter.find_energy_minimum, splitter.as_envelope
+    splitter.find_energy_minimum = legacy_find_energy_minimum
+    splitter.as_envelope = lambda value: value
+    try:
+        return silence_chunks, splitter.get_split_points(
+            audio, len(audio), silence_chunks, params['max_segment_len'], params['strict_max_len'],
+            params['min_segment_len'], search_window=params['search_window']
+        )
+    finally:
+        splitter.find_energy_minimum, splitter.as_envelope = original_find, original_as_envelope
+
+
+def run_envelope(audio_path: str, params: dict):
+    """使用NumPy能量包络计算切割点"""
+    envelope = splitter.load_envelope(audio_path)
+    silence_chunks = splitter.get_silence_chunks(envelope, params['min_silence_len'], params['silence_thresh'])
+    return silence_chunks, splitter.get_split_points(
+        envelope, len(envelope), silence_chunks, params['max_segment_len'], params['strict_max_len'],
+        params['min_segment_len'], search_window=params['search_window']
+    )
+
+
+def measure(label: str, func):
+    """测量墙钟时间、CPU时间和Python堆峰值内存"""
+    usage_before = resource.getrusage(resource.RUSAGE_SELF)
+    tracemalloc.start()
+    wall_start = time.perf_counter()
+    result = func()
+    wall = time.perf_counter() - wall_start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    usage_after = resource.getrusage(resource.RUSAGE_SELF)
+    cpu = (usage_after.ru_utime - usage_before.ru_utime) + (usage_after.ru_stime - usage_before.ru_stime)
+    print(f"{label:8} 墙钟时间: {wall:8.2f}s  CPU: {cpu:8.2f}s  峰值内存: {peak / 1024 / 1024:8.1f}MB")
+    return result, wall
+
+
+def main():
+    parser = argparse.ArgumentParser(description='pydub与NumPy能量包络的静音检测性能对比')
+    parser.add_argument('--audio', help='源WAV路径，不指定则生成测试音频')
+    parser.add_argument('--duration', type=int, default=3600, help='生成测试音频的时长（秒）')
+    parser.add_argument('--segment-seconds', type=int, default=600, help='目标分段时长（秒），与并行ASR的默认值一致')
+    parser.add_argument('--min-silence', type=int, default=splitter.DEFAULT_MIN_SILENCE_LEN, help='最小静音长度（毫秒）')
+    parser.add_argument('--silence-threshold', type=int, default=splitter.DEFAULT_SILENCE_THRESH, help='静音阈值（dB）')
+    parser.add_argument('--tolerance-ms', type=int, default=10, help='切割点允许的最大偏差（毫秒）')
+    parser.add_argument('--skip-legacy', action='store_true', help='只测试NumPy实现')
+    args = parser.parse_args()
+
+    segment_ms = args.segment_seconds * 1000
+    params = {
+        'min_silence_len': args.min_silence,
+        'silence_thresh': args.silence_threshold,
+        'max_segment_len': segment_ms,
+        'strict_max_len': int(segment_ms * 1.5),
+        'min_segment_len': segment_ms // 2,
+        'search_window': min(segment_ms // 4, 60000),
+    }
+
+    # 预先导入句子边界聚类用到的sklearn，避免把导入时间计入先运行的实现
+    try:
+        from sklearn.cluster import KMeans  # noqa: F401
+    except ImportError:
+        pass
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        audio_path = args.audio
+        if not audio_path:
+            audio_path = os.path.join(temp_dir, 'sample.wav')
+            print(f"生成 {args.duration} 秒测试音频...")
+            generate_sample_audio(audio_path, args.duration)
+
+        (envelope_chunks, envelope_points), envelope_wall = measure('NumPy', lambda: run_envelope(audio_path, params))
+        print(f"NumPy    静音段: {len(envelope_chunks)}  切割点: {[round(p / 1000, 2) for p in envelope_points]}")
+
+        if args.skip_legacy:
+            return
+
+        (legacy_chunks, legacy_points), legacy_wall = measure('pydub', lambda: run_legacy(audio_path, params))
+        print(f"pydub    静音段: {len(legacy_chunks)}  切割点: {[round(p / 1000, 2) for p in legacy_points]}")
+
+        print(f"加速比: {legacy_wall / envelope_wall:.1f}x")
+        same_chunks = [list(chunk) for chunk in legacy_chunks] == [list(chunk) for chunk in envelope_chunks]
+        print(f"静音段完全一致: {same_chunks}")
+        if len(legacy_points) != len(envelope_points):
+            print(f"❌ 切割点数量不同: {len(legacy_points)} vs {len(envelope_points)}")
+            sys.exit(1)
+        max_diff = max(abs(a - b) for a, b in zip(legacy_points, envelope_points))
+        print(f"切割点最大偏差: {max_diff}ms (容差 {args.tolerance_ms}ms)")
+        if max_diff > args.tolerance_ms:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
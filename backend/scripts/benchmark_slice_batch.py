@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+视频切片性能对比脚本：逐个切割 vs 批量切割
+
+使用方法:
+1. 使用生成的测试视频（默认60分钟，15个切片，每个切片4个子切片）:
+   python scripts/benchmark_slice_batch.py
+
+2. 使用指定的视频文件:
+   python scripts/benchmark_slice_batch.py --video /path/to/video.mp4 --slices 15 --chapters 4
+
+说明: MinIO上传会被替换为空操作，只统计ffmpeg/ffprobe的墙钟时间和子进程CPU时间。
+"""
+
+import sys
+import os
+import time
+import argparse
+import resource
+import subprocess
+import tempfile
+
+# 添加项目根目录到 Python 路径
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from app.services.video_slicing_service import video_slicing_service
+from app.services.minio_client import minio_service
+
+
+def generate_sample_video(path: str, duration: int):
+    """使用ffmpeg生成测试视频"""
+    cmd = [
+        'ffmpeg', '-v', 'error',
+        '-f', 'lavfi', '-i', 'testsrc=size=1280x720:rate=25',
+        '-f', 'lavfi', '-i', 'sine=frequency=440',
+        '-t', str(duration),
+        '-c:v', 'libx264', '-preset', 'ultrafast', '-g', '50',
+        '-c:a', 'aac', '-shortest',
+        '-y', path
+    ]
+    subprocess.run(cmd, check=True)
+
+
+def build_cuts(duration: float, slices: int, chapters: int):
+    """生成均匀分布的切片和子切片"""
+    cuts = []
+    slice_length = duration / slices
+    for i in range(slices):
+        start = i * slice_length
+        end = start + slice_length * 0.9
+        cuts.append({
+            'start_time': start,
+            'end_time': end,
+            'output_filename': video_slicing_service.generate_filename('slice', i + 1)
+        })
+        chapter_length = (end - start) / chapters
+        for j in range(chapters):
+            chapter_start = start + j * chapter_length
+            cuts.append({
+                'start_time': chapter_start,
+                'end_time': chapter_start + chapter_length,
+                'output_filename': video_slicing_service.generate_filename('sub_slice', j + 1, is_sub_slice=True)
+            })
+    return cuts
+
+
+def measure(label: str, func):
+    """测量墙钟时间和子进程CPU时间"""
+    usage_before = resource.getrusage(resource.RUSAGE_CHILDREN)
+    wall_start = time.perf_counter()
+    func()
+    wall = time.perf_counter() - wall_start
+    usage_after = resource.getrusage(resource.RUSAGE_CHILDREN)
+    cpu = (usage_after.ru_utime - usage_before.ru_utime) + (usage_after.ru_stime - usage_before.ru_stime)
+    print(f"{label:12} 墙钟时间: {wall:8.2f}s  子进程CPU: {cpu:8.2f}s")
+    return wall, cpu
+
+
+def main():
+    parser = argparse.ArgumentParser(description='逐个切割与批量切割的性能对比')
+    parser.add_argument('--video', help='源视频路径，不指定则生成测试视频')
+    parser.add_argument('--duration', type=int, default=3600, help='生成测试视频的时长（秒）')
+    parser.add_argument('--slices', type=int, default=15, help='切片数量')
+    parser.add_argument('--chapters', type=int, default=4, help='每个切片的子切片数量')
+    parser.add_argument('--concurrency', type=int, default=4, help='并行批量切割的并发数')
+    args = parser.parse_args()
+
+    # 替换上传为空操作，只测量切割本身
+    minio_service.upload_file_sync = lambda file_path, object_name, content_type=None: object_name
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        video_path = args.video
+        if not video_path:
+            video_path = os.path.join(temp_dir, 'sample.mp4')
+            print(f"生成 {args.duration} 秒测试视频...")
+            generate_sample_video(video_path, args.duration)
+
+        cuts = build_cuts(args.duration, args.slices, args.chapters)
+        print(f"切割数量: {len(cuts)}")
+
+        def _per_slice():
+            for cut in cuts:
+                video_slicing_service.slice_video_sync(
+                    video_path, cut['start_time'], cut['end_time'], cut['output_filename'],
+                    'slice', 0, 0, 0
+                )
+
+        def _batch(concurrency: int = 1):
+            results = video_slicing_service.slice_video_batch_sync(
+                video_path, cuts, 0, 0, 0, concurrency=concurrency
+            )
+            failed = [r for r in results if not r.get('success')]
+            if failed:
+                print(f"批量切割失败数量: {len(failed)}")
+
+        per_slice_wall, per_slice_cpu = measure('逐个切割', _per_slice)
+        batch_wall, batch_cpu = measure('批量切割', _batch)
+        parallel_wall, parallel_cpu = measure('并行批量', lambda: _batch(args.concurrency))
+
+        print(f"加速比: 墙钟 {per_slice_wall / max(batch_wall, 1e-6):.2f}x, CPU {per_slice_cpu / max(batch_cpu, 1e-6):.2f}x")
+        print(f"并行加速比: 墙钟 {per_slice_wall / max(parallel_wall, 1e-6):.2f}x")
+
+
+if __name__ == "__main__":
+    main()
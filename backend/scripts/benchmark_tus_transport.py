@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+TUS传输编码性能对比脚本：WAV vs FLAC vs Opus
+
+使用方法:
+1. 使用生成的测试音频（默认10分钟，16kHz单声道），模拟40Mbit/s链路:
+   python scripts/benchmark_tus_transport.py
+
+2. 使用指定的音频文件和链路带宽:
+   python scripts/benchmark_tus_transport.py --audio /path/to/audio.wav --bandwidth-mbps 20
+
+说明: 脚本在本地启动模拟ASR服务（任务创建接口 + TUS上传接口），按指定带宽限速接收数据，
+上传完成后像真实ASR服务一样用ffmpeg解码为PCM。通过TusASRClient的任务创建和上传流程，
+统计每种编码的上传字节数、转码耗时和端到端耗时（转码开始到服务端解码完成），
+并检查FLAC解码后的PCM与原始音频是否一致。TusASRClient初始化需要可用的Redis。
+"""
+
+import sys
+import os
+import time
+import uuid
+import wave
+import asyncio
+import hashlib
+import logging
+import argparse
+import tempfile
+import subprocess
+
+import numpy as np
+from aiohttp import web
+
+# 添加项目根目录到 Python 路径
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from app.services.asr_transport import ASRTransportEncoder
+
+
+def generate_sample_audio(path: str, duration: int, seed: int = 0):
+    """生成类似语音的测试音频：带谐波和音量起伏的有声段与停顿交替"""
+    rng = np.random.default_rng(seed)
+    frame_rate = 16000
+    with wave.open(path, 'wb') as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(frame_rate)
+        written = 0
+        while written < duration * frame_rate:
+            frames = min(int(rng.uniform(2, 6) * frame_rate), duration * frame_rate - written)
+            t = np.arange(frames) / frame_rate
+            pitch = rng.uniform(100, 250)
+            voiced = sum(np.sin(2 * np.pi * pitch * k * t) / k for k in range(1, 8))
+            envelope = 0.5 + 0.5 * np.sin(2 * np.pi * rng.uniform(2, 5) * t)
+            samples = voiced * envelope * 3000 + rng.standard_normal(frames) * 80
+            pause = rng.standard_normal(int(rng.uniform(0.2, 1.0) * frame_rate)) * 30
+            chunk = np.concatenate([samples, pause])[:duration * frame_rate - written]
+            wav.writeframes(chunk.astype(np.int16).tobytes())
+            written += len(chunk)
+
+
+def decode_pcm(data: bytes) -> bytes:
+    """与ASR服务一样用ffmpeg把上传的文件解码为16kHz单声道PCM"""
+    return subprocess.run(
+        ['ffmpeg', '-v', 'error', '-i', 'pipe:0', '-f', 's16le', '-ac', '1', '-ar', '16000', 'pipe:1'],
+        input=data, capture_output=True, check=True
+    ).stdout
+
+
+class MockASRServer:
+    """模拟ASR任务接口和TUS上传接口，按带宽限速接收上传数据"""
+
+    def __init__(self, base_url: str, bandwidth_mbps: float):
+        self.base_url = base_url
+        self.bandwidth_bps = bandwidth_mbps * 1000 * 1000
+        self.uploads = {}
+        self.completed = {}
+        self.app = web.Application(client_max_size=64 * 1024 * 1024)
+        self.app.router.add_post('/api/v1/asr-tasks', self.create_task)
+        self.app.router.add_post('/files', self.create_upload)
+        self.app.router.add_patch('/files/{upload_id}', self.upload_chunk)
+
+    async def create_task(self, request):
+        payload = await request.json()
+        task_id = uuid.uuid4().hex
+        self.completed[task_id] = asyncio.get_running_loop().create_future()
+        return web.json_response({
+            'task_id': task_id,
+            'upload_url': f"{self.base_url}/files/{task_id}",
+            'metadata': payload.get('metadata', {})
+        })
+
+    async def create_upload(self, request):
+        upload_id = uuid.uuid4().hex
+        metadata = dict(
+            part.strip().split(' ', 1) for part in request.headers.get('Upload-Metadata', '').split(',') if ' ' in part.strip()
+        )
+        self.uploads[upload_id] = {
+            'length': int(request.headers['Upload-Length']),
+            'data': bytearray(),
+            'task_id': metadata.get('task_id')
+        }
+        return web.Response(status=201, headers={'Location': f"/files/{upload_id}"})
+
+    async def upload_chunk(self, request):
+        upload = self.uploads[request.match_info['upload_id']]
+        body = await request.read()
+        # 模拟链路带宽
+        await asyncio.sleep(len(body) * 8 / self.bandwidth_bps)
+        upload['data'].extend(body)
+        if len(upload['data']) >= upload['length']:
+            loop = asyncio.get_running_loop()
+            pcm = await loop.run_in_executor(None, decode_pcm, bytes(upload['data']))
+            future = self.completed.get(upload['task_id'])
+            if future and not future.done():
+                future.set_result(pcm)
+        return web.Response(status=204, headers={'Upload-Offset': str(len(upload['data']))})
+
+
+async def run_codec(client, server, audio_path: str, codec: str, opus_bitrate: int) -> dict:
+    """按指定编码走一遍任务创建和TUS上传，等待服务端解码完成"""
+    client.transport_encoder = ASRTransportEncoder(codec=codec, opus_bitrate=opus_bitrate)
+    start = time.perf_counter()
+    async with client.transport_encoder.transport_file(audio_path) as (transport_path, used_codec):
+        encode_time = time.perf_counter() - start
+        metadata = {'language': 'zh', 'model': 'whisper', 'transport_codec': used_codec}
+        task_info = await client._create_tus_task(transport_path, metadata)
+        upload_size = os.path.getsize(transport_path)
+        await client._upload_file_via_tus(transport_path, task_info['upload_url'])
+        pcm = await server.completed[task_info['task_id']]
+    return {
+        'codec': used_codec,
+        'upload_bytes': upload_size,
+        'encode_time': encode_time,
+        'total_time': time.perf_counter() - start,
+        'pcm_sha256': hashlib.sha256(pcm).hexdigest()
+    }
+
+
+async def main_async(args):
+    from app.services.tus_asr_client import TusASRClient
+
+    base_url = f"http://127.0.0.1:{args.port}"
+    server = MockASRServer(base_url, args.bandwidth_mbps)
+    runner = web.AppRunner(server.app)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', args.port)
+    await site.start()
+
+    client = TusASRClient(api_url=base_url, tus_url=base_url)
+    client.api_url = client.tus_url = base_url
+
+    try:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            audio_path = args.audio
+            if not audio_path:
+                audio_path = os.path.join(temp_dir, 'sample.wav')
+                print(f"生成 {args.duration} 秒测试音频...")
+                generate_sample_audio(audio_path, args.duration)
+
+            with open(audio_path, 'rb') as f:
+                source_pcm_sha256 = hashlib.sha256(decode_pcm(f.read())).hexdigest()
+
+            print(f"源文件: {os.path.getsize(audio_path) / 1024 / 1024:.2f}MB, 模拟带宽: {args.bandwidth_mbps}Mbit/s")
+            results = []
+            for codec in args.codecs:
+                result = await run_codec(client, server, audio_path, codec, args.opus_bitrate)
+                results.append(result)
+                print(
+                    f"{result['codec']:6} 上传: {result['upload_bytes'] / 1024 / 1024:8.2f}MB  "
+                    f"转码: {result['encode_time']:6.2f}s  端到端: {result['total_time']:7.2f}s  "
+                    f"PCM一致: {result['pcm_sha256'] == source_pcm_sha256 if result['codec'] != 'opus' else '有损编码'}"
+                )
+
+            baseline = next((r for r in results if r['codec'] == 'wav'), None)
+            if baseline:
+                for result in results:
+                    if result is baseline:
+                        continue
+                    print(
+                        f"{result['codec']:6} 上传字节 {result['upload_bytes'] / baseline['upload_bytes'] * 100:5.1f}%  "
+                        f"端到端加速 {baseline['total_time'] / result['total_time']:.2f}x"
+                    )
+            flac = next((r for r in results if r['codec'] == 'flac'), None)
+            if flac and flac['pcm_sha256'] != source_pcm_sha256:
+                print("❌ FLAC解码后的PCM与源音频不一致")
+                sys.exit(1)
+    finally:
+        await runner.cleanup()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='TUS上传的WAV/FLAC/Opus传输编码性能对比')
+    parser.add_argument('--audio', help='源音频路径（16kHz单声道WAV），不指定则生成测试音频')
+    parser.add_argument('--duration', type=int, default=600, help='生成测试音频的时长（秒）')
+    parser.add_argument('--bandwidth-mbps', type=float, default=40, help='模拟链路带宽（Mbit/s）')
+    parser.add_argument('--opus-bitrate', type=int, default=32000, help='Opus码率（bps）')
+    parser.add_argument('--codecs', nargs='+', default=['wav', 'flac', 'opus'], help='参与对比的编码')
+    parser.add_argument('--port', type=int, default=18089, help='模拟ASR服务端口')
+    args = parser.parse_args()
+
+    # 客户端在INFO级别会打印每个分块的日志
+    logging.basicConfig(level=logging.WARNING)
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
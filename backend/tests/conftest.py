@@ -1,6 +1,8 @@
 import pytest
 import asyncio
 import os
+import functools
+from collections import Counter
 from typing import Generator
 from pathlib import Path
 
@@ -47,6 +49,176 @@ def sample_image_content():
     """创建示例图片内容"""
     return b"fake image content"
 
+def _command(method):
+    """记录Redis命令的调用次数"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        self.calls[method.__name__] += 1
+        return method(self, *args, **kwargs)
+    return wrapper
+
+
+class InMemoryRedis:
+    """
+    单元测试共用的内存Redis，实现各服务用到的命令子集
+
+    calls记录每个命令的调用次数（pipeline按execute计一次）；
+    attach替换LazyRedis的同步和异步连接。
+    """
+
+    def __init__(self):
+        self.values = {}
+        self.hashes = {}
+        self.zsets = {}
+        self.published = []
+        self.calls = Counter()
+
+    def attach(self, lazy):
+        """让LazyRedis的get()和get_async()都返回这个实例"""
+        async_client = AsyncInMemoryRedis(self)
+
+        async def get_async():
+            return async_client
+        lazy.client = self
+        lazy.get_async = get_async
+        return self
+
+    @_command
+    def get(self, name):
+        return self.values.get(name)
+
+    @_command
+    def set(self, name, value, ex=None):
+        self.values[name] = str(value)
+        return True
+
+    def _add(self, name, amount):
+        self.values[name] = str(int(self.values.get(name, 0)) + amount)
+        return int(self.values[name])
+
+    @_command
+    def incr(self, name, amount=1):
+        return self._add(name, amount)
+
+    @_command
+    def incrby(self, name, amount):
+        return self._add(name, amount)
+
+    @_command
+    def delete(self, *names):
+        removed = 0
+        for name in names:
+            for store in (self.values, self.hashes, self.zsets):
+                removed += store.pop(name, None) is not None
+        return removed
+
+    @_command
+    def expire(self, name, seconds):
+        return True
+
+    @_command
+    def hget(self, name, key):
+        return self.hashes.get(name, {}).get(key)
+
+    @_command
+    def hgetall(self, name):
+        return dict(self.hashes.get(name, {}))
+
+    @_command
+    def hset(self, name, key=None, value=None, mapping=None):
+        fields = dict(mapping or {})
+        if key is not None:
+            fields[key] = value
+        self.hashes.setdefault(name, {}).update({k: str(v) for k, v in fields.items()})
+        return len(fields)
+
+    @_command
+    def hincrby(self, name, key, amount=1):
+        fields = self.hashes.setdefault(name, {})
+        fields[key] = str(int(fields.get(key, 0)) + amount)
+        return int(fields[key])
+
+    @_command
+    def zadd(self, name, mapping):
+        self.zsets.setdefault(name, {}).update(mapping)
+        return len(mapping)
+
+    @_command
+    def zrem(self, name, *members):
+        return sum(self.zsets.get(name, {}).pop(member, None) is not None for member in members)
+
+    @_command
+    def zcard(self, name):
+        return len(self.zsets.get(name, {}))
+
+    def _sorted(self, name):
+        return sorted(self.zsets.get(name, {}).items(), key=lambda item: item[1])
+
+    @_command
+    def zrange(self, name, start, end):
+        members = [member for member, _ in self._sorted(name)]
+        return members[start:] if end == -1 else members[start:end + 1]
+
+    @_command
+    def zrangebyscore(self, name, min, max, start=None, num=None):
+        members = [member for member, score in self._sorted(name) if float(min) <= score <= float(max)]
+        return members[start:start + num] if num is not None else members
+
+    @_command
+    def publish(self, channel, message):
+        self.published.append((channel, message))
+        return 0
+
+    def pipeline(self, transaction=True):
+        return InMemoryPipeline(self)
+
+
+class InMemoryPipeline:
+    """排队命令，execute时依次执行"""
+
+    def __init__(self, redis):
+        self.redis = redis
+        self.commands = []
+
+    def __getattr__(self, name):
+        def queue(*args, **kwargs):
+            self.commands.append((name, args, kwargs))
+            return self
+        return queue
+
+    def execute(self):
+        self.redis.calls['execute'] += 1
+        commands, self.commands = self.commands, []
+        return [getattr(self.redis, name)(*args, **kwargs) for name, args, kwargs in commands]
+
+
+class AsyncInMemoryPipeline(InMemoryPipeline):
+    async def execute(self):
+        return InMemoryPipeline.execute(self)
+
+
+class AsyncInMemoryRedis:
+    """InMemoryRedis的redis.asyncio接口，命令为协程，共享同一份数据"""
+
+    def __init__(self, redis):
+        self.redis = redis
+
+    def pipeline(self, transaction=True):
+        return AsyncInMemoryPipeline(self.redis)
+
+    def __getattr__(self, name):
+        command = getattr(self.redis, name)
+
+        async def run(*args, **kwargs):
+            return command(*args, **kwargs)
+        return run
+
+
+@pytest.fixture
+def fake_redis():
+    """内存Redis，用 fake_redis.attach(service._redis) 注入到服务中"""
+    return InMemoryRedis()
+
 # 标记集成测试
 pytestmark = [
     pytest.mark.asyncio,
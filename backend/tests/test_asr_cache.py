@@ -0,0 +1,121 @@
+import wave
+import struct
+import pytest
+from unittest.mock import patch
+
+from app.services.asr_cache import ASRResultCache
+from app.services.minio_client import minio_service
+
+
+def _write_wav(path, frames, sample_rate=16000, channels=1):
+    with wave.open(str(path), 'wb') as wav:
+        wav.setnchannels(channels)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(frames)
+
+
+class TestASRResultCache:
+    """测试按音频内容哈希缓存ASR结果"""
+
+    SRT = "1\n00:00:00,000 --> 00:00:01,000\n你好\n"
+
+    @pytest.fixture
+    def bucket(self):
+        objects = {}
+        with patch.object(minio_service, 'upload_file_content_sync',
+                          side_effect=lambda content, name, content_type: objects.__setitem__(name, content) or name), \
+             patch.object(minio_service, 'get_file_content_sync', side_effect=lambda name: objects.get(name)), \
+             patch.object(minio_service, 'delete_file_sync', side_effect=lambda name: objects.pop(name, None) is not None):
+            yield objects
+
+    @pytest.fixture
+    def cache(self, bucket, fake_redis):
+        cache = ASRResultCache(enabled=True, ttl_seconds=3600, max_bytes=100)
+        fake_redis.attach(cache._redis)
+        return cache
+
+    def test_key_depends_on_pcm_not_container(self, cache, tmp_path):
+        """测试缓存键只取决于PCM数据、模型和语言"""
+        frames = b''.join(struct.pack('<h', i % 1000) for i in range(16000))
+        first = tmp_path / "a.wav"
+        second = tmp_path / "b.wav"
+        _write_wav(first, frames)
+        _write_wav(second, frames)
+        # 在data块之前插入LIST块，只改变容器头部
+        data = second.read_bytes()
+        list_chunk = b'LIST' + struct.pack('<I', 4) + b'INFO'
+        second.write_bytes(data[:36] + list_chunk + data[36:])
+
+        key = cache.compute_audio_key_sync(str(first), "whisper", "zh")
+        assert cache.compute_audio_key_sync(str(second), "whisper", "zh") == key
+        assert cache.compute_audio_key_sync(str(first), "sense", "zh") != key
+        assert cache.compute_audio_key_sync(str(first), "whisper", "en") != key
+
+    def test_miss_store_hit(self, cache):
+        """测试未命中、写入后命中，并统计命中率"""
+        assert cache.lookup_sync("k1") is None
+        assert cache.store_sync("k1", self.SRT, "whisper", "zh")
+        assert cache.lookup_sync("k1") == self.SRT
+
+        stats = cache.get_stats()
+        assert (stats['hits'], stats['misses'], stats['stores']) == (1, 1, 1)
+        assert stats['hit_rate'] == 0.5
+        assert stats['entries'] == 1
+
+    def test_pending_task_stored_on_callback(self, cache):
+        """测试TUS任务回调完成后按TaskID写入缓存"""
+        cache.register_pending_sync("tus-1", "k1", "whisper", "zh")
+        assert cache.store_for_task_sync("tus-1", self.SRT)
+        assert cache.lookup_sync("k1") == self.SRT
+        # 同一个任务的重复回调不会重复写入
+        assert not cache.store_for_task_sync("tus-1", self.SRT)
+
+    def test_evicts_least_recently_used(self, cache, bucket):
+        """测试超出容量时淘汰最久未访问的条目"""
+        cache.store_sync("k1", self.SRT)
+        cache.store_sync("k2", self.SRT)
+        cache.lookup_sync("k1")
+        cache.store_sync("k3", self.SRT)
+
+        assert cache.lookup_sync("k2") is None
+        assert cache.lookup_sync("k1") == self.SRT
+        assert "asr_cache/k2.srt" not in bucket
+        assert cache.get_stats()['total_bytes'] <= 100
+
+    def test_lost_object_is_a_miss(self, cache, bucket):
+        """测试索引存在但MinIO对象丢失时视为未命中并清理索引"""
+        cache.store_sync("k1", self.SRT)
+        bucket.clear()
+
+        assert cache.lookup_sync("k1") is None
+        assert cache.get_stats()['entries'] == 0
+
+    def test_eviction_reads_only_lru_head(self, cache, fake_redis):
+        """测试超出容量时只读取最久未访问一端的条目，不遍历整个LRU集合"""
+        cache._max_bytes = 10 ** 9
+        for index in range(500):
+            cache.store_sync(f"k{index}", self.SRT)
+        fake_redis.zsets["asr_cache:lru"] = {f"k{index}": 1000.0 + index for index in range(500)}
+
+        cache._max_bytes = len(self.SRT.encode('utf-8')) * 497
+        fake_redis.calls.clear()
+        with patch('app.services.asr_cache.time.time', return_value=2000.0):
+            assert cache.evict_sync() == 3
+        assert fake_redis.calls['hget'] + fake_redis.calls['hgetall'] == 3
+        assert fake_redis.zrange("asr_cache:lru", 0, 0) == ["k3"]
+
+    def test_expired_entries_removed(self, cache, bucket, fake_redis):
+        """测试访问时间早于TTL的条目被清理，较新的条目保留"""
+        cache.store_sync("old", self.SRT)
+        cache.store_sync("new", self.SRT)
+        fake_redis.zsets["asr_cache:lru"]["old"] -= cache.ttl_seconds + 1
+        # 模拟Redis已按TTL删除条目Hash，大小从MinIO对象读取
+        fake_redis.delete(cache._entry_key("old"))
+
+        size = len(self.SRT.encode('utf-8'))
+        with patch.object(minio_service, 'stat_file_sync', return_value={'size': size}):
+            assert cache.evict_sync() == 1
+        assert "asr_cache/old.srt" not in bucket
+        assert cache.lookup_sync("new") == self.SRT
+        assert cache.get_stats()['total_bytes'] == size
@@ -0,0 +1,90 @@
+import wave
+import shutil
+import asyncio
+import subprocess
+import numpy as np
+import pytest
+from pathlib import Path
+
+from app.services.asr_transport import ASRTransportEncoder
+from app.services.file_size_detector import FileSizeDetector
+
+pytestmark = pytest.mark.skipif(not shutil.which('ffmpeg'), reason="需要ffmpeg")
+
+
+@pytest.fixture
+def speech_wav(tmp_path):
+    """10秒16kHz单声道，带停顿的低频信号"""
+    path = tmp_path / "speech.wav"
+    t = np.arange(16000 * 10) / 16000
+    samples = (np.sin(2 * np.pi * 220 * t) * 6000 * (np.sin(2 * np.pi * 0.5 * t) > 0)).astype(np.int16)
+    with wave.open(str(path), 'wb') as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(16000)
+        wav.writeframes(samples.tobytes())
+    return path
+
+
+def _decode_pcm(path):
+    return subprocess.run(
+        ['ffmpeg', '-v', 'error', '-i', str(path), '-f', 's16le', '-ac', '1', '-ar', '16000', 'pipe:1'],
+        capture_output=True, check=True
+    ).stdout
+
+
+class TestASRTransportEncoder:
+    """测试TUS上传前的传输编码"""
+
+    def test_flac_is_lossless_and_cleaned_up(self, speech_wav):
+        """测试FLAC解码后的PCM与原始WAV一致，退出后删除临时文件"""
+        encoder = ASRTransportEncoder(codec='flac')
+
+        async def _run():
+            async with encoder.transport_file(str(speech_wav)) as (path, codec):
+                assert codec == 'flac'
+                assert path.endswith('.flac')
+                assert Path(path).stat().st_size < speech_wav.stat().st_size
+                assert _decode_pcm(path) == _decode_pcm(speech_wav)
+                return path
+
+        encoded_path = asyncio.run(_run())
+        assert not Path(encoded_path).exists()
+
+    def test_opus_size_follows_bitrate(self, speech_wav):
+        """测试Opus按配置的码率编码，估算大小与实际接近"""
+        encoder = ASRTransportEncoder(codec='opus', opus_bitrate=24000)
+
+        async def _run():
+            async with encoder.transport_file(str(speech_wav)) as (path, codec):
+                return codec, Path(path).stat().st_size
+
+        codec, size = asyncio.run(_run())
+        estimate = encoder.estimate_transport_size(speech_wav.stat().st_size)
+        assert codec == 'opus'
+        assert estimate == pytest.approx(30000, rel=0.01)
+        assert size == pytest.approx(estimate, rel=0.5)
+
+    def test_wav_and_unknown_codec_pass_through(self, speech_wav):
+        """测试wav和未知编码直接上传原始文件"""
+        async def _run(encoder):
+            async with encoder.transport_file(str(speech_wav)) as result:
+                return result
+
+        assert asyncio.run(_run(ASRTransportEncoder(codec='wav'))) == (str(speech_wav), 'wav')
+        assert asyncio.run(_run(ASRTransportEncoder(codec='mp3'))) == (str(speech_wav), 'wav')
+
+    def test_detector_compares_transport_size(self, tmp_path, monkeypatch):
+        """测试文件大小阈值按传输编码后的字节数比较"""
+        path = tmp_path / "big.wav"
+        path.write_bytes(b'\x00' * 3 * 1024 * 1024)
+        detector = FileSizeDetector(threshold_mb=2)
+
+        monkeypatch.setattr('app.core.config.settings.tus_transport_codec', 'wav')
+        assert detector.detect_file_size(str(path))['use_tus']
+
+        monkeypatch.setattr('app.core.config.settings.tus_transport_codec', 'flac')
+        result = detector.detect_file_size(str(path))
+        assert result['transport_codec'] == 'flac'
+        assert result['transport_size'] < 2 * 1024 * 1024
+        assert not result['use_tus']
@@ -0,0 +1,362 @@
+import base64
+import asyncio
+import hashlib
+from datetime import timedelta
+from urllib.parse import urlparse, parse_qs
+
+import pytest
+from unittest.mock import patch
+from aiohttp import web
+from minio.error import S3Error
+
+from app.core.config import settings
+from app.services.async_s3_client import AsyncS3Client
+from app.services.http_session_pool import HTTPSessionPool
+from app.services.minio_client import minio_service
+
+
+def _make_store_app(objects, requests, part_failures=None):
+    """最小的S3兼容服务：按路径保存对象，支持分片上传，记录收到的请求
+
+    part_failures: {分片号: 剩余失败次数}，对应分片上传先返回若干次500
+    """
+    uploads = {}
+    part_failures = part_failures if part_failures is not None else {}
+
+    async def handle(request):
+        requests.append((request.method, request.path_qs, dict(request.headers)))
+        query = request.query
+        if 'location' in query:
+            return web.Response(text='<LocationConstraint xmlns="http://s3.amazonaws.com/doc/2006-03-01/"/>',
+                                content_type='application/xml')
+        key = request.path
+        if request.method == 'POST' and 'uploads' in query:
+            upload_id = f"upload-{len(uploads) + 1}"
+            uploads[upload_id] = {}
+            return web.Response(content_type='application/xml', text=(
+                '<InitiateMultipartUploadResult xmlns="http://s3.amazonaws.com/doc/2006-03-01/">'
+                f'<UploadId>{upload_id}</UploadId></InitiateMultipartUploadResult>'))
+        if request.method == 'PUT' and 'partNumber' in query:
+            part_number = int(query['partNumber'])
+            data = await request.read()
+            if part_failures.get(part_number):
+                part_failures[part_number] -= 1
+                return web.Response(status=500, content_type='application/xml',
+                                    text='<Error><Code>InternalError</Code><Message>retry</Message></Error>')
+            if request.headers.get('Content-MD5') != base64.b64encode(hashlib.md5(data).digest()).decode():
+                return web.Response(status=400, content_type='application/xml',
+                                    text='<Error><Code>BadDigest</Code><Message>md5</Message></Error>')
+            uploads[query['uploadId']][part_number] = data
+            return web.Response(headers={'ETag': f'"{hashlib.md5(data).hexdigest()}"'})
+        if request.method == 'POST' and 'uploadId' in query:
+            await request.read()
+            parts = uploads.pop(query['uploadId'])
+            objects[key] = b''.join(parts[n] for n in sorted(parts))
+            etag = hashlib.md5(b''.join(hashlib.md5(parts[n]).digest() for n in sorted(parts))).hexdigest()
+            return web.Response(content_type='application/xml', text=(
+                '<CompleteMultipartUploadResult xmlns="http://s3.amazonaws.com/doc/2006-03-01/">'
+                f'<ETag>&quot;{etag}-{len(parts)}&quot;</ETag></CompleteMultipartUploadResult>'))
+        if request.method == 'DELETE' and 'uploadId' in query:
+            uploads.pop(query['uploadId'], None)
+            return web.Response(status=204)
+        if request.method == 'PUT':
+            objects[key] = await request.read()
+            return web.Response(headers={'ETag': '"etag-1"'})
+        if key not in objects:
+            if request.method == 'HEAD':
+                return web.Response(status=404)
+            return web.Response(status=404, content_type='application/xml',
+                                text='<Error><Code>NoSuchKey</Code><Message>missing</Message></Error>')
+        if request.method == 'HEAD':
+            return web.Response(headers={'Content-Length': str(len(objects[key])), 'ETag': '"etag-1"',
+                                         'Last-Modified': 'Mon, 12 Oct 2026 08:00:00 GMT'})
+        if request.method == 'DELETE':
+            objects.pop(key)
+            return web.Response(status=204)
+        return web.Response(body=objects[key])
+
+    app = web.Application(client_max_size=64 * 1024 * 1024)
+    app.router.add_route('*', '/{tail:.*}', handle)
+    return app
+
+
+class TestAsyncS3Client:
+    """测试异步S3客户端的请求、签名和并发通道"""
+
+    @pytest.fixture
+    def env(self):
+        objects, requests = {}, []
+        loop = asyncio.new_event_loop()
+        app = _make_store_app(objects, requests)
+        runner = web.AppRunner(app)
+        loop.run_until_complete(runner.setup())
+        site = web.TCPSite(runner, '127.0.0.1', 0)
+        loop.run_until_complete(site.start())
+        port = site._server.sockets[0].getsockname()[1]
+        pool = HTTPSessionPool(limit=8, limit_per_host=8, keepalive_timeout=30, dns_cache_ttl=60)
+        stream_pool = HTTPSessionPool(limit=8, limit_per_host=8, keepalive_timeout=30, dns_cache_ttl=60)
+        client = AsyncS3Client(f"127.0.0.1:{port}", "minioadmin", "minioadmin", session_pool=pool,
+                               presign_endpoint="media.example.com", small_concurrency=4, large_concurrency=1,
+                               stream_session_pool=stream_pool, stream_concurrency=8)
+        yield client, loop, objects, requests
+        loop.run_until_complete(pool.close())
+        loop.run_until_complete(stream_pool.close())
+        loop.run_until_complete(runner.cleanup())
+        loop.close()
+
+    def test_roundtrip(self, env, tmp_path):
+        """测试上传、查询、下载和删除，请求带有SigV4签名"""
+        client, loop, objects, requests = env
+        source = tmp_path / "video.mp4"
+        source.write_bytes(b'x' * 100000)
+
+        async def run():
+            await client.put_object_file("bucket", "users/1/视频 1.mp4", str(source), "video/mp4")
+            stat = await client.stat_object("bucket", "users/1/视频 1.mp4")
+            stream = await client.get_object("bucket", "users/1/视频 1.mp4")
+            data = b''
+            while True:
+                chunk = await stream.read(8192)
+                if not chunk:
+                    break
+                data += chunk
+            stream.close()
+            await client.remove_object("bucket", "users/1/视频 1.mp4")
+            return stat, data
+
+        stat, data = loop.run_until_complete(run())
+        assert (stat.size, stat.etag) == (100000, "etag-1")
+        assert stat.last_modified.year == 2026
+        assert data == b'x' * 100000
+        assert objects == {}
+        put = next(headers for method, _, headers in requests if method == 'PUT')
+        assert put['Authorization'].startswith("AWS4-HMAC-SHA256 Credential=minioadmin/")
+        assert put['x-amz-content-sha256'] == "UNSIGNED-PAYLOAD"
+        assert put['Content-Type'] == "video/mp4"
+
+    def test_missing_object_raises_s3_error(self, env):
+        """测试对象不存在时抛出S3Error"""
+        client, loop, _, _ = env
+        with pytest.raises(S3Error) as exc_info:
+            loop.run_until_complete(client.stat_object("bucket", "missing.mp4"))
+        assert exc_info.value.code == "NoSuchKey"
+        with pytest.raises(S3Error) as exc_info:
+            loop.run_until_complete(client.get_object("bucket", "missing.mp4"))
+        assert exc_info.value.message == "missing"
+        # 失败的GET不占用stream通道
+        assert client.get_stats()['stream']['active'] == 0
+
+    def test_presign_uses_public_endpoint_without_request(self, env):
+        """测试预签名URL使用公共端点，区域缓存后不再发出请求"""
+        client, loop, _, requests = env
+        loop.run_until_complete(client.presigned_get_object("bucket", "a.mp4"))
+        count = len(requests)
+        url = loop.run_until_complete(client.presigned_get_object("bucket", "a.mp4", expires=timedelta(hours=1)))
+        assert len(requests) == count
+        parsed = urlparse(url)
+        assert (parsed.netloc, parsed.path) == ("media.example.com", "/bucket/a.mp4")
+        query = parse_qs(parsed.query)
+        assert query['X-Amz-Expires'] == ['3600']
+        assert 'X-Amz-Signature' in query
+
+    def test_small_requests_do_not_wait_for_large_lane(self, env):
+        """测试大文件通道占满时元数据请求不排队"""
+        client, loop, objects, _ = env
+        objects['/bucket/big.mp4'] = b'y' * 1024
+        objects['/bucket/small.txt'] = b'z'
+
+        async def run():
+            async with client.transfer_slot():
+                waiting = asyncio.ensure_future(client.put_object("bucket", "big.mp4", b'y' * 1024 * 1024 * 8))
+                await asyncio.sleep(0.05)
+                assert not waiting.done()
+                stat = await asyncio.wait_for(client.stat_object("bucket", "small.txt"), timeout=2)
+            await waiting
+            return stat
+
+        assert loop.run_until_complete(run()).size == 1
+        stats = client.get_stats()
+        assert stats['large']['queued'] == 1
+        assert stats['small']['queued'] == 0
+
+
+    def test_slow_streams_do_not_block_large_lane(self, env, tmp_path):
+        """测试多个未读完的对象流（慢速客户端）不占用大文件通道，新的流和大文件上传照常完成"""
+        client, loop, objects, requests = env
+        # 测试服务与客户端在同一事件循环中，对象较小时未读取的响应体不会阻塞服务端写入
+        objects['/bucket/video.mp4'] = b'v' * 1000
+        source = tmp_path / "upload.mp4"
+        source.write_bytes(b'u' * 100000)
+
+        async def run():
+            # 超过大文件通道并发数（这里为1，默认为4）的流保持打开、不读取
+            held = [await asyncio.wait_for(client.get_object("bucket", "video.mp4"), timeout=2) for _ in range(5)]
+            try:
+                assert client.get_stats()['large']['active'] == 0
+                extra = await asyncio.wait_for(client.get_object("bucket", "video.mp4", 0, 10), timeout=2)
+                assert await extra.read()
+                assert requests[-1][2]['Range'] == 'bytes=0-9'
+                extra.close()
+                await asyncio.wait_for(
+                    client.put_object_file("bucket", "upload.mp4", str(source), "video/mp4"), timeout=2)
+            finally:
+                for stream in held:
+                    stream.close()
+
+        loop.run_until_complete(run())
+        assert objects['/bucket/upload.mp4'] == b'u' * 100000
+        stats = client.get_stats()
+        assert stats['large']['queued'] == 0
+        assert stats['stream']['active'] == 0
+
+
+class TestProxiedMediaStreams:
+    """测试视频代理（stream_minio_object）的慢速客户端不占用大文件通道"""
+
+    @pytest.fixture
+    def env(self):
+        objects, requests = {}, []
+        loop = asyncio.new_event_loop()
+        runner = web.AppRunner(_make_store_app(objects, requests))
+        loop.run_until_complete(runner.setup())
+        site = web.TCPSite(runner, '127.0.0.1', 0)
+        loop.run_until_complete(site.start())
+        port = site._server.sockets[0].getsockname()[1]
+        pool = HTTPSessionPool(limit=8, limit_per_host=8, keepalive_timeout=30, dns_cache_ttl=60)
+        stream_pool = HTTPSessionPool(limit=16, limit_per_host=16, keepalive_timeout=30, dns_cache_ttl=60)
+        # 使用默认的通道并发数（大文件通道为4）
+        client = AsyncS3Client(f"127.0.0.1:{port}", "minioadmin", "minioadmin", session_pool=pool,
+                               stream_session_pool=stream_pool)
+        with patch.object(minio_service, 'async_client', client), \
+             patch.object(minio_service, 'bucket_name', 'bucket'), \
+             patch.object(settings, 'media_stream_chunk_size', 100):
+            yield client, loop, objects
+        loop.run_until_complete(pool.close())
+        loop.run_until_complete(stream_pool.close())
+        loop.run_until_complete(runner.cleanup())
+        loop.close()
+
+    def test_open_streams_do_not_block_playback_or_upload(self, env, tmp_path):
+        """测试超过大文件通道并发数的代理响应只读了开头，新的Range请求和大文件上传照常完成"""
+        from starlette.requests import Request
+        from app.services.media_streaming import stream_minio_object
+
+        client, loop, objects = env
+        objects['/bucket/videos/1.mp4'] = bytes(range(256)) * 4
+        source = tmp_path / "upload.mp4"
+        source.write_bytes(b'u' * 100000)
+
+        def request(headers=None):
+            return Request({'type': 'http', 'method': 'GET', 'path': '/media', 'query_string': b'',
+                            'headers': [(k.lower().encode(), v.encode()) for k, v in (headers or {}).items()]})
+
+        async def run():
+            held = []
+            try:
+                # 浏览器暂停播放：每个响应只发送了第一块，MinIO流保持打开
+                for _ in range(settings.minio_large_op_concurrency + 1):
+                    response = await stream_minio_object(request(), "videos/1.mp4")
+                    body = response.body_iterator
+                    held.append(body)
+                    assert await asyncio.wait_for(body.__anext__(), timeout=2)
+                assert client.get_stats()['large']['active'] == 0
+
+                response = await asyncio.wait_for(
+                    stream_minio_object(request({'Range': 'bytes=0-9'}), "videos/1.mp4"), timeout=2)
+                assert response.status_code == 206
+                chunks = [chunk async for chunk in response.body_iterator]
+                assert b''.join(chunks)[:10] == bytes(range(10))
+
+                await asyncio.wait_for(
+                    client.put_object_file("bucket", "upload.mp4", str(source), "video/mp4"), timeout=2)
+            finally:
+                for body in held:
+                    await body.aclose()
+
+        loop.run_until_complete(run())
+        assert objects['/bucket/upload.mp4'] == b'u' * 100000
+        stats = client.get_stats()
+        assert stats['large']['queued'] == 0
+        assert stats['stream']['active'] == 0
+
+
+class TestMultipartUpload:
+    """测试MinioService的并行分片上传"""
+
+    PART_SIZE = 5 * 1024 * 1024
+
+    @pytest.fixture
+    def env(self):
+        objects, requests, part_failures = {}, [], {}
+        loop = asyncio.new_event_loop()
+        runner = web.AppRunner(_make_store_app(objects, requests, part_failures))
+        loop.run_until_complete(runner.setup())
+        site = web.TCPSite(runner, '127.0.0.1', 0)
+        loop.run_until_complete(site.start())
+        port = site._server.sockets[0].getsockname()[1]
+        pool = HTTPSessionPool(limit=8, limit_per_host=8, keepalive_timeout=30, dns_cache_ttl=60)
+        client = AsyncS3Client(f"127.0.0.1:{port}", "minioadmin", "minioadmin", session_pool=pool,
+                               small_concurrency=4, large_concurrency=1)
+        with patch.object(minio_service, 'async_client', client), \
+             patch.object(minio_service, 'bucket_name', 'bucket'), \
+             patch.object(settings, 'minio_multipart_part_retries', 2), \
+             patch('app.services.minio_client.MinioService._part_retry_delay', return_value=0):
+            yield loop, objects, requests, part_failures
+        loop.run_until_complete(pool.close())
+        loop.run_until_complete(runner.cleanup())
+        loop.close()
+
+    def test_plan_parts(self):
+        """测试分片不小于5MB，分片数超过上限时放大分片"""
+        plan = minio_service._plan_parts(12 * 1024 * 1024, part_size=1024)
+        assert [size for _, _, size in plan] == [self.PART_SIZE, self.PART_SIZE, 2 * 1024 * 1024]
+        huge = minio_service._plan_parts(100 * 1024 ** 3, part_size=self.PART_SIZE)
+        assert len(huge) <= 10000
+        assert sum(size for _, _, size in huge) == 100 * 1024 ** 3
+
+    def test_parts_uploaded_concurrently_and_retried(self, env, tmp_path):
+        """测试分片并行上传，失败的分片单独重试，合并后内容和ETag校验一致"""
+        loop, objects, requests, part_failures = env
+        payload = bytes(range(256)) * (self.PART_SIZE * 3 // 256 + 777)
+        source = tmp_path / "video.mp4"
+        source.write_bytes(payload)
+        part_failures[2] = 2
+
+        result = loop.run_until_complete(minio_service.upload_file_multipart(
+            str(source), "videos/1.mp4", "video/mp4", part_size=self.PART_SIZE, concurrency=3
+        ))
+
+        assert result == "videos/1.mp4"
+        assert objects['/bucket/videos/1.mp4'] == payload
+        part_requests = [path for method, path, _ in requests if method == 'PUT' and 'partNumber' in path]
+        assert sum('partNumber=2&' in path for path in part_requests) == 3
+        assert sum('partNumber=1&' in path for path in part_requests) == 1
+
+    def test_exhausted_retries_abort_upload(self, env, tmp_path):
+        """测试分片重试耗尽后取消上传并返回None"""
+        loop, objects, requests, part_failures = env
+        source = tmp_path / "video.mp4"
+        source.write_bytes(b'\x01' * (self.PART_SIZE * 2))
+        part_failures[1] = 5
+
+        result = loop.run_until_complete(minio_service.upload_file_multipart(
+            str(source), "videos/2.mp4", part_size=self.PART_SIZE
+        ))
+
+        assert result is None
+        assert objects == {}
+        assert any(method == 'DELETE' and 'uploadId=' in path for method, path, _ in requests)
+
+    def test_checksum_mismatch_removes_object(self, env, tmp_path):
+        """测试合并后的ETag与本地计算不一致时删除对象"""
+        loop, objects, _, _ = env
+        source = tmp_path / "video.mp4"
+        source.write_bytes(b'\x02' * (self.PART_SIZE + 10))
+
+        with patch.object(minio_service, '_expected_multipart_etag', return_value="0" * 32 + "-2"):
+            result = loop.run_until_complete(minio_service.upload_file_multipart(
+                str(source), "videos/3.mp4", part_size=self.PART_SIZE
+            ))
+
+        assert result is None
+        assert objects == {}
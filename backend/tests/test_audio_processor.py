@@ -0,0 +1,371 @@
+import wave
+import struct
+import shutil
+import hashlib
+import pytest
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from app.services.audio_processor import AudioProcessor
+from app.services.minio_client import minio_service
+
+
+def _write_wav(path, frames, sample_rate=16000, channels=1, sample_width=2):
+    with wave.open(str(path), 'wb') as wav:
+        wav.setnchannels(channels)
+        wav.setsampwidth(sample_width)
+        wav.setframerate(sample_rate)
+        wav.writeframes(frames)
+
+
+class TestCutWavSegment:
+    """测试从父视频WAV中按采样偏移截取音频"""
+
+    @pytest.fixture
+    def processor(self):
+        return AudioProcessor()
+
+    @pytest.fixture
+    def parent_wav(self, tmp_path):
+        """10秒16kHz单声道，每个采样值等于帧序号（取低16位）"""
+        path = tmp_path / "parent.wav"
+        frames = b''.join(struct.pack('<h', i % 32768) for i in range(16000 * 10))
+        _write_wav(path, frames)
+        return path
+
+    def test_cut_matches_sample_offsets(self, processor, parent_wav, tmp_path):
+        """测试截取的采样与父音频对应区间完全一致"""
+        output = tmp_path / "slice.wav"
+        info = processor.cut_wav_segment_sync(str(parent_wav), 2.5, 4.0, str(output))
+
+        assert info['start_frame'] == 40000
+        assert info['end_frame'] == 64000
+        assert info['duration'] == pytest.approx(1.5)
+        with wave.open(str(output), 'rb') as wav:
+            assert (wav.getframerate(), wav.getnchannels(), wav.getsampwidth()) == (16000, 1, 2)
+            assert wav.getnframes() == 24000
+            samples = struct.unpack('<24000h', wav.readframes(24000))
+        assert samples[0] == 40000 % 32768
+        assert samples[-1] == 63999 % 32768
+
+    def test_cut_clamps_to_audio_length(self, processor, parent_wav, tmp_path):
+        """测试结束时间超过音频长度时截断"""
+        output = tmp_path / "slice.wav"
+        info = processor.cut_wav_segment_sync(str(parent_wav), 9.0, 15.0, str(output))
+
+        assert info['duration'] == pytest.approx(1.0)
+        with wave.open(str(output), 'rb') as wav:
+            assert wav.getnframes() == 16000
+
+    def test_cut_handles_streamed_data_size(self, processor, parent_wav, tmp_path):
+        """测试ffmpeg流式写入时data块大小为0xFFFFFFFF的WAV"""
+        data = bytearray(parent_wav.read_bytes())
+        data_index = data.index(b'data')
+        data[data_index + 4:data_index + 8] = struct.pack('<I', 0xFFFFFFFF)
+        streamed = tmp_path / "streamed.wav"
+        streamed.write_bytes(bytes(data))
+
+        info = processor.cut_wav_segment_sync(str(streamed), 0.0, 1.0, str(tmp_path / "slice.wav"))
+        assert info['end_frame'] == 16000
+
+    def test_rejects_non_16k_mono(self, processor, tmp_path):
+        """测试格式不匹配时返回None，由调用方回退到ffmpeg"""
+        stereo = tmp_path / "stereo.wav"
+        _write_wav(stereo, b'\x00' * 44100 * 4, sample_rate=44100, channels=2)
+        assert processor.cut_wav_segment_sync(str(stereo), 0.0, 0.5, str(tmp_path / "out.wav")) is None
+
+    def test_derive_returns_none_without_parent_audio(self, processor):
+        """测试父视频音频不存在时返回None"""
+        with patch.object(minio_service, 'stat_file_sync', return_value=None), \
+             patch.object(minio_service, 'upload_file_sync') as mock_upload:
+            assert processor.derive_audio_from_parent_sync("1", 2, 3, 0.0, 5.0, "1_slice_9") is None
+        mock_upload.assert_not_called()
+
+
+class TestTranscriptWindow:
+    """测试从父视频字幕中截取切片字幕"""
+
+    PARENT_SRT = (
+        "1\n00:00:01,000 --> 00:00:04,000\n第一句\n\n"
+        "2\n00:00:05,000 --> 00:00:08,500\n第二句\n\n"
+        "3\n00:00:09,000 --> 00:00:12,000\n第三句\n"
+    )
+
+    @pytest.fixture
+    def processor(self):
+        return AudioProcessor()
+
+    def test_window_segments_rebases_and_clips(self):
+        """测试截取重叠片段、截断到窗口边界并以窗口起点为0"""
+        from app.services.asr_timestamp_utils import parse_srt_text, window_segments
+
+        segments = window_segments(parse_srt_text(self.PARENT_SRT), 3.0, 10.0)
+
+        assert [s['text'] for s in segments] == ["第一句", "第二句", "第三句"]
+        assert [(s['start'], s['end']) for s in segments] == [(0.0, 1.0), (2.0, 5.5), (6.0, 7.0)]
+
+    def test_derive_srt_from_parent_srt_file(self, processor):
+        """测试读取父视频SRT文件并上传截取后的切片字幕"""
+        with patch.object(minio_service, 'get_file_content_sync', return_value=self.PARENT_SRT.encode('utf-8')), \
+             patch.object(minio_service, 'upload_file_content_sync', side_effect=lambda content, name, content_type: name) as mock_upload:
+            result = processor.derive_srt_from_parent_sync("7", 2, 3, 4.5, 9.5, "7_slice_1.srt")
+
+        assert result['strategy'] == 'transcript_window'
+        assert result['object_name'] == "users/3/projects/2/subtitles/7_slice_1.srt"
+        assert result['total_segments'] == 2
+        assert result['srt_content'].startswith("1\n00:00:00,500 --> 00:00:04,000\n第二句")
+        mock_upload.assert_called_once()
+
+    def test_derive_srt_prefers_transcript_segments(self, processor):
+        """测试优先使用Transcript.segments，不读取父视频SRT文件"""
+        parent_segments = [{'start': 10.0, 'end': 12.0, 'text': "转录"}]
+        with patch.object(minio_service, 'get_file_content_sync') as mock_get, \
+             patch.object(minio_service, 'upload_file_content_sync', side_effect=lambda content, name, content_type: name):
+            result = processor.derive_srt_from_parent_sync("7", 2, 3, 9.0, 13.0, "7_subslice_5.srt", parent_segments)
+
+        mock_get.assert_not_called()
+        assert result['srt_content'].startswith("1\n00:00:01,000 --> 00:00:03,000\n转录")
+
+    def test_derive_srt_without_parent_transcript(self, processor):
+        """测试父视频字幕不存在时返回None，由调用方回退到ASR"""
+        with patch.object(minio_service, 'get_file_content_sync', return_value=None), \
+             patch.object(minio_service, 'upload_file_content_sync') as mock_upload:
+            assert processor.derive_srt_from_parent_sync("7", 2, 3, 0.0, 5.0, "7_slice_1.srt") is None
+        mock_upload.assert_not_called()
+
+
+class TestParallelASR:
+    """测试长音频按静音切分后并行识别并合并字幕"""
+
+    @pytest.fixture
+    def processor(self):
+        return AudioProcessor()
+
+    @pytest.fixture
+    def speech_wav(self, tmp_path):
+        """30秒音频：每5秒中前4秒为有声音的方波，后1秒为静音"""
+        path = tmp_path / "speech.wav"
+        tone = b''.join(struct.pack('<h', 8000 if (i // 20) % 2 else -8000) for i in range(16000 * 4))
+        silence = b'\x00\x00' * 16000
+        _write_wav(path, (tone + silence) * 6)
+        return path
+
+    def test_split_segments_are_contiguous(self, processor, speech_wav, tmp_path):
+        """测试分段首尾相接、切分点落在静音中、总时长不变"""
+        segments = processor.split_wav_for_parallel_asr_sync(str(speech_wav), str(tmp_path), segment_seconds=10)
+
+        assert len(segments) >= 2
+        assert sum(segment['duration'] for segment in segments) == pytest.approx(30.0)
+        for previous, current in zip(segments, segments[1:]):
+            assert current['start'] == pytest.approx(previous['start'] + previous['duration'])
+            # 每5秒的第4-5秒为静音
+            assert 4.0 <= current['start'] % 5 <= 5.0
+
+    def test_generate_srt_parallel_merges_offsets(self, processor, speech_wav):
+        """测试并发识别各分段并按分段时长偏移合并字幕"""
+        import sys
+        import asyncio
+        from types import SimpleNamespace
+        from app.services.asr_cache import asr_result_cache
+
+        active = []
+        peak = []
+        indexes = []
+
+        async def _transcribe_segment(file_path, metadata, segment_index=None):
+            indexes.append(segment_index)
+            active.append(file_path)
+            peak.append(len(active))
+            await asyncio.sleep(0.01)
+            active.remove(file_path)
+            return "1\n00:00:00,500 --> 00:00:01,000\n分段\n"
+
+        fake_client = SimpleNamespace(tus_asr_client=SimpleNamespace(transcribe_segment=_transcribe_segment))
+        with patch.dict(sys.modules, {'app.services.tus_asr_client': fake_client}), \
+             patch.object(asr_result_cache, '_enabled', False), \
+             patch('app.services.audio_processor.settings.asr_parallel_segment_seconds', 10), \
+             patch.object(minio_service, 'upload_file_content_sync', side_effect=lambda content, name, content_type: name):
+            result = asyncio.run(processor.generate_srt_parallel(
+                str(speech_wav), 2, 3, "7.srt", max_concurrency=2
+            ))
+
+        from app.services.asr_timestamp_utils import parse_srt_text
+        merged = parse_srt_text(result['srt_content'])
+        segments = result['processing_stats']['segment_count']
+        assert result['strategy'] == 'parallel_asr'
+        assert len(merged) == segments
+        assert max(peak) <= 2
+        # 各分段带序号提交，内容相同的分段也不会共用断点记录
+        assert sorted(indexes) == list(range(segments))
+        assert merged[0]['start'] == pytest.approx(0.5)
+        assert [s['start'] for s in merged] == sorted(s['start'] for s in merged)
+        assert merged[-1]['start'] > 10
+
+    def test_force_asr_bypasses_result_cache(self, processor, speech_wav):
+        """测试强制重新识别时不读取缓存，重新调用ASR并用新结果覆盖缓存条目"""
+        import sys
+        import asyncio
+        from app.services.asr_cache import asr_result_cache
+
+        transcribed = []
+        stored = {}
+
+        async def _transcribe_segment(file_path, metadata, segment_index=None):
+            transcribed.append(segment_index)
+            return "1\n00:00:00,500 --> 00:00:01,000\n新结果\n"
+
+        def _generate(force_asr):
+            return asyncio.run(processor.generate_srt_from_audio(
+                str(speech_wav), "7", 2, 3, custom_filename="7.srt", force_asr=force_asr
+            ))
+
+        fake_client = SimpleNamespace(tus_asr_client=SimpleNamespace(transcribe_segment=_transcribe_segment))
+        cached = "1\n00:00:00,000 --> 00:00:01,000\n旧结果\n"
+        with patch.dict(sys.modules, {'app.services.tus_asr_client': fake_client}), \
+             patch.object(asr_result_cache, '_enabled', True), \
+             patch.object(asr_result_cache, 'compute_audio_key_sync', side_effect=lambda path, model, lang: path), \
+             patch.object(asr_result_cache, 'lookup_sync', return_value=cached) as lookup, \
+             patch.object(asr_result_cache, 'store_sync', side_effect=lambda key, srt, *args: stored.__setitem__(key, srt)), \
+             patch('app.services.audio_processor.settings.asr_parallel_enabled', True), \
+             patch('app.services.audio_processor.settings.asr_parallel_min_duration', 20), \
+             patch('app.services.audio_processor.settings.asr_parallel_segment_seconds', 10), \
+             patch.object(minio_service, 'upload_file_content_sync', side_effect=lambda content, name, content_type: name):
+            assert _generate(force_asr=False)['strategy'] == 'asr_cache'
+            assert transcribed == []
+
+            lookup.reset_mock()
+            result = _generate(force_asr=True)
+
+        assert result['strategy'] == 'parallel_asr'
+        lookup.assert_not_called()
+        segments = result['processing_stats']['segment_count']
+        assert sorted(transcribed) == list(range(segments))
+        # 整段和各分段的缓存条目都被新结果覆盖
+        assert stored[str(speech_wav)] == result['srt_content']
+        assert len(stored) == segments + 1
+        assert "旧结果" not in result['srt_content']
+
+
+class FakeMultipartClient:
+    """记录put_object和分片上传，并按分片号拼接出最终对象"""
+
+    def __init__(self):
+        self.objects = {}
+        self.uploads = {}
+        self.aborted = []
+
+    def put_object(self, bucket_name, object_name, data, length, content_type=None):
+        self.objects[object_name] = data.read(length)
+
+    def _create_multipart_upload(self, bucket_name, object_name, headers):
+        self.uploads["upload-1"] = {}
+        return "upload-1"
+
+    def _upload_part(self, bucket_name, object_name, data, headers, upload_id, part_number):
+        self.uploads[upload_id][part_number] = bytes(data)
+        return hashlib.md5(data).hexdigest()
+
+    def _complete_multipart_upload(self, bucket_name, object_name, upload_id, parts):
+        chunks = self.uploads.pop(upload_id)
+        self.objects[object_name] = b''.join(chunks[part.part_number] for part in parts)
+        digests = b''.join(hashlib.md5(chunks[part.part_number]).digest() for part in parts)
+        return SimpleNamespace(etag=f"{hashlib.md5(digests).hexdigest()}-{len(parts)}")
+
+    def _abort_multipart_upload(self, bucket_name, object_name, upload_id):
+        self.aborted.append(upload_id)
+
+    def remove_object(self, bucket_name, object_name):
+        self.objects.pop(object_name, None)
+
+
+class TestStreamingExtraction:
+    """测试ffmpeg输出经管道直接分片上传到MinIO"""
+
+    @pytest.fixture
+    def client(self):
+        client = FakeMultipartClient()
+        with patch.object(minio_service, 'internal_client', client):
+            yield client
+
+    def test_header_reflects_total_size(self, client):
+        """测试第一个分片最后上传，文件头中的长度与实际数据一致"""
+        import io
+        part_size = 5 * 1024 * 1024
+        payload = bytes(range(256)) * (part_size * 2 // 256 + 1000)
+
+        size = minio_service.upload_stream_sync(
+            io.BytesIO(payload), "audio.wav", "audio/wav", part_size=part_size,
+            header_factory=AudioProcessor.build_wav_header
+        )
+
+        assert size == len(payload)
+        obj = client.objects["audio.wav"]
+        assert obj == AudioProcessor.build_wav_header(len(payload)) + payload
+        assert AudioProcessor._read_wav_layout(obj)['data_size'] == len(payload)
+
+    def test_failed_part_aborts_upload(self, client):
+        """测试分片上传失败时取消整个上传"""
+        import io
+        part_size = 5 * 1024 * 1024
+        with patch.object(client, '_upload_part', side_effect=RuntimeError("boom")):
+            with pytest.raises(RuntimeError):
+                minio_service.upload_stream_sync(io.BytesIO(b'\x00' * part_size * 2), "audio.wav", part_size=part_size)
+        assert client.aborted == ["upload-1"]
+
+    def test_failed_part_retried_individually(self, client):
+        """测试连接错误的分片单独重试，其余分片不重传"""
+        import io
+        part_size = 5 * 1024 * 1024
+        payload = b'\x01' * (part_size * 3)
+        upload_part = client._upload_part
+        calls = []
+
+        def flaky(bucket_name, object_name, data, headers, upload_id, part_number):
+            calls.append(part_number)
+            if part_number == 2 and calls.count(2) == 1:
+                raise ConnectionResetError("reset")
+            return upload_part(bucket_name, object_name, data, headers, upload_id, part_number)
+
+        with patch.object(client, '_upload_part', side_effect=flaky), \
+             patch.object(minio_service, '_part_retry_delay', return_value=0):
+            size = minio_service.upload_stream_sync(io.BytesIO(payload), "audio.wav", part_size=part_size)
+
+        assert size == len(payload)
+        assert client.objects["audio.wav"] == payload
+        assert sorted(calls) == [1, 2, 2, 3]
+
+    @pytest.mark.skipif(not shutil.which('ffmpeg'), reason="需要ffmpeg")
+    def test_extract_computes_info_from_byte_count(self, client, tmp_path):
+        """测试提取结果为16kHz单声道WAV，时长和大小由字节数计算"""
+        import subprocess
+        source = tmp_path / "source.wav"
+        subprocess.run(
+            ['ffmpeg', '-v', 'error', '-f', 'lavfi', '-i', 'sine=frequency=440:sample_rate=44100:duration=3',
+             '-ac', '2', '-y', str(source)],
+            check=True
+        )
+
+        info = AudioProcessor().extract_audio_streaming_sync(str(source), "users/1/projects/2/audio/9.wav")
+
+        obj = client.objects["users/1/projects/2/audio/9.wav"]
+        assert info['file_size'] == len(obj)
+        assert info['duration'] == pytest.approx(3.0, abs=0.01)
+        output = tmp_path / "out.wav"
+        output.write_bytes(obj)
+        with wave.open(str(output), 'rb') as wav:
+            assert (wav.getframerate(), wav.getnchannels(), wav.getsampwidth()) == (16000, 1, 2)
+            assert wav.getnframes() == (len(obj) - 44) // 2
+
+    @pytest.mark.skipif(not shutil.which('ffmpeg'), reason="需要ffmpeg")
+    def test_extract_failure_removes_object(self, client, tmp_path):
+        """测试ffmpeg失败时删除已上传的对象并抛出异常"""
+        with pytest.raises(Exception, match="音频提取失败"):
+            AudioProcessor().extract_audio_streaming_sync(str(tmp_path / "missing.mp4"), "audio.wav")
+        assert "audio.wav" not in client.objects
+
+    def test_extract_without_ffmpeg_raises_extraction_error(self, client, tmp_path):
+        """测试找不到ffmpeg时抛出与其他失败相同的音频提取异常"""
+        with patch('app.services.audio_processor.subprocess.Popen', side_effect=FileNotFoundError("ffmpeg")):
+            with pytest.raises(Exception, match="音频提取失败"):
+                AudioProcessor().extract_audio_streaming_sync(str(tmp_path / "source.mp4"), "audio.wav")
+        assert "audio.wav" not in client.objects
@@ -0,0 +1,77 @@
+import wave
+import numpy as np
+import pytest
+from pydub import AudioSegment
+from pydub.silence import detect_silence, detect_nonsilent
+
+import audio_splitter_enhanced as splitter
+
+
+def _speech_like_samples(frame_rate, channels, seconds, seed=0):
+    """以0.3Hz开关的噪声模拟说话和停顿"""
+    rng = np.random.default_rng(seed)
+    frames = np.arange(frame_rate * seconds)
+    loudness = (np.sin(frames / frame_rate * 2 * np.pi * 0.3) > 0.2) * 0.5 + 0.001
+    noise = rng.standard_normal(len(frames) * channels) * 3000
+    return (noise * np.repeat(loudness, channels)).astype(np.int16)
+
+
+def _legacy_find_energy_minimum(audio, start_time, end_time, window_size=200):
+    """原先基于AudioSegment切片的实现，作为对照"""
+    if end_time <= start_time:
+        return start_time
+    segment = audio[start_time:end_time]
+    if len(segment) < window_size:
+        return (start_time + end_time) // 2
+    min_energy = float('inf')
+    min_pos = start_time
+    for win_start in range(0, len(segment) - window_size, window_size // 2):
+        energy = segment[win_start:win_start + window_size].rms
+        if energy < min_energy:
+            min_energy = energy
+            min_pos = start_time + win_start + window_size // 2
+    return min_pos
+
+
+class TestAudioEnvelope:
+    """测试NumPy能量包络与pydub实现的一致性"""
+
+    @pytest.mark.parametrize("frame_rate,channels", [(16000, 1), (44100, 2)])
+    def test_detect_silence_matches_pydub(self, frame_rate, channels):
+        """测试各种阈值下静音/非静音区间与pydub完全一致"""
+        samples = _speech_like_samples(frame_rate, channels, 20)
+        audio = AudioSegment(samples.tobytes(), frame_rate=frame_rate, sample_width=2, channels=channels)
+        envelope = splitter.as_envelope(audio)
+
+        assert len(envelope) == len(audio)
+        for min_silence_len, silence_thresh in [(500, -35), (250, -30), (100, -15), (1000, -50)]:
+            assert envelope.detect_silence(min_silence_len, silence_thresh) == \
+                detect_silence(audio, min_silence_len, silence_thresh)
+            assert envelope.detect_nonsilent(min_silence_len, silence_thresh) == \
+                detect_nonsilent(audio, min_silence_len, silence_thresh)
+
+    def test_find_energy_minimum_matches_legacy(self):
+        """测试能量最低点与逐窗口计算rms的结果一致"""
+        samples = _speech_like_samples(16000, 1, 20)
+        audio = AudioSegment(samples.tobytes(), frame_rate=16000, sample_width=2, channels=1)
+        envelope = splitter.as_envelope(audio)
+
+        for start, end in [(0, 4000), (1234, 9876), (15000, 20000), (500, 650)]:
+            assert splitter.find_energy_minimum(envelope, start, end) == \
+                _legacy_find_energy_minimum(audio, start, end)
+
+    def test_wav_is_memory_mapped(self, tmp_path):
+        """测试WAV通过内存映射读取，包络与解码后的AudioSegment一致"""
+        samples = _speech_like_samples(16000, 1, 10)
+        path = tmp_path / "speech.wav"
+        with wave.open(str(path), 'wb') as wav:
+            wav.setnchannels(1)
+            wav.setsampwidth(2)
+            wav.setframerate(16000)
+            wav.writeframes(samples.tobytes())
+
+        envelope = splitter.load_envelope(str(path))
+        audio = AudioSegment.from_wav(str(path))
+
+        assert isinstance(envelope.samples, np.memmap)
+        assert splitter.get_silence_chunks(envelope) == splitter.get_silence_chunks(audio)
@@ -0,0 +1,158 @@
+import time
+import uuid
+import asyncio
+import threading
+
+import pytest
+import redis
+import aiohttp
+from aiohttp import web
+from unittest.mock import patch
+
+from app.core.config import settings
+
+
+def _redis_available():
+    try:
+        redis.from_url(settings.redis_url, socket_connect_timeout=1).ping()
+        return True
+    except Exception:
+        return False
+
+
+pytestmark = pytest.mark.skipif(not _redis_available(), reason="需要Redis")
+
+CALLBACK_HEADERS = {'User-Agent': 'Tus-ASR-Task-Manager/1.0'}
+
+
+@pytest.fixture
+def server():
+    from callback_server import StandaloneCallbackServer
+    with patch.object(StandaloneCallbackServer, '_init_database'):
+        server = StandaloneCallbackServer()
+    # 每个测试使用独立的Stream和统计键
+    suffix = uuid.uuid4().hex[:8]
+    server.stream_key = f"test_callback_stream:{suffix}"
+    server.dead_letter_key = f"test_callback_dead:{suffix}"
+    server.stats_key = f"test_callback_stats:{suffix}"
+    server.stream_stats_key = f"{server.stats_key}:stream"
+    server.processing_times_key = f"{server.stats_key}:processing_ms"
+    server.consumer_count = 2
+    yield server
+    server._server_running = False
+    for thread in server._consumer_threads:
+        thread.join(timeout=5)
+    server._redis_client.delete(
+        server.stream_key, server.dead_letter_key, server.stats_key,
+        server.stream_stats_key, server.processing_times_key
+    )
+
+
+async def _post_callbacks(server, payloads):
+    runner = web.AppRunner(server.build_app())
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    try:
+        async with aiohttp.ClientSession(headers=CALLBACK_HEADERS) as session:
+            statuses = []
+            for payload in payloads:
+                async with session.post(f"http://127.0.0.1:{port}/callback", json=payload) as response:
+                    statuses.append(response.status)
+            async with session.get(f"http://127.0.0.1:{port}/health") as response:
+                health = await response.json()
+        return statuses, health
+    finally:
+        await runner.cleanup()
+
+
+def _wait_until(condition, timeout=10):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if condition():
+            return True
+        time.sleep(0.05)
+    return False
+
+
+class TestCallbackStream:
+    """测试回调写入Redis Stream并由消费者组处理"""
+
+    def test_handler_enqueues_without_processing(self, server):
+        """测试回调请求只入队，不在请求中执行处理"""
+        with patch.object(server, '_process_callback') as process:
+            statuses, health = asyncio.run(_post_callbacks(server, [
+                {'task_id': f"t{i}", 'status': 'completed'} for i in range(3)
+            ]))
+
+        assert statuses == [200, 200, 200]
+        process.assert_not_called()
+        assert server._redis_client.xlen(server.stream_key) == 3
+        assert health['stream']['stream_length'] == 3
+
+    def test_consumers_process_and_ack(self, server):
+        """测试消费者处理消息后确认，/health报告积压和处理耗时"""
+        processed = []
+        server._server_running = True
+        with patch.object(server, '_process_callback', side_effect=lambda payload: processed.append(payload['task_id'])):
+            server.start_consumers()
+            statuses, _ = asyncio.run(_post_callbacks(server, [
+                {'task_id': f"t{i}", 'status': 'completed'} for i in range(5)
+            ]))
+            assert _wait_until(lambda: len(processed) == 5)
+            assert _wait_until(lambda: server._get_stream_stats()['processed'] == 5)
+
+        stats = server._get_stream_stats()
+        assert sorted(processed) == [f"t{i}" for i in range(5)]
+        assert stats['pending'] == 0
+        assert stats['lag'] in (0, None)
+        assert 'p95_processing_ms' in stats
+
+    def test_failed_entries_are_retried_then_dead_lettered(self, server):
+        """测试处理失败的消息被重新认领重试，超过最大尝试次数后转入死信"""
+        server.claim_idle_ms = 200
+        server.max_attempts = 3
+        attempts = []
+        lock = threading.Lock()
+
+        def fail(payload):
+            with lock:
+                attempts.append(payload['task_id'])
+            raise RuntimeError("数据库不可用")
+
+        server._server_running = True
+        with patch.object(server, '_process_callback', side_effect=fail):
+            server.start_consumers()
+            asyncio.run(_post_callbacks(server, [{'task_id': 'bad', 'status': 'completed'}]))
+            assert _wait_until(lambda: server._redis_client.xlen(server.dead_letter_key) == 1)
+
+        stats = server._get_stream_stats()
+        assert len(attempts) >= 3
+        assert stats['dead_lettered'] == 1
+        assert stats['pending'] == 0
+        dead = server._redis_client.xrange(server.dead_letter_key)[0][1]
+        assert dead[b'attempts'] == b'3'
+        assert b'error' in dead
+
+
+class TestTaskMapping:
+    """测试TUS任务ID到Celery任务ID的直接查找"""
+
+    def test_reverse_mapping_lookup_without_keys_scan(self, server):
+        """测试客户端注册的反向映射可被回调服务器直接GET到"""
+        from app.services.standalone_callback_client import StandaloneCallbackClient
+        suffix = uuid.uuid4().hex[:8]
+        task_id, celery_task_id = f"tus-{suffix}", f"celery-{suffix}"
+        client = StandaloneCallbackClient()
+        assert client.register_task(task_id, celery_task_id)
+        # 任务键过期后仍可通过反向映射找到
+        server._redis_client.delete(server._get_task_key(task_id))
+        try:
+            with patch.object(server._redis_client, 'keys', side_effect=AssertionError("不应调用KEYS")):
+                assert server._get_celery_task_id_from_redis(task_id) == celery_task_id
+                assert server._count_keys(f"tus_task_mapping:tus-{suffix}*") == 1
+        finally:
+            server._redis_client.delete(
+                f"tus_celery_mapping:{celery_task_id}", f"tus_task_mapping:{task_id}", client._get_task_key(task_id)
+            )
@@ -0,0 +1,135 @@
+import asyncio
+from unittest.mock import patch
+
+from app.core.config import settings
+from app.services.config_version import ConfigVersion
+from app.services.minio_client import minio_service
+
+
+async def _return(value):
+    return value
+
+
+def _make_version(redis, check_interval=30):
+    version = ConfigVersion(check_interval=check_interval, pubsub_enabled=False)
+    if redis is not None:
+        redis.attach(version._redis)
+    version.loads = 0
+
+    def load_settings():
+        version.loads += 1
+    version._load_settings = load_settings
+    return version
+
+
+class TestConfigVersion:
+    """测试按版本刷新系统配置"""
+
+    def test_loads_only_when_version_changes(self, fake_redis):
+        """测试版本不变时不重新加载，其他进程bump后重新加载一次"""
+        reader = _make_version(fake_redis, check_interval=0)
+        writer = _make_version(fake_redis)
+        assert reader.ensure_current_sync()
+        for _ in range(10):
+            assert not reader.ensure_current_sync()
+        assert reader.loads == 1
+
+        writer.bump_sync()
+        assert reader.ensure_current_sync()
+        assert reader.loads == 2
+        assert reader.local_version == 1
+
+    def test_fast_path_skips_redis_until_notified(self, fake_redis):
+        """测试核对间隔内不访问Redis，收到更新通知后立即核对"""
+        reader = _make_version(fake_redis)
+        reader.ensure_current_sync()
+        gets = fake_redis.calls['get']
+        for _ in range(100):
+            reader.ensure_current_sync()
+        assert fake_redis.calls['get'] == gets
+
+        fake_redis.incr(ConfigVersion.VERSION_KEY)
+        reader._on_message("1")
+        assert reader.ensure_current_sync()
+        assert fake_redis.calls['get'] == gets + 1
+        # 过期或重复的通知不会触发核对
+        reader._on_message("1")
+        reader._on_message("not-a-version")
+        assert not reader.ensure_current_sync()
+        assert fake_redis.calls['get'] == gets + 1
+
+    def test_bump_publishes_and_notifies_without_reload(self, fake_redis):
+        """测试写入方递增版本、发布通知并回调监听者，不再从数据库加载"""
+        writer = _make_version(fake_redis)
+        calls = []
+        writer.register(lambda: calls.append('refreshed'))
+        assert writer.bump_sync() == 1
+        assert fake_redis.published == [(ConfigVersion.CHANNEL, 1)]
+        assert calls == ['refreshed']
+        assert not writer.ensure_current_sync()
+        assert writer.loads == 0
+
+    def test_failing_listener_does_not_block_others(self, fake_redis):
+        """测试某个监听者失败时其他监听者仍被调用"""
+        version = _make_version(fake_redis)
+        calls = []
+
+        def broken():
+            raise RuntimeError("boom")
+        version.register(broken)
+        version.register(lambda: calls.append('ok'))
+        version.ensure_current_sync()
+        assert calls == ['ok']
+
+    def test_redis_unavailable_loads_once(self):
+        """测试Redis不可用时只在首次使用时加载，之后保持当前配置"""
+        version = _make_version(None, check_interval=0)
+        version._redis.get = lambda: None
+        assert version.ensure_current_sync()
+        assert not version.ensure_current_sync()
+        assert version.loads == 1
+        assert version.local_version == ConfigVersion.UNVERSIONED
+
+    def test_async_ensure_current_and_bump(self, fake_redis):
+        """测试异步版本的核对和递增"""
+        reader = _make_version(fake_redis, check_interval=0)
+        writer = _make_version(fake_redis)
+        loop = asyncio.new_event_loop()
+        try:
+            assert loop.run_until_complete(reader.ensure_current())
+            assert not loop.run_until_complete(reader.ensure_current())
+            assert loop.run_until_complete(writer.bump()) == 1
+            assert loop.run_until_complete(reader.ensure_current())
+        finally:
+            loop.close()
+        assert reader.loads == 2
+
+    def test_async_reload_runs_off_event_loop(self, fake_redis):
+        """测试异步核对发现版本变化时，数据库加载和监听者回调不在事件循环线程中执行"""
+        import threading
+        version = _make_version(fake_redis)
+        threads = []
+        version._load_settings = lambda: threads.append(threading.get_ident())
+        version.register(lambda: threads.append(threading.get_ident()))
+        loop = asyncio.new_event_loop()
+        try:
+            loop_thread = loop.run_until_complete(_return(threading.get_ident()))
+            assert loop.run_until_complete(version.ensure_current())
+        finally:
+            loop.close()
+        assert len(threads) == 2
+        assert loop_thread not in threads
+
+
+class TestMinioRefreshConfig:
+    """测试配置版本变化时MinIO客户端只在相关配置变化时重建"""
+
+    def test_rebuilds_only_on_minio_change(self):
+        client = minio_service.internal_client
+        minio_service.refresh_config()
+        assert minio_service.internal_client is client
+
+        with patch.object(settings, 'minio_access_key', 'rotated-key'):
+            minio_service.refresh_config()
+            assert minio_service.internal_client is not client
+        minio_service.reload_config()
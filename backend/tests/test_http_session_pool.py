@@ -0,0 +1,79 @@
+import asyncio
+import threading
+
+from aiohttp import web
+
+from app.services.http_session_pool import HTTPSessionPool
+
+
+async def _status(request):
+    return web.json_response({'status': 'processing'})
+
+
+def _start_server(loop):
+    """在指定事件循环中启动本地服务，返回(runner, 地址)"""
+    app = web.Application()
+    app.router.add_get('/status', _status)
+    runner = web.AppRunner(app)
+    loop.run_until_complete(runner.setup())
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    loop.run_until_complete(site.start())
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://127.0.0.1:{port}/status"
+
+
+async def _poll(pool, url, times):
+    for _ in range(times):
+        session = await pool.get_session()
+        async with session.get(url) as response:
+            assert (await response.json())['status'] == 'processing'
+
+
+class TestHTTPSessionPool:
+    """测试按事件循环复用HTTP会话"""
+
+    def test_requests_reuse_keepalive_connection(self):
+        """测试同一事件循环内的多次请求复用同一个会话和连接"""
+        pool = HTTPSessionPool(limit=8, limit_per_host=4, keepalive_timeout=30, dns_cache_ttl=60)
+        loop = asyncio.new_event_loop()
+        runner, url = _start_server(loop)
+        try:
+            loop.run_until_complete(_poll(pool, url, 5))
+            stats = pool.get_stats()
+            assert stats['sessions_created'] == 1
+            assert stats['requests'] == 5
+            assert stats['connections_created'] == 1
+            assert stats['connections_reused'] == 4
+            assert stats['reuse_ratio'] == 0.8
+        finally:
+            pool.close_sync()
+            loop.run_until_complete(runner.cleanup())
+            loop.close()
+        assert pool.get_stats()['active_sessions'] == 0
+
+    def test_each_event_loop_gets_its_own_session(self):
+        """测试逐任务创建的事件循环各自使用独立会话，已关闭事件循环的会话被丢弃"""
+        pool = HTTPSessionPool(limit=8, limit_per_host=4, keepalive_timeout=30, dns_cache_ttl=60)
+        server_loop = asyncio.new_event_loop()
+        runner, url = _start_server(server_loop)
+        server_thread = threading.Thread(target=server_loop.run_forever, daemon=True)
+        server_thread.start()
+        try:
+            for _ in range(3):
+                task_loop = asyncio.new_event_loop()
+                task_loop.run_until_complete(_poll(pool, url, 2))
+                task_loop.close()
+
+            # 新事件循环获取会话时清理已关闭事件循环的会话
+            task_loop = asyncio.new_event_loop()
+            task_loop.run_until_complete(_poll(pool, url, 1))
+            assert pool.get_stats()['active_sessions'] == 1
+            pool.close_sync()
+            task_loop.close()
+
+            assert pool.get_stats()['sessions_created'] == 4
+        finally:
+            asyncio.run_coroutine_threadsafe(runner.cleanup(), server_loop).result(timeout=5)
+            server_loop.call_soon_threadsafe(server_loop.stop)
+            server_thread.join(timeout=5)
+            server_loop.close()
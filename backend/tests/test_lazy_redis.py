@@ -0,0 +1,39 @@
+from unittest.mock import patch
+
+from app.core.config import settings
+from app.services.lazy_redis import LazyRedis, SettingsDefault
+
+
+class Configured:
+    ttl_seconds = SettingsDefault('asr_cache_ttl_seconds')
+
+    def __init__(self, ttl_seconds=None):
+        self._ttl_seconds = ttl_seconds
+
+
+class TestLazyRedis:
+    """测试共享的可降级Redis连接"""
+
+    def test_failed_connection_not_retried_within_interval(self):
+        """测试连接失败后在重试间隔内直接返回None"""
+        with patch('app.services.lazy_redis.redis.from_url', side_effect=ConnectionError("refused")) as from_url:
+            lazy = LazyRedis("测试")
+            assert lazy.get() is None
+            assert lazy.get() is None
+        assert from_url.call_count == 1
+
+    def test_connection_created_once(self):
+        """测试连接成功后复用同一个客户端"""
+        with patch('app.services.lazy_redis.redis.from_url') as from_url:
+            lazy = LazyRedis("测试", "redis://example:6379/1", socket_timeout=2)
+            assert lazy.get() is lazy.get()
+        from_url.assert_called_once()
+        assert from_url.call_args.args == ("redis://example:6379/1",)
+        assert from_url.call_args.kwargs['socket_timeout'] == 2
+
+    def test_settings_default(self):
+        """测试构造参数优先，未指定时读取settings"""
+        assert Configured(10).ttl_seconds == 10
+        assert Configured().ttl_seconds == settings.asr_cache_ttl_seconds
+        with patch.object(settings, 'asr_cache_ttl_seconds', 123):
+            assert Configured().ttl_seconds == 123
@@ -0,0 +1,139 @@
+import os
+import time
+import threading
+import pytest
+from unittest.mock import patch
+
+from app.services.media_cache import MediaCache
+from app.services.minio_client import minio_service
+
+
+class FakeBucket:
+    """模拟MinIO中的对象，记录下载次数"""
+
+    def __init__(self):
+        self.objects = {}
+        self.downloads = []
+
+    def put(self, object_name, content, etag):
+        self.objects[object_name] = (content, etag)
+
+    def stat_file_sync(self, object_name):
+        if object_name not in self.objects:
+            return None
+        content, etag = self.objects[object_name]
+        return {'etag': etag, 'size': len(content)}
+
+    def download_file_sync(self, object_name, file_path, chunk_size=None):
+        time.sleep(0.05)
+        content, _ = self.objects[object_name]
+        self.downloads.append(object_name)
+        with open(file_path, 'wb') as f:
+            f.write(content)
+        return len(content)
+
+
+class TestMediaCache:
+    """测试节点本地媒体缓存"""
+
+    @pytest.fixture
+    def bucket(self):
+        bucket = FakeBucket()
+        with patch.object(minio_service, 'stat_file_sync', side_effect=bucket.stat_file_sync), \
+             patch.object(minio_service, 'download_file_sync', side_effect=bucket.download_file_sync):
+            yield bucket
+
+    @pytest.fixture
+    def cache(self, tmp_path):
+        return MediaCache(cache_dir=str(tmp_path / "cache"), max_bytes=250, enabled=True)
+
+    def test_miss_then_hit(self, cache, bucket):
+        """测试第二次读取命中缓存，不再下载"""
+        bucket.put("videos/a.mp4", b"a" * 100, "etag-a")
+
+        with cache.local_path("videos/a.mp4") as path:
+            assert path.endswith(".mp4")
+            assert open(path, 'rb').read() == b"a" * 100
+        with cache.local_path("videos/a.mp4") as path:
+            assert os.path.exists(path)
+
+        stats = cache.get_stats()
+        assert bucket.downloads == ["videos/a.mp4"]
+        assert (stats['hits'], stats['misses']) == (1, 1)
+        assert stats['entries'] == 1
+
+    def test_etag_change_invalidates_entry(self, cache, bucket):
+        """测试对象被覆盖（ETag变化）后重新下载"""
+        bucket.put("videos/a.mp4", b"a" * 100, "etag-1")
+        with cache.local_path("videos/a.mp4"):
+            pass
+        bucket.put("videos/a.mp4", b"b" * 100, "etag-2")
+        with cache.local_path("videos/a.mp4") as path:
+            assert open(path, 'rb').read() == b"b" * 100
+
+        assert len(bucket.downloads) == 2
+
+    def test_concurrent_tasks_download_once(self, cache, bucket):
+        """测试并发读取同一对象时只下载一次"""
+        bucket.put("videos/a.mp4", b"a" * 100, "etag-a")
+        errors = []
+
+        def _read():
+            try:
+                with cache.local_path("videos/a.mp4") as path:
+                    assert open(path, 'rb').read() == b"a" * 100
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=_read) for _ in range(6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert errors == []
+        assert bucket.downloads == ["videos/a.mp4"]
+        stats = cache.get_stats()
+        assert (stats['hits'], stats['misses']) == (5, 1)
+
+    def test_lru_eviction_skips_entries_in_use(self, cache, bucket):
+        """测试超出容量时淘汰最久未使用的条目，正在使用的条目不会被淘汰"""
+        for name in ("a", "b", "c"):
+            bucket.put(f"videos/{name}.mp4", name.encode() * 100, f"etag-{name}")
+
+        with cache.local_path("videos/a.mp4") as path_a:
+            with cache.local_path("videos/b.mp4"):
+                pass
+            with cache.local_path("videos/c.mp4"):
+                pass
+            # a最旧但仍在使用，因此淘汰b
+            assert os.path.exists(path_a)
+
+        stats = cache.get_stats()
+        assert stats['evictions'] == 1
+        assert stats['total_bytes'] <= 250
+
+        with cache.local_path("videos/b.mp4"):
+            pass
+        assert bucket.downloads.count("videos/b.mp4") == 2
+
+    def test_oversized_object_bypasses_cache(self, cache, bucket):
+        """测试超过缓存容量的对象下载到临时文件并在使用后删除"""
+        bucket.put("videos/big.mp4", b"x" * 1000, "etag-big")
+        with cache.local_path("videos/big.mp4") as path:
+            assert os.path.getsize(path) == 1000
+        assert not os.path.exists(path)
+        assert cache.get_stats()['bypasses'] == 1
+
+    def test_put_file_seeds_cache(self, cache, bucket, tmp_path):
+        """测试上传后放入缓存，后续读取直接命中"""
+        source = tmp_path / "upload.mp4"
+        source.write_bytes(b"u" * 100)
+        bucket.put("videos/u.mp4", b"u" * 100, "etag-u")
+
+        assert cache.put_file_sync("videos/u.mp4", str(source))
+        with cache.local_path("videos/u.mp4"):
+            pass
+
+        assert bucket.downloads == []
+        assert cache.get_stats()['hits'] == 1
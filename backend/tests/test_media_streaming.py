@@ -0,0 +1,122 @@
+import pytest
+from datetime import datetime, timezone
+from unittest.mock import patch
+
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+from minio.datatypes import Object
+
+from app.core.config import settings
+from app.services.media_streaming import stream_minio_object
+from app.services.minio_client import minio_service
+
+DATA = bytes(range(256)) * 40  # 10240字节
+LAST_MODIFIED = datetime(2026, 10, 12, 8, 0, 0, tzinfo=timezone.utc)
+
+
+class FakeStream:
+    """按offset/length截取的对象内容，每次read最多返回1000字节"""
+
+    def __init__(self, data):
+        self.data = data
+        self.closed = False
+
+    async def read(self, size=-1):
+        size = min(size, 1000)
+        chunk, self.data = self.data[:size], self.data[size:]
+        return chunk
+
+    def close(self):
+        self.closed = True
+
+
+class TestStreamMinioObject:
+    """测试共享的MinIO流式响应：Range、条件请求和分块"""
+
+    @pytest.fixture
+    def env(self):
+        fetches, streams = [], []
+
+        async def get_file_stat(object_name):
+            if object_name != "videos/1.mp4":
+                return None
+            return Object("bucket", object_name, last_modified=LAST_MODIFIED, etag="abc123", size=len(DATA))
+
+        async def get_file_stream(object_name, offset=0, length=None):
+            fetches.append((offset, length))
+            stream = FakeStream(DATA[offset:offset + length if length else None])
+            streams.append(stream)
+            return stream
+
+        app = FastAPI()
+
+        @app.get("/media/{path:path}")
+        async def media(path: str, request: Request):
+            return await stream_minio_object(request, path, filename="视频 1.mp4")
+
+        with patch.object(minio_service, 'get_file_stat', get_file_stat), \
+             patch.object(minio_service, 'get_file_stream', get_file_stream), \
+             patch.object(settings, 'media_stream_chunk_size', 4096):
+            yield TestClient(app), fetches, streams
+
+    def test_full_response(self, env):
+        """测试完整响应带ETag、Last-Modified和编码后的文件名，不带Range请求MinIO"""
+        client, fetches, streams = env
+        response = client.get("/media/videos/1.mp4")
+        assert response.status_code == 200
+        assert response.content == DATA
+        assert response.headers['etag'] == '"abc123"'
+        assert response.headers['last-modified'] == "Mon, 12 Oct 2026 08:00:00 GMT"
+        assert response.headers['accept-ranges'] == "bytes"
+        assert response.headers['content-length'] == str(len(DATA))
+        assert response.headers['content-disposition'] == "attachment; filename*=UTF-8''%E8%A7%86%E9%A2%91%201.mp4"
+        assert fetches == [(0, None)]
+        assert streams[0].closed
+
+    def test_range_fetches_only_requested_bytes(self, env):
+        """测试Range请求返回206，只从MinIO读取请求的范围"""
+        client, fetches, _ = env
+        response = client.get("/media/videos/1.mp4", headers={"Range": "bytes=5000-"})
+        assert response.status_code == 206
+        assert response.content == DATA[5000:]
+        assert response.headers['content-range'] == f"bytes 5000-{len(DATA) - 1}/{len(DATA)}"
+        assert fetches == [(5000, len(DATA) - 5000)]
+
+        response = client.get("/media/videos/1.mp4", headers={"Range": "bytes=-100"})
+        assert response.content == DATA[-100:]
+
+    def test_unsatisfiable_range(self, env):
+        """测试超出对象大小的范围返回416"""
+        client, fetches, _ = env
+        response = client.get("/media/videos/1.mp4", headers={"Range": f"bytes={len(DATA)}-"})
+        assert response.status_code == 416
+        assert response.headers['content-range'] == f"bytes */{len(DATA)}"
+        assert fetches == []
+
+    def test_if_range_mismatch_returns_full_object(self, env):
+        """测试If-Range与当前ETag不一致时忽略Range"""
+        client, _, _ = env
+        response = client.get("/media/videos/1.mp4", headers={"Range": "bytes=0-9", "If-Range": '"old"'})
+        assert response.status_code == 200
+        assert response.content == DATA
+
+    def test_conditional_requests(self, env):
+        """测试If-None-Match和If-Modified-Since命中时返回304且不读取MinIO"""
+        client, fetches, _ = env
+        response = client.get("/media/videos/1.mp4", headers={"If-None-Match": 'W/"abc123"'})
+        assert response.status_code == 304
+        assert response.content == b''
+        assert response.headers['etag'] == '"abc123"'
+
+        response = client.get("/media/videos/1.mp4", headers={"If-Modified-Since": "Mon, 12 Oct 2026 08:00:00 GMT"})
+        assert response.status_code == 304
+
+        response = client.get("/media/videos/1.mp4", headers={"If-None-Match": '"other"',
+                                                              "If-Modified-Since": "Mon, 12 Oct 2026 08:00:00 GMT"})
+        assert response.status_code == 200
+        assert fetches == [(0, None)]
+
+    def test_missing_object(self, env):
+        """测试对象不存在时返回404"""
+        client, _, _ = env
+        assert client.get("/media/videos/missing.mp4").status_code == 404
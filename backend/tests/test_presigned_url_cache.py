@@ -0,0 +1,113 @@
+import asyncio
+import pytest
+from unittest.mock import patch
+
+from app.services.minio_client import minio_service
+from app.services.presigned_url_cache import PresignedURLCache
+
+
+class CountingSigner:
+    """替代MinIO客户端的签名，记录签名次数"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def _sign(self, object_name):
+        self.calls += 1
+        return f"https://media.example.com/bucket/{object_name}?sig={self.calls}"
+
+    def presigned_get_object(self, bucket_name, object_name, expires):
+        return self._sign(object_name)
+
+
+class AsyncCountingSigner(CountingSigner):
+    async def presigned_get_object(self, bucket_name, object_name, expires):
+        return self._sign(object_name)
+
+
+def _make_cache(redis):
+    cache = PresignedURLCache(enabled=True, min_remaining_ratio=0.5, local_ttl=60, max_local_entries=100)
+    redis.attach(cache._redis)
+    return cache
+
+
+class TestPresignedURLCache:
+    """测试预签名URL的复用、失效和批量签名"""
+
+    @pytest.fixture
+    def cache(self, fake_redis):
+        cache = _make_cache(fake_redis)
+        with patch('app.services.minio_client.presigned_url_cache', cache):
+            yield cache
+
+    @pytest.fixture
+    def signer(self):
+        signer = CountingSigner()
+        with patch.object(minio_service, 'public_client', signer):
+            yield signer
+
+    @pytest.fixture
+    def async_signer(self):
+        signer = AsyncCountingSigner()
+        with patch.object(minio_service, 'async_client', signer):
+            yield signer
+
+    def test_reuses_url_until_remaining_lifetime_too_short(self, cache, signer):
+        """测试剩余有效期不少于一半时复用URL，之后重新签名"""
+        with patch('app.services.presigned_url_cache.time.time', return_value=1000.0), \
+             patch('app.services.minio_client.time.time', return_value=1000.0):
+            first = minio_service.get_file_url_sync("thumbs/1.jpg", expiry=3600)
+        with patch('app.services.presigned_url_cache.time.time', return_value=1000.0 + 1800):
+            assert minio_service.get_file_url_sync("thumbs/1.jpg", expiry=3600) == first
+        with patch('app.services.presigned_url_cache.time.time', return_value=1000.0 + 1801):
+            assert minio_service.get_file_url_sync("thumbs/1.jpg", expiry=3600) != first
+        assert signer.calls == 2
+
+    def test_expiry_is_part_of_key(self, cache, signer):
+        """测试不同有效期分别缓存"""
+        short = minio_service.get_file_url_sync("a.mp4", expiry=3600)
+        long = minio_service.get_file_url_sync("a.mp4", expiry=86400)
+        assert short != long
+        assert minio_service.get_file_url_sync("a.mp4", expiry=86400) == long
+        assert signer.calls == 2
+
+    def test_other_process_reuses_url_from_redis(self, cache, fake_redis, signer):
+        """测试其他进程（独立的进程内缓存）从Redis拿到同一个URL"""
+        url = minio_service.get_file_url_sync("a.mp4")
+        other = _make_cache(fake_redis)
+        assert other.get_many_sync(["a.mp4"], 3600) == {"a.mp4": url}
+        assert other.get_stats()['redis_hits'] == 1
+
+    def test_delete_invalidates(self, cache, fake_redis, signer):
+        """测试删除对象后清除进程内和Redis中的URL"""
+        minio_service.get_file_url_sync("a.mp4")
+        with patch.object(minio_service, 'internal_client') as client:
+            assert minio_service.delete_file_sync("a.mp4")
+        client.remove_object.assert_called_once()
+        assert fake_redis.hashes == {}
+        minio_service.get_file_url_sync("a.mp4")
+        assert signer.calls == 2
+
+    def test_configure_switches_namespace(self, cache, fake_redis, signer):
+        """测试配置变化后不再返回旧配置签出的URL"""
+        minio_service.get_file_url_sync("a.mp4")
+        cache.configure("new-endpoint:9000", "key", "bucket")
+        minio_service.get_file_url_sync("a.mp4")
+        assert signer.calls == 2
+        assert len(fake_redis.hashes) == 2
+
+    def test_batch_signs_misses_with_one_lookup(self, cache, fake_redis, async_signer):
+        """测试批量获取时缓存只查询一次，只对未命中的对象签名"""
+        loop = asyncio.new_event_loop()
+        try:
+            first = loop.run_until_complete(minio_service.get_file_url("0.jpg"))
+            cache.clear_local()
+            fake_redis.calls.clear()
+            names = [f"{i}.jpg" for i in range(100)]
+            urls = loop.run_until_complete(minio_service.get_file_urls(names))
+        finally:
+            loop.close()
+        assert len(urls) == 100 and urls["0.jpg"] == first
+        assert async_signer.calls == 100
+        # 一次批量读取 + 一次批量写回
+        assert fake_redis.calls['execute'] == 2
@@ -0,0 +1,131 @@
+import time
+import pickle
+import asyncio
+
+import pytest
+import redis
+from unittest.mock import patch
+
+from app.core.config import settings
+
+
+def _redis_available():
+    try:
+        redis.from_url(settings.redis_url, socket_connect_timeout=1).ping()
+        return True
+    except Exception:
+        return False
+
+
+# 模块导入时全局实例即连接Redis
+pytestmark = pytest.mark.skipif(not _redis_available(), reason="需要Redis")
+
+
+@pytest.fixture
+def client():
+    from app.services.standalone_callback_client import StandaloneCallbackClient
+    return StandaloneCallbackClient()
+
+
+def _complete(client, task_id, publish=True):
+    """模拟回调服务器保存结果并发布通知"""
+    data = {'task_id': task_id, 'result': {'status': 'completed', 'task_id': task_id}}
+    client._redis_client.setex(client._get_result_key(task_id), 60, pickle.dumps(data))
+    if publish:
+        client._redis_client.publish(f"{settings.tus_result_channel_prefix}{task_id}", 'completed')
+
+
+class TestNotificationFallback:
+    """测试通知订阅不可用时的等待间隔"""
+
+    def test_wait_capped_to_fallback_poll_without_subscription(self):
+        """测试没有订阅时wait最多等待5秒，不会按兜底轮询间隔睡满"""
+        from app.services import standalone_callback_client as module
+
+        client = module.StandaloneCallbackClient()
+        sleeps = []
+
+        async def fake_sleep(seconds):
+            sleeps.append(seconds)
+
+        async def run():
+            async with client.result_notifications('no-subscription') as wait:
+                return await wait(30)
+
+        with patch.object(settings, 'tus_result_notify_enabled', False), \
+             patch.object(module.asyncio, 'sleep', fake_sleep):
+            assert asyncio.run(run()) is False
+        assert sleeps == [module.FALLBACK_POLL_SECONDS]
+
+
+class TestResultNotification:
+    """测试任务完成通知唤醒等待者"""
+
+    def test_notification_wakes_waiter_immediately(self, client):
+        """测试发布通知后等待者立即返回，不等兜底轮询"""
+        async def run():
+            loop = asyncio.get_running_loop()
+            loop.call_later(0.3, _complete, client, 'notify-task')
+            started = time.monotonic()
+            result = await client.wait_for_result('notify-task', timeout=20)
+            return result, time.monotonic() - started
+
+        with patch.object(settings, 'tus_result_safety_poll_seconds', 30):
+            result, elapsed = asyncio.run(run())
+        client.cleanup_task('notify-task')
+
+        assert result['status'] == 'completed'
+        assert elapsed < 3
+
+    def test_safety_poll_when_notification_lost(self, client):
+        """测试通知丢失时兜底轮询仍能取到结果"""
+        async def run():
+            asyncio.get_running_loop().call_later(0.2, _complete, client, 'lost-task', False)
+            return await client.wait_for_result('lost-task', timeout=10)
+
+        with patch.object(settings, 'tus_result_safety_poll_seconds', 1):
+            result = asyncio.run(run())
+        client.cleanup_task('lost-task')
+
+        assert result['task_id'] == 'lost-task'
+
+    def test_concurrent_waiters_share_one_subscription(self, client):
+        """测试同一事件循环中的等待者共用一个订阅，全部结束后订阅关闭"""
+        task_ids = [f"shared-task-{i}" for i in range(5)]
+
+        async def run():
+            loop = asyncio.get_running_loop()
+            for i, task_id in enumerate(task_ids):
+                loop.call_later(0.2 + i * 0.05, _complete, client, task_id)
+            waiters = [asyncio.create_task(client.wait_for_result(task_id, timeout=20)) for task_id in task_ids]
+            await asyncio.sleep(0.1)
+            listener = client._listeners[loop]
+            subscribed = listener._task
+            results = await asyncio.gather(*waiters)
+            return listener, subscribed, results
+
+        with patch.object(settings, 'tus_result_safety_poll_seconds', 30):
+            listener, subscribed, results = asyncio.run(run())
+        for task_id in task_ids:
+            client.cleanup_task(task_id)
+
+        assert [r['task_id'] for r in results] == task_ids
+        assert subscribed is not None
+        assert listener.notifications >= len(task_ids)
+        assert listener._task is None
+
+    def test_subscribed_before_status_check(self, client):
+        """测试进入订阅后、查询状态前发布的通知也能唤醒等待者"""
+        async def run():
+            async with client.result_notifications('early-task') as wait:
+                # 调用方查询状态期间任务完成并发布通知
+                _complete(client, 'early-task')
+                started = time.monotonic()
+                notified = await wait(30)
+                return notified, time.monotonic() - started
+
+        notified, elapsed = asyncio.run(run())
+        client.cleanup_task('early-task')
+
+        assert notified
+        assert elapsed < 3
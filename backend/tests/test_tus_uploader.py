@@ -0,0 +1,286 @@
+import os
+import asyncio
+import pytest
+from contextlib import asynccontextmanager
+from unittest.mock import patch
+from aiohttp import web
+
+from app.services.tus_uploader import AdaptiveUploadTuner, TusUploader
+from app.services.tus_upload_state import TusUploadStateStore
+
+
+class StandInTusServer:
+    """本地TUS服务端替身，支持creation和可选的concatenation扩展"""
+
+    def __init__(self, concatenation=True, patch_delay=0.02, fail_final=False, hang_after_patches=None):
+        self.concatenation = concatenation
+        self.patch_delay = patch_delay
+        self.fail_final = fail_final
+        self.hang_after_patches = hang_after_patches
+        self.released = None
+        self.uploads = {}
+        self.finished = []
+        self.active_patches = 0
+        self.max_active_patches = 0
+        self.patch_count = 0
+        self.app = web.Application(client_max_size=64 * 1024 * 1024)
+        self.app.router.add_route('OPTIONS', '/files', self.options)
+        self.app.router.add_post('/files', self.create)
+        self.app.router.add_patch('/files/{upload_id}', self.patch)
+        self.app.router.add_route('HEAD', '/files/{upload_id}', self.head)
+
+    async def options(self, request):
+        extensions = 'creation,concatenation' if self.concatenation else 'creation'
+        return web.Response(status=204, headers={'Tus-Resumable': '1.0.0', 'Tus-Extension': extensions})
+
+    async def create(self, request):
+        upload_id = f"u{len(self.uploads)}"
+        concat = request.headers.get('Upload-Concat', '')
+        if concat.startswith('final;'):
+            if self.fail_final:
+                return web.Response(status=500, text="final disabled")
+            parts = [self.uploads[url.rstrip('/').split('/')[-1]] for url in concat[len('final;'):].split()]
+            assert all(part['partial'] and len(part['data']) == part['length'] for part in parts)
+            data = b''.join(bytes(part['data']) for part in parts)
+            self.uploads[upload_id] = {'data': bytearray(data), 'length': len(data), 'partial': False}
+            self.finished.append((request.headers.get('Upload-Metadata'), data))
+        else:
+            self.uploads[upload_id] = {
+                'data': bytearray(),
+                'length': int(request.headers['Upload-Length']),
+                'partial': concat == 'partial',
+                'metadata': request.headers.get('Upload-Metadata')
+            }
+        return web.Response(status=201, headers={'Location': f"/files/{upload_id}"})
+
+    async def head(self, request):
+        upload = self.uploads.get(request.match_info['upload_id'])
+        if upload is None:
+            return web.Response(status=404)
+        return web.Response(status=200, headers={
+            'Upload-Offset': str(len(upload['data'])),
+            'Upload-Length': str(upload['length'])
+        })
+
+    async def patch(self, request):
+        upload = self.uploads[request.match_info['upload_id']]
+        if int(request.headers['Upload-Offset']) != len(upload['data']):
+            return web.Response(status=409)
+        if self.hang_after_patches is not None and self.patch_count >= self.hang_after_patches:
+            # 挂起直到测试恢复服务，之后让客户端已放弃的请求失败
+            self.released = self.released or asyncio.Event()
+            await self.released.wait()
+            return web.Response(status=503)
+        self.patch_count += 1
+        self.active_patches += 1
+        self.max_active_patches = max(self.max_active_patches, self.active_patches)
+        try:
+            body = await request.read()
+            await asyncio.sleep(self.patch_delay)
+        finally:
+            self.active_patches -= 1
+        upload['data'].extend(body)
+        if not upload['partial'] and len(upload['data']) == upload['length']:
+            self.finished.append((upload['metadata'], bytes(upload['data'])))
+        return web.Response(status=204, headers={'Upload-Offset': str(len(upload['data']))})
+
+
+@asynccontextmanager
+async def _serve(server):
+    runner = web.AppRunner(server.app)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    try:
+        yield f"http://127.0.0.1:{port}"
+    finally:
+        if server.released:
+            server.released.set()
+        await runner.cleanup()
+
+
+async def _run_upload(server, file_path, task_id="task-1"):
+    async with _serve(server) as base_url:
+        uploader = TusUploader(base_url)
+        upload_id = await uploader.upload(file_path, file_path.name, task_id)
+        return uploader, upload_id
+
+
+@pytest.fixture
+def small_chunks():
+    with patch.multiple(
+        'app.services.tus_uploader.settings',
+        tus_upload_parallel_enabled=True,
+        tus_upload_max_concurrency=4,
+        tus_upload_chunk_size=256 * 1024,
+        tus_upload_min_chunk_size=128 * 1024,
+        tus_upload_max_chunk_size=512 * 1024,
+        tus_upload_target_chunk_seconds=0.05
+    ):
+        yield
+
+
+@pytest.fixture
+def audio_file(tmp_path):
+    path = tmp_path / "audio.flac"
+    path.write_bytes(os.urandom(3 * 1024 * 1024 + 12345))
+    return path
+
+
+class TestTusUploader:
+    """测试TUS并发partial上传与顺序上传"""
+
+    def test_concatenation_uploads_partials_concurrently(self, small_chunks, audio_file):
+        """测试服务端支持Concatenation时并发上传partial并按顺序合并"""
+        server = StandInTusServer(concatenation=True)
+        uploader, upload_id = asyncio.run(_run_upload(server, audio_file))
+
+        assert uploader.last_stats['mode'] == 'concatenation'
+        assert server.max_active_patches > 1
+        metadata, data = server.finished[-1]
+        assert data == audio_file.read_bytes()
+        assert metadata == 'filename audio.flac, task_id task-1'
+        assert server.uploads[upload_id]['data'] == audio_file.read_bytes()
+        # partial上传不带任务元数据，避免服务端提前处理
+        assert all(not upload.get('metadata') for upload in server.uploads.values() if upload['partial'])
+
+    def test_falls_back_to_sequential_without_extension(self, small_chunks, audio_file):
+        """测试服务端不支持Concatenation时顺序上传"""
+        server = StandInTusServer(concatenation=False)
+        uploader, _ = asyncio.run(_run_upload(server, audio_file))
+
+        assert uploader.last_stats['mode'] == 'sequential'
+        assert server.max_active_patches == 1
+        assert server.patch_count > 1
+        assert server.finished == [('filename audio.flac, task_id task-1', audio_file.read_bytes())]
+
+    def test_failed_final_falls_back_to_sequential(self, small_chunks, audio_file):
+        """测试合并失败时改用顺序上传，文件仍完整送达"""
+        server = StandInTusServer(concatenation=True, fail_final=True)
+        with patch('app.services.tus_uploader.asyncio.sleep', side_effect=_no_backoff):
+            uploader, _ = asyncio.run(_run_upload(server, audio_file))
+
+        assert uploader.last_stats['mode'] == 'sequential'
+        assert server.finished[-1][1] == audio_file.read_bytes()
+
+
+class TestTusUploadResume:
+    """测试按断点记录续传"""
+
+    @pytest.fixture
+    def store(self, fake_redis):
+        store = TusUploadStateStore(enabled=True, ttl_seconds=60)
+        fake_redis.attach(store._redis)
+        # 上传循环中不允许使用同步Redis连接，避免阻塞事件循环
+        store._redis.get = lambda: pytest.fail("TUS断点记录使用了同步Redis连接")
+        return store
+
+    def test_resume_key_scoped_per_submission(self, store, tmp_path):
+        """测试断点记录键按Celery任务和分段区分，内容相同的分段和其他任务的提交不共用记录"""
+        first, second = tmp_path / "seg0.flac", tmp_path / "seg1.flac"
+        first.write_bytes(b'same audio')
+        second.write_bytes(b'same audio')
+
+        keys = {
+            store.compute_key_sync(str(first), 'celery-1', 0, 'whisper', 'zh'),
+            store.compute_key_sync(str(second), 'celery-1', 1, 'whisper', 'zh'),
+            store.compute_key_sync(str(first), 'celery-2', 0, 'whisper', 'zh'),
+            store.compute_key_sync(str(first), 'celery-1', None, 'whisper', 'zh'),
+        }
+        assert len(keys) == 4
+        # 重新投递的任务ID不变，得到同一个键
+        assert store.compute_key_sync(str(second), 'celery-1', 0, 'whisper', 'zh') in keys
+
+    def test_sequential_resumes_from_server_offset(self, store, small_chunks, audio_file):
+        """测试顺序上传从服务端确认的offset继续，已上传的字节不再发送"""
+        data = audio_file.read_bytes()
+        server = StandInTusServer(concatenation=False)
+        server.uploads['u0'] = {
+            'data': bytearray(data[:1024 * 1024]),
+            'length': len(data),
+            'partial': False,
+            'metadata': 'filename audio.flac, task_id task-1'
+        }
+
+        async def run():
+            async with _serve(server) as base_url:
+                # 记录中的offset落后于服务端，以HEAD返回的offset为准
+                await store.save('key', {'task_id': 'task-1', 'mode': 'sequential', 'upload_url': f"{base_url}/files/u0", 'offset': 512})
+                uploader = TusUploader(base_url, state_store=store)
+                return uploader, await uploader.upload(audio_file, audio_file.name, 'task-1', 'key')
+
+        uploader, upload_id = asyncio.run(run())
+
+        assert upload_id == 'u0'
+        assert uploader.last_stats['bytes'] == len(data) - 1024 * 1024
+        assert server.finished == [('filename audio.flac, task_id task-1', data)]
+        assert asyncio.run(store.load('key')) is None
+
+    def test_concatenation_skips_completed_partials(self, store, small_chunks, audio_file):
+        """测试并发上传只补传缺失的区间，已完整的partial直接参与合并"""
+        data = audio_file.read_bytes()
+        # 两个partial完成后服务端不再响应，模拟worker在上传途中被终止
+        server = StandInTusServer(concatenation=True, hang_after_patches=2)
+
+        async def run():
+            async with _serve(server) as base_url:
+                with pytest.raises(asyncio.TimeoutError):
+                    await asyncio.wait_for(TusUploader(base_url, state_store=store).upload(
+                        audio_file, audio_file.name, 'task-1', 'key'
+                    ), 1)
+                record = await store.load('key')
+
+                # 重启后继续上传
+                server.hang_after_patches = None
+                server.released.set()
+                uploader = TusUploader(base_url, state_store=store)
+                return record, uploader, await uploader.upload(audio_file, audio_file.name, 'task-1', 'key')
+
+        record, uploader, upload_id = asyncio.run(run())
+
+        assert record['mode'] == 'concatenation'
+        done = {int(start): length for start, (_, length) in record['partials'].items()}
+        assert len(done) == 2
+        assert server.uploads[upload_id]['data'] == data
+        assert uploader.last_stats['bytes'] == len(data) - sum(done.values())
+        assert asyncio.run(store.load('key')) is None
+
+
+_real_sleep = asyncio.sleep
+
+
+async def _no_backoff(seconds):
+    """跳过重试的退避等待，保留模拟的网络延迟"""
+    await _real_sleep(min(seconds, 0.02))
+
+
+class TestAdaptiveUploadTuner:
+    """测试按吞吐量调整分块大小和并发数"""
+
+    def test_chunk_size_follows_request_rate(self):
+        """测试分块大小按单请求吞吐量 x 目标耗时计算并限制在上下限内"""
+        tuner = AdaptiveUploadTuner(4 << 20, 1 << 20, 16 << 20, target_seconds=2.0)
+        tuner.record(4 << 20, 1.0)
+        assert tuner.chunk_size == 8 << 20
+        for _ in range(10):
+            tuner.record(16 << 20, 0.1)
+        assert tuner.chunk_size == 16 << 20
+        for _ in range(20):
+            tuner.record(1 << 20, 10.0)
+        assert tuner.chunk_size == 1 << 20
+
+    def test_concurrency_grows_until_no_gain(self):
+        """测试总吞吐量提升时增加并发，提升不足10%时退回并停止增长"""
+        tuner = AdaptiveUploadTuner(4 << 20, 1 << 20, 16 << 20, max_concurrency=8, concurrency=1)
+        clock = [0.0]
+        with patch('app.services.tus_uploader.time.monotonic', side_effect=lambda: clock[0]):
+            tuner._window_start = 0.0
+            # 带宽随并发线性增长，直到3个并发时饱和
+            for _ in range(6):
+                concurrency = tuner.concurrency
+                clock[0] += 1.0
+                for _ in range(concurrency):
+                    tuner.record(min(concurrency, 3) * (1 << 20) // concurrency, 1.0)
+        assert tuner.concurrency == 3
+        assert not tuner._growing
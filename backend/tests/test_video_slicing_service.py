@@ -0,0 +1,296 @@
+import json
+import pytest
+import re
+import shutil
+import subprocess
+import time
+from unittest.mock import Mock, patch
+
+from app.services.video_slicing_service import VideoSlicingService
+from app.services.minio_client import minio_service
+
+
+class TestKeyframeIndex:
+    """测试关键帧索引相关功能"""
+
+    @pytest.fixture
+    def service(self):
+        """创建视频切片服务实例"""
+        return VideoSlicingService()
+
+    @pytest.fixture
+    def keyframe_index(self):
+        """每2秒一个关键帧的60秒视频"""
+        return {
+            "version": 1,
+            "duration": 60.0,
+            "keyframes": [float(t) for t in range(0, 60, 2)]
+        }
+
+    def test_build_keyframe_index_parses_ffprobe_output(self, service):
+        """测试解析ffprobe的包列表输出"""
+        stdout = "\n".join([
+            "packet,0.000000,K__",
+            "packet,0.040000,___",
+            "packet,2.000000,K__",
+            "packet,N/A,K__",
+            "packet,4.000000,K_D",
+            "format,6.000000",
+        ])
+        with patch('app.services.video_slicing_service.subprocess.run') as mock_run:
+            mock_run.return_value = Mock(returncode=0, stdout=stdout, stderr="")
+            result = service.build_keyframe_index_sync("/tmp/video.mp4")
+
+        assert result == {"version": 1, "duration": 6.0, "keyframes": [0.0, 2.0, 4.0]}
+
+    def test_build_keyframe_index_failure(self, service):
+        """测试ffprobe失败时返回None"""
+        with patch('app.services.video_slicing_service.subprocess.run') as mock_run:
+            mock_run.return_value = Mock(returncode=1, stdout="", stderr="error")
+            assert service.build_keyframe_index_sync("/tmp/video.mp4") is None
+
+    def test_predict_copy_cut_snaps_to_previous_keyframe(self, service, keyframe_index):
+        """测试流拷贝起点对齐到前一个关键帧"""
+        assert service.predict_copy_cut(keyframe_index, 5.5, 8.5) == (4.0, 4.5)
+
+    def test_predict_copy_cut_on_keyframe(self, service, keyframe_index):
+        """测试起点正好在关键帧上"""
+        assert service.predict_copy_cut(keyframe_index, 10.0, 20.0) == (10.0, 10.0)
+
+    def test_predict_copy_cut_clamps_to_video_duration(self, service, keyframe_index):
+        """测试结束时间超过视频时长时截断"""
+        assert service.predict_copy_cut(keyframe_index, 55.0, 90.0) == (54.0, 6.0)
+
+    def test_keyframe_drift_warnings(self, service, keyframe_index):
+        """测试关键帧偏移警告"""
+        slices = [
+            {
+                "start": "00:00:03,900",
+                "end": "00:00:20,000",
+                "chapters": [
+                    {"start": "00:00:10,000", "end": "00:00:15,000"}
+                ]
+            }
+        ]
+        warnings = service.get_keyframe_drift_warnings(slices, keyframe_index, max_drift=1.0)
+        assert len(warnings) == 1
+        assert warnings[0].startswith("切片 1:")
+
+    def test_generate_keyframe_index_object_name(self):
+        """测试关键帧索引对象名称"""
+        result = minio_service.generate_keyframe_index_object_name("users/1/projects/2/videos/abc.mp4")
+        assert result == "users/1/projects/2/keyframes/abc.mp4.keyframes.json"
+
+    def test_finalize_skips_ffprobe_with_predicted_duration(self, service, tmp_path):
+        """测试提供预测时长时不再调用ffprobe"""
+        output = tmp_path / "slice.mp4"
+        output.write_bytes(b"0" * 10)
+        with patch('app.services.video_slicing_service.subprocess.run') as mock_run, \
+             patch.object(minio_service, 'upload_file_sync', return_value="object"):
+            result = service._finalize_slice_output_sync(str(output), 3.0, "slice.mp4", 1, 2, 3, 4.5)
+
+        mock_run.assert_not_called()
+        assert result["duration"] == 4.5
+        assert result["file_size"] == 10
+
+
+class TestSmartCut:
+    """测试智能切割（只重新编码首个GOP）"""
+
+    @pytest.fixture
+    def service(self):
+        """创建视频切片服务实例"""
+        return VideoSlicingService()
+
+    @pytest.fixture
+    def keyframe_index(self):
+        """每2秒一个关键帧的20秒视频"""
+        return {
+            "version": 1,
+            "duration": 20.0,
+            "keyframes": [float(t) for t in range(0, 20, 2)]
+        }
+
+    def test_smart_cut_reencodes_only_leading_gop(self, service, keyframe_index, tmp_path):
+        """测试只重新编码起点到下一个关键帧的部分"""
+        with patch.object(service, '_probe_video_stream_sync', return_value={'codec_name': 'h264', 'pix_fmt': 'yuv420p'}), \
+             patch.object(service, '_run_ffmpeg_sync') as mock_run:
+            info = service._smart_cut_to_file_sync(
+                "/tmp/video.mp4", 5.52, 9.0, str(tmp_path / "out.mp4"), keyframe_index
+            )
+
+        assert info == {"keyframe": 6.0, "reencoded_duration": 0.48, "mode": "smart"}
+        assert mock_run.call_count == 3
+        head_args, tail_args, concat_args = (call.args[0] for call in mock_run.call_args_list)
+        assert head_args[head_args.index('-t') + 1] == str(6.0 - 5.52)
+        assert head_args[head_args.index('-c:v') + 1] == 'libx264'
+        assert tail_args[tail_args.index('-c') + 1] == 'copy'
+        assert concat_args[:2] == ['-f', 'concat']
+
+    def test_smart_cut_matches_source_stream_and_copies_audio(self, service, keyframe_index, tmp_path):
+        """测试重新编码的GOP沿用原始视频的profile、level和时间基，音频整段流拷贝"""
+        stream = {'codec_name': 'h264', 'profile': 'Main', 'level': 31, 'pix_fmt': 'yuv420p', 'time_base': '1/90000'}
+        with patch.object(service, '_probe_video_stream_sync', return_value=stream), \
+             patch.object(service, '_run_ffmpeg_sync') as mock_run:
+            service._smart_cut_to_file_sync(
+                "/tmp/video.mp4", 5.52, 9.0, str(tmp_path / "out.mp4"), keyframe_index
+            )
+
+        head_args, tail_args, concat_args = (call.args[0] for call in mock_run.call_args_list)
+        assert head_args[head_args.index('-profile:v') + 1] == 'main'
+        assert head_args[head_args.index('-level:v') + 1] == '3.1'
+        assert head_args[head_args.index('-video_track_timescale') + 1] == '90000'
+        assert '-c:a' not in head_args
+        assert tail_args[tail_args.index('-bsf:v') + 1] == 'h264_mp4toannexb'
+        assert concat_args[concat_args.index('-map', concat_args.index('0:v:0')) + 1] == '1:a?'
+        assert concat_args[concat_args.index('-c') + 1] == 'copy'
+
+    def test_smart_cut_on_keyframe_uses_copy(self, service, keyframe_index, tmp_path):
+        """测试起点在关键帧上时直接流拷贝"""
+        with patch.object(service, '_probe_video_stream_sync') as mock_probe, \
+             patch.object(service, '_run_ffmpeg_sync') as mock_run:
+            info = service._smart_cut_to_file_sync(
+                "/tmp/video.mp4", 6.0, 9.0, str(tmp_path / "out.mp4"), keyframe_index
+            )
+
+        assert info["mode"] == "copy"
+        assert info["reencoded_duration"] == 0.0
+        mock_probe.assert_not_called()
+        mock_run.assert_called_once()
+
+    def test_smart_cut_without_keyframe_in_range_encodes_clip(self, service, keyframe_index, tmp_path):
+        """测试区间内没有关键帧时整段重新编码"""
+        with patch.object(service, '_probe_video_stream_sync', return_value={'codec_name': 'h264'}), \
+             patch.object(service, '_run_ffmpeg_sync') as mock_run:
+            info = service._smart_cut_to_file_sync(
+                "/tmp/video.mp4", 6.5, 7.5, str(tmp_path / "out.mp4"), keyframe_index
+            )
+
+        assert info["mode"] == "encode"
+        mock_run.assert_called_once()
+
+    @pytest.mark.integration
+    @pytest.mark.skipif(not (shutil.which('ffmpeg') and shutil.which('ffprobe')), reason="需要ffmpeg和ffprobe")
+    def test_smart_cut_frame_accurate_on_sample_video(self, service, keyframe_index, tmp_path):
+        """测试生成的样例视频上智能切割的起点帧精确且编码时间有界"""
+        source = tmp_path / "sample.mp4"
+        subprocess.run([
+            'ffmpeg', '-v', 'error',
+            '-f', 'lavfi', '-i', 'testsrc=size=320x240:rate=25',
+            '-f', 'lavfi', '-i', 'sine=frequency=440',
+            '-t', '20',
+            '-c:v', 'libx264', '-pix_fmt', 'yuv420p',
+            '-x264-params', 'keyint=50:min-keyint=50:scenecut=0',
+            '-c:a', 'aac', '-shortest',
+            '-y', str(source)
+        ], check=True)
+
+        def _count_frames(path):
+            output = subprocess.run(
+                ['ffmpeg', '-i', str(path), '-map', '0:v', '-f', 'null', '-'],
+                capture_output=True, text=True
+            ).stderr
+            return int(re.findall(r'frame=\s*(\d+)', output)[-1])
+
+        start_time, end_time = 5.52, 9.0
+        smart_output = tmp_path / "smart.mp4"
+        started = time.perf_counter()
+        info = service._smart_cut_to_file_sync(str(source), start_time, end_time, str(smart_output))
+        smart_elapsed = time.perf_counter() - started
+
+        full_output = tmp_path / "full.mp4"
+        started = time.perf_counter()
+        service._run_ffmpeg_sync([
+            '-ss', str(start_time), '-i', str(source), '-t', str(end_time - start_time),
+            '-c:v', 'libx264', '-preset', 'veryfast', '-c:a', 'aac', '-y', str(full_output)
+        ])
+        full_elapsed = time.perf_counter() - started
+
+        # 起点帧精确：帧数接近 (end - start) * fps，而流拷贝会从4秒处的关键帧开始
+        expected_frames = round((end_time - start_time) * 25)
+        copy_frames = round((end_time - 4.0) * 25)
+        frames = _count_frames(smart_output)
+        assert abs(frames - expected_frames) <= 4
+        assert frames < copy_frames
+
+        # 只重新编码到下一个关键帧（6秒）为止
+        assert info["mode"] == "smart"
+        assert info["keyframe"] == pytest.approx(6.0, abs=0.05)
+        assert info["reencoded_duration"] <= 2.0
+        assert smart_elapsed < full_elapsed * 3 + 2
+
+
+    @pytest.mark.integration
+    @pytest.mark.skipif(not (shutil.which('ffmpeg') and shutil.which('ffprobe')), reason="需要ffmpeg和ffprobe")
+    def test_smart_cut_output_decodes_for_non_default_profile(self, service, tmp_path):
+        """测试Main profile、48kHz立体声的源视频智能切割后能完整解码，编码参数与源一致"""
+        source = tmp_path / "main.mp4"
+        subprocess.run([
+            'ffmpeg', '-v', 'error',
+            '-f', 'lavfi', '-i', 'testsrc=size=320x240:rate=25',
+            '-f', 'lavfi', '-i', 'sine=frequency=440:sample_rate=48000',
+            '-t', '20',
+            '-c:v', 'libx264', '-profile:v', 'main', '-level:v', '3.1', '-pix_fmt', 'yuv420p',
+            '-x264-params', 'keyint=50:min-keyint=50:scenecut=0',
+            '-video_track_timescale', '90000',
+            '-c:a', 'aac', '-ar', '48000', '-ac', '2', '-shortest',
+            '-y', str(source)
+        ], check=True)
+
+        output = tmp_path / "smart.mp4"
+        info = service._smart_cut_to_file_sync(str(source), 5.52, 9.0, str(output))
+        assert info["mode"] == "smart"
+
+        probe = subprocess.run([
+            'ffprobe', '-v', 'error', '-count_frames',
+            '-show_entries', 'stream=codec_type,profile,level,time_base,sample_rate,channels,nb_read_frames',
+            '-of', 'json', str(output)
+        ], capture_output=True, text=True, check=True)
+        streams = {s['codec_type']: s for s in json.loads(probe.stdout)['streams']}
+        assert probe.stderr == ''
+        assert streams['video']['profile'] == 'Main'
+        assert streams['video']['level'] == 31
+        assert streams['video']['time_base'] == '1/90000'
+        assert abs(int(streams['video']['nb_read_frames']) - round((9.0 - 5.52) * 25)) <= 4
+        assert streams['audio']['sample_rate'] == '48000'
+        assert streams['audio']['channels'] == 2
+
+        decode = subprocess.run(['ffmpeg', '-v', 'error', '-i', str(output), '-f', 'null', '-'],
+                                capture_output=True, text=True)
+        assert decode.returncode == 0
+        assert decode.stderr == ''
+
+
+class TestParallelSlicing:
+    """测试并行批量切割"""
+
+    @pytest.fixture
+    def service(self):
+        """创建视频切片服务实例"""
+        return VideoSlicingService()
+
+    def test_parallel_results_keep_order_and_isolate_failures(self, service):
+        """测试并行切割时结果顺序不变且单个失败不影响其他切片"""
+        cuts = [
+            {'start_time': i * 10.0, 'end_time': i * 10.0 + 5, 'output_filename': f'slice_{i}.mp4'}
+            for i in range(8)
+        ]
+
+        def _fake_slice(video_path, start_time, end_time, output_filename, *args):
+            time.sleep(0.01 * (8 - start_time / 10))
+            if output_filename == 'slice_3.mp4':
+                raise Exception("ffmpeg failed")
+            return {"success": True, "filename": output_filename, "duration": end_time - start_time}
+
+        progress = []
+        with patch.object(service, '_slice_video_impl_sync', side_effect=_fake_slice):
+            results = service.slice_video_batch_sync(
+                "/tmp/video.mp4", cuts, 1, 2, 3,
+                concurrency=4,
+                smart_cut=True,
+                progress_callback=lambda completed, total: progress.append((completed, total))
+            )
+
+        assert [r["filename"] for r in results] == [c['output_filename'] for c in cuts]
+        assert [r["success"] for r in results] == [True, True, True, False, True, True, True, True]
+        assert progress[-1] == (8, 8)